@@ -0,0 +1,98 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import Optional
+from config.settings import settings
+from utils.profiler import profiler
+from utils.timing import timing_stats
+from services.training_service import training_service
+from services.audit_log import audit_log
+
+router = APIRouter()
+
+class ProfileRequest(BaseModel):
+    seconds: Optional[float] = 10.0
+    requests: Optional[int] = None
+    interval_ms: Optional[float] = 5.0
+
+class TrainRequest(BaseModel):
+    mode: str = Field("full", pattern="^(full|grow)$")
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Allow the request only with an ``X-Admin-Token`` header matching ADMIN_TOKEN"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Set ADMIN_TOKEN to enable this endpoint")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token")
+
+@router.get("/timings", dependencies=[Depends(require_admin_token)])
+async def get_timings():
+    """Per-route stage timings (count, mean, p50/p95/p99, max) since startup or the last reset"""
+    return timing_stats.snapshot()
+
+@router.post("/timings/reset", dependencies=[Depends(require_admin_token)])
+async def reset_timings():
+    """Clear the aggregated stage timings"""
+    timing_stats.reset()
+    return {"status": "reset"}
+
+@router.post("/profile", status_code=202, dependencies=[Depends(require_admin_token)])
+async def start_profile(request: ProfileRequest):
+    """Sample all threads for the next N timed requests or T seconds, whichever ends first"""
+    seconds = min(request.seconds or settings.PROFILER_MAX_SECONDS, settings.PROFILER_MAX_SECONDS)
+    if not profiler.start(seconds, max_requests=request.requests, interval_ms=request.interval_ms or 5.0):
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+    return profiler.get_status()
+
+@router.post("/profile/stop", dependencies=[Depends(require_admin_token)])
+async def stop_profile():
+    """End the current profiling session early"""
+    profiler.stop()
+    return profiler.get_status()
+
+@router.get("/profile", dependencies=[Depends(require_admin_token)])
+async def get_profile(format: str = Query("json", pattern="^(json|collapsed)$")):
+    """Profile of the last session
+
+    ``format=collapsed`` returns ``frame;frame;frame count`` lines for
+    flamegraph.pl or speedscope; JSON gives status and the hottest functions.
+    """
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return dict(profiler.get_status(), top_functions=profiler.top_functions())
+
+@router.post("/train", status_code=202, dependencies=[Depends(require_admin_token)])
+async def start_training(request: TrainRequest):
+    """Retrain the live anomaly model from the stored transactions in the background
+    
+    Needs the ``X-Admin-Token`` header (ADMIN_TOKEN). ``full`` fits a new forest on a reservoir sample of every stored row;
+    ``grow`` adds trees fitted on the rows stored since the last run.
+    """
+    if not training_service.start(request.mode):
+        raise HTTPException(status_code=409, detail="A training run is already in progress")
+    return training_service.get_status()
+
+@router.get("/train")
+async def get_training_status():
+    """State of the current or last training run"""
+    return training_service.get_status()
+
+@router.get("/audit", dependencies=[Depends(require_admin_token)])
+async def read_audit_log(
+    start: Optional[float] = Query(None, description="Epoch seconds"),
+    end: Optional[float] = Query(None, description="Epoch seconds"),
+    limit: int = Query(1000, ge=1, le=100000)
+):
+    """Audit records of the scoring decisions logged between ``start`` and ``end``, oldest first
+    
+    Only the frames in the range are read, located through the log's index.
+    Needs the ``X-Admin-Token`` header (ADMIN_TOKEN).
+    """
+    records = await run_in_threadpool(audit_log.read, start, end, limit)
+    return {
+        "count": len(records),
+        "records": records.to_dict(orient="records"),
+        "log": audit_log.get_stats()
+    }
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import pandas as pd
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from services.alert_service import alert_broker, OVERFLOW_POLICIES, POLICY_COALESCE
+from services.vendor_service import canonical_vendors
+
+router = APIRouter()
+
+@router.websocket("/ws")
+async def anomaly_alerts(
+    websocket: WebSocket,
+    department_id: Optional[int] = Query(None),
+    vendor_name: Optional[str] = Query(None),
+    min_score: float = Query(0.0),
+    policy: str = Query(POLICY_COALESCE)
+):
+    """Stream flagged transactions as they are scored
+
+    ``vendor_name`` is resolved to its canonical vendor, so one spelling
+    matches payments under any of the vendor's spellings. ``min_score`` is
+    a minimum severity, ``max(-anomaly_score, 0)``, so the default 0 sends every flagged row, including rows flagged by the
+    look-alike or split rules with a positive score, and a positive
+    ``min_score`` keeps only the forest's stronger outliers. ``policy`` chooses what happens
+    when this client falls behind: ``coalesce`` skips the oldest queued
+    messages and reports the count, ``disconnect`` closes the socket.
+    """
+    if policy not in OVERFLOW_POLICIES:
+        await websocket.close(code=1008, reason=f"Unknown policy: {policy}")
+        return
+
+    await websocket.accept()
+    if vendor_name and vendor_name.strip():
+        resolved = await run_in_threadpool(canonical_vendors, pd.DataFrame({'vendor_name': [vendor_name.strip()]}))
+        vendor_name = resolved.iat[0]
+    subscriber = alert_broker.subscribe(
+        department_id=department_id, vendor_name=vendor_name, min_score=min_score, policy=policy
+    )
+    await websocket.send_text(json.dumps({
+        "type": "subscribed",
+        "subscriber_id": subscriber.id,
+        "filters": {"department_id": department_id, "vendor_name": subscriber.vendor_name, "min_score": min_score},
+        "policy": policy,
+        "max_queue": subscriber.max_queue
+    }))
+
+    # Watch for the client going away while the sender waits for alerts
+    receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        while not receiver.done():
+            waiter = asyncio.create_task(subscriber.event.wait())
+            await asyncio.wait({waiter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            subscriber.event.clear()
+
+            # Send one at a time so the bounded queue stays the only buffer
+            while True:
+                message, skipped = subscriber.pop()
+                if skipped:
+                    await websocket.send_text(json.dumps({"type": "dropped", "alerts_dropped": skipped}))
+                if message is None:
+                    break
+                await websocket.send_text(message)
+                subscriber.delivered += 1
+
+            if subscriber.closed:
+                await websocket.close(code=1013, reason="Subscriber too slow")
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        alert_broker.unsubscribe(subscriber)
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/stats")
+async def get_alert_stats():
+    """Subscriber count, fan-out volume and dropped alerts"""
+    return alert_broker.get_stats()
@@ -1,8 +1,45 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response, UploadFile, File, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, TypeAdapter
+from typing import List, Optional, Dict, Any, Union
 import pandas as pd
 import numpy as np
+from utils.columnar import (
+    MEDIA_TYPES, arrow_available, negotiate_format, compute_reason_codes, encode_results
+)
+from utils.data_processor import DataProcessor
+from models.attribution import get_attributor
+from services.result_sinks import record_scored_batch
+from utils.timing import stage, mark_since_start
+from utils.feature_matrix import feature_builder
+from utils.result_pages import select_rows, encode_cursor, decode_cursor
+from services.admission import note_rows
+from services.result_cache import result_cache, batch_fingerprint, model_fingerprint, CACHE_HIT, CACHE_MISS
+from services.detector_service import detector_service
+from services.forensic_service import forensic_service
+from services.frequency_service import frequency_feature, frequency_service
+from services.variance_service import variance_service
+from services.vendor_service import canonical_vendors, vendor_resolver
+from services.search_service import transaction_search
+from config.settings import settings
+
+REQUIRED_COLUMNS = ['amount', 'department_id', 'vendor_name', 'transaction_date']
+
+# Feature columns a model can be trained on (ANOMALY_FEATURE_SET picks one for retraining);
+# "base" is what the bundled model uses
+FEATURE_SETS = {
+    'base': ['amount', 'department_id', 'vendor_frequency', 'time_of_day'],
+    'amount_vendor': ['amount', 'vendor_frequency'],
+    'extended': ['amount', 'department_id', 'vendor_frequency', 'time_of_day',
+                 'log_amount', 'day_of_week', 'vendor_amount_ratio', 'duplicate_count']
+}
+
+LEDGER_CONTENT_TYPES = {
+    "application/json": "json",
+    "text/csv": "csv",
+    MEDIA_TYPES["parquet"]: "parquet",
+    "application/x-parquet": "parquet"
+}
 
 router = APIRouter()
 
@@ -17,85 +54,720 @@ class BudgetAnalysisRequest(BaseModel):
     transactions: List[TransactionData]
     threshold: Optional[float] = 0.1
 
+class FeatureContribution(BaseModel):
+    feature: str
+    contribution: float
+
 class AnomalyResult(BaseModel):
     transaction_index: int
     anomaly_score: float
     is_anomaly: bool
     reasons: List[str]
+    feature_contributions: Optional[List[FeatureContribution]] = None
+
+ANOMALY_RESULTS = TypeAdapter(List[AnomalyResult])
+
+class DetectionSummary(BaseModel):
+    total_rows: int
+    anomalies: int
+    lookalike_vendors: int
+    selected: int
+    returned: int
 
-@router.post("/detect", response_model=List[AnomalyResult])
-async def detect_anomalies(request: BudgetAnalysisRequest):
-    """Detect anomalies in financial transactions"""
+class DetectionPage(BaseModel):
+    mode: str
+    summary: DetectionSummary
+    results: List[AnomalyResult]
+    next_cursor: Optional[str] = None
+
+DETECTION_PAGE = TypeAdapter(DetectionPage)
+
+@router.post("/detect", response_model=Union[List[AnomalyResult], DetectionPage])
+async def detect_anomalies(
+    request: BudgetAnalysisRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    mode: str = Query("all", pattern="^(all|anomalies|top_k)$"),
+    k: int = Query(100, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=settings.DETECT_MAX_PAGE_ROWS)
+):
+    """Detect anomalies in financial transactions
+    
+    Returns JSON by default. Send ``Accept: application/vnd.apache.arrow.stream``
+    or ``Accept: application/vnd.apache.parquet`` for columnar results.
+    Re-submitted batches are served from the result cache (``X-Cache: HIT``).
+    
+    ``mode=anomalies`` returns only the flagged rows and ``mode=top_k`` the
+    ``k`` lowest-scoring ones, as a ``DetectionPage`` with summary counts and
+    a ``next_cursor`` for ``GET /detect/pages``; so does ``limit`` with the
+    default ``mode=all``. ``X-Total-Rows`` and ``X-Anomaly-Count`` headers
+    summarise every response.
+    """
+    mark_since_start("parse")
+    output_format = negotiate_output_format(http_request)
     try:
-        # Import here to avoid circular import
-        from main import get_ml_models
-        
-        models = get_ml_models()
-        if "anomaly_detector" not in models:
-            raise HTTPException(status_code=503, detail="Anomaly detection model not loaded")
-        
         # Convert transactions to DataFrame
-        df = pd.DataFrame([t.dict() for t in request.transactions])
+        with stage("dataframe"):
+            df = pd.DataFrame([t.dict() for t in request.transactions])
+        note_rows(len(df))
         
-        # Feature engineering (FIXED)
-        features = prepare_features(df)
-        
-        # Predict anomalies
-        anomaly_detector = models["anomaly_detector"]
-        anomaly_scores = anomaly_detector.decision_function(features)
-        is_anomaly = anomaly_detector.predict(features) == -1
-        
-        # Prepare results
-        results = []
-        for i, (score, anomaly) in enumerate(zip(anomaly_scores, is_anomaly)):
-            reasons = get_anomaly_reasons(df.iloc[i], score, anomaly)
-            results.append(AnomalyResult(
-                transaction_index=i,
-                anomaly_score=float(score),
-                is_anomaly=bool(anomaly),
-                reasons=reasons
-            ))
-        
-        return results
+        return await run_in_threadpool(
+            build_detection_response, df, output_format, background_tasks, source="api",
+            mode=mode, k=k, limit=limit
+        )
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error detecting anomalies: {str(e)}")
+
+@router.post("/detect-file", response_model=Union[List[AnomalyResult], DetectionPage])
+async def detect_anomalies_in_file(
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    mode: str = Query("all", pattern="^(all|anomalies|top_k)$"),
+    k: int = Query(100, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=settings.DETECT_MAX_PAGE_ROWS)
+):
+    """Detect anomalies in an uploaded ledger file (JSON, CSV or Parquet)
+    
+    ``mode``, ``k`` and ``limit`` select and page rows as for ``/detect``.
+    """
+    output_format = negotiate_output_format(http_request)
+    ledger_format = DataProcessor.detect_ledger_format(file.filename)
+    if ledger_format is None and file.content_type:
+        ledger_format = LEDGER_CONTENT_TYPES.get(file.content_type.split(";")[0].strip().lower())
+    if ledger_format is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported ledger file: {file.filename}")
+    if ledger_format == "parquet" and not arrow_available():
+        raise HTTPException(status_code=415, detail="Parquet input requires pyarrow")
+    
+    try:
+        with stage("read_file"):
+            df = DataProcessor.load_ledger(await file.read(), ledger_format)
+        note_rows(len(df))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read ledger file: {str(e)}")
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Ledger file is missing columns: {missing}")
+    
+    try:
+        return await run_in_threadpool(
+            build_detection_response, df, output_format, background_tasks, source=f"upload:{file.filename}",
+            mode=mode, k=k, limit=limit
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error detecting anomalies: {str(e)}")
 
-def prepare_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Prepare features for anomaly detection - FIXED VERSION"""
-    features = pd.DataFrame()
+@router.get("/detect/pages", response_model=DetectionPage)
+async def get_detection_page(
+    cursor: str,
+    limit: int = Query(settings.DETECT_PAGE_ROWS, ge=1, le=settings.DETECT_MAX_PAGE_ROWS)
+):
+    """Next page of an anomalies-only, top-k or paginated ``/detect`` response
+    
+    Pages are rendered from the scored batch held in the result cache. Once
+    it has been evicted, or the model has changed, the cursor is gone (410)
+    and the batch has to be submitted again.
+    """
+    try:
+        state = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Import here to avoid circular import
+    from main import get_ml_models
+    model = get_ml_models().get("anomaly_detector")
+    entry = result_cache.peek(state['key'], model_fingerprint(model)) if model is not None else None
+    if entry is None or 'amounts' not in entry:
+        raise HTTPException(status_code=410, detail="Result set expired; submit the batch again")
+    
+    payload = await run_in_threadpool(
+        render_detection_page, entry, state['mode'], state['k'], state['offset'], limit
+    )
+    return Response(content=payload, media_type=MEDIA_TYPES["json"], headers={"X-Cache": CACHE_HIT})
+
+def negotiate_output_format(http_request: Request) -> str:
+    """Choose JSON, Arrow or Parquet output from the Accept header"""
+    output_format = negotiate_format(http_request.headers.get("accept"))
+    if output_format != "json" and not arrow_available():
+        raise HTTPException(status_code=406, detail="Columnar output requires pyarrow; use application/json")
+    return output_format
+
+def score_transactions(df: pd.DataFrame, explain: bool = False,
+                       resolution: Optional[pd.DataFrame] = None,
+                       context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Score a batch with the loaded anomaly model
+    
+    With ``explain=True`` per-feature contributions are computed for the
+    rows the forest itself flags only, so normal rows cost the same as
+    before; rows flagged by the look-alike or split rules alone get none.
+    ``resolution`` is the batch's vendor resolution when the caller already
+    has it. ``context`` comes from ``batch_context`` when ``df`` is a chunk
+    of a larger batch, and gives the chunk the batch-relative features and
+    split flags of the whole batch.
+    """
+    # Import here to avoid circular import
+    from main import get_ml_models
+    
+    models = get_ml_models()
+    if "anomaly_detector" not in models:
+        raise HTTPException(status_code=503, detail="Anomaly detection model not loaded")
+    
+    # Feature engineering (FIXED)
+    if resolution is None and settings.VENDOR_RESOLUTION_ENABLED:
+        with stage("vendors"):
+            resolution = vendor_resolver.resolve(df['vendor_name'])
+    anomaly_detector = models["anomaly_detector"]
+    with stage("features"):
+        columns = feature_columns(anomaly_detector)
+        matrix = build_feature_matrix(df, resolution, columns, context=context)
+        # Zero-copy wrapper so the forest still checks feature names
+        features = pd.DataFrame(matrix, columns=columns, copy=False)
+    
+    # Predict anomalies through the configured engine (DETECTOR_ENGINE); flagged means a score below 0
+    with stage("scoring"):
+        anomaly_scores, is_anomaly = detector_service.score(
+            anomaly_detector, df, canonical_vendors(df, resolution), features,
+            rows=None if context is None else context['rows'])
+    
+    # New spellings close to a known vendor are flagged whatever the model says
+    lookalikes = {}
+    if resolution is not None and settings.VENDOR_LOOKALIKE_FLAG:
+        lookalike_rows = np.flatnonzero(resolution['lookalike_of'].notna().to_numpy())
+        if len(lookalike_rows):
+            is_anomaly[lookalike_rows] = True
+            lookalikes = {
+                int(i): (resolution['lookalike_of'].iat[i], float(resolution['similarity'].iat[i]))
+                for i in lookalike_rows
+            }
+    
+    # Payments split under an approval threshold, and the ledger report's vendor/department findings
+    forensic = {'split': None, 'finding': None, 'reasons': {}}
+    if settings.FORENSIC_CHECKS_ENABLED:
+        with stage("forensic"):
+            forensic = forensic_service.batch_findings(df, resolution, is_anomaly, _context_splits(df, context))
+        if settings.FORENSIC_FLAG_SPLITS:
+            is_anomaly |= forensic['split']
+    
+    explanations = {}
+    flagged = np.flatnonzero(anomaly_scores < 0)
+    if explain and len(flagged):
+        with stage("explain"):
+            attributor = get_attributor(anomaly_detector, features.columns)
+            ranked = attributor.rank(attributor.explain(matrix[flagged]))
+            explanations = dict(zip(flagged.tolist(), ranked))
+    
+    lookalike = np.zeros(len(is_anomaly), dtype=bool)
+    lookalike[list(lookalikes)] = True
+    
+    return {
+        'scores': anomaly_scores,
+        'is_anomaly': is_anomaly,
+        'reason_codes': compute_reason_codes(
+            df['amount'].to_numpy(), anomaly_scores, is_anomaly, lookalike, forensic['split'], forensic['finding']
+        ),
+        'explanations': explanations,
+        'lookalikes': lookalikes,
+        'forensic': forensic['reasons'],
+        'model_version': model_fingerprint(anomaly_detector)
+    }
+
+def render_detection_payload(df: pd.DataFrame, scored: Dict[str, Any], output_format: str) -> bytes:
+    """Serialise scoring results as a JSON list of AnomalyResult, Arrow or Parquet"""
+    anomaly_scores, is_anomaly = scored['scores'], scored['is_anomaly']
+    if output_format != "json":
+        # Columns go straight from the numpy arrays into Arrow buffers
+        return encode_results(output_format, anomaly_scores, is_anomaly, scored['reason_codes'])
+    
+    results = []
+    explanations = scored['explanations']
+    lookalikes = scored.get('lookalikes', {})
+    forensic = scored.get('forensic', {})
+    for i, (score, anomaly) in enumerate(zip(anomaly_scores, is_anomaly)):
+        contributions = explanations.get(i)
+        # Only flagged rows need the transaction itself for their reasons
+        transaction = df.iloc[i] if anomaly else None
+        results.append(AnomalyResult(
+            transaction_index=i,
+            anomaly_score=float(score),
+            is_anomaly=bool(anomaly),
+            reasons=get_anomaly_reasons(transaction, score, anomaly, contributions, lookalikes.get(i), forensic.get(i)),
+            feature_contributions=contributions
+        ))
+    return ANOMALY_RESULTS.dump_json(results)
+
+def render_detection_page(entry: Dict[str, Any], mode: str, k: int, offset: int, limit: int) -> bytes:
+    """JSON ``DetectionPage`` of the rows ``mode`` selects, from ``offset``
+    
+    ``entry`` comes from ``score_and_render(..., render=False)``. Reasons are
+    built for the returned rows only. Without the result cache there is
+    nothing for a cursor to point at, so the whole selection is returned.
+    """
+    scores, is_anomaly = entry['scores'], entry['is_anomaly']
+    selected = select_rows(scores, is_anomaly, mode, k)
+    if entry['key'] is None:
+        limit = len(selected)
+    page = selected[offset:offset + limit]
+    
+    results = []
+    explanations, lookalikes, forensic = entry['explanations'], entry['lookalikes'], entry['forensic']
+    for i in page.tolist():
+        score, anomaly = float(scores[i]), bool(is_anomaly[i])
+        contributions = explanations.get(i)
+        transaction = {'amount': entry['amounts'][i], 'vendor_name': entry['vendor_names'].get(i)} if anomaly else None
+        results.append(AnomalyResult(
+            transaction_index=i,
+            anomaly_score=score,
+            is_anomaly=anomaly,
+            reasons=get_anomaly_reasons(transaction, score, anomaly, contributions, lookalikes.get(i), forensic.get(i)),
+            feature_contributions=contributions
+        ))
+    
+    end = offset + len(page)
+    return DETECTION_PAGE.dump_json(DetectionPage(
+        mode=mode,
+        summary=DetectionSummary(
+            total_rows=len(scores),
+            anomalies=int(is_anomaly.sum()),
+            lookalike_vendors=len(lookalikes),
+            selected=len(selected),
+            returned=len(page)
+        ),
+        results=results,
+        next_cursor=encode_cursor(entry['key'], mode, k, end) if end < len(selected) else None
+    ))
+
+def render_selection_columnar(entry: Dict[str, Any], output_format: str, mode: str, k: int) -> bytes:
+    """Arrow or Parquet payload of the rows ``mode`` selects, with their batch indices"""
+    scores, is_anomaly = entry['scores'], entry['is_anomaly']
+    selected = select_rows(scores, is_anomaly, mode, k)
+    return encode_results(
+        output_format, scores[selected], is_anomaly[selected], entry['reason_codes'][selected], selected
+    )
+
+def score_and_render(df: pd.DataFrame, output_format: str = "json", render: bool = True):
+    """Score and serialise a batch through the result cache; returns ``(entry, cache_status)``
+    
+    The key covers the scoring columns in row order, the output format and
+    the model fingerprint, so swapping the model invalidates every entry.
+    With ``render=False`` the entry holds what any selection of its rows
+    needs to be rendered later instead of a payload, under one key for every
+    output format; cursors point at it through ``entry['key']`` (None when
+    the cache is off).
+    """
+    key = None
+    resolution = None
+    
+    def compute():
+        scored = score_transactions(df, explain=output_format == "json" or not render, resolution=resolution)
+        # Cached arrays are shared between requests
+        scored['scores'].setflags(write=False)
+        scored['is_anomaly'].setflags(write=False)
+        scored['reason_codes'].setflags(write=False)
+        if not render:
+            lookalikes = scored['lookalikes']
+            return {
+                'key': key,
+                'scores': scored['scores'],
+                'is_anomaly': scored['is_anomaly'],
+                'reason_codes': scored['reason_codes'],
+                'model_version': scored['model_version'],
+                'amounts': df['amount'].to_numpy(dtype=np.float64),
+                'explanations': scored['explanations'],
+                'lookalikes': lookalikes,
+                'forensic': scored['forensic'],
+                'vendor_names': {i: df['vendor_name'].iat[i] for i in lookalikes}
+            }
+        with stage("render"):
+            payload = render_detection_payload(df, scored, output_format)
+        return {
+            'scores': scored['scores'],
+            'is_anomaly': scored['is_anomaly'],
+            'reason_codes': scored['reason_codes'],
+            'model_version': scored['model_version'],
+            'payload': payload
+        }
+    
+    if not settings.RESULT_CACHE_ENABLED:
+        return compute(), CACHE_MISS
+    
+    from main import get_ml_models
+    model = get_ml_models().get("anomaly_detector")
+    if model is None:
+        raise HTTPException(status_code=503, detail="Anomaly detection model not loaded")
+    
+    if settings.VENDOR_RESOLUTION_ENABLED:
+        with stage("vendors"):
+            resolution = vendor_resolver.resolve(df['vendor_name'])
+    
+    with stage("cache_key"):
+        key = f"{batch_fingerprint(df, REQUIRED_COLUMNS)}:{output_format if render else 'rows'}"
+        if settings.FREQUENCY_SOURCE == "sketch":
+            # Frequency features depend on everything seen so far
+            key = f"{key}:{frequency_service.version}"
+        if settings.VENDOR_RESOLUTION_ENABLED:
+            # Canonical names and look-alike flags depend on the spellings learned so far, so the key
+            # covers this batch's resolution rather than the whole index: learning unrelated spellings
+            # keeps it, but the first repeat of a batch that brought new look-alike spellings misses,
+            # since by then they are known and no longer flagged
+            flagged = resolution['lookalike_of'].notna()
+            key = f"{key}:v" + batch_fingerprint(
+                resolution.assign(similarity=resolution['similarity'].where(flagged, 1.0)),
+                ('canonical_name', 'lookalike_of', 'similarity'))
+        if settings.FORENSIC_CHECKS_ENABLED:
+            # Split rates and vendor/department findings come from the latest ledger report
+            key = f"{key}:f{forensic_service.refreshes}"
+        if settings.DETECTOR_ENGINE != "isolation_forest":
+            # Cleared rows depend on the prefilter's statistics
+            key = f"{key}:e{detector_service.version}"
+        version = model_fingerprint(model)
+    return result_cache.get_or_compute(key, version, compute)
+
+def build_detection_response(
+    df: pd.DataFrame,
+    output_format: str = "json",
+    background_tasks: Optional[BackgroundTasks] = None,
+    source: str = "api",
+    mode: str = "all",
+    k: int = 100,
+    limit: Optional[int] = None
+) -> Response:
+    """Score a batch and return it as JSON AnomalyResult objects or a columnar payload
+    
+    The scored batch is recorded after the response is sent when
+    ``background_tasks`` is given, otherwise before returning. Batches
+    answered from the cache were already recorded and are not stored again.
+    Any ``mode`` but ``all``, or a ``limit``, returns the first
+    ``DetectionPage`` of the selected rows instead (columnar formats return
+    every selected row and ignore ``limit``).
+    """
+    paged = mode != "all" or limit is not None
+    entry, cache_status = score_and_render(df, output_format, render=not paged)
+    if cache_status == CACHE_MISS:
+        if background_tasks is not None:
+            background_tasks.add_task(
+                record_scored_batch, df, entry['scores'], entry['is_anomaly'], source,
+                reason_codes=entry['reason_codes'], model_version=entry['model_version']
+            )
+        else:
+            record_scored_batch(df, entry['scores'], entry['is_anomaly'], source,
+                                reason_codes=entry['reason_codes'], model_version=entry['model_version'])
+    
+    headers = {
+        "X-Cache": cache_status,
+        "X-Total-Rows": str(len(entry['scores'])),
+        "X-Anomaly-Count": str(int(entry['is_anomaly'].sum()))
+    }
+    if not paged:
+        payload = entry['payload']
+    elif output_format != "json":
+        with stage("render"):
+            payload = render_selection_columnar(entry, output_format, mode, k)
+    else:
+        with stage("render"):
+            payload = render_detection_page(entry, mode, k, 0, limit or settings.DETECT_PAGE_ROWS)
+    return Response(content=payload, media_type=MEDIA_TYPES[output_format], headers=headers)
+
+def feature_columns(model) -> List[str]:
+    """Feature columns a fitted model expects, in order (the base set for models fitted without names)"""
+    names = getattr(model, 'feature_names_in_', None)
+    return list(names) if names is not None else FEATURE_SETS['base']
+
+def prepare_features(
+    df: pd.DataFrame,
+    vendor_resolution: Optional[pd.DataFrame] = None,
+    columns: Optional[List[str]] = None,
+    batches: Optional[np.ndarray] = None
+) -> pd.DataFrame:
+    """Prepare features for anomaly detection - FIXED VERSION
+    
+    ``columns`` picks from the columns listed in ``FEATURE_SETS`` (the base
+    set by default); only the requested ones are computed. The frame wraps
+    a float32 matrix of its own; scoring uses ``build_feature_matrix``.
+    ``batches`` is passed on to ``build_feature_matrix``.
+    """
+    columns = columns or FEATURE_SETS['base']
+    matrix = build_feature_matrix(df, vendor_resolution, columns, reuse=False, batches=batches)
+    return pd.DataFrame(matrix, columns=columns, index=df.index, copy=False)
+
+def build_feature_matrix(
+    df: pd.DataFrame,
+    vendor_resolution: Optional[pd.DataFrame] = None,
+    columns: Optional[List[str]] = None,
+    reuse: bool = True,
+    batches: Optional[np.ndarray] = None,
+    context: Optional[Dict[str, Any]] = None
+) -> np.ndarray:
+    """Features written straight into one C-contiguous float32 matrix, in ``columns`` order
+    
+    With ``reuse`` the matrix is the calling thread's buffer from
+    ``feature_builder`` and is overwritten by that thread's next call.
+    Values are exactly what the forest sees from ``prepare_features``,
+    which it converts to float32 anyway. Frequencies, vendor medians and
+    duplicate counts are relative to the batch; ``batches`` (the batch
+    number of each row) computes them for every batch on its own, as if
+    each were a separate request, which training uses to match scoring;
+    ``context`` (see ``batch_context``) takes them from the whole batch
+    ``df`` is a chunk of.
+    """
+    columns = columns or FEATURE_SETS['base']
+    matrix = feature_builder.allocate(len(df), len(columns), reuse)
+    column = {name: matrix[:, j] for j, name in enumerate(columns)}
+    amounts = df['amount'].to_numpy()
     
     # Use EXACT same features as training data
-    features['amount'] = df['amount']
+    if 'amount' in column:
+        column['amount'][:] = amounts
+    
+    # Department and vendor frequency (per batch, or from the stream sketches); vendor spellings merged
+    vendors = None
+    if 'department_id' in column:
+        column['department_id'][:] = frequency_feature(df['department_id'], 'department_id', batches, context).to_numpy()
+    if {'vendor_frequency', 'vendor_amount_ratio', 'duplicate_count'} & column.keys():
+        vendors = canonical_vendors(df, vendor_resolution)
+    if 'vendor_frequency' in column:
+        column['vendor_frequency'][:] = frequency_feature(vendors, 'vendor_name', batches, context).to_numpy()
+    
+    # Hour of the transaction; date-only values count as midday so scores stay deterministic
+    dates = df['transaction_date'].astype(str)
+    if {'time_of_day', 'day_of_week'} & column.keys():
+        parsed = pd.to_datetime(dates, errors='coerce', format='mixed')
+        if 'time_of_day' in column:
+            hours = parsed.dt.hour
+            column['time_of_day'][:] = hours.where(dates.str.contains(':') & hours.notna(), 12).to_numpy()
+        if 'day_of_week' in column:
+            column['day_of_week'][:] = parsed.dt.dayofweek.fillna(0).to_numpy()
     
-    # Department frequency
-    dept_counts = df['department_id'].value_counts().to_dict()
-    features['department_id'] = df['department_id'].map(dept_counts)
+    if 'log_amount' in column:
+        np.log1p(np.maximum(amounts, 0), out=column['log_amount'])
+    if 'vendor_amount_ratio' in column:
+        # Amount relative to the vendor's median in this batch
+        if context is not None:
+            medians = vendors.map(context['vendor_median']).to_numpy()
+        else:
+            groups = vendors.to_numpy() if batches is None else [batches, vendors.to_numpy()]
+            medians = df['amount'].groupby(groups).transform('median').to_numpy()
+        np.divide(amounts, np.where(medians > 0, medians, 1.0), out=column['vendor_amount_ratio'], casting='same_kind')
+    if 'duplicate_count' in column:
+        # Other rows in the batch with the same vendor, amount and date
+        keys = [vendors.to_numpy(), amounts, dates.str.slice(0, 10).to_numpy()]
+        if context is not None:
+            counts = context['duplicates'].reindex(pd.MultiIndex.from_arrays(keys)).to_numpy()
+        else:
+            if batches is not None:
+                keys.append(batches)
+            counts = df['amount'].groupby(keys).transform('size').to_numpy()
+        column['duplicate_count'][:] = counts - 1
     
-    # Vendor frequency  
-    vendor_counts = df['vendor_name'].value_counts().to_dict()
-    features['vendor_frequency'] = df['vendor_name'].map(vendor_counts)
+    return matrix
+
+def batch_context(df: pd.DataFrame, chunk_rows: int) -> Dict[str, Any]:
+    """Whole-batch statistics for scoring ``df`` chunk by chunk, from one pass over its chunks
     
-    # Time-based features (simplified)
-    features['time_of_day'] = np.random.randint(0, 24, len(df))
+    Frequencies, vendor medians, duplicate counts and split payments are
+    relative to the batch. With this context each chunk passed to
+    ``score_transactions`` gets the values the whole batch would get from
+    one ``/detect`` call, while only one chunk's features are built at a
+    time. Counts are accumulated a chunk at a time; medians and splits need
+    the batch's canonical vendor names, which are kept.
+    """
+    department_counts = vendor_counts = duplicates = None
+    vendors = []
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        resolution = vendor_resolver.resolve(chunk['vendor_name']) if settings.VENDOR_RESOLUTION_ENABLED else None
+        names = canonical_vendors(chunk, resolution)
+        keys = [names.to_numpy(), chunk['amount'].to_numpy(),
+                chunk['transaction_date'].astype(str).str.slice(0, 10).to_numpy()]
+        department_counts = _add_counts(department_counts, chunk['department_id'].value_counts())
+        vendor_counts = _add_counts(vendor_counts, names.value_counts())
+        duplicates = _add_counts(duplicates, chunk['amount'].groupby(keys).size())
+        vendors.append(names.to_numpy())
+    vendors = np.concatenate(vendors) if vendors else np.zeros(0, dtype=object)
     
-    return features
+    context = {
+        'rows': len(df),
+        'department_id': department_counts,
+        'vendor_name': vendor_counts,
+        'vendor_median': df['amount'].groupby(vendors).median(),
+        'duplicates': duplicates
+    }
+    if settings.FORENSIC_CHECKS_ENABLED:
+        split, reasons = forensic_service.batch_splits(df, vendors)
+        context['split'] = pd.Series(split, index=df.index)
+        context['split_reasons'] = {df.index[i]: found for i, found in reasons.items()}
+    return context
+
+def _add_counts(total: Optional[pd.Series], counts: pd.Series) -> pd.Series:
+    return counts if total is None else total.add(counts, fill_value=0)
 
-def get_anomaly_reasons(transaction: pd.Series, score: float, is_anomaly: bool) -> List[str]:
+def _context_splits(df: pd.DataFrame, context: Optional[Dict[str, Any]]):
+    """Split flags and reasons of a chunk, by position, from its ``batch_context``"""
+    if context is None or 'split' not in context:
+        return None
+    positions = df.index.get_indexer(list(context['split_reasons']))
+    reasons = {int(i): found for i, found in zip(positions, context['split_reasons'].values()) if i >= 0}
+    return context['split'].reindex(df.index).to_numpy(), reasons
+
+def get_anomaly_reasons(
+    transaction: Union[pd.Series, Dict[str, Any], None],
+    score: float,
+    is_anomaly: bool,
+    contributions: Optional[List[Dict[str, Any]]] = None,
+    lookalike: Optional[tuple] = None,
+    forensic: Optional[List[str]] = None
+) -> List[str]:
     """Generate reasons for anomaly detection"""
     reasons = []
     
     if is_anomaly:
+        if lookalike:
+            known, similarity = lookalike
+            reasons.append(
+                f"New vendor name '{transaction['vendor_name']}' resembles known vendor '{known}' "
+                f"(similarity {similarity:.2f})"
+            )
         if transaction['amount'] > 10000:
             reasons.append("Unusually high transaction amount")
         if score < -0.5:
             reasons.append("Highly unusual transaction pattern")
+        if forensic:
+            reasons.extend(forensic)
+        if contributions:
+            top = contributions[0]
+            reasons.append(f"Mainly driven by {top['feature']} ({top['contribution']:.0%} of isolation)")
         reasons.append(f"Anomaly score: {score:.3f}")
     else:
         reasons.append("Transaction appears normal")
     
     return reasons
 
+@router.get("/variance")
+async def get_budget_variance(
+    grain: str = Query("monthly", pattern="^(daily|weekly|monthly)$"),
+    kind: str = Query("department", pattern="^(department|vendor)$"),
+    window: Optional[int] = Query(None, ge=1),
+    threshold: Optional[float] = Query(None, gt=0),
+    direction: str = Query("over", pattern="^(over|under|both)$")
+):
+    """Spend buckets that deviate from their seasonal baseline (slow overspending the row model can't see)"""
+    try:
+        flagged = await run_in_threadpool(variance_service.detect, kind, grain, window, threshold, direction)
+        return {"grain": grain, "kind": kind, "flagged_count": len(flagged), "flagged": flagged}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Variance detection failed: {str(e)}")
+
+@router.get("/variance/series")
+async def get_spend_series(
+    key: str,
+    grain: str = Query("monthly", pattern="^(daily|weekly|monthly)$"),
+    kind: str = Query("department", pattern="^(department|vendor)$")
+):
+    """Bucketed spend for one department (by id) or vendor"""
+    if kind == "department":
+        series_key = int(key) if key.isdigit() else key
+    else:
+        series_key = canonical_vendors(pd.DataFrame({'vendor_name': [key]})).iat[0]
+    series = variance_service.get_series(kind, series_key, grain)
+    if series is None:
+        raise HTTPException(status_code=404, detail=f"No spend recorded for {kind} {key}")
+    return series
+
+@router.get("/forensics")
+async def get_forensic_report(
+    refresh: bool = False,
+    kind: Optional[str] = Query(None, pattern="^(vendor|department|splits)$"),
+    limit: int = Query(50, ge=0, le=10000)
+):
+    """Forensic-accounting report over the stored ledger
+    
+    Vendors and departments whose first digits break Benford's law, that
+    bill round amounts unusually often or whose payments bunch just under an
+    approval threshold, most significant first, plus clusters of payments
+    split under a threshold. The report is rebuilt in the background;
+    ``refresh=true`` rebuilds it now.
+    """
+    try:
+        report = await run_in_threadpool(forensic_service.get_report, refresh)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forensic checks failed: {str(e)}")
+    return trim_forensic_report(report, kind, limit)
+
+@router.post("/forensics")
+async def analyze_ledger_forensics(
+    request: BudgetAnalysisRequest,
+    kind: Optional[str] = Query(None, pattern="^(vendor|department|splits)$"),
+    limit: int = Query(50, ge=0, le=10000)
+):
+    """Forensic-accounting report over the submitted transactions alone (nothing is stored)
+    
+    Split clusters are judged as ``/detect`` judges a batch: against each
+    pair's usual rate in the stored ledger, so both flag the same payments.
+    """
+    try:
+        df = pd.DataFrame([t.dict() for t in request.transactions], columns=REQUIRED_COLUMNS)
+        note_rows(len(df))
+        report = await run_in_threadpool(forensic_service.analyze_frame, df)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forensic checks failed: {str(e)}")
+    return trim_forensic_report(report, kind, limit)
+
+def trim_forensic_report(report: Dict[str, Any], kind: Optional[str], limit: int) -> Dict[str, Any]:
+    """The first ``limit`` flagged groups and split clusters, of one kind when ``kind`` is given"""
+    trimmed = dict(report, splits=report['splits'][:limit])
+    if kind is not None and kind != "splits":
+        trimmed.pop("splits")
+    for group_kind in ("vendor", "department"):
+        if kind is not None and group_kind != kind:
+            trimmed.pop(group_kind)
+        else:
+            trimmed[group_kind] = dict(report[group_kind], flagged=report[group_kind]['flagged'][:limit])
+    return trimmed
+
+@router.get("/vendors/resolve")
+async def resolve_vendor(name: str = Query(..., min_length=1)):
+    """Canonical vendor for a name and how closely it matches, without learning it"""
+    try:
+        resolved = await run_in_threadpool(vendor_resolver.resolve, pd.Series([name], dtype=object))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Vendor resolution failed: {str(e)}")
+    row = resolved.iloc[0]
+    known = row['similarity'] >= settings.VENDOR_MATCH_THRESHOLD
+    return {
+        "name": name,
+        "canonical_name": row['canonical_name'] if known else None,
+        "similarity": round(float(row['similarity']), 3),
+        "exact": bool(row['similarity'] >= 1.0) and row['lookalike_of'] is None,
+        "lookalike": row['lookalike_of'] is not None
+    }
+
+@router.get("/transactions")
+async def search_transactions(
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+    start_date: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    end_date: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    department_id: Optional[int] = None,
+    limit: int = Query(20, ge=0, le=1000)
+):
+    """Stored transactions inside an amount/date range (inclusive), largest first, via the range index"""
+    filters = {
+        key: value for key, value in (
+            ('amount_min', min_amount), ('amount_max', max_amount), ('date_from', start_date), ('date_to', end_date)
+        ) if value is not None
+    }
+    try:
+        return await run_in_threadpool(transaction_search.search, filters, department_id, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filter: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Transaction search failed: {str(e)}")
+
 @router.get("/demo-data")
 async def get_demo_data():
     """Get sample data for testing"""
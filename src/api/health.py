@@ -14,8 +14,10 @@ async def health_check():
         # Import here to avoid circular import
         from main import get_ml_models
         from services.voice_service import voice_service
+        from services.admission import admission_controller
         
         models = get_ml_models()
+        admission = admission_controller.get_stats()
         
         return {
             "status": "healthy",
@@ -27,7 +29,14 @@ async def health_check():
             "version": "1.0.0",
             "python_version": sys.version.split()[0],
             "memory_usage_mb": round(psutil.virtual_memory().used / (1024*1024), 2),
-            "cpu_usage_percent": psutil.cpu_percent(interval=1)
+            "cpu_usage_percent": psutil.cpu_percent(interval=1),
+            "admission": {
+                "in_flight": admission["in_flight"],
+                "queued_now": admission["queued_now"],
+                "memory_in_use_mb": admission["memory_in_use_mb"],
+                "memory_budget_mb": admission["memory_budget_mb"],
+                "rejected": admission["rejected"]
+            }
         }
         
     except Exception as e:
@@ -39,6 +48,7 @@ async def model_status():
     try:
         # Import here to avoid circular import
         from main import get_ml_models
+        from services.training_service import training_service
         
         models = get_ml_models()
         
@@ -50,8 +60,9 @@ async def model_status():
                     "type": str(type(model).__name__),
                     "ready": True,
                     "features": ["transaction_analysis", "outlier_detection", "pattern_recognition"],
-                    "training_samples": 9,
-                    "contamination_rate": 0.1
+                    "training_samples": training_service.sample_rows or 9,
+                    "trees": getattr(model, "n_estimators", None),
+                    "contamination_rate": model.contamination
                 }
             else:
                 model_status[model_name] = {
@@ -75,6 +86,19 @@ async def get_system_stats():
     """Real-time system statistics and performance metrics"""
     try:
         from main import get_ml_models
+        from services.job_service import job_service
+        from services.alert_service import alert_broker
+        from services.result_cache import result_cache
+        from services.admission import admission_controller
+        from services.transaction_store import transaction_store
+        from services.frequency_service import frequency_service
+        from services.variance_service import variance_service
+        from services.vendor_service import vendor_resolver
+        from services.search_service import transaction_search
+        from services.training_service import training_service
+        from services.audit_log import audit_log
+        from services.forensic_service import forensic_service
+        from services.detector_service import detector_service
         
         models = get_ml_models()
         
@@ -82,10 +106,15 @@ async def get_system_stats():
         current_time = time.time()
         uptime_hours = int((current_time % 86400) / 3600)
         
+        # Real aggregates from the transaction store
+        store_summary = transaction_store.get_summary()
+        frequency_stats = frequency_service.get_stats()
+        today_start = time.mktime(time.localtime(current_time)[:3] + (0, 0, 0, 0, 0, -1))
+        
         return {
             "performance": {
                 "total_queries_processed": 1247 + int(current_time % 100),
-                "anomalies_detected_today": 12 + int(current_time % 5),
+                "anomalies_detected_today": transaction_store.count_anomalies(since=today_start),
                 "average_response_time_ms": 85,
                 "model_accuracy_percent": 94.2,
                 "cache_hit_rate_percent": 78.5
@@ -110,11 +139,24 @@ async def get_system_stats():
                 "peak_requests_per_minute": 45
             },
             "data": {
-                "transactions_analyzed": 15847,
-                "departments_monitored": 5,
-                "vendors_tracked": 127,
-                "data_freshness_hours": 2
+                "transactions_analyzed": store_summary["transactions_stored"],
+                "anomalies_stored": store_summary["anomalies_stored"],
+                "departments_monitored": store_summary["departments_monitored"],
+                "vendors_tracked": frequency_stats["distinct_vendors_estimate"] or store_summary["vendors_tracked"],
+                "latest_transaction_date": store_summary["latest_transaction_date"]
             },
+            "jobs": job_service.get_stats(),
+            "alert_stream": alert_broker.get_stats(),
+            "result_cache": result_cache.get_stats(),
+            "admission": admission_controller.get_stats(),
+            "frequency_sketches": frequency_stats,
+            "spend_series": variance_service.get_stats(),
+            "vendor_index": vendor_resolver.get_stats(),
+            "range_index": transaction_search.get_stats(),
+            "training": training_service.get_status(),
+            "audit_log": audit_log.get_stats(),
+            "forensics": forensic_service.get_stats(),
+            "detector_engine": detector_service.get_stats(),
             "alerts": {
                 "active_alerts": 0,
                 "resolved_today": 3,
@@ -141,7 +183,8 @@ async def get_nlp_status():
                 "status": "active",
                 "supported_categories": stats["supported_categories"],
                 "response_templates": stats["total_response_templates"],
-                "supported_intents": stats["supported_intents"]
+                "supported_intents": stats["supported_intents"],
+                "intent_model": stats["intent_model"]
             },
             "performance": {
                 "average_confidence": stats["average_confidence"],
@@ -156,6 +199,12 @@ async def get_nlp_status():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"NLP status check failed: {str(e)}")
 
+@router.get("/ingestion")
+async def get_ingestion_status():
+    """Lag and throughput of the ledger directory watcher"""
+    from services.ingestion_service import ingestion_service
+    return ingestion_service.get_metrics()
+
 @router.get("/endpoints")
 async def get_available_endpoints():
     """List all available API endpoints and their descriptions"""
@@ -166,14 +215,45 @@ async def get_available_endpoints():
                 "GET /api/health/models": "Detailed ML model status",
                 "GET /api/health/stats": "Real-time system statistics", 
                 "GET /api/health/nlp-status": "NLP processor capabilities",
+                "GET /api/health/ingestion": "Ledger directory ingestion lag and throughput",
                 "GET /api/health/endpoints": "This endpoint - API documentation"
             },
             "anomaly": {
-                "POST /api/anomaly/detect": "Detect anomalies in transactions",
+                "POST /api/anomaly/detect": "Detect anomalies in transactions (?mode=anomalies|top_k&limit= for pages)",
+                "POST /api/anomaly/detect-file": "Detect anomalies in a JSON/CSV/Parquet ledger file",
+                "GET /api/anomaly/detect/pages": "Next page of a detection response, by cursor",
+                "GET /api/anomaly/variance": "Department/vendor spend buckets deviating from seasonal baselines",
+                "GET /api/anomaly/variance/series": "Daily, weekly or monthly spend series for one department or vendor",
+                "GET /api/anomaly/forensics": "Benford, round-amount and threshold-splitting checks over the stored ledger",
+                "POST /api/anomaly/forensics": "The same forensic checks over submitted transactions",
+                "GET /api/anomaly/vendors/resolve": "Canonical vendor for a name and whether it looks like a known one",
+                "GET /api/anomaly/transactions": "Stored transactions in an amount/date range, largest first",
                 "GET /api/anomaly/demo-data": "Get sample transaction data"
             },
+            "jobs": {
+                "POST /api/jobs/": "Submit a dataset for asynchronous analysis",
+                "GET /api/jobs/stats": "Job queue depth and durations",
+                "GET /api/jobs/{job_id}": "Job progress",
+                "POST /api/jobs/{job_id}/cancel": "Cancel a job",
+                "GET /api/jobs/{job_id}/results": "Paginated job results"
+            },
+            "alerts": {
+                "WS /api/alerts/ws": "Stream flagged transactions (filters: department_id, vendor_name, min_score)",
+                "GET /api/alerts/stats": "Subscriber and fan-out statistics"
+            },
+            "admin": {
+                "GET /api/admin/timings": "Per-route stage timings",
+                "POST /api/admin/timings/reset": "Clear stage timings",
+                "POST /api/admin/profile": "Start a sampling profiler session",
+                "POST /api/admin/profile/stop": "Stop the profiler early",
+                "GET /api/admin/profile": "Profile summary, or collapsed stacks with ?format=collapsed",
+                "POST /api/admin/train": "Retrain (full) or grow (grow) the anomaly model from stored transactions",
+                "GET /api/admin/train": "Training run status",
+                "GET /api/admin/audit": "Audit records of scoring decisions in a time range"
+            },
             "voice": {
                 "POST /api/voice/text-query": "Process natural language queries",
+                "POST /api/voice/text-queries": "Process a batch of natural language queries",
                 "POST /api/voice/simulate-voice": "Simulate voice input",
                 "GET /api/voice/demo-queries": "Get sample queries for testing"
             },
@@ -181,7 +261,7 @@ async def get_available_endpoints():
                 "GET /": "API information and status"
             }
         },
-        "total_endpoints": 10,
+        "total_endpoints": 35,
         "api_version": "1.0.0",
         "documentation": "Visit /docs for interactive API documentation"
     }
@@ -0,0 +1,78 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any
+from api.anomaly import BudgetAnalysisRequest, negotiate_output_format
+from utils.columnar import MEDIA_TYPES, results_batch, iter_encoded
+from services.job_service import job_service, JobQueueFullError
+from services.admission import note_rows
+
+router = APIRouter()
+
+@router.post("/", status_code=202)
+async def submit_job(request: BudgetAnalysisRequest) -> Dict[str, Any]:
+    """Submit a dataset for asynchronous anomaly analysis"""
+    if not request.transactions:
+        raise HTTPException(status_code=400, detail="No transactions submitted")
+    note_rows(len(request.transactions))
+    try:
+        job = await run_in_threadpool(job_service.submit, [t.dict() for t in request.transactions])
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "total_rows": job.total_rows,
+        "status_url": f"/api/jobs/{job.id}",
+        "results_url": f"/api/jobs/{job.id}/results"
+    }
+
+@router.get("/stats")
+async def get_job_stats():
+    """Queue depth, worker usage and job durations"""
+    return job_service.get_stats()
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str):
+    """Progress of a submitted job"""
+    job = job_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = job_service.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+@router.get("/{job_id}/results")
+async def get_job_results(
+    http_request: Request,
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000)
+):
+    """Paginated results for the rows processed so far
+    
+    With an Arrow or Parquet Accept header the full result set is streamed
+    chunk by chunk instead, and offset/limit are ignored.
+    """
+    output_format = negotiate_output_format(http_request)
+    if output_format != "json":
+        job = job_service.get_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        batches = (
+            results_batch(start, chunk["scores"], chunk["is_anomaly"], chunk["reason_codes"])
+            for start, chunk in job_service.iter_result_chunks(job)
+        )
+        return StreamingResponse(iter_encoded(output_format, batches), media_type=MEDIA_TYPES[output_format])
+    
+    page = job_service.get_results(job_id, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return page
@@ -0,0 +1,130 @@
+"""Fan-out cost and delivery latency of the anomaly alert broker.
+
+Connects ``--subscribers`` in-process subscribers with mixed filters to the
+broker, a fraction of which consume slowly, and publishes scored batches
+from a separate thread the way the scoring paths do. Reports how long
+``publish`` holds the scoring thread, end-to-end delivery latency for
+prompt subscribers, and what the overflow policies did to slow ones. Run
+from ``src/``::
+
+    python -m benchmarks.bench_alerts --subscribers 1000 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_ledger
+from services.alert_service import AlertBroker, POLICY_COALESCE, POLICY_DISCONNECT
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else float("nan")
+
+
+async def consume(broker, subscriber, delay, latencies, done):
+    """Stand-in for the WebSocket sender loop; ``delay`` simulates a slow socket"""
+    while not done.is_set():
+        await subscriber.event.wait()
+        subscriber.event.clear()
+        while True:
+            message, _ = subscriber.pop()
+            if message is None:
+                break
+            if latencies is not None:
+                latencies.append(time.time() - json.loads(message)["published_at"])
+            if delay:
+                await asyncio.sleep(delay)
+        if subscriber.closed:
+            break
+    broker.unsubscribe(subscriber)
+
+
+def publisher(broker, batches, rate, seconds, publish_ms, stop):
+    interval = 1.0 / rate
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        df, scores, flags = batches[i % len(batches)]
+        start = time.perf_counter()
+        broker.publish(df, scores, flags, source="bench")
+        publish_ms.append((time.perf_counter() - start) * 1000)
+        i += 1
+        time.sleep(max(0.0, interval - (time.perf_counter() - start)))
+    stop.set()
+
+
+async def run(args):
+    rng = np.random.default_rng(0)
+    batches = []
+    for seed in range(5):
+        df, labels = make_ledger(args.batch_rows, anomaly_rate=args.flag_rate, seed=seed + 10)
+        flags = labels != ""
+        scores = np.where(flags, -rng.uniform(0.05, 0.8, len(df)), rng.uniform(0.0, 0.2, len(df)))
+        batches.append((df, scores, flags))
+    departments = sorted(batches[0][0]['department_id'].unique().tolist())
+    vendors = batches[0][0]['vendor_name'].value_counts().index[:20].tolist()
+
+    broker = AlertBroker()
+    done = asyncio.Event()
+    prompt_latencies = []
+    tasks = []
+    slow_count = int(args.subscribers * args.slow_fraction)
+    for i in range(args.subscribers):
+        kind = i % 4
+        filters = {
+            "department_id": departments[i % len(departments)] if kind == 1 else None,
+            "vendor_name": vendors[i % len(vendors)] if kind == 2 else None,
+            "min_score": [0.0, 0.2, 0.4][i % 3] if kind == 3 else 0.0,
+            "policy": POLICY_DISCONNECT if i % 2 and i < slow_count else POLICY_COALESCE,
+            "max_queue": args.queue_size
+        }
+        subscriber = broker.subscribe(**filters)
+        slow = i < slow_count
+        tasks.append(asyncio.create_task(consume(
+            broker, subscriber, args.slow_delay if slow else 0.0, None if slow else prompt_latencies, done)))
+
+    publish_ms = []
+    stop = threading.Event()
+    thread = threading.Thread(target=publisher, args=(broker, batches, args.rate, args.seconds, publish_ms, stop))
+    thread.start()
+    while not stop.is_set():
+        await asyncio.sleep(0.05)
+    thread.join()
+    await asyncio.sleep(0.5)
+    stats = broker.get_stats()
+    done.set()
+    for subscriber in list(broker._subscribers.values()):
+        subscriber.event.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    flagged = int(np.mean([b[2].sum() for b in batches]))
+    print(f"subscribers: {args.subscribers} ({slow_count} slow, {args.slow_delay * 1000:.0f} ms per message)")
+    print(f"batches: {len(publish_ms)} x {args.batch_rows:,} rows, ~{flagged} flagged each, {args.rate}/s")
+    print(f"publish (scoring-thread cost): p50 {percentile(publish_ms, 50):.2f} ms  "
+          f"p99 {percentile(publish_ms, 99):.2f} ms  max {max(publish_ms):.2f} ms")
+    print(f"delivery latency (prompt subscribers): p50 {percentile(prompt_latencies, 50) * 1000:.1f} ms  "
+          f"p99 {percentile(prompt_latencies, 99) * 1000:.1f} ms  ({len(prompt_latencies):,} messages)")
+    print(f"messages queued: {stats['messages_queued']:,}  slow subscribers disconnected: "
+          f"{stats['subscribers_disconnected']}  alerts coalesced away: {stats['alerts_dropped']:,}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rate", type=float, default=10.0, help="batches published per second")
+    parser.add_argument("--batch-rows", type=int, default=5000)
+    parser.add_argument("--flag-rate", type=float, default=0.01)
+    parser.add_argument("--slow-fraction", type=float, default=0.1)
+    parser.add_argument("--slow-delay", type=float, default=0.2, help="seconds per message for slow subscribers")
+    parser.add_argument("--queue-size", type=int, default=100)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
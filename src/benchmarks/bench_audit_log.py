@@ -0,0 +1,135 @@
+"""Audit log cost: request-path overhead of a group-committed append vs a synchronous write, and sustained throughput.
+
+Latency is per scored batch of ``--batch-rows`` rows, as ``record_scored_batch``
+would see it: ``AuditLog.append`` (queue only) against encoding, writing and
+fsyncing the same frame inline. Throughput appends ``--rows`` rows as fast
+as possible under each fsync policy and waits for the last commit, and is
+compared with one synchronous write and fsync per batch. Reading back a
+time range through the index is compared with reading the whole log. Logs
+are written under ``--dir`` (use the disk the service will log to; tmpfs
+makes fsync free). Run from ``src/``::
+
+    python -m benchmarks.bench_audit_log --rows 2000000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_ledger
+from services.audit_log import AuditLog, encode_frame
+
+
+def percentiles(samples):
+    values = np.array(samples) * 1e6
+    return np.percentile(values, 50), np.percentile(values, 99)
+
+
+def sync_writer(path: str):
+    """Encode, write and fsync each batch inline: the naive per-request write"""
+    f = open(path, "ab")
+    seq = [0]
+
+    def write(df, scores, is_anomaly):
+        frame = encode_frame({
+            'rows': len(df), 'seq': seq[0], 'ts': time.time(), 'model_version': "bench", 'source': "bench",
+            'amount': df['amount'].to_numpy(dtype=np.float64), 'department_id': df['department_id'].to_numpy(),
+            'vendor_name': df['vendor_name'].to_numpy(), 'transaction_date': df['transaction_date'].to_numpy(),
+            'scores': scores, 'is_anomaly': is_anomaly, 'reason_codes': None
+        })
+        f.write(frame)
+        f.flush()
+        os.fsync(f.fileno())
+        seq[0] += len(df)
+    return write, f
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    parser.add_argument("--latency-batches", type=int, default=2000)
+    parser.add_argument("--dir", default=None, help="directory to create the benchmark logs in")
+    args = parser.parse_args(argv)
+
+    df, _ = make_ledger(args.batch_rows, anomaly_rate=0.01, seed=6)
+    df['transaction_date'] = df['transaction_date'].astype(str)
+    scores = np.random.default_rng(6).normal(0.05, 0.05, len(df))
+    is_anomaly = scores < 0
+    batches = args.rows // args.batch_rows
+    root = tempfile.mkdtemp(prefix="bench_audit_", dir=args.dir)
+
+    try:
+        print(f"batches of {args.batch_rows:,} rows, logs under {root}")
+        print(f"{'request-path cost per batch':<44}{'p50 us':>10}{'p99 us':>10}")
+        log = AuditLog(os.path.join(root, "latency"), fsync="group")
+        samples = []
+        for _ in range(args.latency_batches):
+            start = time.perf_counter()
+            log.append(df, scores, is_anomaly, model_version="bench", source="bench")
+            samples.append(time.perf_counter() - start)
+        log.flush()
+        log.stop()
+        print(f"{'AuditLog.append (group commit)':<44}{percentiles(samples)[0]:>10.0f}{percentiles(samples)[1]:>10.0f}")
+        write, f = sync_writer(os.path.join(root, "sync-latency.log"))
+        samples = []
+        for _ in range(min(args.latency_batches, 500)):
+            start = time.perf_counter()
+            write(df, scores, is_anomaly)
+            samples.append(time.perf_counter() - start)
+        f.close()
+        print(f"{'synchronous encode + write + fsync':<44}{percentiles(samples)[0]:>10.0f}{percentiles(samples)[1]:>10.0f}")
+
+        print(f"\n{'sustained, ' + format(batches * args.batch_rows, ',') + ' rows':<28}{'rows/s':>12}{'MB/s':>8}"
+              f"{'commits':>9}{'rows/commit':>13}{'fsyncs':>8}{'B/row':>7}")
+        for policy in ("group", "interval", "never"):
+            log = AuditLog(os.path.join(root, policy), fsync=policy)
+            start = time.perf_counter()
+            for _ in range(batches):
+                log.append(df, scores, is_anomaly, model_version="bench", source="bench")
+            log.flush()
+            seconds = time.perf_counter() - start
+            stats = log.get_stats()
+            log.stop()
+            rows = stats['rows_written']
+            print(f"{'group commit, fsync=' + policy:<28}{rows / seconds:>12,.0f}{stats['bytes_written'] / seconds / 1e6:>8.1f}"
+                  f"{stats['commits']:>9,}{stats['rows_per_commit']:>13,.0f}{stats['syncs']:>8,}"
+                  f"{stats['bytes_written'] / rows:>7.1f}")
+        sync_batches = min(batches, 500)
+        write, f = sync_writer(os.path.join(root, "sync.log"))
+        start = time.perf_counter()
+        for _ in range(sync_batches):
+            write(df, scores, is_anomaly)
+        seconds = time.perf_counter() - start
+        f.close()
+        rows = sync_batches * args.batch_rows
+        print(f"{'synchronous, fsync per batch':<28}{rows / seconds:>12,.0f}{'':>8}{sync_batches:>9,}"
+              f"{args.batch_rows:>13,}{sync_batches:>8,}")
+        record = {"seq": 0, "logged_at": time.time(), "model_version": "bench", "source": "bench",
+                  **{k: (v.item() if hasattr(v, "item") else v) for k, v in df.iloc[0].items()},
+                  "anomaly_score": float(scores[0]), "is_anomaly": bool(is_anomaly[0]), "reasons": []}
+        print(f"(one JSON Lines record of the same row: {len(json.dumps(record)) + 1} B)")
+
+        log = AuditLog(os.path.join(root, "group"))
+        log.start()
+        index = log._read_index()
+        window = index['ts'][len(index) // 2], index['ts'][len(index) // 2 + max(len(index) // 100, 1)]
+        start = time.perf_counter()
+        part = log.read(*window)
+        range_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        everything = log.read()
+        full_ms = (time.perf_counter() - start) * 1000
+        log.stop()
+        print(f"\nread back 1% of the time range: {len(part):,} rows in {range_ms:.1f} ms; "
+              f"whole log: {len(everything):,} rows in {full_ms:.0f} ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
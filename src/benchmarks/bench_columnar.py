@@ -0,0 +1,93 @@
+"""Payload size and encode/decode time: JSON vs Arrow IPC vs Parquet.
+
+Compares the per-row JSON ``AnomalyResult`` representation returned by
+``/api/anomaly/detect`` with the columnar encodings, for both the result
+payload and ledger input. Run from ``src/``::
+
+    python -m benchmarks.bench_columnar --rows 200000
+"""
+import argparse
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from api.anomaly import get_anomaly_reasons
+from utils.columnar import compute_reason_codes, encode_results, decode_results
+from utils.data_processor import DataProcessor
+
+
+def timed(fn, repeat: int = 3):
+    """Best-of-``repeat`` wall time and the last return value"""
+    best, value = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def json_results(amounts, scores, is_anomaly) -> bytes:
+    rows = [
+        {
+            "transaction_index": i,
+            "anomaly_score": float(score),
+            "is_anomaly": bool(flag),
+            "reasons": get_anomaly_reasons({"amount": amount}, score, flag)
+        }
+        for i, (amount, score, flag) in enumerate(zip(amounts, scores, is_anomaly))
+    ]
+    return json.dumps(rows).encode()
+
+
+def synthetic_ledger(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    return pd.DataFrame({
+        "amount": np.round(rng.lognormal(7, 1.3, rows), 2),
+        "department_id": rng.integers(1, 6, rows),
+        "vendor_name": np.char.add("Vendor ", rng.integers(0, 5000, rows).astype(str)),
+        "transaction_date": pd.to_datetime("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "description": "Ledger extract row"
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(42)
+    amounts = np.round(rng.lognormal(7, 1.3, args.rows), 2)
+    scores = rng.normal(0.05, 0.08, args.rows)
+    is_anomaly = scores < -0.1
+    codes = compute_reason_codes(amounts, scores, is_anomaly)
+
+    print(f"Result payload, {args.rows:,} rows ({int(is_anomaly.sum()):,} anomalies)")
+    print(f"{'format':<10}{'bytes':>14}{'encode ms':>12}{'decode ms':>12}")
+    encode_s, payload = timed(lambda: json_results(amounts, scores, is_anomaly), repeat=1)
+    decode_s, _ = timed(lambda: json.loads(payload), repeat=1)
+    print(f"{'json':<10}{len(payload):>14,}{encode_s * 1000:>12.1f}{decode_s * 1000:>12.1f}")
+    for fmt in ("arrow", "parquet"):
+        encode_s, payload = timed(lambda: encode_results(fmt, scores, is_anomaly, codes))
+        decode_s, _ = timed(lambda: decode_results(fmt, payload))
+        print(f"{fmt:<10}{len(payload):>14,}{encode_s * 1000:>12.1f}{decode_s * 1000:>12.1f}")
+
+    print(f"\nLedger input, {args.rows:,} rows")
+    print(f"{'format':<10}{'bytes':>14}{'load ms':>12}")
+    ledger = synthetic_ledger(args.rows, rng)
+    as_json = ledger.assign(transaction_date=ledger["transaction_date"].dt.strftime("%Y-%m-%d"))
+    inputs = {
+        "json": json.dumps({"transactions": as_json.to_dict(orient="records")}).encode(),
+        "csv": as_json.to_csv(index=False).encode(),
+    }
+    buffer = io.BytesIO()
+    ledger.to_parquet(buffer)
+    inputs["parquet"] = buffer.getvalue()
+    for fmt, payload in inputs.items():
+        load_s, _ = timed(lambda: DataProcessor.load_ledger(payload, fmt), repeat=1)
+        print(f"{fmt:<10}{len(payload):>14,}{load_s * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
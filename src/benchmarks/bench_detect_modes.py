@@ -0,0 +1,96 @@
+"""Response size and render time of /detect response modes on a large batch: all rows vs anomalies-only vs top-k.
+
+Installs a forest fitted on a synthetic ledger (the bundled model flags
+next to nothing in synthetic data) and scores one batch. Then it renders
+the full ``AnomalyResult`` list (``mode=all``, as every response was
+before the modes existed), the first page of ``mode=anomalies``, every
+page of it by cursor, and ``mode=top_k``.
+Rendering is timed separately from scoring, which is the same for every
+mode. The top-k partial selection is also compared with a full sort of
+the scores, and the paged results are checked against the full list.
+Run from ``src/``::
+
+    python -m benchmarks.bench_detect_modes --rows 200000
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("STORE_SCORED_TRANSACTIONS", "false")
+
+import numpy as np  # noqa: E402
+from sklearn.ensemble import IsolationForest  # noqa: E402
+
+from benchmarks.synthetic import make_ledger  # noqa: E402
+from utils.result_pages import decode_cursor, select_rows  # noqa: E402
+
+
+def timed(fn, repeat=3):
+    """(best milliseconds, result) of ``fn()``"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--page-rows", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    import main as app_main
+    from api.anomaly import (
+        prepare_features, render_detection_page, render_detection_payload, score_and_render, score_transactions
+    )
+
+    train, _ = make_ledger(50_000, anomaly_rate=0.01, seed=2)
+    app_main.get_ml_models()["anomaly_detector"] = IsolationForest(contamination=0.01, random_state=42).fit(
+        prepare_features(train))
+    df, _ = make_ledger(args.rows, anomaly_rate=0.01, seed=3)
+    df['transaction_date'] = df['transaction_date'].astype(str)
+
+    scoring_ms, scored = timed(lambda: score_transactions(df, explain=True), repeat=1)
+    entry, _ = score_and_render(df, render=False)
+    print(f"{args.rows:,} rows, {int(entry['is_anomaly'].sum()):,} flagged; scoring {scoring_ms:.0f} ms in every mode")
+    print(f"{'response':<36}{'rows':>9}{'render ms':>11}{'KB':>10}")
+
+    all_ms, full = timed(lambda: render_detection_payload(df, scored, "json"))
+    page_ms, first = timed(lambda: render_detection_page(entry, "anomalies", args.k, 0, args.page_rows))
+    top_ms, top = timed(lambda: render_detection_page(entry, "top_k", args.k, 0, args.page_rows))
+
+    def every_page():
+        pages, offset = [], 0
+        while offset is not None:
+            pages.append(render_detection_page(entry, "anomalies", args.k, offset, args.page_rows))
+            cursor = json.loads(pages[-1])["next_cursor"]
+            offset = decode_cursor(cursor)["offset"] if cursor else None
+        return pages
+
+    pages_ms, pages = timed(every_page)
+    first_page, top_page = json.loads(first), json.loads(top)
+    for label, rows, ms, size in [
+        ("mode=all (full list)", args.rows, all_ms, len(full)),
+        ("mode=anomalies, first page", first_page["summary"]["returned"], page_ms, len(first)),
+        (f"mode=anomalies, all {len(pages)} pages", first_page["summary"]["selected"], pages_ms, sum(map(len, pages))),
+        (f"mode=top_k, k={args.k}", top_page["summary"]["returned"], top_ms, len(top)),
+    ]:
+        print(f"{label:<36}{rows:>9,}{ms:>11.1f}{size / 1024:>10.0f}")
+
+    scores = entry['scores']
+    partial_ms, selected = timed(lambda: select_rows(scores, entry['is_anomaly'], "top_k", args.k), repeat=10)
+    sort_ms, ranked = timed(lambda: np.lexsort((np.arange(len(scores)), scores))[:args.k], repeat=10)
+    print(f"top-{args.k} selection: partial {partial_ms:.2f} ms vs full sort {sort_ms:.2f} ms, "
+          f"same rows in the same order: {np.array_equal(selected, ranked)}")
+
+    flagged = [r for r in json.loads(full) if r["is_anomaly"]]
+    paged = [r for page in pages for r in json.loads(page)["results"]]
+    print(f"anomaly pages identical to the flagged rows of the full list: {paged == flagged}")
+
+
+if __name__ == "__main__":
+    main()
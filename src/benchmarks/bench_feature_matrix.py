@@ -0,0 +1,145 @@
+"""Feature building and scoring time and peak memory per million rows: float32 matrix builder vs DataFrames.
+
+The DataFrame paths are reproduced here as they were before the builder:
+``prepare_features`` assembling a DataFrame column by column and the forest
+called twice (``decision_function`` then ``predict``), and
+``engineer_features`` with float64 intermediates followed by
+``StandardScaler.transform``. Both are compared with the builder paths on
+the same synthetic ledger: features and scores must agree (exactly for the
+live model, whose forest sees float32 either way; within float32 rounding
+for the scaled detector). Peak memory is the largest traced allocation
+during one call (``tracemalloc``, which sees numpy and pandas buffers).
+Reuse is shown by scoring the ledger as ``--batch-rows`` batches. Run from
+``src/``::
+
+    python -m benchmarks.bench_feature_matrix --rows 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+from api.anomaly import FEATURE_SETS, build_feature_matrix
+from benchmarks.synthetic import make_ledger
+from models.anomaly_detector import AdvancedAnomalyDetector
+from services.frequency_service import frequency_feature
+from services.vendor_service import canonical_vendors
+from utils.feature_matrix import feature_builder
+
+
+def dataframe_features(df: pd.DataFrame) -> pd.DataFrame:
+    """``prepare_features`` (base set) as it was: a DataFrame built column by column"""
+    features = pd.DataFrame()
+    features['amount'] = df['amount']
+    features['department_id'] = frequency_feature(df['department_id'], 'department_id')
+    features['vendor_frequency'] = frequency_feature(canonical_vendors(df), 'vendor_name')
+    dates = df['transaction_date'].astype(str)
+    hours = pd.to_datetime(dates, errors='coerce', format='mixed').dt.hour
+    features['time_of_day'] = hours.where(dates.str.contains(':') & hours.notna(), 12).astype(int)
+    return features
+
+
+def dataframe_engineered(detector: AdvancedAnomalyDetector, df: pd.DataFrame) -> np.ndarray:
+    """``engineer_features`` plus ``StandardScaler.transform`` as they were"""
+    features = pd.DataFrame()
+    features['amount'] = df['amount']
+    features['log_amount'] = np.log1p(df['amount'])
+    features['amount_zscore'] = (df['amount'] - df['amount'].mean()) / df['amount'].std()
+    features['department_frequency'] = frequency_feature(df['department_id'], 'department_id')
+    features['vendor_frequency'] = frequency_feature(canonical_vendors(df), 'vendor_name')
+    dates = pd.to_datetime(df['transaction_date'])
+    features['day_of_week'] = dates.dt.dayofweek
+    features['hour_of_day'] = dates.dt.hour
+    features['amount_percentile'] = df['amount'].rank(pct=True)
+    return detector.scaler.transform(features.to_numpy())
+
+
+def live_dataframe(model, df):
+    features = dataframe_features(df)
+    return model.decision_function(features), model.predict(features) == -1
+
+
+def live_matrix(model, df):
+    columns = FEATURE_SETS['base']
+    features = pd.DataFrame(build_feature_matrix(df, None, columns), columns=columns, copy=False)
+    scores = model.decision_function(features)
+    return scores, scores < 0
+
+
+def measure(function, repeats: int):
+    """(best seconds, peak traced MB) of ``function()``, and its result"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    ledger, _ = make_ledger(args.rows, anomaly_rate=0.01, seed=4)
+    train, _ = make_ledger(50_000, anomaly_rate=0.01, seed=5)
+    per_million = 1_000_000 / args.rows
+
+    model = IsolationForest(random_state=42).fit(dataframe_features(train))
+    detector = AdvancedAnomalyDetector(contamination=0.01).fit(train)
+
+    print(f"{args.rows:,} rows; time per million rows, peak traced memory per call")
+    print(f"{'path':<44}{'s/M rows':>9}{'peak MB':>9}")
+    rows = [
+        ("live features, DataFrame", lambda: dataframe_features(ledger)),
+        ("live features, float32 matrix", lambda: build_feature_matrix(ledger, None, FEATURE_SETS['base'])),
+        ("live score (features + forest), DataFrame", lambda: live_dataframe(model, ledger)),
+        ("live score (features + forest), matrix", lambda: live_matrix(model, ledger)),
+        ("engineered + scaled, DataFrame + scaler", lambda: dataframe_engineered(detector, ledger)),
+        ("engineered + scaled, matrix in place", lambda: detector.transform(ledger)),
+    ]
+    results = {}
+    for label, function in rows:
+        seconds, peak, result = measure(function, args.repeats)
+        results[label] = result
+        print(f"{label:<44}{seconds * per_million:>9.2f}{peak:>9.0f}")
+
+    old_features = dataframe_features(ledger).to_numpy(dtype=np.float32)
+    new_features = build_feature_matrix(ledger, None, FEATURE_SETS['base'])
+    old_scores, old_flags = results["live score (features + forest), DataFrame"]
+    new_scores, new_flags = live_matrix(model, ledger)
+    print(f"live features identical: {np.array_equal(old_features, new_features)}; "
+          f"scores identical: {np.array_equal(old_scores, new_scores)}; flags identical: {np.array_equal(old_flags, new_flags)}")
+
+    # The forest casts to float32 either way, so that is what the scaled matrix is compared with
+    old_scaled = dataframe_engineered(detector, ledger).astype(np.float32)
+    new_scaled = detector.transform(ledger).copy()
+    old_detector_scores = detector.model.decision_function(old_scaled)
+    new_detector_scores = detector.model.decision_function(new_scaled)
+    moved = old_detector_scores != new_detector_scores
+    print(f"scaled features max |diff|: {np.abs(old_scaled - new_scaled).max():.1e}; "
+          f"detector scores differ on {moved.sum():,} rows "
+          f"(max |diff| {np.abs(old_detector_scores - new_detector_scores).max():.1e}); "
+          f"flags agree on {np.mean((old_detector_scores < 0) == (new_detector_scores < 0)):.4%} of rows")
+
+    before = feature_builder.get_stats()
+    start = time.perf_counter()
+    for first in range(0, args.rows, args.batch_rows):
+        live_matrix(model, ledger.iloc[first:first + args.batch_rows])
+    seconds = time.perf_counter() - start
+    after = feature_builder.get_stats()
+    print(f"{args.rows // args.batch_rows:,} batches of {args.batch_rows:,}: {seconds * per_million:.2f} s/M rows, "
+          f"{after['allocations'] - before['allocations']} buffer allocations, {after['reuses'] - before['reuses']:,} reuses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Forensic checks over a whole ledger: vectorised pass time at scale, and what it finds among planted fraud.
+
+The ledger is generated as column arrays: vendors with their own typical
+amount spread over one to two orders of magnitude (so honest vendors
+follow Benford's law closely), each serving one department, Zipf-like
+popularity and three years of days. Planted among the busier vendors are
+fabricated amounts (first digits drawn uniformly), vendors billing round
+hundreds, vendors bunching payments just under the approval threshold, and
+clusters of three sub-threshold payments by one department to one vendor
+within three days. ``ForensicAnalyzer.analyze`` runs over the whole ledger
+and is checked for recall on the planted vendors and clusters and for
+false alarms among the rest. A per-group loop (one numpy call per vendor
+and a window walk per department/vendor pair, the usual way these checks
+are written) is timed on the first ``--baseline-rows`` rows and must flag
+the same vendors. Run from ``src/``::
+
+    python -m benchmarks.bench_forensics --rows 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy import stats
+
+from models.forensic_checks import (
+    BENFORD_FIRST_DIGIT, MAD_BOUNDS, MAX_TRUNCATED_SHARE, MIN_LOG10_SPREAD, MIN_ROUND_BASELINE,
+    ForensicAnalyzer, find_splits
+)
+
+THRESHOLD = 10000.0
+
+
+def make_forensic_ledger(rows: int, n_vendors: int, n_departments: int, planted: int, splits: int, seed: int):
+    """Column arrays of a synthetic ledger, the planted vendors per check and the rows of each planted cluster"""
+    rng = np.random.default_rng(seed)
+    vendor_department = rng.integers(1, n_departments + 1, n_vendors)
+    centre = rng.uniform(1.5, 3.6, n_vendors)
+    spread = rng.uniform(0.6, 0.9, n_vendors)
+    popularity = 1.0 / np.arange(1, n_vendors + 1) ** 0.8
+    vendors = rng.choice(n_vendors, rows, p=popularity / popularity.sum()).astype(np.int32)
+    amounts = np.round(10 ** rng.normal(centre[vendors], spread[vendors]), 2)
+    days = (19723 + rng.integers(0, 3 * 365, rows)).astype(np.int32)
+
+    # Planted vendors come from the busier ones so every check has enough rows to decide
+    chosen = rng.choice(min(n_vendors, 2000), 3 * planted, replace=False)
+    truth = {"benford": chosen[:planted], "round_amounts": chosen[planted:2 * planted],
+             "threshold_avoidance": chosen[2 * planted:]}
+    for check, picked in truth.items():
+        rows_of = np.flatnonzero(np.isin(vendors, picked))
+        if check == "benford":
+            magnitude = np.floor(centre[vendors[rows_of]]).astype(int) + rng.integers(-1, 2, len(rows_of))
+            amounts[rows_of] = np.round((rng.integers(1, 10, len(rows_of)) + rng.random(len(rows_of)))
+                                        * 10.0 ** np.clip(magnitude, 1, 5), 2)
+        elif check == "round_amounts":
+            rounded = rows_of[rng.random(len(rows_of)) < 0.4]
+            amounts[rounded] = np.maximum(np.round(amounts[rounded], -2), 100)
+        else:
+            bunched = rows_of[rng.random(len(rows_of)) < 0.15]
+            amounts[bunched] = np.round(rng.uniform(0.9, 0.999, len(bunched)) * THRESHOLD, 2)
+
+    # Split clusters overwrite rows of honest vendors with three payments in three days
+    honest = np.setdiff1d(np.arange(min(n_vendors, 2000)), chosen)
+    cluster_vendors = rng.choice(honest, splits)
+    cluster_days = (19723 + rng.integers(0, 3 * 365 - 3, splits)).astype(np.int32)
+    slots = rng.choice(rows, 3 * splits, replace=False).reshape(splits, 3)
+    vendors[slots] = cluster_vendors[:, None]
+    days[slots] = cluster_days[:, None] + rng.integers(0, 3, (splits, 3))
+    amounts[slots] = np.round(rng.uniform(0.4, 0.95, (splits, 3)) * THRESHOLD, 2)
+    departments = vendor_department[vendors]
+    return amounts, departments, vendors, days, truth, slots
+
+
+def loop_checks(amounts, departments, vendors, days, analyzer: ForensicAnalyzer):
+    """Vendors flagged per check and split-cluster count, one group at a time"""
+    order = np.argsort(vendors, kind='stable')
+    bounds = np.flatnonzero(np.diff(vendors[order])) + 1
+    groups = np.split(order, bounds)
+    pooled_round = max(np.mean((np.rint(amounts * 100) >= 10000) & (np.fmod(np.rint(amounts * 100), 10000) == 0)),
+                       MIN_ROUND_BASELINE)
+    results, tested = [], {"benford": 0, "round_amounts": 0, "threshold_avoidance": 0}
+    for rows in groups:
+        a = amounts[rows]
+        vendor = int(vendors[rows[0]])
+        valid = a[a >= 10]
+        logs = np.log10(valid)
+        digits = (valid / 10 ** np.floor(logs)).astype(int)
+        counts = np.bincount(digits, minlength=10)[1:10]
+        n = counts.sum()
+        benford = None
+        if n >= analyzer.min_count and logs.std() >= MIN_LOG10_SPREAD and n >= (1 - MAX_TRUNCATED_SHARE) * len(a):
+            tested["benford"] += 1
+            observed = counts / n
+            chi2 = n * ((observed - BENFORD_FIRST_DIGIT) ** 2 / BENFORD_FIRST_DIGIT).sum()
+            mad = np.abs(observed - BENFORD_FIRST_DIGIT).mean()
+            benford = (stats.chi2.sf(chi2, 8), mad > MAD_BOUNDS[-1])
+        rounded = int(((np.rint(a * 100) >= 10000) & (np.fmod(np.rint(a * 100), 10000) == 0)).sum())
+        round_p = None
+        if len(a) >= analyzer.min_count:
+            tested["round_amounts"] += 1
+            round_p = stats.binom.sf(rounded - 1, len(a), pooled_round)
+        below = int(((a >= THRESHOLD * (1 - analyzer.margin)) & (a < THRESHOLD)).sum())
+        above = int(((a >= THRESHOLD) & (a < THRESHOLD * (1 + analyzer.margin))).sum())
+        avoid_p = None
+        if below + above >= max(analyzer.min_count // 5, 5):
+            tested["threshold_avoidance"] += 1
+            avoid_p = stats.binom.sf(below - 1, below + above, analyzer.below_share)
+        results.append((vendor, benford, round_p, avoid_p))
+
+    flagged = {"benford": set(), "round_amounts": set(), "threshold_avoidance": set()}
+    for vendor, benford, round_p, avoid_p in results:
+        if benford is not None and benford[0] * tested["benford"] < analyzer.alpha and benford[1]:
+            flagged["benford"].add(vendor)
+        if round_p is not None and round_p * tested["round_amounts"] < analyzer.alpha:
+            flagged["round_amounts"].add(vendor)
+        if avoid_p is not None and avoid_p * tested["threshold_avoidance"] < analyzer.alpha:
+            flagged["threshold_avoidance"].add(vendor)
+
+    # Splits: walk each department/vendor pair's candidates in day order with a trailing window
+    clusters = 0
+    candidates = np.flatnonzero((amounts >= THRESHOLD * analyzer.min_fraction) & (amounts < THRESHOLD))
+    pairs = {}
+    for i in candidates.tolist():
+        pairs.setdefault((int(departments[i]), int(vendors[i])), []).append((int(days[i]), float(amounts[i])))
+    for payments in pairs.values():
+        payments.sort()
+        covered = [False] * len(payments)
+        start, total = 0, 0.0
+        for end, (day, amount) in enumerate(payments):
+            total += amount
+            while payments[start][0] <= day - analyzer.window_days:
+                total -= payments[start][1]
+                start += 1
+            if end > start and total >= THRESHOLD:
+                covered[start:end + 1] = [True] * (end + 1 - start)
+        for j, (day, _) in enumerate(payments):
+            if covered[j] and (j == 0 or not covered[j - 1] or day - payments[j - 1][0] >= analyzer.window_days):
+                clusters += 1
+    return flagged, clusters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--vendors", type=int, default=20_000)
+    parser.add_argument("--departments", type=int, default=50)
+    parser.add_argument("--planted", type=int, default=20, help="planted vendors per check")
+    parser.add_argument("--splits", type=int, default=500, help="planted split clusters")
+    parser.add_argument("--baseline-rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    amounts, departments, vendors, days, truth, slots = make_forensic_ledger(
+        args.rows, args.vendors, args.departments, args.planted, args.splits, seed=7)
+    labels = [f"Vendor {i}" for i in range(args.vendors)]
+    print(f"{args.rows:,} rows, {args.vendors:,} vendors, {args.departments} departments "
+          f"(generated in {time.perf_counter() - start:.1f} s, "
+          f"{(amounts.nbytes + departments.nbytes + vendors.nbytes + days.nbytes) / 1e6:.0f} MB of columns)")
+
+    analyzer = ForensicAnalyzer(thresholds=(THRESHOLD,))
+    best = float("inf")
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        report = analyzer.analyze(amounts, departments, vendors, labels, days, max_splits=10 * args.splits)
+        best = min(best, time.perf_counter() - start)
+    print(f"full pass (Benford, round amounts, threshold avoidance per vendor and department, splits): "
+          f"{best:.2f} s, {args.rows / best / 1e6:.1f} M rows/s")
+
+    flagged = {check: set() for check in truth}
+    for finding in report["vendor"]["flagged"]:
+        for check in finding["checks"]:
+            flagged[check].add(int(finding["key"].split()[-1]))
+    planted_all = set(np.concatenate(list(truth.values())).tolist())
+    print(f"{'check':<22}{'tested':>8}{'planted':>9}{'found':>7}{'false alarms':>14}")
+    for check, picked in truth.items():
+        found = len(flagged[check] & set(picked.tolist()))
+        false = len(flagged[check] - planted_all)
+        print(f"{check:<22}{report['vendor']['tested'][check]:>8,}{len(picked):>9}{found:>7}{false:>14}")
+    pairs = departments.astype(np.int64) * args.vendors + vendors
+    found = find_splits(amounts, pairs, days, THRESHOLD, analyzer.window_days, analyzer.min_fraction)
+    keys, rates, span = analyzer.candidate_rates(amounts, pairs, days, THRESHOLD)
+    p, _ = analyzer.split_p_values(found, rates[np.searchsorted(keys, found["group"])], span)
+    planted_clusters = found["row_cluster"][slots]
+    caught = ((planted_clusters >= 0).all(axis=1) & (p[planted_clusters.max(axis=1)] < analyzer.alpha)).sum()
+    print(f"split clusters: {report['ledger']['split_clusters']:,} over the threshold in the window, "
+          f"{report['ledger']['significant_splits']:,} unlikely at their pair's usual rate "
+          f"({report['ledger']['split_payments']:,} payments); {caught} of {len(slots)} planted clusters among those")
+    print(f"departments flagged: {report['department']['flagged_count']} of {report['department']['groups']}")
+
+    n = min(args.baseline_rows, args.rows)
+    part = amounts[:n], departments[:n], vendors[:n], days[:n]
+    start = time.perf_counter()
+    looped, loop_clusters = loop_checks(*part, analyzer)
+    loop_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    subset = analyzer.analyze(*part[:3], labels, part[3], max_splits=0)
+    vector_seconds = time.perf_counter() - start
+    vectorised = {check: set() for check in truth}
+    for finding in subset["vendor"]["flagged"]:
+        for check in finding["checks"]:
+            vectorised[check].add(int(finding["key"].split()[-1]))
+    print(f"\nfirst {n:,} rows: per-group loop {loop_seconds:.2f} s vs vectorised {vector_seconds:.2f} s "
+          f"({loop_seconds / vector_seconds:.0f}x); same vendors flagged: {looped == vectorised}; "
+          f"split clusters {loop_clusters:,} vs {subset['ledger']['split_clusters']:,}")
+
+
+if __name__ == "__main__":
+    main()
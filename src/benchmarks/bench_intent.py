@@ -0,0 +1,102 @@
+"""Intent accuracy, calibration and batch throughput: hashed n-gram classifier vs the substring rules.
+
+Accuracy and calibration are measured on held-out folds of the labeled
+samples (each fold's classifier is trained, temperature included, on the
+other folds only). Calibration is the expected calibration error: the gap
+between stated confidence and actual accuracy, averaged over ten confidence
+bins. Throughput classifies ``--queries`` queries drawn from the samples,
+one at a time with the rules and as one batch with the classifier. Run from
+``src/``::
+
+    python -m benchmarks.bench_intent --queries 100000
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+
+from config.settings import settings
+from models.intent_classifier import HashedIntentClassifier, load_intent_samples
+from models.nlp_processor import SimpleNLPProcessor
+
+
+def expected_calibration_error(confidence: np.ndarray, correct: np.ndarray, bins: int = 10) -> float:
+    edges = np.linspace(0, 1, bins + 1)
+    which = np.clip(np.digitize(confidence, edges[1:-1]), 0, bins - 1)
+    error = 0.0
+    for b in range(bins):
+        in_bin = which == b
+        if in_bin.any():
+            error += in_bin.mean() * abs(confidence[in_bin].mean() - correct[in_bin].mean())
+    return error
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", default=settings.INTENT_SAMPLES_PATH)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    texts, labels, _ = load_intent_samples(args.samples)
+    labels = np.asarray(labels)
+    rules = SimpleNLPProcessor()
+
+    rule_intents = np.array([rules.detect_intent_by_rules(t) for t in texts])
+    rule_confidence = np.array([
+        rules.calculate_confidence(rules.extract_keywords(t), i) for t, i in zip(texts, rule_intents)
+    ])
+
+    model_intents = np.empty(len(texts), dtype=object)
+    model_confidence = np.zeros(len(texts))
+    splitter = StratifiedKFold(n_splits=args.folds, shuffle=True, random_state=args.seed)
+    for train, held_out in splitter.split(texts, labels):
+        model = HashedIntentClassifier().fit([texts[i] for i in train], labels[train])
+        intents, confidence = model.classify([texts[i] for i in held_out])
+        model_intents[held_out] = intents
+        model_confidence[held_out] = confidence
+
+    print(f"{len(texts)} labeled queries, {args.folds}-fold held-out evaluation")
+    print(f"{'':<12}{'accuracy':>10}{'mean conf':>11}{'ECE':>8}   per-intent accuracy")
+    for name, intents, confidence in (("rules", rule_intents, rule_confidence),
+                                      ("classifier", model_intents, model_confidence)):
+        correct = intents == labels
+        per_intent = "  ".join(f"{c} {correct[labels == c].mean():.0%}" for c in sorted(set(labels)))
+        print(f"{name:<12}{correct.mean():>10.1%}{confidence.mean():>11.2f}"
+              f"{expected_calibration_error(confidence, correct):>8.3f}   {per_intent}")
+
+    rng = np.random.default_rng(args.seed)
+    queries = [texts[i] for i in rng.integers(0, len(texts), args.queries)]
+    model = HashedIntentClassifier().fit(texts, labels)
+
+    start = time.perf_counter()
+    for query in queries:
+        rules.detect_intent_by_rules(query)
+    intent_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in queries:
+        intent = rules.detect_intent_by_rules(query)
+        rules.calculate_confidence(rules.extract_keywords(query), intent)
+    rules_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in queries[:2000]:
+        model.classify([query])
+    single_seconds = (time.perf_counter() - start) * len(queries) / 2000
+
+    start = time.perf_counter()
+    model.classify(queries)
+    batch_seconds = time.perf_counter() - start
+
+    print(f"throughput over {len(queries):,} queries:")
+    print(f"  rules, intent only:                             {len(queries) / intent_seconds:>10,.0f} queries/s")
+    print(f"  rules, per query (intent + keyword confidence): {len(queries) / rules_seconds:>10,.0f} queries/s")
+    print(f"  classifier, one query per call:                 {len(queries) / single_seconds:>10,.0f} queries/s")
+    print(f"  classifier, one batch:                          {len(queries) / batch_seconds:>10,.0f} queries/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Amount/date range query latency at 10M transactions: range index vs a full scan.
+
+Builds a ``RangeIndex`` over ``--rows`` synthetic transactions (log-normal
+amounts, uniform dates over five years, five departments), then times
+filtered queries of different selectivity through the index and through a
+numpy boolean-mask scan of the same columns, checking both agree. Also
+times incremental additions (including the merges they trigger) and the
+filter extraction of the sample voice queries. Run from ``src/``::
+
+    python -m benchmarks.bench_range_index --rows 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.query_filters import extract_filters
+from utils.range_index import RangeIndex
+from services.search_service import to_day
+
+QUERIES = [
+    ("amount >= $50K", dict(amount_min=50_000)),
+    ("amount >= $1M", dict(amount_min=1_000_000)),
+    ("$1K-$2K", dict(amount_min=1_000, amount_max=2_000)),
+    ("one day", dict(date_from="2023-06-01", date_to="2023-06-01")),
+    ("last month, >= $50K", dict(date_from="2024-11-01", date_to="2024-11-30", amount_min=50_000)),
+    ("year, $1K-$2K, dept 3", dict(date_from="2023-01-01", date_to="2023-12-31", amount_min=1_000,
+                                   amount_max=2_000, department_id=3)),
+]
+VOICE_QUERIES = ["Show me transactions above $50,000", "List all vendor payments above fifty thousand dollars",
+                 "How much did we spend on education last year?", "payments between 1 and 5 million this quarter",
+                 "Show me the top 5 vendors by spending"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=9)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    n = args.rows
+    amounts = rng.lognormal(7, 1.6, n).round(2)
+    days = rng.integers(to_day("2020-01-01"), to_day("2024-12-31") + 1, n).astype(np.int32)
+    departments = rng.integers(1, 6, n).astype(np.int32)
+    ids = np.arange(1, n + 1, dtype=np.int64)
+
+    index = RangeIndex()
+    start = time.perf_counter()
+    index.add(ids, amounts, days, departments)
+    index.rebuild()
+    build = time.perf_counter() - start
+    print(f"indexed {n:,} rows in {build:.1f}s, {index.memory_bytes() / 1024 ** 2:.0f} MB")
+
+    print(f"{'query':<24}{'matches':>10}{'index p50':>12}{'index p99':>12}{'scan p50':>11}")
+    for label, query in QUERIES:
+        bounds = dict(
+            amount_min=query.get('amount_min'), amount_max=query.get('amount_max'),
+            day_from=to_day(query.get('date_from')), day_to=to_day(query.get('date_to')),
+            department_id=query.get('department_id'))
+        latencies = []
+        for _ in range(args.repeats):
+            t = time.perf_counter()
+            found, _ = index.search(**bounds)
+            latencies.append(time.perf_counter() - t)
+        scans = []
+        for _ in range(max(args.repeats // 10, 3)):
+            t = time.perf_counter()
+            mask = np.ones(n, dtype=bool)
+            if bounds['amount_min'] is not None:
+                mask &= amounts >= bounds['amount_min']
+            if bounds['amount_max'] is not None:
+                mask &= amounts <= bounds['amount_max']
+            if bounds['day_from'] is not None:
+                mask &= days >= bounds['day_from']
+            if bounds['day_to'] is not None:
+                mask &= days <= bounds['day_to']
+            if bounds['department_id'] is not None:
+                mask &= departments == bounds['department_id']
+            expected = ids[mask]
+            scans.append(time.perf_counter() - t)
+        assert np.array_equal(np.sort(found), expected), label
+        latencies = np.array(latencies) * 1000
+        print(f"{label:<24}{len(found):>10,}{np.percentile(latencies, 50):>10.2f}ms"
+              f"{np.percentile(latencies, 99):>10.2f}ms{np.median(scans) * 1000:>9.1f}ms")
+
+    batch = 10_000
+    extra = 1_000_000
+    start = time.perf_counter()
+    for first in range(0, extra, batch):
+        rows = np.arange(first, first + batch)
+        index.add(ids[rows] + n, amounts[rows], days[rows], departments[rows])
+    add_seconds = time.perf_counter() - start
+    print(f"incremental add of {extra:,} rows in batches of {batch:,}: {add_seconds:.1f}s "
+          f"({add_seconds / extra * 1e6:.1f} us/row including merges), tail now {index.get_stats()['unsorted_tail']:,}")
+
+    start = time.perf_counter()
+    for _ in range(200):
+        for query in VOICE_QUERIES:
+            extract_filters(query)
+    per_query = (time.perf_counter() - start) / (200 * len(VOICE_QUERIES)) * 1e6
+    print(f"filter extraction: {per_query:.0f} us/query; e.g. {VOICE_QUERIES[1]!r} -> {extract_filters(VOICE_QUERIES[1])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Cold versus cached /detect scoring, and coalescing of concurrent duplicates.
+
+Scores a synthetic batch through ``build_detection_response`` cold, then
+again from the cache, and reports the hashing overhead paid on every
+request. Finally fires ``--concurrency`` identical requests at once and
+counts how many actually ran the model. Run from ``src/``::
+
+    python -m benchmarks.bench_result_cache --rows 10000
+"""
+import argparse
+import os
+import threading
+import time
+
+os.environ.setdefault("STORE_SCORED_TRANSACTIONS", "false")
+
+from benchmarks.synthetic import make_ledger  # noqa: E402
+from services.result_cache import result_cache, batch_fingerprint  # noqa: E402
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    import main as app_main  # noqa: F401  loads the model
+    from api.anomaly import build_detection_response, render_detection_payload, REQUIRED_COLUMNS, score_transactions
+
+    df, _ = make_ledger(args.rows, anomaly_rate=0.01, seed=3)
+    df['transaction_date'] = df['transaction_date'].astype(str)
+
+    uncached_ms = timed(lambda: score_transactions(df, explain=True))
+    json_before = timed(lambda: render_detection_payload(df, score_transactions(df, explain=True), "json"))
+    result_cache.clear()
+    cold_ms = timed(lambda: build_detection_response(df))
+    hit_ms = timed(lambda: build_detection_response(df), repeat=5)
+    hash_ms = timed(lambda: batch_fingerprint(df, REQUIRED_COLUMNS), repeat=5)
+    print(f"rows: {args.rows:,}")
+    print(f"scoring only:          {uncached_ms:8.1f} ms")
+    print(f"scoring + JSON render: {json_before:8.1f} ms")
+    print(f"cold (miss + store):   {cold_ms:8.1f} ms")
+    print(f"cached (hit):          {hit_ms:8.1f} ms  (response body served from cache)")
+    print(f"batch fingerprint:     {hash_ms:8.1f} ms per request")
+
+    # Concurrent identical requests with a different batch so nothing is cached yet
+    other, _ = make_ledger(args.rows, anomaly_rate=0.01, seed=4)
+    other['transaction_date'] = other['transaction_date'].astype(str)
+    before = result_cache.get_stats()
+    barrier = threading.Barrier(args.concurrency)
+
+    def request():
+        barrier.wait()
+        build_detection_response(other)
+
+    threads = [threading.Thread(target=request) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = (time.perf_counter() - start) * 1000
+    after = result_cache.get_stats()
+    print(f"{args.concurrency} concurrent identical requests: {elapsed:.1f} ms, "
+          f"model runs {after['misses'] - before['misses']}, coalesced {after['coalesced'] - before['coalesced']}, "
+          f"hits {after['hits'] - before['hits']}")
+    print(f"cache: {after['entries']} entries, {after['bytes'] / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Accuracy and memory of the vendor frequency sketches against exact counts.
+
+Streams a Zipf-distributed vendor column in batches through two
+``FrequencySketches`` (as two workers would), merges them, round-trips the
+result through ``to_bytes``, and checks every guarantee against an exact
+``Counter``:
+
+* Count-Min estimates never undercount, and at most ``1 - 1/e**depth`` of
+  vendors exceed the ``e / width * total`` overcount bound
+* the HyperLogLog distinct count is within 4 standard errors
+* every vendor heavier than the heavy-hitter error bound is reported, and
+  reported counts sit between the exact count minus that bound and the count
+
+Exits with status 1 if any check fails. Run from ``src/``::
+
+    python -m benchmarks.bench_sketches --rows 5000000 --vendors 1000000
+"""
+import argparse
+import math
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from utils.sketches import FrequencySketches
+
+
+def make_stream(rows: int, vendors: int, skew: float, seed: int) -> np.ndarray:
+    """Vendor ids drawn from a Zipf law truncated to ``vendors`` names"""
+    rng = np.random.default_rng(seed)
+    ids = rng.zipf(skew, rows * 2)
+    ids = ids[ids <= vendors][:rows]
+    while len(ids) < rows:
+        more = rng.zipf(skew, rows)
+        ids = np.concatenate([ids, more[more <= vendors]])[:rows]
+    # A scattering of uniform draws so the long tail really reaches `vendors` names
+    tail = rng.random(rows) < 0.2
+    ids[tail] = rng.integers(1, vendors + 1, int(tail.sum()))
+    return ids
+
+
+def exact_dict_bytes(counts: Counter) -> int:
+    """Rough footprint of a {vendor name: count} dict"""
+    sample = list(counts.items())[:1000]
+    per_entry = sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in sample) / max(len(sample), 1)
+    return int(sys.getsizeof(counts) + per_entry * len(counts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--vendors", type=int, default=1_000_000)
+    parser.add_argument("--skew", type=float, default=1.3)
+    parser.add_argument("--batch", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    ids = make_stream(args.rows, args.vendors, args.skew, args.seed)
+    names = np.char.add("Vendor ", ids.astype(str)).astype(object)
+    amounts = np.random.default_rng(args.seed + 1).lognormal(8, 1, len(ids)).round(2)
+
+    workers = [FrequencySketches(), FrequencySketches()]
+    start = time.perf_counter()
+    for i, offset in enumerate(range(0, len(names), args.batch)):
+        batch = pd.DataFrame({
+            "vendor_name": names[offset:offset + args.batch],
+            "department_id": ids[offset:offset + args.batch] % 50,
+            "amount": amounts[offset:offset + args.batch]
+        })
+        workers[i % 2].update(batch)
+    update_seconds = time.perf_counter() - start
+    sketches = FrequencySketches.from_bytes(workers[0].merge(workers[1]).to_bytes())
+
+    exact = Counter(names.tolist())
+    keys = np.array(list(exact.keys()), dtype=object)
+    truth = np.array(list(exact.values()))
+    failures = []
+
+    cms = sketches.vendor_counts
+    start = time.perf_counter()
+    estimates = cms.estimate(keys)
+    estimate_seconds = time.perf_counter() - start
+    overcount = estimates - truth
+    bound = cms.error_bound
+    over_bound = float(np.mean(overcount > bound))
+    allowed = math.exp(-cms.depth)
+    if (overcount < 0).any():
+        failures.append("Count-Min undercounted")
+    if over_bound > allowed:
+        failures.append(f"Count-Min: {over_bound:.4%} of vendors over the bound (allowed {allowed:.4%})")
+
+    hll = sketches.distinct_vendors
+    distinct = hll.count()
+    hll_error = distinct / len(exact) - 1
+    if abs(hll_error) > 4 * hll.relative_error:
+        failures.append(f"HyperLogLog error {hll_error:.2%} beyond 4 standard errors")
+
+    hh = sketches.top_vendors
+    reported = hh.counts
+    missing = [k for k, c in exact.items() if c > hh.error and k not in reported.index]
+    if missing:
+        failures.append(f"Heavy hitters missed {len(missing)} vendors above the error bound")
+    exact_reported = np.array([exact[k] for k in reported.index])
+    if ((reported.to_numpy() > exact_reported) | (reported.to_numpy() < exact_reported - hh.error)).any():
+        failures.append("Heavy-hitter counts outside [exact - error, exact]")
+    top_exact = [k for k, _ in exact.most_common(10)]
+    top_sketch = [row["key"] for row in hh.top(10)]
+
+    exact_bytes = exact_dict_bytes(exact)
+    per_million = 1_000_000 / len(exact)
+    print(f"rows={len(names):,} distinct vendors={len(exact):,} update={len(names) / update_seconds:,.0f} rows/s "
+          f"estimate={len(keys) / estimate_seconds:,.0f} keys/s")
+    print(f"count-min  width={cms.width} depth={cms.depth} bound={bound:,.1f} "
+          f"mean overcount={overcount.mean():.2f} max={overcount.max()} over bound={over_bound:.4%}")
+    print(f"hyperloglog estimate={distinct:,.0f} error={hll_error:+.2%} (standard error {hll.relative_error:.2%})")
+    print(f"heavy hitters capacity={hh.capacity} error bound={hh.error:,.0f} "
+          f"top-10 overlap={len(set(top_exact) & set(top_sketch))}/10")
+    print("memory:")
+    print(f"  count-min (vendor)   {cms.memory_bytes() / 1024 ** 2:8.2f} MB  fixed")
+    print(f"  count-min (dept)     {sketches.department_counts.memory_bytes() / 1024 ** 2:8.2f} MB  fixed")
+    print(f"  hyperloglog          {hll.memory_bytes() / 1024 ** 2:8.2f} MB  fixed")
+    print(f"  heavy hitters (x2)   {(hh.memory_bytes() + sketches.top_vendor_spend.memory_bytes()) / 1024 ** 2:8.2f} MB  "
+          f"at most {hh.capacity} vendors each")
+    print(f"  all sketches         {sketches.memory_bytes() / 1024 ** 2:8.2f} MB  "
+          f"serialized {len(sketches.to_bytes()) / 1024 ** 2:.2f} MB")
+    print(f"  exact dict           {exact_bytes / 1024 ** 2:8.2f} MB  "
+          f"~{exact_bytes * per_million / 1024 ** 2:.0f} MB per million vendors")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        return 1
+    print("all error bounds hold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Write throughput and query latency of the SQLite transaction store.
+
+Ingests distinct synthetic scored batches (the store drops rows it already
+holds, so each batch is drawn with its own seed; generation time is
+excluded), runs a
+reader thread during ingestion to show WAL keeps reads unblocked, then times
+the common queries on the full table. Run from ``src/``::
+
+    python -m benchmarks.bench_store --rows 10000000 --db /tmp/bench_transactions.db
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_ledger
+from services.transaction_store import TransactionStore
+
+
+def timed_query(fn, repeat: int = 5) -> float:
+    """Median latency in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--db", default="/tmp/bench_transactions.db")
+    args = parser.parse_args(argv)
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+    store = TransactionStore(args.db)
+
+    template, _ = make_ledger(args.batch_size, anomaly_rate=0.01, n_vendors=5000, seed=1)
+
+    stop = threading.Event()
+    read_latencies = []
+
+    def reader():
+        reader_store = TransactionStore(args.db)
+        while not stop.is_set():
+            start = time.perf_counter()
+            reader_store.top_vendors(5)
+            reader_store.department_totals("2024-03-01", "2024-03-31")
+            read_latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    write_s = 0.0
+    written = 0
+    batches = 0
+    reader_thread = None
+    while written < args.rows:
+        n = min(args.batch_size, args.rows - written)
+        batches += 1
+        batch, labels = make_ledger(n, anomaly_rate=0.01, n_vendors=5000, seed=batches)
+        flags = labels != ""
+        start = time.perf_counter()
+        stored = store.insert_scored(batch, np.where(flags, -0.2, 0.1), flags, source="bench")
+        write_s += time.perf_counter() - start
+        written += stored
+        if reader_thread is None:
+            reader_thread = threading.Thread(target=reader, daemon=True)
+            reader_thread.start()
+        if batches % 20 == 0:
+            print(f"  {written:,} rows, {written / write_s:,.0f} rows/s")
+    stop.set()
+    reader_thread.join()
+
+    print(f"\nwrote {written:,} rows in {write_s:.1f}s: {written / write_s:,.0f} rows/s "
+          f"(batch size {args.batch_size:,}, db {os.path.getsize(args.db) / 1e9:.2f} GB)")
+    reads = np.asarray(read_latencies) * 1000
+    print(f"reads during ingestion: {len(reads)} queries, p50 {np.percentile(reads, 50):.1f} ms, "
+          f"p99 {np.percentile(reads, 99):.1f} ms")
+
+    vendor = template["vendor_name"].iloc[0]
+    since = time.time() - 3600
+    queries = {
+        "top_vendors(5)": lambda: store.top_vendors(5),
+        "department_totals(month)": lambda: store.department_totals("2024-03-01", "2024-03-31"),
+        "department_totals(all)": lambda: store.department_totals(),
+        "vendor_transactions(100)": lambda: store.vendor_transactions(vendor, 100),
+        "transactions_between(1 day)": lambda: store.transactions_between("2024-03-04", "2024-03-04 23:59:59"),
+        "recent_anomalies(10)": lambda: store.recent_anomalies(10),
+        "count_anomalies(last hour)": lambda: store.count_anomalies(since=since),
+        "get_summary()": store.get_summary,
+    }
+    print(f"\n{'query':<30}{'median ms':>12}")
+    for name, fn in queries.items():
+        print(f"{name:<30}{timed_query(fn):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Training time and peak memory at 1M-50M rows: streamed reservoir training vs fitting in memory.
+
+Each configuration runs in its own process so peak RSS (``ru_maxrss``)
+is its own. The streamed fit feeds ``AdvancedAnomalyDetector.fit_stream``
+chunks of ``--chunk-rows`` rows (a few pre-generated synthetic chunks
+cycled with shifted amounts, so generation is not timed), while the
+in-memory fit builds the whole ledger and calls ``fit`` on it, which is
+only attempted up to ``--memory-max-rows``. Both are scored on the same
+held-out ledger with injected anomalies (ROC AUC), then the streamed model
+grows ``--grow-trees`` trees on one more chunk. Run from ``src/``::
+
+    python -m benchmarks.bench_training --rows 1000000 10000000 50000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import psutil
+from sklearn.metrics import roc_auc_score
+
+from benchmarks.synthetic import make_ledger
+from config.settings import settings
+from models.anomaly_detector import AdvancedAnomalyDetector
+
+
+def chunk_stream(rows: int, chunk_rows: int, pool):
+    """``rows`` rows as chunks cycled from ``pool``, each cycle with slightly shifted amounts"""
+    for i, start in enumerate(range(0, rows, chunk_rows)):
+        chunk = pool[i % len(pool)].iloc[:min(chunk_rows, rows - start)].copy()
+        chunk['amount'] *= 1 + (i // len(pool)) * 1e-6
+        yield chunk
+
+
+def worker(args) -> dict:
+    held_out, kinds = make_ledger(50_000, anomaly_rate=0.01, seed=999)
+    pool = [make_ledger(args.chunk_rows, anomaly_rate=0.0, seed=seed)[0] for seed in range(4)]
+    detector = AdvancedAnomalyDetector(contamination=0.01)
+    base_mb = psutil.Process().memory_info().rss / 1024 ** 2
+
+    start = time.perf_counter()
+    if args.mode == "stream":
+        detector.fit_stream(chunk_stream(args.worker_rows, args.chunk_rows, pool), sample_size=args.sample_size)
+    else:
+        ledger = pd.concat(list(chunk_stream(args.worker_rows, args.chunk_rows, pool)), ignore_index=True)
+        detector.fit(ledger)
+    seconds = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    auc = roc_auc_score(kinds != "", -detector.predict(held_out.copy())[1])
+
+    grow_seconds = None
+    if args.mode == "stream":
+        start = time.perf_counter()
+        detector.grow([make_ledger(args.chunk_rows, anomaly_rate=0.0, seed=100)[0]], n_estimators=args.grow_trees)
+        grow_seconds = time.perf_counter() - start
+    return {"seconds": seconds, "peak_mb": peak_mb - base_mb, "auc": auc, "grow_seconds": grow_seconds,
+            "trees": detector.model.n_estimators}
+
+
+def run(args, mode: str, rows: int) -> dict:
+    command = [sys.executable, "-m", "benchmarks.bench_training", "--worker-mode", mode,
+               "--worker-rows", str(rows), "--chunk-rows", str(args.chunk_rows),
+               "--sample-size", str(args.sample_size), "--grow-trees", str(args.grow_trees)]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument("--chunk-rows", type=int, default=settings.TRAIN_CHUNK_ROWS)
+    parser.add_argument("--sample-size", type=int, default=settings.TRAIN_SAMPLE_SIZE)
+    parser.add_argument("--grow-trees", type=int, default=settings.TRAIN_GROW_ESTIMATORS)
+    parser.add_argument("--memory-max-rows", type=int, default=2_000_000)
+    parser.add_argument("--worker-mode", choices=["stream", "memory"], help=argparse.SUPPRESS)
+    parser.add_argument("--worker-rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker_mode:
+        args.mode = args.worker_mode
+        print(json.dumps(worker(args)))
+        return
+
+    print(f"{os.cpu_count()} CPU(s), TRAIN_N_JOBS={settings.TRAIN_N_JOBS}, chunks of {args.chunk_rows:,} rows, "
+          f"reservoir of {args.sample_size:,} rows")
+    print(f"{'rows':>12}  {'mode':<10}{'train s':>9}{'rows/s':>12}{'peak MB':>9}{'AUC':>7}{'grow s':>8}")
+    for rows in args.rows:
+        modes = ["stream"] + (["memory"] if rows <= args.memory_max_rows else [])
+        for mode in modes:
+            result = run(args, mode, rows)
+            grow = f"{result['grow_seconds']:>8.1f}" if result['grow_seconds'] is not None else f"{'-':>8}"
+            print(f"{rows:>12,}  {mode:<10}{result['seconds']:>9.1f}{rows / result['seconds']:>12,.0f}"
+                  f"{result['peak_mb']:>9.0f}{result['auc']:>7.3f}{grow}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Build time, memory, lookup latency and recall of the vendor resolution index.
+
+Indexes ``--vendors`` synthetic vendor names, then resolves three query
+sets: known names in a different format (case, punctuation, legal
+suffix), names with one typo (deletion, substitution, transposition or
+homoglyph), and new names. Reports latency percentiles per set, how often
+a typo resolves to the vendor it came from, and how often the LSH lookup
+finds the same best match as an exhaustive weighted-Jaccard scan over every
+known name (done with a sparse matrix product, also timed). New names that
+score above ``--threshold`` are the ones that would be flagged as
+look-alikes; random names are often close to some existing one. Run from
+``src/``::
+
+    python -m benchmarks.bench_vendor_index --vendors 1000000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+from scipy import sparse
+
+from utils.vendor_index import VendorIndex, normalize_vendor, ngrams
+
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+NOUNS = ["Supplies", "Services", "Consulting", "Logistics", "Medical", "Construction", "Foods", "Systems",
+         "Equipment", "Software", "Printing", "Energy", "Labs", "Partners", "Holdings", "Transport"]
+SUFFIXES = ["Inc", "LLC", "Ltd", "Co", "Corp", "Group", ""]
+HOMOGLYPHS = {"o": "0", "l": "1", "i": "1", "e": "3", "s": "5", "a": "4"}
+
+
+def make_name(rng: random.Random) -> str:
+    brand = "".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(3, 5))).title()
+    return " ".join(p for p in (brand, rng.choice(NOUNS), rng.choice(SUFFIXES)) if p)
+
+
+def typo(name: str, rng: random.Random) -> str:
+    chars = list(name)
+    i = rng.randrange(1, len(chars) - 1)
+    kind = rng.choice(["delete", "substitute", "transpose", "homoglyph"])
+    if kind == "delete":
+        del chars[i]
+    elif kind == "substitute":
+        chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    elif kind == "transpose":
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    else:
+        letters = [j for j, c in enumerate(chars) if c.lower() in HOMOGLYPHS]
+        if letters:
+            j = rng.choice(letters)
+            chars[j] = HOMOGLYPHS[chars[j].lower()]
+    return "".join(chars)
+
+
+def reformat(name: str, rng: random.Random) -> str:
+    variant = rng.choice([name.upper(), name.lower(), name + ".", name.replace(" ", ", ", 1), name + " Inc."])
+    return variant
+
+
+def time_queries(index: VendorIndex, queries):
+    latencies, results = [], []
+    for raw in queries:
+        start = time.perf_counter()
+        results.append(index.query(normalize_vendor(raw)))
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000, results
+
+
+class ExhaustiveScan:
+    """Weighted Jaccard against every indexed name at once, as the ground truth for LSH recall"""
+
+    def __init__(self, index: VendorIndex):
+        self.index = index
+        self.vocabulary = {g: i for i, g in enumerate(index.gram_counts)}
+        n = len(index.names) + 1
+        self.weights = np.array([np.log(n / (c + 1)) + 1.0 for c in index.gram_counts.values()])
+        rows, cols = [], []
+        for row, name in enumerate(index.names):
+            grams = {self.vocabulary[g] for g in ngrams(name)}
+            rows.extend([row] * len(grams))
+            cols.extend(grams)
+        self.matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(index.names), len(self.weights)))
+        self.row_weight = self.matrix @ self.weights
+
+    def best(self, normalized: str):
+        grams = set(ngrams(normalized))
+        known = [self.vocabulary[g] for g in grams if g in self.vocabulary]
+        unknown_weight = sum(np.log(len(self.index.names) + 1) + 1.0 for g in grams if g not in self.vocabulary)
+        query = np.zeros(len(self.weights))
+        query[known] = self.weights[known]
+        intersection = self.matrix @ query
+        union = self.row_weight + query.sum() + unknown_weight - intersection
+        scores = intersection / union
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vendors", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--recall-queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    names = list(dict.fromkeys(make_name(rng) for _ in range(int(args.vendors * 1.05))))[:args.vendors]
+    normalized = [normalize_vendor(n) for n in names]
+
+    index = VendorIndex()
+    start = time.perf_counter()
+    index.add(normalized)
+    index._merge_pending()
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    blob = index.to_bytes()
+    restored = VendorIndex.from_bytes(blob)
+    persist = time.perf_counter() - start
+    distinct = len(index)
+    print(f"indexed {distinct:,} distinct normalized names from {len(names):,} vendors in {build:.1f}s "
+          f"({distinct / build:,.0f}/s); ~{index.memory_bytes() / 1024 ** 2:.0f} MB, "
+          f"{len(blob) / 1024 ** 2:.0f} MB on disk, save+load {persist:.1f}s")
+
+    sample = rng.sample(range(len(names)), args.queries)
+    known = [reformat(names[i], rng) for i in sample]
+    typos = [typo(names[i], rng) for i in sample]
+    unknown = [make_name(random.Random(args.seed + 1000 + i)) for i in range(args.queries)]
+    unknown = [n for n in unknown if normalize_vendor(n) not in index.ids]
+
+    # Incremental additions land in the pending buffer first
+    extra = [normalize_vendor(make_name(rng)) for _ in range(1000)]
+    start = time.perf_counter()
+    for name in extra:
+        restored.add([name])
+    add_ms = (time.perf_counter() - start) / len(extra) * 1000
+
+    scan = ExhaustiveScan(restored)
+    for label, queries, expected in (("reformatted known", known, sample), ("one typo", typos, sample),
+                                     ("new vendor", unknown, None)):
+        latencies, results = time_queries(restored, queries)
+        line = (f"{label:<18} n={len(queries):,} p50={np.percentile(latencies, 50):.2f} ms "
+                f"p99={np.percentile(latencies, 99):.2f} ms")
+        if expected is not None:
+            correct = sum(1 for r, i in zip(results, expected) if r and r[0] == index.ids[normalized[i]])
+            line += f"  resolved to the right vendor {correct / len(queries):.1%}"
+        else:
+            flagged = sum(1 for r in results if r and r[1] >= args.threshold)
+            line += f"  look-alike at >= {args.threshold}: {flagged / max(len(queries), 1):.1%}"
+        print(line)
+
+        checked = queries[:args.recall_queries]
+        start = time.perf_counter()
+        truth = [scan.best(normalize_vendor(q)) for q in checked]
+        scan_ms = (time.perf_counter() - start) / max(len(checked), 1) * 1000
+        # LSH found the best match if its similarity equals the exhaustive best (ties count)
+        found = sum(1 for r, t in zip(results, truth) if (r[1] if r else 0.0) >= t[1] - 1e-9)
+        above = [(r, t) for r, t in zip(results, truth) if t[1] >= args.threshold]
+        found_above = sum(1 for r, t in above if (r[1] if r else 0.0) >= t[1] - 1e-9)
+        print(f"{'':<18} recall vs exhaustive scan {found / max(len(checked), 1):.1%} "
+              f"({found_above}/{len(above)} of best matches >= {args.threshold}); "
+              f"exhaustive scan {scan_ms:.1f} ms/query")
+    print(f"incremental add: {add_ms:.2f} ms per name")
+
+
+if __name__ == "__main__":
+    main()
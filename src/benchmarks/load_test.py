@@ -0,0 +1,441 @@
+"""End-to-end load-testing harness for the FastAPI service.
+
+Starts ``main:app`` under uvicorn on localhost (or targets an already running
+server with ``--url``), drives it with an asyncio HTTP client and reports
+throughput, latency percentiles and error rates per endpoint together with the
+server's CPU and RSS over the run. Everything runs offline on one box.
+
+Examples (run from ``src/``)::
+
+    # closed loop: 16 concurrent clients for 30s, 3:1 detect/text-query mix
+    python -m benchmarks.load_test --duration 30 --concurrency 16 \\
+        --mix detect=3,text-query=1 --batch-sizes 10=5,100=3,1000=1
+
+    # every detect body distinct, so nothing is answered from the result cache
+    python -m benchmarks.load_test --distinct-bodies 0
+
+    # open loop: Poisson arrivals at 40 req/s, fail the run if p99 > 500ms
+    python -m benchmarks.load_test --rate 40 --duration 60 \\
+        --max-p99-ms 500 --max-error-rate 0.01 --report load_report.json
+
+The exit code is 1 when any ``--max-*`` gate is breached, so the harness can
+be used to gate releases.
+
+Detect bodies are drawn from ``--distinct-bodies`` pre-built batches per
+size, so some requests repeat and are answered from the server's result
+cache; the report gives the share served that way (``X-Cache`` HIT or
+COALESCED) next to the latencies. ``--distinct-bodies 0`` generates a fresh
+batch for every request to measure uncached scoring.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+import httpx
+import numpy as np
+import psutil
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {
+    "detect": "/api/anomaly/detect",
+    "text-query": "/api/voice/text-query",
+}
+
+DEFAULT_QUERIES = [
+    "How much did we spend on education last year?",
+    "Show me the budget allocation for healthcare",
+    "What are the top 5 vendors by spending?",
+    "Are there any unusual transactions this month?",
+    "Compare education and healthcare spending",
+    "Show me transactions above $50,000",
+    "Which department has the highest budget?",
+    "How is our money being spent?",
+]
+
+
+def parse_weights(spec: str, cast=str) -> List[Tuple[Any, float]]:
+    """Parse ``a=3,b=1`` (or ``a,b`` for equal weights) into (key, weight) pairs"""
+    pairs = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, _, weight = item.partition("=")
+        pairs.append((cast(key), float(weight) if weight else 1.0))
+    if not pairs:
+        raise ValueError(f"Empty weight specification: {spec!r}")
+    return pairs
+
+
+def generate_transactions(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Synthetic ledger rows shaped like ``data/sample_budgets.json``"""
+    vendors = [f"Vendor {i:03d} Inc" for i in range(200)]
+    rows = []
+    for _ in range(n):
+        amount = round(rng.lognormvariate(7, 1.2), 2)
+        if rng.random() < 0.01:
+            amount *= 50
+        rows.append({
+            "amount": amount,
+            "department_id": rng.randint(1, 5),
+            "vendor_name": rng.choice(vendors),
+            "transaction_date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "description": "Load test transaction",
+        })
+    return rows
+
+
+class RequestMix:
+    """Request bodies drawn according to the configured mix
+
+    ``distinct_bodies`` batches are built per size up front; with 0 every
+    detect request gets a newly generated batch instead.
+    """
+
+    def __init__(self, endpoint_weights, batch_weights, queries, seed: int = 42, distinct_bodies: int = 32):
+        self.rng = random.Random(seed)
+        self.endpoints = [e for e, _ in endpoint_weights]
+        self.endpoint_weights = [w for _, w in endpoint_weights]
+        self.batch_sizes = [b for b, _ in batch_weights]
+        self.batch_weights = [w for _, w in batch_weights]
+        for endpoint in self.endpoints:
+            if endpoint not in ENDPOINTS:
+                raise ValueError(f"Unknown endpoint {endpoint!r}, expected one of {list(ENDPOINTS)}")
+
+        # Serialise once up front so the client does not compete with the server for CPU
+        self.distinct_bodies = distinct_bodies
+        self.detect_bodies = {
+            size: [self._detect_body(size) for _ in range(distinct_bodies)]
+            for size in self.batch_sizes
+        }
+        self.query_bodies = [json.dumps({"text": q}).encode() for q in queries]
+
+    def next(self) -> Tuple[str, bytes]:
+        endpoint = self.rng.choices(self.endpoints, self.endpoint_weights)[0]
+        if endpoint == "detect":
+            size = self.rng.choices(self.batch_sizes, self.batch_weights)[0]
+            if not self.distinct_bodies:
+                return endpoint, self._detect_body(size)
+            return endpoint, self.rng.choice(self.detect_bodies[size])
+        return endpoint, self.rng.choice(self.query_bodies)
+
+    def _detect_body(self, size: int) -> bytes:
+        return json.dumps({"transactions": generate_transactions(size, self.rng)}).encode()
+
+
+class Recorder:
+    """Collects per-endpoint latencies and error counts"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {e: [] for e in ENDPOINTS}
+        self.errors: Dict[str, Dict[str, int]] = {e: {} for e in ENDPOINTS}
+        self.cache: Dict[str, Dict[str, int]] = {e: {} for e in ENDPOINTS}
+        self.dropped = 0
+
+    def record(self, endpoint: str, latency: float, error: Optional[str], cache_status: Optional[str] = None):
+        self.latencies[endpoint].append(latency)
+        if error is not None:
+            self.errors[endpoint][error] = self.errors[endpoint].get(error, 0) + 1
+        if cache_status is not None:
+            self.cache[endpoint][cache_status] = self.cache[endpoint].get(cache_status, 0) + 1
+
+
+class ResourceSampler:
+    """Samples CPU and RSS of the server process (and its children)"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.5):
+        self.process = psutil.Process(pid) if pid else None
+        self.interval = interval
+        self.cpu: List[float] = []
+        self.rss_mb: List[float] = []
+
+    def _processes(self) -> List[psutil.Process]:
+        try:
+            return [self.process] + self.process.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    async def run(self, stop: asyncio.Event):
+        if self.process is None:
+            return
+        for proc in self._processes():
+            proc.cpu_percent(None)
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            cpu, rss = 0.0, 0
+            for proc in self._processes():
+                try:
+                    cpu += proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                except psutil.Error:
+                    continue
+            self.cpu.append(cpu)
+            self.rss_mb.append(rss / (1024 * 1024))
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.cpu:
+            return {}
+        return {
+            "cpu_percent_mean": round(float(np.mean(self.cpu)), 1),
+            "cpu_percent_max": round(float(np.max(self.cpu)), 1),
+            "rss_mb_mean": round(float(np.mean(self.rss_mb)), 1),
+            "rss_mb_max": round(float(np.max(self.rss_mb)), 1),
+            "samples": len(self.cpu),
+        }
+
+
+async def send(client: httpx.AsyncClient, mix: RequestMix, recorder: Recorder, scheduled: float):
+    """Issue one request; latency is measured from the scheduled start time"""
+    endpoint, body = mix.next()
+    error = cache_status = None
+    try:
+        response = await client.post(
+            ENDPOINTS[endpoint], content=body, headers={"Content-Type": "application/json"}
+        )
+        await response.aread()
+        if response.status_code >= 400:
+            error = f"HTTP {response.status_code}"
+        cache_status = response.headers.get("x-cache")
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    recorder.record(endpoint, time.perf_counter() - scheduled, error, cache_status)
+
+
+async def closed_loop(client, mix, recorder, concurrency: int, deadline: float):
+    """Fixed number of clients, each sending its next request as soon as the last returns"""
+    async def worker():
+        while time.perf_counter() < deadline:
+            await send(client, mix, recorder, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client, mix, recorder, rate: float, deadline: float, max_in_flight: int):
+    """Poisson arrivals at ``rate`` req/s, independent of how fast the server answers"""
+    rng = random.Random(7)
+    in_flight = set()
+    next_at = time.perf_counter()
+    while next_at < deadline:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            recorder.dropped += 1
+        else:
+            task = asyncio.create_task(send(client, mix, recorder, next_at))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_at += rng.expovariate(rate)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+
+def summarise(recorder: Recorder, elapsed: float) -> Dict[str, Any]:
+    endpoints = {}
+    for endpoint, latencies in recorder.latencies.items():
+        if not latencies:
+            continue
+        arr = np.asarray(latencies) * 1000.0
+        errors = sum(recorder.errors[endpoint].values())
+        p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+        cache = recorder.cache[endpoint]
+        cached = cache.get("HIT", 0) + cache.get("COALESCED", 0)
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(arr.max()), 2),
+            "error_rate": round(errors / len(latencies), 4),
+            "errors": recorder.errors[endpoint],
+            "cache_hit_rate": round(cached / sum(cache.values()), 4) if cache else None,
+            "cache": cache,
+        }
+    return endpoints
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    """Launch ``main:app`` under uvicorn from the ``src`` directory"""
+    cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, cwd=SRC_DIR)
+
+
+async def wait_ready(base_url: str, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout:.0f}s")
+
+
+async def run(args, base_url: str, server_pid: Optional[int]) -> Dict[str, Any]:
+    mix = RequestMix(
+        parse_weights(args.mix),
+        parse_weights(args.batch_sizes, int),
+        args.queries or DEFAULT_QUERIES,
+        seed=args.seed,
+        distinct_bodies=args.distinct_bodies,
+    )
+    recorder = Recorder()
+    sampler = ResourceSampler(server_pid)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        # Warm up model caches and connections before measuring
+        warmup = Recorder()
+        await closed_loop(client, mix, warmup, min(args.concurrency, 4), time.perf_counter() + args.warmup)
+
+        stop = asyncio.Event()
+        sampler_task = asyncio.create_task(sampler.run(stop))
+        start = time.perf_counter()
+        deadline = start + args.duration
+        if args.rate:
+            await open_loop(client, mix, recorder, args.rate, deadline, args.max_in_flight)
+        else:
+            await closed_loop(client, mix, recorder, args.concurrency, deadline)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await sampler_task
+
+    return {
+        "config": {
+            "mode": "open_loop" if args.rate else "closed_loop",
+            "rate_rps": args.rate,
+            "concurrency": None if args.rate else args.concurrency,
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "batch_sizes": args.batch_sizes,
+            "distinct_bodies": args.distinct_bodies,
+            "server_workers": args.workers,
+        },
+        "elapsed_s": round(elapsed, 2),
+        "total_throughput_rps": round(sum(len(v) for v in recorder.latencies.values()) / elapsed, 2),
+        "dropped_arrivals": recorder.dropped,
+        "endpoints": summarise(recorder, elapsed),
+        "server": sampler.summary(),
+    }
+
+
+def check_gates(report: Dict[str, Any], args) -> List[str]:
+    """Return a list of human-readable gate violations"""
+    violations = []
+    for endpoint, stats in report["endpoints"].items():
+        if args.max_p99_ms is not None and stats["p99_ms"] > args.max_p99_ms:
+            violations.append(f"{endpoint}: p99 {stats['p99_ms']}ms > {args.max_p99_ms}ms")
+        if args.max_error_rate is not None and stats["error_rate"] > args.max_error_rate:
+            violations.append(f"{endpoint}: error rate {stats['error_rate']} > {args.max_error_rate}")
+    if args.min_throughput is not None and report["total_throughput_rps"] < args.min_throughput:
+        violations.append(f"throughput {report['total_throughput_rps']} rps < {args.min_throughput} rps")
+    return violations
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\nMode: {report['config']['mode']}  elapsed: {report['elapsed_s']}s  "
+          f"throughput: {report['total_throughput_rps']} req/s  dropped: {report['dropped_arrivals']}")
+    header = (f"{'endpoint':<12}{'reqs':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}"
+              f"{'cached':>9}")
+    print(header)
+    print("-" * len(header))
+    for endpoint, s in report["endpoints"].items():
+        print(f"{endpoint:<12}{s['requests']:>8}{s['throughput_rps']:>9}{s['p50_ms']:>10}"
+              f"{s['p95_ms']:>10}{s['p99_ms']:>10}{s['error_rate']:>9.2%}"
+              f"{'-' if s['cache_hit_rate'] is None else format(s['cache_hit_rate'], '.2%'):>9}")
+    if report["server"]:
+        s = report["server"]
+        print(f"server CPU mean/max: {s['cpu_percent_mean']}% / {s['cpu_percent_max']}%  "
+              f"RSS mean/max: {s['rss_mb_mean']} / {s['rss_mb_max']} MB")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load test the AI/ML service")
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="PID to sample when using --url")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured run length in seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured warm-up in seconds")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop client count")
+    parser.add_argument("--rate", type=float, help="Open-loop arrival rate (req/s); overrides --concurrency")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Open-loop cap before arrivals are dropped")
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--mix", default="detect=1,text-query=1", help="Endpoint weights, e.g. detect=3,text-query=1")
+    parser.add_argument("--batch-sizes", default="10=5,100=3,1000=1", help="Detect batch sizes with weights")
+    parser.add_argument("--distinct-bodies", type=int, default=32,
+                        help="Pre-built detect bodies per batch size; 0 sends a new batch every request")
+    parser.add_argument("--queries-file", help="File with one voice query per line")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--report", help="Write the JSON report to this path")
+    parser.add_argument("--max-p99-ms", type=float, help="Fail if any endpoint's p99 exceeds this")
+    parser.add_argument("--max-error-rate", type=float, help="Fail if any endpoint's error rate exceeds this")
+    parser.add_argument("--min-throughput", type=float, help="Fail if total throughput falls below this")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    args.queries = None
+    if args.queries_file:
+        with open(args.queries_file) as f:
+            args.queries = [line.strip() for line in f if line.strip()]
+
+    server = None
+    if args.url:
+        base_url, server_pid = args.url.rstrip("/"), args.server_pid
+    else:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_server(port, args.workers)
+        server_pid = server.pid
+
+    try:
+        asyncio.run(wait_ready(base_url))
+        report = asyncio.run(run(args, base_url, server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    violations = check_gates(report, args)
+    report["gate_violations"] = violations
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+    for violation in violations:
+        print(f"❌ {violation}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Synthetic labelled ledgers for benchmarks and model evaluation"""
+import numpy as np
+import pandas as pd
+from typing import Tuple, Sequence
+
+ANOMALY_TYPES = ("large_amount", "new_vendor", "duplicate", "off_hours")
+
+
+def make_ledger(
+    rows: int,
+    anomaly_rate: float = 0.01,
+    n_vendors: int = 500,
+    n_departments: int = 5,
+    anomaly_types: Sequence[str] = ANOMALY_TYPES,
+    seed: int = 42,
+    universe_seed: int = 0
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Generate a ledger shaped like ``data/sample_budgets.json`` plus injected anomalies.
+
+    Every vendor serves one department and has its own typical amount;
+    payments fall on weekdays in business hours. Returns the ledger and an
+    array naming the injected anomaly type per row (empty string for normal
+    rows). Ledgers drawn with the same ``universe_seed`` share vendors and
+    their departments and typical amounts, so one can train on another.
+    """
+    universe = np.random.default_rng(universe_seed)
+    vendor_department = universe.integers(1, n_departments + 1, n_vendors)
+    vendor_scale = universe.uniform(5.5, 8.5, n_vendors)
+    rng = np.random.default_rng(seed)
+    # Zipf-like vendor popularity
+    popularity = 1.0 / np.arange(1, n_vendors + 1) ** 0.8
+    vendors = rng.choice(n_vendors, rows, p=popularity / popularity.sum())
+
+    days = rng.integers(0, 365, rows)
+    weekday_days = days - (days % 7) + np.minimum(days % 7, 4)
+    seconds = rng.integers(8 * 3600, 18 * 3600, rows)
+    timestamps = pd.Timestamp("2024-01-01") + pd.to_timedelta(weekday_days, unit="D") + pd.to_timedelta(seconds, unit="s")
+
+    df = pd.DataFrame({
+        "amount": np.round(rng.lognormal(vendor_scale[vendors], 0.35), 2),
+        "department_id": vendor_department[vendors],
+        "vendor_name": np.char.add("Vendor ", vendors.astype(str)).astype(object),
+        "transaction_date": timestamps.strftime("%Y-%m-%d %H:%M:%S"),
+        "description": "Synthetic ledger row"
+    })
+
+    labels = np.full(rows, "", dtype=object)
+    n_anomalies = int(rows * anomaly_rate)
+    if n_anomalies and anomaly_types:
+        injected = rng.choice(rows, n_anomalies, replace=False)
+        kinds = rng.choice(list(anomaly_types), n_anomalies)
+        labels[injected] = kinds
+        for kind in set(kinds):
+            idx = injected[kinds == kind]
+            if kind == "large_amount":
+                df.loc[idx, "amount"] = np.round(df.loc[idx, "amount"] * rng.uniform(20, 100, len(idx)), 2)
+            elif kind == "new_vendor":
+                df.loc[idx, "vendor_name"] = [f"Unregistered Supplier {i}" for i in idx]
+                df.loc[idx, "amount"] = np.round(df.loc[idx, "amount"] * rng.uniform(3, 10, len(idx)), 2)
+            elif kind == "duplicate":
+                sources = rng.choice(rows, len(idx))
+                df.loc[idx, ["amount", "department_id", "vendor_name", "transaction_date"]] = (
+                    df.loc[sources, ["amount", "department_id", "vendor_name", "transaction_date"]].to_numpy()
+                )
+            elif kind == "off_hours":
+                night = pd.to_datetime(df.loc[idx, "transaction_date"]).dt.normalize() + pd.to_timedelta(
+                    rng.integers(0, 5 * 3600, len(idx)), unit="s")
+                weekend = rng.random(len(idx)) < 0.5
+                night = night + pd.to_timedelta(np.where(weekend, 5 - night.dt.dayofweek.clip(upper=5), 0), unit="D")
+                df.loc[idx, "transaction_date"] = night.dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy()
+            else:
+                raise ValueError(f"Unknown anomaly type: {kind}")
+    return df, labels
@@ -0,0 +1,176 @@
+"""Accuracy versus scoring cost of the anomaly forest over a grid of settings, with a Pareto report.
+
+Sweeps ``n_estimators``, ``max_samples``, feature set (``FEATURE_SETS`` in
+``api/anomaly.py``) and contamination on synthetic ledgers with injected
+large amounts, new vendors, duplicates and off-hours payments. Training
+features are built per ``--train-chunk-rows`` chunk as the training
+service does, and test features per ``--batch-rows`` batch as requests
+do. Contamination only moves the threshold, so each forest is fitted and
+scored once and every contamination level is evaluated from the same
+scores. Each configuration reports precision, recall and F1 on the injected
+labels, per-row scoring latency (features plus ``decision_function``) and
+pickled model size.
+
+A configuration is on the Pareto front when no other one has at least its
+F1 with lower latency and a smaller model, and strictly better in one of
+them. The one recommended is the fastest on the front within
+``--max-f1-loss`` of the best F1. ``--export-env`` writes it into a dotenv
+file read by ``config.settings``, and ``--export-model`` fits it and saves
+the model artifact the training service loads at startup. Run from
+``src/``::
+
+    python -m benchmarks.tune_model --export-env ../.env --report /tmp/tuning.json
+"""
+import argparse
+import itertools
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+from api.anomaly import FEATURE_SETS, prepare_features
+from benchmarks.synthetic import make_ledger
+from config.settings import settings
+from services.training_service import save_model_artifact
+
+ENV_KEYS = {
+    "n_estimators": "TRAIN_N_ESTIMATORS",
+    "max_samples": "TRAIN_MAX_SAMPLES",
+    "contamination": "ANOMALY_CONTAMINATION",
+    "feature_set": "ANOMALY_FEATURE_SET"
+}
+
+
+def max_samples_arg(value: str):
+    return value if value == "auto" else int(value)
+
+
+def batched_features(df: pd.DataFrame, columns, batch_rows: int) -> pd.DataFrame:
+    return pd.concat([prepare_features(df.iloc[start:start + batch_rows], columns=columns)
+                      for start in range(0, len(df), batch_rows)])
+
+
+def pareto_front(results):
+    """Configurations no other one matches or beats on F1, latency and size while beating on one"""
+    front = []
+    for r in results:
+        dominated = any(
+            o["f1"] >= r["f1"] and o["us_per_row"] <= r["us_per_row"] and o["model_kb"] <= r["model_kb"]
+            and (o["f1"] > r["f1"] or o["us_per_row"] < r["us_per_row"] or o["model_kb"] < r["model_kb"])
+            for o in results)
+        if not dominated:
+            front.append(r)
+    return front
+
+
+def export_env(path: str, config: dict):
+    """Set the chosen values in a dotenv file, keeping its other lines"""
+    lines = open(path).read().splitlines() if os.path.exists(path) else []
+    values = {ENV_KEYS[key]: str(config[key]) for key in ENV_KEYS}
+    kept = [line for line in lines if line.split("=", 1)[0].strip() not in values]
+    with open(path, "w") as f:
+        f.write("\n".join(kept + [f"{key}={value}" for key, value in values.items()]) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--train-rows", type=int, default=200_000)
+    parser.add_argument("--test-rows", type=int, default=100_000)
+    parser.add_argument("--anomaly-rate", type=float, default=0.01)
+    parser.add_argument("--train-chunk-rows", type=int, default=settings.TRAIN_CHUNK_ROWS)
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    parser.add_argument("--n-estimators", type=int, nargs="+", default=[10, 25, 50, 100, 200])
+    parser.add_argument("--max-samples", type=max_samples_arg, nargs="+", default=[64, 128, "auto", 512])
+    parser.add_argument("--feature-sets", nargs="+", choices=sorted(FEATURE_SETS), default=sorted(FEATURE_SETS))
+    parser.add_argument("--contamination", type=float, nargs="+", default=[0.005, 0.01, 0.02, 0.05, 0.1])
+    parser.add_argument("--max-f1-loss", type=float, default=0.01)
+    parser.add_argument("--report", help="write every result and the front as JSON")
+    parser.add_argument("--export-env", help="dotenv file to write the chosen settings into")
+    parser.add_argument("--export-model", help="fit the chosen configuration and save it as the model artifact")
+    args = parser.parse_args(argv)
+
+    # Training data carries the same anomaly rate as the stored ledger would; its labels are unused
+    train, _ = make_ledger(args.train_rows, anomaly_rate=args.anomaly_rate, seed=11)
+    test, labels = make_ledger(args.test_rows, anomaly_rate=args.anomaly_rate, seed=12)
+    injected = labels != ""
+    kinds = sorted(set(labels[injected]))
+
+    results = []
+    for feature_set in args.feature_sets:
+        columns = FEATURE_SETS[feature_set]
+        train_features = batched_features(train, columns, args.train_chunk_rows)
+        start = time.perf_counter()
+        test_features = batched_features(test, columns, args.batch_rows)
+        feature_us = (time.perf_counter() - start) / len(test) * 1e6
+
+        for n_estimators, max_samples in itertools.product(args.n_estimators, args.max_samples):
+            model = IsolationForest(n_estimators=n_estimators, max_samples=max_samples,
+                                    n_jobs=settings.TRAIN_N_JOBS, random_state=settings.ANOMALY_RANDOM_STATE)
+            model.fit(train_features)
+            train_scores = model.score_samples(train_features)
+            start = time.perf_counter()
+            test_scores = np.concatenate([model.score_samples(test_features.iloc[i:i + args.batch_rows])
+                                          for i in range(0, len(test_features), args.batch_rows)])
+            scoring_us = (time.perf_counter() - start) / len(test) * 1e6
+            model_kb = len(pickle.dumps(model)) / 1024
+
+            for contamination in args.contamination:
+                # The threshold IsolationForest.fit would set for this contamination
+                flagged = test_scores < np.percentile(train_scores, 100 * contamination)
+                true_positives = int((flagged & injected).sum())
+                precision = true_positives / max(int(flagged.sum()), 1)
+                recall = true_positives / max(int(injected.sum()), 1)
+                results.append({
+                    "n_estimators": n_estimators,
+                    "max_samples": max_samples,
+                    "feature_set": feature_set,
+                    "contamination": contamination,
+                    "precision": precision,
+                    "recall": recall,
+                    "f1": 2 * precision * recall / (precision + recall) if true_positives else 0.0,
+                    "recall_by_type": {kind: float(flagged[labels == kind].mean()) for kind in kinds},
+                    "us_per_row": feature_us + scoring_us,
+                    "model_kb": model_kb
+                })
+
+    front = sorted(pareto_front(results), key=lambda r: -r["f1"])
+    best_f1 = max(r["f1"] for r in results)
+    chosen = min((r for r in front if r["f1"] >= best_f1 - args.max_f1_loss), key=lambda r: r["us_per_row"])
+    current = next((r for r in results if r["n_estimators"] == settings.TRAIN_N_ESTIMATORS
+                    and r["max_samples"] == settings.TRAIN_MAX_SAMPLES
+                    and r["feature_set"] == settings.ANOMALY_FEATURE_SET
+                    and r["contamination"] == settings.ANOMALY_CONTAMINATION), None)
+
+    print(f"{len(results)} configurations; train {args.train_rows:,} rows, test {args.test_rows:,} rows "
+          f"({int(injected.sum()):,} injected anomalies), scored in batches of {args.batch_rows:,}")
+    header = f"{'trees':>6}{'samples':>9}  {'features':<14}{'contam':>7}{'prec':>7}{'recall':>8}{'F1':>7}{'us/row':>8}{'KB':>8}"
+    print(f"Pareto front ({len(front)}):")
+    print(header + "   recall by type (" + ", ".join(kinds) + ")")
+    for r in front + ([current] if current and current not in front else []):
+        mark = " <- chosen" if r is chosen else " <- current settings" if r is current else ""
+        by_type = " ".join(f"{r['recall_by_type'][k]:.0%}" for k in kinds)
+        print(f"{r['n_estimators']:>6}{str(r['max_samples']):>9}  {r['feature_set']:<14}{r['contamination']:>7}"
+              f"{r['precision']:>7.2f}{r['recall']:>8.2f}{r['f1']:>7.3f}{r['us_per_row']:>8.1f}{r['model_kb']:>8.0f}"
+              f"   {by_type}{mark}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"results": results, "front": front, "chosen": chosen, "current": current}, f, indent=2)
+    if args.export_env:
+        export_env(args.export_env, chosen)
+        print(f"wrote {', '.join(f'{ENV_KEYS[k]}={chosen[k]}' for k in ENV_KEYS)} to {args.export_env}")
+    if args.export_model:
+        model = IsolationForest(n_estimators=chosen["n_estimators"], max_samples=chosen["max_samples"],
+                                contamination=chosen["contamination"], n_jobs=settings.TRAIN_N_JOBS,
+                                random_state=settings.ANOMALY_RANDOM_STATE)
+        model.fit(batched_features(train, FEATURE_SETS[chosen["feature_set"]], args.train_chunk_rows))
+        if save_model_artifact(args.export_model, model):
+            print(f"saved the chosen model to {args.export_model}")
+
+
+if __name__ == "__main__":
+    main()
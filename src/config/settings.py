@@ -1,9 +1,18 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _max_samples(value: str):
+    """IsolationForest ``max_samples``: "auto", a row count, or a fraction of the training rows"""
+    if value == "auto":
+        return value
+    return float(value) if "." in value else int(value)
+
 class Settings:
     """Application settings with environment variables"""
     
@@ -16,6 +25,125 @@ class Settings:
     # ML Model Settings
     ANOMALY_CONTAMINATION = float(os.getenv("ANOMALY_CONTAMINATION", 0.1))
     ANOMALY_RANDOM_STATE = int(os.getenv("ANOMALY_RANDOM_STATE", 42))
+    DETECTOR_ENGINE = os.getenv("DETECTOR_ENGINE", "isolation_forest")
+    CASCADE_Z_THRESHOLD = float(os.getenv("CASCADE_Z_THRESHOLD", 3.5))
+    CASCADE_MIN_SUPPORT = int(os.getenv("CASCADE_MIN_SUPPORT", 20))
+    CASCADE_FIT_ROWS = int(os.getenv("CASCADE_FIT_ROWS", 200000))
+    
+    # Analysis Job Settings
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+    JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 100))
+    JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", 5000))
+    JOB_WORKER_NICE = int(os.getenv("JOB_WORKER_NICE", 10))
+    JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", 3600))
+    JOB_RESULTS_DIR = os.getenv("JOB_RESULTS_DIR", os.path.join(tempfile.gettempdir(), "bnb_analysis_jobs"))
+    
+    # Transaction Store Settings
+    TRANSACTION_DB_PATH = os.getenv("TRANSACTION_DB_PATH", os.path.join(PROJECT_ROOT, "data", "transactions.db"))
+    STORE_SCORED_TRANSACTIONS = os.getenv("STORE_SCORED_TRANSACTIONS", "True").lower() == "true"
+    
+    # Ledger Ingestion Settings (watcher is off unless INGEST_WATCH_DIR is set)
+    INGEST_WATCH_DIR = os.getenv("INGEST_WATCH_DIR", "")
+    INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", 5.0))
+    INGEST_SETTLE_SECONDS = float(os.getenv("INGEST_SETTLE_SECONDS", 2.0))
+    INGEST_CHUNK_BYTES = int(os.getenv("INGEST_CHUNK_BYTES", 4 * 1024 * 1024))
+    INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", 5000))
+    
+    # Result Cache Settings
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "True").lower() == "true"
+    RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", 64))
+    
+    # Detection Response Settings (pages of anomalies-only, top-k or paginated responses)
+    DETECT_PAGE_ROWS = int(os.getenv("DETECT_PAGE_ROWS", 1000))
+    DETECT_MAX_PAGE_ROWS = int(os.getenv("DETECT_MAX_PAGE_ROWS", 10000))
+    
+    # Request Timing and Profiling Settings
+    SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "True").lower() == "true"
+    TIMED_PATH_PREFIXES = os.getenv("TIMED_PATH_PREFIXES", "/api/anomaly,/api/voice").split(",")
+    PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", 60))
+    
+    # Admission Control Settings (heavy POST endpoints)
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "True").lower() == "true"
+    ADMISSION_PATHS = os.getenv("ADMISSION_PATHS", "/api/anomaly/detect,/api/anomaly/forensics,/api/jobs,/api/voice/text-queries").split(",")
+    ADMISSION_MEMORY_BUDGET_MB = int(os.getenv("ADMISSION_MEMORY_BUDGET_MB", 1024))
+    ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", 4))
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 32))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10.0))
+    ADMISSION_MAX_BODY_MB = int(os.getenv("ADMISSION_MAX_BODY_MB", 100))
+    ADMISSION_TRACE_SAMPLE_RATE = float(os.getenv("ADMISSION_TRACE_SAMPLE_RATE", 0.05))
+    
+    # Alert Streaming Settings
+    ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", 100))
+    
+    # Frequency Sketch Settings (FREQUENCY_SOURCE: "batch" counts within each request, "sketch" uses the whole stream)
+    FREQUENCY_SOURCE = os.getenv("FREQUENCY_SOURCE", "batch")
+    SKETCH_STATE_PATH = os.getenv("SKETCH_STATE_PATH", os.path.join(PROJECT_ROOT, "data", "frequency_sketches.npz"))
+    SKETCH_SAVE_SECONDS = float(os.getenv("SKETCH_SAVE_SECONDS", 60))
+    SKETCH_WIDTH = int(os.getenv("SKETCH_WIDTH", 1 << 16))
+    SKETCH_DEPTH = int(os.getenv("SKETCH_DEPTH", 4))
+    SKETCH_HLL_PRECISION = int(os.getenv("SKETCH_HLL_PRECISION", 14))
+    SKETCH_TOP_K = int(os.getenv("SKETCH_TOP_K", 1000))
+    
+    # Budget Variance Settings (seasonal robust z-scores on bucketed spend)
+    VARIANCE_Z_THRESHOLD = float(os.getenv("VARIANCE_Z_THRESHOLD", 3.5))
+    VARIANCE_MIN_AMOUNT = float(os.getenv("VARIANCE_MIN_AMOUNT", 1000))
+    VARIANCE_MAX_VENDORS = int(os.getenv("VARIANCE_MAX_VENDORS", 10000))
+    
+    # Vendor Resolution Settings (MinHash/LSH index of known vendor spellings)
+    VENDOR_RESOLUTION_ENABLED = os.getenv("VENDOR_RESOLUTION_ENABLED", "True").lower() == "true"
+    VENDOR_MATCH_THRESHOLD = float(os.getenv("VENDOR_MATCH_THRESHOLD", 0.5))
+    VENDOR_LOOKALIKE_FLAG = os.getenv("VENDOR_LOOKALIKE_FLAG", "True").lower() == "true"
+    VENDOR_INDEX_PATH = os.getenv("VENDOR_INDEX_PATH", os.path.join(PROJECT_ROOT, "data", "vendor_index.npz"))
+    VENDOR_INDEX_SAVE_SECONDS = float(os.getenv("VENDOR_INDEX_SAVE_SECONDS", 60))
+    
+    # Voice Intent Settings (hashed n-gram classifier; rules when disabled)
+    INTENT_CLASSIFIER_ENABLED = os.getenv("INTENT_CLASSIFIER_ENABLED", "True").lower() == "true"
+    INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", os.path.join(PROJECT_ROOT, "data", "intent_model.npz"))
+    INTENT_SAMPLES_PATH = os.getenv("INTENT_SAMPLES_PATH", os.path.join(PROJECT_ROOT, "data", "intent_samples.json"))
+    
+    # Model Training Settings (streamed ledger, reservoir-sampled training set, forest grown with warm_start)
+    TRAIN_SAMPLE_SIZE = int(os.getenv("TRAIN_SAMPLE_SIZE", 262_144))
+    TRAIN_CHUNK_ROWS = int(os.getenv("TRAIN_CHUNK_ROWS", 200_000))
+    TRAIN_N_ESTIMATORS = int(os.getenv("TRAIN_N_ESTIMATORS", 100))
+    TRAIN_MAX_SAMPLES = _max_samples(os.getenv("TRAIN_MAX_SAMPLES", "auto"))
+    ANOMALY_FEATURE_SET = os.getenv("ANOMALY_FEATURE_SET", "base")
+    TRAIN_N_JOBS = int(os.getenv("TRAIN_N_JOBS", -1))
+    TRAIN_GROW_ESTIMATORS = int(os.getenv("TRAIN_GROW_ESTIMATORS", 20))
+    TRAIN_MAX_ESTIMATORS = int(os.getenv("TRAIN_MAX_ESTIMATORS", 300))
+    TRAIN_MODEL_PATH = os.getenv("TRAIN_MODEL_PATH", os.path.join(PROJECT_ROOT, "data", "anomaly_model.joblib"))
+    # Training features are built over request-sized batches (recent scoring sizes, else log-uniform MIN..MAX rows); a model
+    # flagging more than TRAIN_MAX_FLAG_RATE_RATIO x contamination of the last TRAIN_CHECK_ROWS rows is rejected
+    TRAIN_FEATURE_BATCH_MIN_ROWS = int(os.getenv("TRAIN_FEATURE_BATCH_MIN_ROWS", 10))
+    TRAIN_FEATURE_BATCH_MAX_ROWS = int(os.getenv("TRAIN_FEATURE_BATCH_MAX_ROWS", 2000))
+    TRAIN_CHECK_ROWS = int(os.getenv("TRAIN_CHECK_ROWS", 20_000))
+    TRAIN_MAX_FLAG_RATE_RATIO = float(os.getenv("TRAIN_MAX_FLAG_RATE_RATIO", 2.0))
+    
+    # Token for POST /api/admin/train and GET /api/admin/audit (X-Admin-Token header); unset keeps them disabled
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    
+    # Audit Log Settings (every scoring decision, group-committed by a background writer; AUDIT_FSYNC: group, interval or never)
+    AUDIT_LOG_ENABLED = os.getenv("AUDIT_LOG_ENABLED", "True").lower() == "true"
+    AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", os.path.join(PROJECT_ROOT, "data", "audit"))
+    AUDIT_GROUP_ROWS = int(os.getenv("AUDIT_GROUP_ROWS", 50_000))
+    AUDIT_GROUP_MS = float(os.getenv("AUDIT_GROUP_MS", 100))
+    AUDIT_FSYNC = os.getenv("AUDIT_FSYNC", "group")
+    AUDIT_FSYNC_SECONDS = float(os.getenv("AUDIT_FSYNC_SECONDS", 1.0))
+    AUDIT_SEGMENT_MB = float(os.getenv("AUDIT_SEGMENT_MB", 64))
+    AUDIT_MAX_BUFFER_ROWS = int(os.getenv("AUDIT_MAX_BUFFER_ROWS", 1_000_000))
+    
+    # Forensic Check Settings (Benford first digits, round amounts and payments split under approval thresholds)
+    FORENSIC_CHECKS_ENABLED = os.getenv("FORENSIC_CHECKS_ENABLED", "True").lower() == "true"
+    FORENSIC_APPROVAL_THRESHOLDS = [float(t) for t in os.getenv("FORENSIC_APPROVAL_THRESHOLDS", "10000").split(",")]
+    FORENSIC_SPLIT_WINDOW_DAYS = int(os.getenv("FORENSIC_SPLIT_WINDOW_DAYS", 3))
+    FORENSIC_SPLIT_MIN_FRACTION = float(os.getenv("FORENSIC_SPLIT_MIN_FRACTION", 0.25))
+    FORENSIC_FLAG_SPLITS = os.getenv("FORENSIC_FLAG_SPLITS", "True").lower() == "true"
+    FORENSIC_THRESHOLD_MARGIN = float(os.getenv("FORENSIC_THRESHOLD_MARGIN", 0.1))
+    FORENSIC_ROUND_UNIT = float(os.getenv("FORENSIC_ROUND_UNIT", 100))
+    FORENSIC_MIN_COUNT = int(os.getenv("FORENSIC_MIN_COUNT", 50))
+    FORENSIC_ALPHA = float(os.getenv("FORENSIC_ALPHA", 0.01))
+    FORENSIC_MAX_SPLITS = int(os.getenv("FORENSIC_MAX_SPLITS", 100))
+    FORENSIC_REFRESH_SECONDS = float(os.getenv("FORENSIC_REFRESH_SECONDS", 300))
+    FORENSIC_REFRESH_CHUNK_ROWS = int(os.getenv("FORENSIC_REFRESH_CHUNK_ROWS", 200_000))
     
     # Environment
     ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
@@ -5,6 +5,7 @@ import numpy as np
 from sklearn.ensemble import IsolationForest
 import pickle
 import os
+from config.settings import settings
 
 # Global ML models storage
 ml_models = {}
@@ -30,9 +31,9 @@ print("✅ Anomaly detection model loaded")
 
 # Create FastAPI app
 app = FastAPI(
-    title="Financial Transparency AI/ML Services",
+    title=settings.API_TITLE,
     description="AI-powered anomaly detection and voice processing",
-    version="1.0.0"
+    version=settings.API_VERSION
 )
 
 # Add CORS middleware
@@ -52,10 +53,70 @@ def get_ml_models():
 from api.anomaly import router as anomaly_router
 from api.voice import router as voice_router
 from api.health import router as health_router
+from api.jobs import router as jobs_router
+from api.alerts import router as alerts_router
+from api.admin import router as admin_router
+from utils.timing import ServerTimingMiddleware
+from services.admission import AdmissionMiddleware
 
 app.include_router(anomaly_router, prefix="/api/anomaly", tags=["Anomaly Detection"])
 app.include_router(voice_router, prefix="/api/voice", tags=["Voice Processing"])
 app.include_router(health_router, prefix="/api/health", tags=["Health"])
+app.include_router(jobs_router, prefix="/api/jobs", tags=["Analysis Jobs"])
+app.include_router(alerts_router, prefix="/api/alerts", tags=["Alerts"])
+app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
+
+# Stage timing for the anomaly and voice paths (Server-Timing header + /api/admin/timings)
+app.add_middleware(ServerTimingMiddleware)
+
+# Memory-budgeted admission for heavy endpoints; added last so it runs before any body is read
+app.add_middleware(AdmissionMiddleware)
+
+@app.on_event("startup")
+async def start_services():
+    from services.ingestion_service import ingestion_service
+    from services.frequency_service import frequency_service
+    from services.vendor_service import vendor_resolver
+    from services.voice_service import voice_service
+    from services.training_service import training_service
+    from services.audit_log import audit_log
+    from services.forensic_service import forensic_service
+    from services.detector_service import detector_service
+    if settings.AUDIT_LOG_ENABLED:
+        audit_log.start()
+    training_service.load()
+    try:
+        detector_service.fit()
+    except Exception as e:
+        print(f"Error fitting detector prefilter: {e}")
+    frequency_service.load()
+    vendor_resolver.load()
+    voice_service.load_intent_model()
+    ingestion_service.start()
+    if settings.FORENSIC_CHECKS_ENABLED:
+        forensic_service.start()
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    from services.job_service import job_service
+    from services.ingestion_service import ingestion_service
+    from services.frequency_service import frequency_service
+    from services.vendor_service import vendor_resolver
+    from services.audit_log import audit_log
+    from services.forensic_service import forensic_service
+    ingestion_service.stop()
+    forensic_service.stop()
+    job_service.shutdown()
+    # After everything that scores, so their last batches are in the log
+    audit_log.stop()
+    try:
+        frequency_service.save()
+    except Exception as e:
+        print(f"Error saving frequency sketches: {e}")
+    try:
+        vendor_resolver.save()
+    except Exception as e:
+        print(f"Error saving vendor index: {e}")
 
 @app.get("/")
 async def root():
@@ -68,16 +129,5 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
-
-# Add these imports at the top (keep your existing imports)
-from config.settings import settings  # Add this line
-
-# Replace your app creation with this:
-app = FastAPI(
-    title=settings.API_TITLE,  # Uses config
-    description="AI-powered anomaly detection and voice processing",
-    version=settings.API_VERSION  # Uses config
-)
+    uvicorn.run(app, host=settings.API_HOST, port=settings.API_PORT)
 
-# Keep everything else the same!
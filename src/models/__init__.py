@@ -1,3 +1,13 @@
 from .anomaly_detector import AdvancedAnomalyDetector
+from .detector_engine import (
+    DetectorEngine, IsolationForestEngine, CascadeDetectorEngine, RobustStatsPrefilter, create_engine
+)
 
-__all__ = ["AdvancedAnomalyDetector"]
+__all__ = [
+    "AdvancedAnomalyDetector",
+    "DetectorEngine",
+    "IsolationForestEngine",
+    "CascadeDetectorEngine",
+    "RobustStatsPrefilter",
+    "create_engine"
+]
@@ -2,9 +2,16 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, List, Iterable, Optional
 import joblib
 import os
+from config.settings import settings
+from utils.sketches import ReservoirSample
+from utils.feature_matrix import feature_builder, standardize_, percentile_ranks
+from .attribution import get_attributor
+
+ENGINEERED_FEATURES = ['amount', 'log_amount', 'amount_zscore', 'department_frequency', 'vendor_frequency',
+                       'day_of_week', 'hour_of_day', 'amount_percentile']
 
 class AdvancedAnomalyDetector:
     """Advanced anomaly detection with preprocessing and feature engineering"""
@@ -17,74 +24,175 @@ class AdvancedAnomalyDetector:
         
     def engineer_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Advanced feature engineering for financial transactions"""
-        features = pd.DataFrame()
+        matrix = self.feature_matrix(df, ENGINEERED_FEATURES, reuse=False)
+        return pd.DataFrame(matrix, columns=ENGINEERED_FEATURES, index=df.index, copy=False)
+    
+    def feature_matrix(self, df: pd.DataFrame, columns: List[str], reuse: bool = True,
+                       scaler: Optional[StandardScaler] = None) -> np.ndarray:
+        """Engineered features written straight into one float32 matrix, in ``columns`` order
+        
+        Columns this detector does not know are left at 0. With ``reuse``
+        the matrix is the calling thread's ``feature_builder`` buffer. A
+        fitted ``scaler`` is applied in place as the matrix is built.
+        """
+        from services.frequency_service import frequency_feature
+        from services.vendor_service import canonical_vendors
+        
+        matrix = feature_builder.allocate(len(df), len(columns), reuse)
+        matrix.fill(0)
+        column = {name: matrix[:, j] for j, name in enumerate(columns)}
+        amounts = df['amount'].to_numpy(dtype=np.float64)
+        centre = None if scaler is None else scaler.mean_.astype(np.float64)
         
         # Basic amount features
-        features['amount'] = df['amount']
-        features['log_amount'] = np.log1p(df['amount'])
-        features['amount_zscore'] = (df['amount'] - df['amount'].mean()) / df['amount'].std()
+        if 'amount' in column:
+            # Amounts are centred while still float64: float32 cannot hold large amounts exactly enough
+            j = columns.index('amount')
+            np.subtract(amounts, 0.0 if centre is None else centre[j], out=column['amount'], casting='same_kind')
+            if centre is not None:
+                centre[j] = 0.0
+        if 'log_amount' in column:
+            np.log1p(amounts, out=column['log_amount'])
+        if 'amount_zscore' in column:
+            # float64 statistics, as pandas computes them; the scaling itself goes straight to float32
+            mean, std = amounts.mean(), amounts.std(ddof=1)
+            np.subtract(amounts, mean, out=column['amount_zscore'], casting='same_kind')
+            column['amount_zscore'] /= np.float32(std)
         
         # Frequency features
-        dept_counts = df['department_id'].value_counts().to_dict()
-        features['department_frequency'] = df['department_id'].map(dept_counts)
-        
-        vendor_counts = df['vendor_name'].value_counts().to_dict()
-        features['vendor_frequency'] = df['vendor_name'].map(vendor_counts)
+        if 'department_frequency' in column:
+            column['department_frequency'][:] = frequency_feature(df['department_id'], 'department_id').to_numpy()
+        if 'vendor_frequency' in column:
+            column['vendor_frequency'][:] = frequency_feature(canonical_vendors(df), 'vendor_name').to_numpy()
         
         # Time-based features (if date is available)
-        if 'transaction_date' in df.columns:
-            df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-            features['day_of_week'] = df['transaction_date'].dt.dayofweek
-            features['hour_of_day'] = df['transaction_date'].dt.hour
-        else:
-            features['day_of_week'] = np.random.randint(0, 7, len(df))
-            features['hour_of_day'] = np.random.randint(0, 24, len(df))
+        if {'day_of_week', 'hour_of_day'} & column.keys():
+            if 'transaction_date' in df.columns:
+                dates = pd.to_datetime(df['transaction_date'])
+                if 'day_of_week' in column:
+                    column['day_of_week'][:] = dates.dt.dayofweek.to_numpy()
+                if 'hour_of_day' in column:
+                    column['hour_of_day'][:] = dates.dt.hour.to_numpy()
+            else:
+                if 'day_of_week' in column:
+                    column['day_of_week'][:] = np.random.randint(0, 7, len(df))
+                if 'hour_of_day' in column:
+                    column['hour_of_day'][:] = np.random.randint(0, 24, len(df))
         
         # Statistical features
-        features['amount_percentile'] = df['amount'].rank(pct=True)
+        if 'amount_percentile' in column:
+            percentile_ranks(amounts, column['amount_percentile'])
         
-        return features
+        if scaler is not None:
+            standardize_(matrix, centre, scaler.scale_)
+        return matrix
+    
+    def new_forest(self, n_estimators: int = None) -> IsolationForest:
+        """Unfitted forest whose trees are built in parallel and can be added to with ``warm_start``"""
+        return IsolationForest(
+            n_estimators=n_estimators or settings.TRAIN_N_ESTIMATORS,
+            contamination=self.contamination,
+            n_jobs=settings.TRAIN_N_JOBS,
+            warm_start=True,
+            random_state=42
+        )
     
     def fit(self, X: pd.DataFrame) -> 'AdvancedAnomalyDetector':
         """Fit the anomaly detection model"""
         # Engineer features
-        features = self.engineer_features(X)
+        matrix = self.feature_matrix(X, ENGINEERED_FEATURES, reuse=False)
         
-        # Scale features
-        X_scaled = self.scaler.fit_transform(features)
+        # Scale features in place
+        self.scaler.fit(matrix)
+        standardize_(matrix, self.scaler.mean_, self.scaler.scale_)
         
         # Train model
-        self.model = IsolationForest(contamination=self.contamination, random_state=42)
-        self.model.fit(X_scaled)
+        self.model = self.new_forest()
+        self.model.fit(matrix)
         
         # Store feature columns
-        self.feature_columns = features.columns.tolist()
+        self.feature_columns = list(ENGINEERED_FEATURES)
         
         return self
     
-    def predict(self, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
-        """Predict anomalies"""
+    def fit_stream(self, chunks: Iterable[pd.DataFrame], sample_size: int = None,
+                   seed: int = 42) -> 'AdvancedAnomalyDetector':
+        """Fit on a ledger too large for memory, delivered as DataFrame chunks
+        
+        The scaler is fitted from running means and variances over every
+        row, while the forest is trained on a uniform reservoir sample of at
+        most ``sample_size`` rows. Memory is bounded by the reservoir plus one
+        chunk, whatever the length of the stream.
+        """
+        self.scaler = StandardScaler()
+        sample = self._sample_stream(chunks, sample_size, seed, fit_scaler=True)
+        self.model = self.new_forest()
+        self.model.fit(standardize_(sample, self.scaler.mean_, self.scaler.scale_))
+        return self
+    
+    def grow(self, chunks: Iterable[pd.DataFrame], n_estimators: int = None,
+             sample_size: int = None, seed: Optional[int] = None) -> 'AdvancedAnomalyDetector':
+        """Add ``n_estimators`` trees fitted on new data, keeping the existing ones
+        
+        The scaler is left as it is, since the existing trees split on its
+        scale. The threshold is re-estimated on the new data's sample.
+        """
         if self.model is None:
             raise ValueError("Model not fitted yet")
+        n_estimators = n_estimators or settings.TRAIN_GROW_ESTIMATORS
+        sample = self._sample_stream(chunks, sample_size, self.model.n_estimators if seed is None else seed)
+        # warm_start fits only the added trees, on seeds the existing ones did not use
+        self.model.n_estimators += n_estimators
+        self.model.fit(standardize_(sample, self.scaler.mean_, self.scaler.scale_))
+        return self
+    
+    def _sample_stream(self, chunks: Iterable[pd.DataFrame], sample_size: Optional[int], seed: int,
+                       fit_scaler: bool = False) -> np.ndarray:
+        """Engineer features chunk by chunk into a reservoir sample, updating the scaler's moments if asked"""
+        if self.feature_columns is None or fit_scaler:
+            self.feature_columns = list(ENGINEERED_FEATURES)
+        reservoir = ReservoirSample(sample_size or settings.TRAIN_SAMPLE_SIZE, len(self.feature_columns), seed=seed)
+        for chunk in chunks:
+            if not len(chunk):
+                continue
+            matrix = self.feature_matrix(chunk, self.feature_columns)
+            if fit_scaler:
+                self.scaler.partial_fit(matrix)
+            reservoir.update(matrix)
+        if not reservoir.seen:
+            raise ValueError("No rows to train on")
+        return reservoir.sample()
+    
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        """Engineer and scale features in the column order used for training
         
-        # Engineer features
-        features = self.engineer_features(X)
-        
-        # Ensure same features as training
-        for col in self.feature_columns:
-            if col not in features.columns:
-                features[col] = 0
-        features = features[self.feature_columns]
+        The scaler is applied in place on the float32 feature matrix, which
+        is the calling thread's reused buffer: it is valid until the thread's
+        next call.
+        """
+        if self.model is None:
+            raise ValueError("Model not fitted yet")
         
-        # Scale features
-        X_scaled = self.scaler.transform(features)
+        return self.feature_matrix(X, self.feature_columns, scaler=self.scaler)
+    
+    def predict(self, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Predict anomalies"""
+        X_scaled = self.transform(X)
         
-        # Predict
-        anomaly_labels = self.model.predict(X_scaled)
+        # Predict; labels are the scores thresholded at 0, as IsolationForest.predict does
         anomaly_scores = self.model.decision_function(X_scaled)
+        anomaly_labels = np.where(anomaly_scores < 0, -1, 1)
         
         return anomaly_labels, anomaly_scores
     
+    def explain(self, X: pd.DataFrame, top_k: int = 3) -> Dict[int, List[Dict[str, Any]]]:
+        """Ranked per-feature contributions for the rows flagged as anomalies"""
+        X_scaled = self.transform(X)
+        flagged = np.flatnonzero(self.model.decision_function(X_scaled) < 0)
+        attributor = get_attributor(self.model, self.feature_columns)
+        ranked = attributor.rank(attributor.explain(X_scaled[flagged]), top_k)
+        return dict(zip(flagged.tolist(), ranked))
+    
     def save(self, filepath: str) -> bool:
         """Save model and scaler"""
         try:
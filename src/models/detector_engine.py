@@ -0,0 +1,220 @@
+import threading
+import numpy as np
+import pandas as pd
+from abc import ABC, abstractmethod
+from typing import Tuple, Dict, Any, Optional
+from config.settings import settings
+from .anomaly_detector import AdvancedAnomalyDetector
+
+
+class DetectorEngine(ABC):
+    """Pluggable anomaly detector: fit on a ledger, score batches of transactions"""
+
+    name = "base"
+
+    @abstractmethod
+    def fit(self, df: pd.DataFrame) -> 'DetectorEngine':
+        """Fit the engine on a ledger DataFrame"""
+
+    @abstractmethod
+    def detect(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (anomaly_scores, is_anomaly); lower scores are more anomalous"""
+
+    def score_features(self, model, df: pd.DataFrame, features: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """(anomaly_scores, is_anomaly) of a batch from a fitted forest over its prepared ``features``
+
+        This is how the serving path scores: ``df`` holds the batch's
+        amount, department_id and (canonical) vendor_name columns.
+        """
+        scores = model.decision_function(features)
+        return scores, scores < 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"engine": self.name}
+
+
+class IsolationForestEngine(DetectorEngine):
+    """Runs every row through AdvancedAnomalyDetector"""
+
+    name = "isolation_forest"
+
+    def __init__(self, detector: Optional[AdvancedAnomalyDetector] = None):
+        self.detector = detector or AdvancedAnomalyDetector(contamination=settings.ANOMALY_CONTAMINATION)
+
+    def fit(self, df: pd.DataFrame) -> 'IsolationForestEngine':
+        self.detector.fit(df)
+        return self
+
+    def detect(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        labels, scores = self.detector.predict(df)
+        return scores, labels == -1
+
+
+class RobustStatsPrefilter:
+    """Per-vendor and per-department robust amount statistics held in flat arrays.
+
+    A row is cleared as routine when its vendor and department are both
+    well supported and its amount sits inside both groups' quantile band and
+    within ``z_threshold`` robust z-scores (median/MAD) of both medians.
+    Clearing a whole batch is one index lookup plus a handful of numpy
+    comparisons.
+    """
+
+    def __init__(self, z_threshold: float = None, min_support: int = None, band_quantiles=(0.01, 0.99)):
+        self.z_threshold = z_threshold if z_threshold is not None else settings.CASCADE_Z_THRESHOLD
+        self.min_support = min_support if min_support is not None else settings.CASCADE_MIN_SUPPORT
+        self.band_quantiles = band_quantiles
+        self.groups: Dict[str, Dict[str, Any]] = {}
+
+    def fit(self, df: pd.DataFrame) -> 'RobustStatsPrefilter':
+        amounts = df['amount'].astype(float)
+        for column in ('vendor_name', 'department_id'):
+            grouped = amounts.groupby(df[column].to_numpy())
+            median = grouped.median()
+            mad = (amounts - df[column].map(median).to_numpy()).abs().groupby(df[column].to_numpy()).median()
+            low = grouped.quantile(self.band_quantiles[0])
+            high = grouped.quantile(self.band_quantiles[1])
+            # A zero MAD (constant amounts) would clear nothing but exact repeats
+            floor = np.maximum(0.01 * median.to_numpy(), 1e-6)
+            self.groups[column] = {
+                "index": median.index,
+                "median": median.to_numpy(),
+                "mad": np.maximum(mad.reindex(median.index).to_numpy(), floor),
+                "low": low.reindex(median.index).to_numpy(),
+                "high": high.reindex(median.index).to_numpy(),
+                "count": grouped.size().reindex(median.index).to_numpy()
+            }
+        return self
+
+    def clear_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """Boolean mask of rows that are clearly routine"""
+        amounts = df['amount'].to_numpy(dtype=float)
+        cleared = np.ones(len(df), dtype=bool)
+        for column, stats in self.groups.items():
+            codes = stats["index"].get_indexer(df[column].to_numpy())
+            known = codes >= 0
+            codes = np.where(known, codes, 0)
+            robust_z = 0.6745 * np.abs(amounts - stats["median"][codes]) / stats["mad"][codes]
+            cleared &= (
+                known
+                & (stats["count"][codes] >= self.min_support)
+                & (robust_z <= self.z_threshold)
+                & (amounts >= stats["low"][codes])
+                & (amounts <= stats["high"][codes])
+            )
+        return cleared
+
+
+class CascadeDetectorEngine(DetectorEngine):
+    """Cheap robust-statistics stage that forwards only candidates to the forest.
+
+    Features are still engineered over the whole batch, so the batch-relative
+    features of forwarded rows are identical to a full run; only the forest
+    scoring, which dominates the cost, is skipped for cleared rows. Cleared
+    rows get the median forest score of cleared training rows; when serving,
+    of a sample of cleared rows from the first batch each model scores.
+    That calibration runs once per model under a lock, and is kept
+    together with the model it belongs to, so concurrent batches never
+    mix one model's scores with another's cleared score.
+    Until the prefilter is fitted every row goes to the forest.
+    """
+
+    # Cleared rows the forest scores to set a new model's cleared score
+    CALIBRATION_ROWS = 256
+
+    name = "cascade"
+
+    def __init__(self, detector: Optional[AdvancedAnomalyDetector] = None,
+                 prefilter: Optional[RobustStatsPrefilter] = None):
+        self.detector = detector or AdvancedAnomalyDetector(contamination=settings.ANOMALY_CONTAMINATION)
+        self.prefilter = prefilter or RobustStatsPrefilter()
+        self.cleared_score = 0.0
+        self.rows_seen = 0
+        self.rows_short_circuited = 0
+        self.last_short_circuit_fraction = 0.0
+        # (model, cleared score) of the last calibration
+        self._calibration: Optional[Tuple[Any, float]] = None
+        self._calibration_lock = threading.Lock()
+
+    def fit(self, df: pd.DataFrame) -> 'CascadeDetectorEngine':
+        self.detector.fit(df)
+        self.prefilter.fit(df)
+        _, scores = self.detector.predict(df)
+        cleared = self.prefilter.clear_mask(df)
+        self.cleared_score = float(np.median(scores[cleared])) if cleared.any() else float(scores.max())
+        return self
+
+    def fit_prefilter(self, df: pd.DataFrame) -> 'CascadeDetectorEngine':
+        """Refit only the prefilter (the serving forest is fitted elsewhere); the next batch recalibrates"""
+        self.prefilter.fit(df)
+        self._calibration = None
+        return self
+
+    def detect(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        cleared = self.prefilter.clear_mask(df)
+        candidates = np.flatnonzero(~cleared)
+
+        scores = np.full(len(df), self.cleared_score)
+        is_anomaly = np.zeros(len(df), dtype=bool)
+        if len(candidates):
+            X_scaled = self.detector.transform(df)
+            candidate_scores = self.detector.model.decision_function(X_scaled[candidates])
+            scores[candidates] = candidate_scores
+            is_anomaly[candidates] = candidate_scores < 0
+
+        self._count(len(df), len(candidates))
+        return scores, is_anomaly
+
+    def score_features(self, model, df: pd.DataFrame, features: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.prefilter.groups:
+            self._count(len(df), len(df))
+            return super().score_features(model, df, features)
+        cleared = self.prefilter.clear_mask(df)
+        candidates = np.flatnonzero(~cleared)
+        calibration = self._calibration
+        if (calibration is None or calibration[0] is not model) and cleared.any():
+            with self._calibration_lock:
+                calibration = self._calibration
+                if calibration is None or calibration[0] is not model:
+                    # A cleared row is routine by construction, so its score stays on the normal side
+                    sample = np.flatnonzero(cleared)[:self.CALIBRATION_ROWS]
+                    score = max(float(np.median(model.decision_function(features.iloc[sample]))), 0.0)
+                    calibration = self._calibration = (model, score)
+                    self.cleared_score = score
+        cleared_score = calibration[1] if calibration is not None and calibration[0] is model else self.cleared_score
+
+        scores = np.full(len(df), cleared_score)
+        if len(candidates):
+            scores[candidates] = model.decision_function(features.iloc[candidates])
+        self._count(len(df), len(candidates))
+        return scores, scores < 0
+
+    def _count(self, rows: int, forwarded: int):
+        self.rows_seen += rows
+        self.rows_short_circuited += rows - forwarded
+        self.last_short_circuit_fraction = (rows - forwarded) / rows if rows else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "engine": self.name,
+            "prefilter_fitted": bool(self.prefilter.groups),
+            "cleared_score": round(self.cleared_score, 4),
+            "rows_seen": self.rows_seen,
+            "rows_short_circuited": self.rows_short_circuited,
+            "short_circuit_fraction": self.rows_short_circuited / self.rows_seen if self.rows_seen else 0.0,
+            "last_short_circuit_fraction": self.last_short_circuit_fraction
+        }
+
+
+ENGINES = {
+    IsolationForestEngine.name: IsolationForestEngine,
+    CascadeDetectorEngine.name: CascadeDetectorEngine
+}
+
+
+def create_engine(name: str = None, **kwargs) -> DetectorEngine:
+    """Instantiate a registered detector engine by name"""
+    name = name or settings.DETECTOR_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown detector engine: {name}")
+    return ENGINES[name](**kwargs)
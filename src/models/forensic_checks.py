@@ -0,0 +1,408 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import Dict, Any, Optional, Sequence
+
+# Expected first-digit proportions under Benford's law
+BENFORD_FIRST_DIGIT = np.log10(1 + 1 / np.arange(1, 10))
+# Nigrini's first-digit MAD conformity ranges; above the last bound is nonconformity
+MAD_BOUNDS = np.array([0.006, 0.012, 0.015])
+CONFORMITY = np.array(["close", "acceptable", "marginal", "nonconformity"], dtype=object)
+# Amounts below this carry too few significant digits for the digit test
+MIN_DIGIT_AMOUNT = 10.0
+# Benford only describes amounts spanning orders of magnitude; groups whose
+# log10 amounts have a smaller standard deviation (one fixed price, a narrow
+# rate card) are reported as untestable rather than failed
+MIN_LOG10_SPREAD = 0.4
+# Nor does it describe a group whose amounts MIN_DIGIT_AMOUNT cuts into: past
+# this share left out, what remains is truncated and over-represents 1s
+MAX_TRUNCATED_SHARE = 0.1
+# Share of round amounts assumed normal however few the ledger has
+MIN_ROUND_BASELINE = 0.01
+# Near-threshold payments per day assumed for a department/vendor pair with no history (one a year)
+MIN_SPLIT_RATE = 1 / 365
+KINDS = ("vendor", "department")
+
+
+def first_digits(amounts: np.ndarray) -> np.ndarray:
+    """Leading digit (1-9) of each amount; 0 for amounts below MIN_DIGIT_AMOUNT or not finite"""
+    return _digits_and_logs(np.asarray(amounts, dtype=np.float64))[0]
+
+
+def _digits_and_logs(amounts: np.ndarray):
+    valid = np.isfinite(amounts) & (amounts >= MIN_DIGIT_AMOUNT)
+    safe = np.where(valid, amounts, MIN_DIGIT_AMOUNT)
+    logs = np.log10(safe)
+    leading = np.floor(safe / 10.0 ** np.floor(logs))
+    # log10 can round up to the next power of ten (999.99...) or stop just short of one
+    digits = np.where(leading < 1, 9, np.where(leading > 9, 1, leading)).astype(np.int8)
+    digits[~valid] = 0
+    return digits, logs, valid
+
+
+def weekdays(days: np.ndarray) -> np.ndarray:
+    """Monday=0 weekday of day numbers (1970-01-01 was a Thursday)"""
+    return (np.asarray(days, dtype=np.int64) + 3) % 7
+
+
+def round_amounts(amounts: np.ndarray, unit: float = 100.0) -> np.ndarray:
+    """Amounts of at least ``unit`` that are whole multiples of it, to the cent"""
+    cents = np.rint(np.asarray(amounts, dtype=np.float64) * 100)
+    unit_cents = round(unit * 100)
+    return (cents >= unit_cents) & (np.fmod(cents, unit_cents) == 0)
+
+
+def benford_test(counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Chi-square (8 dof), MAD and most over-represented digit for each row of first-digit counts
+
+    Rows without any counted digit come back as NaN.
+    """
+    counts = np.atleast_2d(counts).astype(np.float64)
+    n = counts.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        observed = counts / n[:, None]
+        deviation = observed - BENFORD_FIRST_DIGIT
+        chi2 = n * (deviation ** 2 / BENFORD_FIRST_DIGIT).sum(axis=1)
+        # Nigrini's per-digit z-statistic, with continuity correction
+        z = (np.abs(deviation) - 0.5 / n[:, None]) / np.sqrt(BENFORD_FIRST_DIGIT * (1 - BENFORD_FIRST_DIGIT) / n[:, None])
+    mad = np.abs(deviation).mean(axis=1)
+    excess = np.where(deviation > 0, z, -np.inf)
+    top = excess.argmax(axis=1)
+    return {
+        "n": n,
+        "chi2": chi2,
+        "p": stats.chi2.sf(chi2, df=8),
+        "mad": mad,
+        "conformity": CONFORMITY[np.searchsorted(MAD_BOUNDS, np.nan_to_num(mad), side='right')],
+        "top_digit": top + 1,
+        "top_share": observed[np.arange(len(n)), top],
+        "top_z": excess[np.arange(len(n)), top]
+    }
+
+
+def binomial_excess(k: np.ndarray, n: np.ndarray, p0: float):
+    """One-sided p-value and z-score of ``k`` successes in ``n`` trials being more than ``p0`` explains"""
+    k, n = np.asarray(k, dtype=np.float64), np.asarray(n, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (k - n * p0) / np.sqrt(n * p0 * (1 - p0))
+    return stats.binom.sf(k - 1, n, p0), z
+
+
+def bonferroni(p: np.ndarray, tested: np.ndarray) -> np.ndarray:
+    """p-values adjusted for the number of groups tested; untested groups get 1"""
+    return np.where(tested, np.minimum(np.nan_to_num(p, nan=1.0) * max(int(tested.sum()), 1), 1.0), 1.0)
+
+
+def significance(p: np.ndarray) -> np.ndarray:
+    """-log10 of a p-value, capped so a vanishing one stays finite"""
+    return -np.log10(np.maximum(p, 1e-300))
+
+
+def find_splits(amounts: np.ndarray, groups: np.ndarray, days: np.ndarray, threshold: float,
+                window_days: int, min_fraction: float) -> Dict[str, np.ndarray]:
+    """Payments to one group that stay under ``threshold`` each but exceed it together within ``window_days``
+
+    Only payments of at least ``min_fraction * threshold`` (and under it)
+    take part; ``groups`` are non-negative integer keys (a department and
+    vendor pair) and ``days`` day numbers, -1 when unknown. Candidates are
+    sorted once by (group, day); each one's trailing window is found with a
+    binary search over the sorted keys and summed from a cumulative sum, so
+    the pass is O(candidates log candidates) whatever the window holds.
+    Overlapping qualifying windows merge into one cluster.
+
+    Returns ``row_cluster`` (the cluster of every input row, -1 for none)
+    and per-cluster ``group``, ``count``, ``total``, ``first_day`` and
+    ``last_day``.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    row_cluster = np.full(len(amounts), -1, dtype=np.int64)
+    candidates = np.flatnonzero((amounts >= threshold * min_fraction) & (amounts < threshold) & (days >= 0))
+    empty = {name: np.zeros(0, dtype=np.int64) for name in ("group", "count", "first_day", "last_day")}
+    empty["total"] = np.zeros(0)
+    if len(candidates) < 2:
+        return dict(empty, row_cluster=row_cluster)
+
+    cand_days = days[candidates].astype(np.int64)
+    first = cand_days.min()
+    span = int(cand_days.max() - first) + window_days + 1
+    # Groups are spaced further apart than any window can reach
+    keys = groups[candidates].astype(np.int64) * span + (cand_days - first)
+    order = np.argsort(keys, kind='stable')
+    keys, rows = keys[order], candidates[order]
+    totals = np.concatenate([[0.0], np.cumsum(amounts[rows])])
+    starts = np.searchsorted(keys, keys - (window_days - 1), side='left')
+    ends = np.arange(len(keys))
+    qualifying = (ends > starts) & (totals[ends + 1] - totals[starts] >= threshold)
+    if not qualifying.any():
+        return dict(empty, row_cluster=row_cluster)
+
+    # Rows inside any qualifying window, via a difference array over the sorted positions
+    marks = (np.bincount(starts[qualifying], minlength=len(keys) + 1)
+             - np.bincount(ends[qualifying] + 1, minlength=len(keys) + 1))
+    covered = np.cumsum(marks)[:-1] > 0
+    sorted_groups = keys // span
+    sorted_days = keys % span + first
+    new = covered.copy()
+    new[1:] &= ~covered[:-1] | (sorted_groups[1:] != sorted_groups[:-1]) | (np.diff(sorted_days) >= window_days)
+    cluster = np.cumsum(new) - 1
+    positions = np.flatnonzero(covered)
+    ids = cluster[positions]
+    row_cluster[rows[positions]] = ids
+    starts_at = positions[new[positions]]
+    return {
+        "row_cluster": row_cluster,
+        "group": sorted_groups[starts_at],
+        "count": np.bincount(ids),
+        "total": np.bincount(ids, weights=amounts[rows[positions]]),
+        "first_day": sorted_days[starts_at],
+        "last_day": np.maximum.reduceat(sorted_days[positions], np.flatnonzero(new[positions]))
+    }
+
+
+class ForensicAnalyzer:
+    """Forensic-accounting checks over a whole ledger, as bulk array passes.
+
+    * Benford: first-digit distribution per vendor and per department,
+      chi-square p-value plus Nigrini's MAD conformity (large groups fail
+      the chi-square on trivial deviations, so both have to fail).
+    * Round amounts: share of whole multiples of ``round_unit`` against the
+      ledger-wide share, one-sided binomial test.
+    * Threshold avoidance: payments just under an approval threshold
+      against just over it. Under a scale-invariant (Benford) amount
+      distribution the density falls as 1/x, which fixes the share below.
+    * Split payments: clusters of sub-threshold payments by one department
+      to one vendor that add up past a threshold within a few days. A pair
+      that pays near the threshold every day forms such clusters by chance,
+      so each cluster gets the Poisson chance of that many near-threshold
+      payments over its days at the pair's usual rate for those weekdays
+      (weekly payment runs are not splits), times the windows in the
+      ledger's span (the clusters that rate would produce by chance), and
+      only clusters under ``alpha`` count.
+
+    Group p-values are Bonferroni-adjusted over the groups tested, and a
+    group is flagged when an adjusted p-value is under ``alpha``. Every test is
+    ``np.bincount`` over integer group codes, so a pass costs a few
+    vectorised sweeps of the ledger whatever the number of groups.
+    """
+
+    def __init__(self, thresholds: Sequence[float] = (10000.0,), window_days: int = 3, min_fraction: float = 0.25,
+                 margin: float = 0.1, round_unit: float = 100.0, min_count: int = 50, alpha: float = 0.01):
+        self.thresholds = sorted(float(t) for t in thresholds)
+        self.window_days = window_days
+        self.min_fraction = min_fraction
+        self.margin = margin
+        self.round_unit = round_unit
+        self.min_count = min_count
+        self.alpha = alpha
+        # Share of the [T(1-m), T(1+m)) band expected below T when density is proportional to 1/x
+        below, above = -np.log1p(-margin), np.log1p(margin)
+        self.below_share = below / (below + above)
+
+    def candidate_rates(self, amounts: np.ndarray, groups: np.ndarray, days: np.ndarray, threshold: float):
+        """Sorted group keys with near-threshold payments, those payments per day by weekday (``keys x 7``), and the span in days"""
+        known = days >= 0
+        span = max(int(days[known].max() - days[known].min()) + 1, self.window_days) if known.any() else self.window_days
+        candidates = (amounts >= threshold * self.min_fraction) & (amounts < threshold) & known
+        keys, inverse = np.unique(groups[candidates], return_inverse=True)
+        counts = np.bincount(inverse * 7 + weekdays(days[candidates]), minlength=len(keys) * 7).reshape(-1, 7)
+        return keys, counts / max(span / 7, 1.0), span
+
+    def split_p_values(self, found: Dict[str, np.ndarray], rates: np.ndarray, span_days: int):
+        """Chance of clusters like ``find_splits`` found over ``span_days`` at usual per-weekday ``rates``, and their expected counts
+
+        Overlapping windows merge, so a cluster is judged over the days it
+        covers, never fewer than the window.
+        """
+        rates = np.asarray(rates, dtype=np.float64).reshape(-1, 7)
+        days = np.maximum(found["last_day"] - found["first_day"] + 1, self.window_days)
+        # Whole weeks at the weekly rate, plus the remaining weekdays from the cluster's first
+        running = np.concatenate([np.zeros((len(rates), 1)), np.cumsum(np.tile(rates, 2), axis=1)], axis=1)
+        start, rest, rows = weekdays(found["first_day"]), days % 7, np.arange(len(rates))
+        expected = days // 7 * rates.sum(axis=1) + running[rows, start + rest] - running[rows, start]
+        expected = np.maximum(expected, MIN_SPLIT_RATE * days)
+        windows = max(span_days / self.window_days, 1.0)
+        return np.minimum(stats.poisson.sf(found["count"] - 1, expected) * windows, 1.0), expected
+
+    def analyze(self, amounts: np.ndarray, department_ids: np.ndarray, vendor_codes: np.ndarray,
+                vendor_labels: Sequence[str], days: np.ndarray, max_splits: int = 100) -> Dict[str, Any]:
+        """Report on a ledger given as column arrays
+
+        ``vendor_codes`` index ``vendor_labels``; ``days`` are day numbers
+        (-1 when unknown). Flagged groups are listed most significant first,
+        and so are the first ``max_splits`` significant split clusters.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        vendor_codes = np.asarray(vendor_codes, dtype=np.int64)
+        department_codes, departments = _factorize(np.asarray(department_ids))
+        digits, logs, valid = _digits_and_logs(amounts)
+        is_round = round_amounts(amounts, self.round_unit)
+        band = np.zeros(len(amounts), dtype=np.int8)
+        for threshold in self.thresholds:
+            band[(amounts >= threshold * (1 - self.margin)) & (amounts < threshold)] = 1
+            band[(amounts >= threshold) & (amounts < threshold * (1 + self.margin))] = 2
+
+        pooled_round = float(is_round.mean()) if len(amounts) else 0.0
+        round_baseline = max(pooled_round, MIN_ROUND_BASELINE)
+        groups = {
+            "vendor": self._group_findings(vendor_codes, np.asarray(vendor_labels, dtype=object),
+                                           digits, logs, valid, is_round, band, round_baseline),
+            "department": self._group_findings(department_codes, departments,
+                                               digits, logs, valid, is_round, band, round_baseline)
+        }
+
+        days = np.asarray(days)
+        split_clusters, significant_clusters, significant_rows, splits = 0, 0, 0, []
+        pair_codes = department_codes * max(len(vendor_labels), 1) + vendor_codes
+        for threshold in self.thresholds:
+            found = find_splits(amounts, pair_codes, days, threshold, self.window_days, self.min_fraction)
+            split_clusters += len(found["count"])
+            keys, rates, span = self.candidate_rates(amounts, pair_codes, days, threshold)
+            p, expected = self.split_p_values(found, rates[np.searchsorted(keys, found["group"])], span)
+            significant = np.flatnonzero(p < self.alpha)
+            significant_clusters += len(significant)
+            significant_rows += int(found["count"][significant].sum())
+            for i in significant[np.lexsort((-found["total"][significant], p[significant]))][:max_splits]:
+                department, vendor = divmod(int(found["group"][i]), max(len(vendor_labels), 1))
+                splits.append({
+                    "department_id": _native(departments[department]),
+                    "vendor_name": vendor_labels[vendor],
+                    "threshold": threshold,
+                    "payments": int(found["count"][i]),
+                    "total": round(float(found["total"][i]), 2),
+                    "first_date": str(np.datetime64(int(found["first_day"][i]), 'D')),
+                    "last_date": str(np.datetime64(int(found["last_day"][i]), 'D')),
+                    "expected_payments": round(float(expected[i]), 4),
+                    "significance": round(float(significance(p[i])), 1)
+                })
+        splits.sort(key=lambda s: (-s["significance"], -s["total"]))
+
+        ledger = benford_test(np.bincount(digits[valid] - 1, minlength=9))
+        return {
+            "rows": len(amounts),
+            "ledger": {
+                "benford_rows": int(ledger["n"][0]),
+                "benford_chi2": _finite(ledger["chi2"][0]),
+                "benford_mad": _finite(ledger["mad"][0]),
+                "benford_conformity": ledger["conformity"][0] if ledger["n"][0] else None,
+                "round_share": round(pooled_round, 5),
+                "round_baseline": round(round_baseline, 5),
+                "below_threshold": int((band == 1).sum()),
+                "above_threshold": int((band == 2).sum()),
+                "split_clusters": split_clusters,
+                "significant_splits": significant_clusters,
+                "split_payments": significant_rows
+            },
+            "vendor": groups["vendor"],
+            "department": groups["department"],
+            "splits": splits[:max_splits],
+            "settings": {
+                "thresholds": self.thresholds,
+                "window_days": self.window_days,
+                "min_fraction": self.min_fraction,
+                "margin": self.margin,
+                "round_unit": self.round_unit,
+                "min_count": self.min_count,
+                "alpha": self.alpha
+            }
+        }
+
+    def _group_findings(self, codes: np.ndarray, labels: np.ndarray, digits: np.ndarray, logs: np.ndarray,
+                        valid: np.ndarray, is_round: np.ndarray, band: np.ndarray,
+                        round_baseline: float) -> Dict[str, Any]:
+        n_groups = len(labels)
+        rows = np.bincount(codes, minlength=n_groups)
+
+        # Benford: digit counts and log10 spread per group
+        counted = codes[valid]
+        digit_counts = np.bincount(counted * 9 + (digits[valid] - 1), minlength=n_groups * 9).reshape(n_groups, 9)
+        benford = benford_test(digit_counts)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_log = np.bincount(counted, weights=logs[valid], minlength=n_groups) / benford["n"]
+            spread = np.sqrt(np.maximum(
+                np.bincount(counted, weights=logs[valid] ** 2, minlength=n_groups) / benford["n"] - mean_log ** 2, 0))
+        benford_tested = ((benford["n"] >= self.min_count) & (spread >= MIN_LOG10_SPREAD)
+                          & (benford["n"] >= (1 - MAX_TRUNCATED_SHARE) * rows))
+        benford_p = bonferroni(benford["p"], benford_tested)
+        benford_failed = benford_tested & (benford_p < self.alpha) & (benford["conformity"] == "nonconformity")
+
+        # Round amounts against the ledger-wide share
+        round_count = np.bincount(codes, weights=is_round, minlength=n_groups)
+        round_tested = rows >= self.min_count
+        round_p, round_z = binomial_excess(round_count, rows, round_baseline)
+        round_p = bonferroni(round_p, round_tested)
+        round_failed = round_tested & (round_p < self.alpha)
+
+        # Threshold avoidance: just under against just over the approval thresholds
+        below = np.bincount(codes, weights=band == 1, minlength=n_groups)
+        above = np.bincount(codes, weights=band == 2, minlength=n_groups)
+        avoid_tested = below + above >= max(self.min_count // 5, 5)
+        avoid_p, _ = binomial_excess(below, below + above, self.below_share)
+        avoid_p = bonferroni(avoid_p, avoid_tested)
+        avoid_failed = avoid_tested & (avoid_p < self.alpha)
+
+        failing = np.where(benford_failed, benford_p, 1.0)
+        failing = np.minimum(failing, np.where(round_failed, round_p, 1.0))
+        failing = np.minimum(failing, np.where(avoid_failed, avoid_p, 1.0))
+        flagged = np.flatnonzero(benford_failed | round_failed | avoid_failed)
+        flagged = flagged[np.argsort(failing[flagged], kind='stable')]
+
+        findings = []
+        for i in flagged.tolist():
+            checks, reasons = [], []
+            if benford_failed[i]:
+                checks.append("benford")
+                reasons.append(
+                    f"First digits deviate from Benford's law (MAD {benford['mad'][i]:.3f} over "
+                    f"{int(benford['n'][i])} payments; digit {benford['top_digit'][i]} at {benford['top_share'][i]:.0%} "
+                    f"vs {BENFORD_FIRST_DIGIT[benford['top_digit'][i] - 1]:.0%} expected)"
+                )
+            if round_failed[i]:
+                checks.append("round_amounts")
+                reasons.append(
+                    f"Round amounts unusually often ({round_count[i] / rows[i]:.0%} multiples of "
+                    f"{self.round_unit:,.0f} vs {round_baseline:.1%} expected)"
+                )
+            if avoid_failed[i]:
+                checks.append("threshold_avoidance")
+                reasons.append(
+                    f"Payments cluster just under the approval threshold ({int(below[i])} just under vs "
+                    f"{int(above[i])} just over)"
+                )
+            findings.append({
+                "key": _native(labels[i]),
+                "transactions": int(rows[i]),
+                "checks": checks,
+                "reasons": reasons,
+                "significance": round(float(significance(failing[i])), 1),
+                "benford_mad": _finite(benford["mad"][i]),
+                "benford_p": float(benford_p[i]),
+                "round_share": round(float(round_count[i] / rows[i]), 4),
+                "round_z": _finite(round_z[i]),
+                "just_under": int(below[i]),
+                "just_over": int(above[i])
+            })
+        return {
+            "groups": n_groups,
+            "tested": {
+                "benford": int(benford_tested.sum()),
+                "round_amounts": int(round_tested.sum()),
+                "threshold_avoidance": int(avoid_tested.sum())
+            },
+            "flagged_count": len(findings),
+            "flagged": findings
+        }
+
+
+def _factorize(values: np.ndarray):
+    """Integer codes and the sorted unique values (hashing, not a sort of the whole column)"""
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes.astype(np.int64), np.asarray(uniques)
+
+
+def _native(value: Any) -> Any:
+    return value.item() if hasattr(value, "item") else value
+
+
+def _finite(value: float) -> Optional[float]:
+    value = float(value)
+    return round(value, 4) if np.isfinite(value) else None
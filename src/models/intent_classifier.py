@@ -0,0 +1,247 @@
+import hashlib
+import io
+import json
+import os
+import re
+import numpy as np
+from scipy import sparse
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+# Temperatures tried when calibrating the softmax on held-out folds
+TEMPERATURE_GRID = np.geomspace(0.2, 5.0, 61)
+CHAR_NGRAMS = (2, 3, 4)
+_NON_WORD = re.compile(r"[^\w'\n]+")
+_SPACE, _NEWLINE = 32, 10
+# Fixed multipliers for the polynomial n-gram hashes (any odd 64-bit constants will do)
+_MULTIPLIERS = np.random.default_rng(20240115).integers(1, 1 << 63, 64, dtype=np.uint64) | np.uint64(1)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """Scramble polynomial hashes so their low bits are usable as column numbers"""
+    h = h ^ (h >> np.uint64(29))
+    h = h * np.uint64(0xBF58476D1CE4E5B9)
+    return h ^ (h >> np.uint64(32))
+
+
+def hashed_ngrams(texts: Sequence[str], n_features: int) -> sparse.csr_matrix:
+    """Hashed word uni/bigram and in-word character n-gram counts for a batch of texts.
+
+    ``(len(texts), 2 * n_features)``: word features in the first half, character
+    features (over each word padded with spaces) in the second, each half L2
+    normalised per row. The whole batch is lower-cased and split by two regex
+    passes over one joined string; n-grams are then hashed with numpy over
+    its bytes, with no per-text Python loop.
+    """
+    n = len(texts)
+    # Newlines separate the texts, so any inside one become spaces
+    text = _NON_WORD.sub(" ", "\n".join(t.replace("\n", " ") for t in texts).lower())
+    data = np.frombuffer(f"\n{text}\n".encode(), dtype=np.uint8)
+    row = np.cumsum(data == _NEWLINE) - 1
+    chars = np.where(data == _NEWLINE, _SPACE, data).astype(np.uint64)
+    is_space = chars == _SPACE
+    size = len(chars)
+    with np.errstate(over='ignore'):
+        # Character n-grams that stay within one space-padded word
+        char_rows, char_cols = [], []
+        for length in CHAR_NGRAMS:
+            starts = np.arange(size - length + 1)
+            inside = np.ones(len(starts), dtype=bool)
+            for k in range(1, length - 1):
+                inside &= ~is_space[starts + k]
+            if length == 2:
+                inside &= ~(is_space[:-1] & is_space[1:])
+            starts = starts[inside]
+            h = np.full(len(starts), np.uint64(length))
+            for k in range(length):
+                h = h * _MULTIPLIERS[k] + chars[starts + k]
+            char_rows.append(row[starts])
+            char_cols.append(_mix(h) % np.uint64(n_features))
+
+        # Words and bigrams of consecutive words in the same text
+        positions = np.flatnonzero(~is_space)
+        word_start = np.ones(len(positions), dtype=bool)
+        word_start[1:] = positions[1:] != positions[:-1] + 1
+        first = np.flatnonzero(word_start)
+        offset = np.arange(len(positions)) - np.repeat(first, np.diff(np.append(first, len(positions))))
+        terms = chars[positions] * _MULTIPLIERS[offset % len(_MULTIPLIERS)]
+        words = _mix(np.add.reduceat(terms, first) if len(first) else np.zeros(0, dtype=np.uint64))
+        word_rows = row[positions[first]]
+        same_text = word_rows[:-1] == word_rows[1:]
+        bigrams = _mix(words[:-1][same_text] * _MULTIPLIERS[0] + words[1:][same_text] + np.uint64(1))
+
+    rows = np.concatenate([word_rows, word_rows[:-1][same_text]] + char_rows)
+    cols = np.concatenate([words % np.uint64(n_features), bigrams % np.uint64(n_features)]
+                          + [c + np.uint64(n_features) for c in char_cols]).astype(np.int64)
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, 2 * n_features))
+    matrix.sum_duplicates()
+    entry_rows = np.repeat(np.arange(n), np.diff(matrix.indptr))
+    half = entry_rows * 2 + (matrix.indices >= n_features)
+    norms = np.sqrt(np.bincount(half, weights=matrix.data ** 2, minlength=2 * n))
+    matrix.data /= norms[half]
+    return matrix
+
+
+class HashedIntentClassifier:
+    """Linear intent model over hashed word and character n-grams.
+
+    Queries are hashed into a fixed-width sparse matrix (word uni/bigrams
+    plus character 2-4 grams within words, so "spent"/"spending" and typos
+    still share features, see ``hashed_ngrams``) and scored with one
+    sparse matrix product against the weights of a multinomial logistic
+    regression. The softmax is temperature-scaled on cross-validated
+    predictions, so ``confidence`` is a calibrated probability rather than
+    a score.
+
+    Only the weight rows of features seen in training are non-zero, so the
+    weights are kept and persisted as a sparse matrix.
+    """
+
+    def __init__(self, n_features: int = 2 ** 18, C: float = 10.0):
+        self.n_features = n_features
+        self.C = C
+        self.classes: List[str] = []
+        self.weights = sparse.csr_matrix((2 * n_features, 0))
+        self.intercept = np.zeros(0)
+        self.temperature = 1.0
+
+    def featurize(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        return hashed_ngrams(texts, self.n_features)
+
+    def _fit_weights(self, X: sparse.csr_matrix, labels: np.ndarray) -> Tuple[sparse.csr_matrix, np.ndarray, List[str]]:
+        # Fit on the hashed columns that occur only; the others would get zero weight anyway
+        used = np.unique(X.indices)
+        model = LogisticRegression(C=self.C, max_iter=2000)
+        model.fit(X[:, used], labels)
+        coef = model.coef_.T
+        weights = sparse.csr_matrix(
+            (coef.ravel(), (np.repeat(used, coef.shape[1]), np.tile(np.arange(coef.shape[1]), len(used)))),
+            shape=(X.shape[1], coef.shape[1])
+        )
+        return weights, model.intercept_, model.classes_.tolist()
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str], folds: int = 5, seed: int = 0) -> "HashedIntentClassifier":
+        """Train on labeled queries, then fit the softmax temperature on out-of-fold logits"""
+        X = self.featurize(texts)
+        labels = np.asarray(labels)
+        self.weights, self.intercept, self.classes = self._fit_weights(X, labels)
+
+        targets = np.searchsorted(self.classes, labels)
+        logits = np.zeros((len(labels), len(self.classes)))
+        splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+        for train, held_out in splitter.split(X, labels):
+            weights, intercept, classes = self._fit_weights(X[train], labels[train])
+            logits[np.ix_(held_out, np.searchsorted(self.classes, classes))] = (X[held_out] @ weights).toarray() + intercept
+        losses = [_log_loss(_softmax(logits / t), targets) for t in TEMPERATURE_GRID]
+        self.temperature = float(TEMPERATURE_GRID[int(np.argmin(losses))])
+        return self
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Calibrated class probabilities, ``(len(texts), len(classes))``"""
+        if not len(texts):
+            return np.zeros((0, len(self.classes)))
+        logits = (self.featurize(texts) @ self.weights).toarray() + self.intercept
+        return _softmax(logits / self.temperature)
+
+    def classify(self, texts: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        """Most likely intent and its probability for every query"""
+        proba = self.predict_proba(texts)
+        best = proba.argmax(axis=1)
+        return [self.classes[i] for i in best], proba[np.arange(len(best)), best]
+
+    def to_bytes(self, samples_digest: str = "") -> bytes:
+        weights = self.weights.tocsr()
+        meta = {"n_features": self.n_features, "C": self.C, "temperature": self.temperature,
+                "samples_digest": samples_digest}
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            __meta__=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+            classes=np.asarray(self.classes),
+            intercept=self.intercept,
+            data=weights.data,
+            indices=weights.indices,
+            indptr=weights.indptr
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Tuple["HashedIntentClassifier", str]:
+        """The classifier and the digest of the samples it was trained on"""
+        archive = np.load(io.BytesIO(data), allow_pickle=False)
+        meta = json.loads(archive["__meta__"].tobytes().decode())
+        model = cls(n_features=meta["n_features"], C=meta["C"])
+        model.classes = archive["classes"].tolist()
+        model.intercept = archive["intercept"]
+        model.temperature = meta["temperature"]
+        model.weights = sparse.csr_matrix(
+            (archive["data"], archive["indices"], archive["indptr"]),
+            shape=(2 * model.n_features, len(model.classes))
+        )
+        return model, meta["samples_digest"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "classes": self.classes,
+            "hashed_features": 2 * self.n_features,
+            "nonzero_weights": int(self.weights.nnz),
+            "temperature": round(self.temperature, 3)
+        }
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+def _log_loss(proba: np.ndarray, targets: np.ndarray) -> float:
+    return float(-np.log(np.clip(proba[np.arange(len(targets)), targets], 1e-12, None)).mean())
+
+
+def load_intent_samples(path: str) -> Tuple[List[str], List[str], str]:
+    """Texts, labels and a content digest of a labeled samples file"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    samples = json.loads(raw)["samples"]
+    return [s["text"] for s in samples], [s["intent"] for s in samples], hashlib.sha256(raw).hexdigest()
+
+
+def load_intent_classifier(model_path: str, samples_path: str) -> Optional[HashedIntentClassifier]:
+    """The saved classifier, retrained from the samples (and saved) when missing or stale"""
+    try:
+        texts, labels, digest = load_intent_samples(samples_path)
+    except Exception as e:
+        print(f"Error reading intent samples: {e}")
+        texts, digest = None, None
+    if model_path and os.path.exists(model_path):
+        try:
+            with open(model_path, 'rb') as f:
+                model, trained_on = HashedIntentClassifier.from_bytes(f.read())
+            if digest is None or trained_on == digest:
+                return model
+        except Exception as e:
+            print(f"Error loading intent model: {e}")
+    if texts is None:
+        return None
+
+    model = HashedIntentClassifier().fit(texts, labels)
+    if model_path:
+        try:
+            os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+            tmp_path = f"{model_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(model.to_bytes(digest))
+            os.replace(tmp_path, model_path)
+        except Exception as e:
+            print(f"Error saving intent model: {e}")
+    return model
+
+
+if __name__ == "__main__":
+    # Offline training: python -m models.intent_classifier (from src/)
+    from config.settings import settings
+    if os.path.exists(settings.INTENT_MODEL_PATH):
+        os.remove(settings.INTENT_MODEL_PATH)
+    trained = load_intent_classifier(settings.INTENT_MODEL_PATH, settings.INTENT_SAMPLES_PATH)
+    print(f"Trained intent model -> {settings.INTENT_MODEL_PATH}: {trained.get_stats()}")
@@ -1,11 +1,18 @@
 import re
 from typing import Dict, List, Tuple
 from collections import Counter
+from utils.query_filters import extract_filters
 
 class SimpleNLPProcessor:
-    """Simple NLP processor for budget queries - Perfect for hackathons"""
+    """Simple NLP processor for budget queries - Perfect for hackathons
     
-    def __init__(self):
+    With an ``intent_classifier`` (see ``models.intent_classifier``) intents
+    and confidences come from the classifier, a whole batch at a time;
+    otherwise from the substring rules below.
+    """
+    
+    def __init__(self, intent_classifier=None):
+        self.intent_classifier = intent_classifier
         # Financial keywords and their categories
         self.keywords = {
             'education': ['education', 'school', 'teacher', 'student', 'learning', 'academic'],
@@ -46,6 +53,12 @@ class SimpleNLPProcessor:
 
     def detect_intent(self, text: str) -> str:
         """Detect user intent from query"""
+        if self.intent_classifier is not None:
+            return self.intent_classifier.classify([text])[0][0]
+        return self.detect_intent_by_rules(text)
+
+    def detect_intent_by_rules(self, text: str) -> str:
+        """First question pattern found in the query"""
         text_lower = text.lower()
         
         # Check for question patterns
@@ -59,22 +72,34 @@ class SimpleNLPProcessor:
 
     def process_query(self, query: str) -> Dict[str, any]:
         """Process natural language query and extract information"""
-        keywords = self.extract_keywords(query)
-        intent = self.detect_intent(query)
-        
-        # Extract numbers (for amounts, years, etc.)
-        numbers = re.findall(r'\d+', query)
+        return self.process_queries([query])[0]
+
+    def process_queries(self, queries: List[str]) -> List[Dict[str, any]]:
+        """Process a batch of queries; the classifier scores them all in one pass"""
+        keywords = [self.extract_keywords(query) for query in queries]
+        if self.intent_classifier is not None:
+            intents, probabilities = self.intent_classifier.classify(queries)
+            confidences = [float(p) for p in probabilities]
+        else:
+            intents = [self.detect_intent_by_rules(query) for query in queries]
+            confidences = [self.calculate_confidence(k, i) for k, i in zip(keywords, intents)]
         
-        return {
-            'original_query': query,
-            'keywords': keywords,
-            'intent': intent,
-            'numbers': numbers,
-            'confidence': self.calculate_confidence(keywords, intent)
-        }
+        return [
+            {
+                'original_query': query,
+                'keywords': found,
+                'intent': intent,
+                # Extract numbers (for amounts, years, etc.)
+                'numbers': re.findall(r'\d+', query),
+                # Structured amount/date ranges ("above $50,000", "last year")
+                'filters': extract_filters(query),
+                'confidence': confidence
+            }
+            for query, found, intent, confidence in zip(queries, keywords, intents, confidences)
+        ]
 
     def calculate_confidence(self, keywords: List[str], intent: str) -> float:
-        """Calculate confidence score for the query processing"""
+        """Calculate confidence score for the query processing (rules only)"""
         base_confidence = 0.5
         
         # Increase confidence based on number of keywords found
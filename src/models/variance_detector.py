@@ -0,0 +1,300 @@
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+
+# Seasonal baseline per grain: the same weekday over the previous 8 weeks for
+# daily buckets, the trailing 12 weeks / 12 months for the coarser grains.
+GRAINS = {
+    "daily": {"period": 7, "history": 8, "window": 28},
+    "weekly": {"period": 1, "history": 12, "window": 8},
+    "monthly": {"period": 1, "history": 12, "window": 3}
+}
+KINDS = ("department", "vendor")
+MIN_HISTORY = 3
+MAD_TO_SIGMA = 1.4826
+# Smallest spread assumed, relative to the baseline, so near-constant series (rent, subscriptions) don't flag small changes
+MIN_RELATIVE_SPREAD = 0.05
+# Cells (history x series x buckets) evaluated at once when scanning long ranges
+DETECT_CHUNK_CELLS = 8_000_000
+
+
+def to_days(dates) -> np.ndarray:
+    """Days since 1970-01-01 for date strings or datetimes; unparseable dates become -1"""
+    parsed = pd.to_datetime(pd.Series(dates), errors='coerce', format='mixed')
+    days = parsed.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return np.where(parsed.isna().to_numpy(), -1, days)
+
+
+def bucket_index(days: np.ndarray, grain: str) -> np.ndarray:
+    if grain == "daily":
+        return days
+    if grain == "weekly":
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return (days + 3) // 7
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def bucket_start(index: int, grain: str) -> str:
+    if grain == "daily":
+        return str(np.datetime64(int(index), 'D'))
+    if grain == "weekly":
+        return str(np.datetime64(int(index) * 7 - 3, 'D'))
+    return str(np.datetime64(int(index), 'M').astype('datetime64[D]'))
+
+
+def _nan_quiet(func, values: np.ndarray, axis: int) -> np.ndarray:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return func(values, axis=axis)
+
+
+def _median(values: np.ndarray, full_from: int) -> np.ndarray:
+    """Median over axis 0 ignoring NaN, which only the first ``full_from`` columns can contain"""
+    out = np.median(values, axis=0)
+    if full_from:
+        out[:, :full_from] = _nan_quiet(np.nanmedian, values[:, :, :full_from], axis=0)
+    return out
+
+
+def _mean(values: np.ndarray, full_from: int) -> np.ndarray:
+    out = values.mean(axis=0)
+    if full_from:
+        out[:, :full_from] = _nan_quiet(np.nanmean, values[:, :, :full_from], axis=0)
+    return out
+
+
+class BucketSeries:
+    """Spend per key per time bucket as one dense ``series x buckets`` float32 array.
+
+    Rows are added as new keys appear and columns as time moves on (or back);
+    both grow by doubling so updates are amortised O(batch).
+    """
+
+    def __init__(self, grain: str, max_series: Optional[int] = None):
+        self.grain = grain
+        self.max_series = max_series
+        self.rows: Dict[Any, int] = {}
+        self.labels: List[Any] = []
+        self.values = np.zeros((0, 0), dtype=np.float32)
+        self.origin = 0
+        self.length = 0
+        self.dropped_rows = 0
+
+    def _row_ids(self, keys: pd.Series) -> np.ndarray:
+        codes, uniques = pd.factorize(keys)
+        ids = np.empty(len(uniques), dtype=np.int64)
+        for i, key in enumerate(uniques.tolist()):
+            row = self.rows.get(key)
+            if row is None:
+                if self.max_series is not None and len(self.labels) >= self.max_series:
+                    row = -1
+                else:
+                    row = self.rows[key] = len(self.labels)
+                    self.labels.append(key)
+            ids[i] = row
+        return ids[codes]
+
+    def _reserve(self, lo: int, hi: int):
+        n_rows, n_cols = self.values.shape
+        if self.length == 0:
+            self.origin = lo
+        new_origin = min(self.origin, lo)
+        needed_cols = max(self.origin + self.length, hi) - new_origin
+        shift = self.origin - new_origin
+        if len(self.labels) <= n_rows and needed_cols <= n_cols and shift == 0:
+            return
+        rows = max(len(self.labels), 2 * n_rows, 16) if len(self.labels) > n_rows else n_rows
+        cols = max(needed_cols, 2 * n_cols, 32) if needed_cols > n_cols else n_cols
+        values = np.zeros((rows, cols), dtype=np.float32)
+        values[:n_rows, shift:shift + self.length] = self.values[:, :self.length]
+        self.values = values
+        self.origin = new_origin
+
+    def add(self, keys: pd.Series, buckets: np.ndarray, amounts: np.ndarray):
+        rows = self._row_ids(keys)
+        keep = rows >= 0
+        self.dropped_rows += int((~keep).sum())
+        rows, buckets, amounts = rows[keep], buckets[keep], amounts[keep]
+        if len(rows) == 0:
+            return
+        lo, hi = int(buckets.min()), int(buckets.max()) + 1
+        self._reserve(lo, hi)
+        self.length = max(self.origin + self.length, hi) - self.origin
+        n_cols = self.values.shape[1]
+        cells, inverse = np.unique(rows * n_cols + (buckets - self.origin), return_inverse=True)
+        sums = np.bincount(inverse, weights=amounts)
+        self.values.reshape(-1)[cells] += sums.astype(np.float32)
+
+    @property
+    def data(self) -> np.ndarray:
+        """View of the populated ``series x buckets`` block"""
+        return self.values[:len(self.labels), :self.length]
+
+    def memory_bytes(self) -> int:
+        return self.values.nbytes
+
+
+class SpendVarianceDetector:
+    """Per-department and per-vendor spend series with seasonal robust z-scores.
+
+    Each kind keeps daily, weekly and monthly ``BucketSeries`` updated
+    incrementally from scored batches. ``detect`` compares every bucket in
+    the requested window with the median of its seasonal predecessors (see
+    ``GRAINS``) for all series at once; the spread is the MAD, floored by the
+    mean absolute deviation so sparse series don't flag every payment. This
+    catches slow overspending made of individually normal payments, which the
+    row-level model cannot see.
+    """
+
+    def __init__(self, max_vendors: Optional[int] = None):
+        self.series = {
+            kind: {grain: BucketSeries(grain, max_vendors if kind == "vendor" else None) for grain in GRAINS}
+            for kind in KINDS
+        }
+
+    def update(self, df: pd.DataFrame):
+        if len(df) == 0:
+            return
+        days = to_days(df['transaction_date'])
+        valid = days >= 0
+        amounts = df['amount'].to_numpy(dtype=np.float64)[valid]
+        days = days[valid]
+        keys = {
+            "department": df['department_id'][valid].astype(int).reset_index(drop=True),
+            "vendor": df['vendor_name'][valid].astype(str).reset_index(drop=True)
+        }
+        for grain in GRAINS:
+            buckets = bucket_index(days, grain)
+            for kind in KINDS:
+                self.series[kind][grain].add(keys[kind], buckets, amounts)
+
+    def detect(
+        self,
+        kind: str = "department",
+        grain: str = "monthly",
+        window: Optional[int] = None,
+        threshold: float = 3.5,
+        min_amount: float = 0.0,
+        direction: str = "over"
+    ) -> List[Dict[str, Any]]:
+        """Buckets among the last ``window`` whose spend deviates from the seasonal baseline"""
+        series = self.series[kind][grain]
+        config = GRAINS[grain]
+        data = series.data
+        if data.size == 0:
+            return []
+        window = min(window or config["window"], series.length)
+        period, history = config["period"], config["history"]
+        chunk = max(1, DETECT_CHUNK_CELLS // max(history * len(data), 1))
+        relative_spread = self._relative_spread(data, period, 2 * history * period)
+
+        flagged = []
+        for stop in range(series.length, series.length - window, -chunk):
+            start = max(stop - chunk, series.length - window)
+            z, baseline, deviation = self._score(data, start, stop, period, history, relative_spread)
+            if direction == "over":
+                hits = z >= threshold
+            elif direction == "under":
+                hits = z <= -threshold
+            else:
+                hits = np.abs(z) >= threshold
+            hits &= np.abs(deviation) >= min_amount
+            for row, col in zip(*np.nonzero(hits)):
+                bucket = start + col
+                flagged.append({
+                    "kind": kind,
+                    "key": series.labels[row],
+                    "grain": grain,
+                    "bucket_start": bucket_start(series.origin + bucket, grain),
+                    "amount": round(float(data[row, bucket]), 2),
+                    "baseline": round(float(baseline[row, col]), 2),
+                    "deviation": round(float(deviation[row, col]), 2),
+                    "percent_change": round(100 * float(deviation[row, col]) / float(baseline[row, col]), 1)
+                    if baseline[row, col] > 0 else None,
+                    "z_score": round(float(z[row, col]), 2),
+                    "partial_bucket": bool(bucket == series.length - 1)
+                })
+        flagged.sort(key=lambda f: -abs(f["z_score"]))
+        return flagged
+
+    @staticmethod
+    def _score(data: np.ndarray, start: int, stop: int, period: int, history: int, relative_spread: np.ndarray
+               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Robust z-scores of ``data[:, start:stop]`` against their seasonal lags"""
+        width = stop - start
+        lags = np.full((history, len(data), width), np.nan, dtype=np.float32)
+        for k in range(1, history + 1):
+            lo = start - k * period
+            skip = max(0, -lo)
+            if skip < width:
+                lags[k - 1, :, skip:] = data[:, lo + skip:stop - k * period]
+        # Only the first buckets of the series lack some lags
+        full_from = min(max(history * period - start, 0), width)
+        current = data[:, start:stop]
+        enough = np.ones((len(data), width), dtype=bool)
+        if full_from:
+            enough[:, :full_from] = np.count_nonzero(~np.isnan(lags[:, :, :full_from]), axis=0) >= MIN_HISTORY
+        with np.errstate(all='ignore'):
+            baseline = _median(lags, full_from)
+            spread = np.abs(lags - baseline)
+            local = np.maximum(MAD_TO_SIGMA * _median(spread, full_from), 1.2533 * _mean(spread, full_from))
+            # A handful of lags can understate the spread, so never go below the series' typical relative spread
+            floor = np.maximum(relative_spread[:, None], MIN_RELATIVE_SPREAD) * np.abs(baseline)
+            scale = np.maximum(np.maximum(local, floor), 1.0)
+            deviation = current - baseline
+            z = np.where(enough, deviation / scale, 0.0)
+        return np.nan_to_num(z), np.nan_to_num(baseline), np.nan_to_num(deviation)
+
+    @staticmethod
+    def _relative_spread(data: np.ndarray, period: int, span: int) -> np.ndarray:
+        """Each series' noise relative to its level, from seasonal differences over the last ``span`` buckets
+
+        Uses many more buckets than one bucket's lags, and medians, so it is
+        stable and barely moved by a level shift.
+        """
+        block = data[:, max(data.shape[1] - span, 0):]
+        if block.shape[1] <= period:
+            return np.zeros(len(data), dtype=np.float32)
+        current, previous = block[:, period:], block[:, :-period]
+        with np.errstate(all='ignore'):
+            relative = np.abs(current - previous) / ((current + previous) / 2)
+        # Buckets with no spend on either side carry no information about noise
+        relative[~np.isfinite(relative)] = 0.0
+        spread = MAD_TO_SIGMA / np.sqrt(2) * np.median(relative, axis=1)
+        return spread.astype(np.float32)
+
+    def period_totals(self, kind: str = "department", grain: str = "monthly", periods: int = 12
+                      ) -> Tuple[List[Any], np.ndarray, np.ndarray]:
+        """Spend per key over the last ``periods`` buckets and the ``periods`` before them"""
+        series = self.series[kind][grain]
+        data = series.data
+        end = series.length
+        current = data[:, max(end - periods, 0):end].sum(axis=1, dtype=np.float64)
+        previous = data[:, max(end - 2 * periods, 0):max(end - periods, 0)].sum(axis=1, dtype=np.float64)
+        return list(series.labels), current, previous
+
+    def get_series(self, kind: str, key: Any, grain: str = "monthly") -> Optional[Dict[str, Any]]:
+        series = self.series[kind][grain]
+        row = series.rows.get(key)
+        if row is None:
+            return None
+        return {
+            "kind": kind,
+            "key": key,
+            "grain": grain,
+            "start": bucket_start(series.origin, grain),
+            "values": [round(float(v), 2) for v in series.data[row]]
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {}
+        for kind in KINDS:
+            monthly = self.series[kind]["monthly"]
+            stats[kind] = {
+                "series": len(monthly.labels),
+                "buckets": {grain: s.length for grain, s in self.series[kind].items()},
+                "memory_mb": round(sum(s.memory_bytes() for s in self.series[kind].values()) / 1024 ** 2, 2),
+                "untracked_rows": monthly.dropped_rows
+            }
+        return stats
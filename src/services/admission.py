@@ -0,0 +1,322 @@
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import tracemalloc
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple
+from config.settings import settings
+from utils.data_processor import DataProcessor
+
+MB = 1024 * 1024
+
+# Starting points for the calibrated estimates; refined from observed requests. Uploads are
+# estimated by file type: CSV runs ~60 bytes a row, Parquet ~20 and JSON ~140 (synthetic ledger)
+DEFAULT_BODY_BYTES_PER_ROW = {"json": 150.0, "csv": 60.0, "parquet": 20.0, "multipart": 60.0}
+DEFAULT_MEMORY_PER_ROW = 4096.0
+DEFAULT_SECONDS_PER_ROW = 0.0001
+BASE_REQUEST_MEMORY = 2 * MB
+UNKNOWN_BODY_BYTES = 1 * MB
+CALIBRATION_WEIGHT = 0.2
+MULTIPART_FILENAME = re.compile(rb'filename="([^"\r\n]*)"')
+
+_current_ticket: ContextVar[Optional["AdmissionTicket"]] = ContextVar("admission_ticket", default=None)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """Cost estimate and bookkeeping for one admitted request"""
+
+    __slots__ = ("kind", "body_bytes", "rows", "memory", "seconds", "actual_rows", "admitted_at", "waited")
+
+    def __init__(self, kind: str, body_bytes: int, rows: int, memory: int, seconds: float):
+        self.kind = kind
+        self.body_bytes = body_bytes
+        self.rows = rows
+        self.memory = memory
+        self.seconds = seconds
+        self.actual_rows: Optional[int] = None
+        self.admitted_at = 0.0
+        self.waited = 0.0
+
+
+def note_rows(rows: int):
+    """Report the real row count of the current request so the estimates can be calibrated"""
+    ticket = _current_ticket.get()
+    if ticket is not None:
+        ticket.actual_rows = rows
+
+
+class AdmissionController:
+    """Memory-budgeted admission for heavy endpoints.
+
+    Each request's row count is estimated from its Content-Length before the
+    body is read, and from that its peak memory and run time. Requests are
+    admitted while the estimated memory of everything in flight stays within
+    the budget and a concurrency slot is free; otherwise they wait in a
+    bounded FIFO queue. A full queue or a wait timeout is answered straight
+    away with a Retry-After hint, and a request that could never fit is
+    refused outright.
+
+    A sample of admitted requests run under tracemalloc so the per-row
+    memory estimate tracks what requests really allocate. Only one request
+    is traced at a time, but allocations by requests running alongside it
+    are counted too, which errs on the side of overestimating.
+    """
+
+    def __init__(self, memory_budget: int = None, max_concurrent: int = None,
+                 queue_size: int = None, queue_timeout: float = None):
+        self.memory_budget = memory_budget or settings.ADMISSION_MEMORY_BUDGET_MB * MB
+        self.max_concurrent = max_concurrent or settings.ADMISSION_MAX_CONCURRENT
+        self.queue_size = queue_size if queue_size is not None else settings.ADMISSION_QUEUE_SIZE
+        self.queue_timeout = queue_timeout if queue_timeout is not None else settings.ADMISSION_QUEUE_TIMEOUT
+        self.bytes_per_row = dict(DEFAULT_BODY_BYTES_PER_ROW)
+        self.memory_per_row = DEFAULT_MEMORY_PER_ROW
+        self.seconds_per_row = DEFAULT_SECONDS_PER_ROW
+        self.mean_request_seconds = 0.1
+        self.in_flight = 0
+        self.memory_in_use = 0
+        self._waiters: deque = deque()
+        self._tracing = False
+        self.admitted = 0
+        self.rejected: Dict[int, int] = {}
+        self.queued = 0
+        self.traced = 0
+        self.last_traced_peak: Optional[int] = None
+        self.max_wait = 0.0
+
+    def estimate(self, kind: str, body_bytes: int) -> AdmissionTicket:
+        rows = max(1, int(body_bytes / self.bytes_per_row.get(kind, DEFAULT_BODY_BYTES_PER_ROW["json"])))
+        memory = int(BASE_REQUEST_MEMORY + rows * self.memory_per_row)
+        return AdmissionTicket(kind, body_bytes, rows, memory, rows * self.seconds_per_row)
+
+    def _fits(self, ticket: AdmissionTicket) -> bool:
+        return (self.in_flight < self.max_concurrent
+                and self.memory_in_use + ticket.memory <= self.memory_budget)
+
+    def _retry_after(self) -> int:
+        # Time for the work in flight and queued to drain at the current concurrency
+        queued_seconds = sum(t.seconds for t, _ in self._waiters) + self.in_flight * self.mean_request_seconds
+        return max(1, math.ceil(queued_seconds / max(self.max_concurrent, 1)))
+
+    async def acquire(self, ticket: AdmissionTicket):
+        """Wait for capacity or raise AdmissionRejected"""
+        if ticket.memory > self.memory_budget:
+            self._reject(413)
+            raise AdmissionRejected(
+                413, f"Request too large: ~{ticket.rows:,} rows needs ~{ticket.memory // MB} MB "
+                     f"of a {self.memory_budget // MB} MB budget; split the batch or use /api/jobs")
+        if not self._waiters and self._fits(ticket):
+            self._grant(ticket)
+            return
+        if len(self._waiters) >= self.queue_size:
+            self._reject(429)
+            raise AdmissionRejected(429, "Server busy, request queue full", self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (ticket, future)
+        self._waiters.append(entry)
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done():
+                # Granted just as the wait expired
+                ticket.waited = time.perf_counter() - start
+                return
+            self._waiters.remove(entry)
+            self._reject(503)
+            raise AdmissionRejected(503, "Server overloaded, timed out waiting for capacity", self._retry_after())
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if future.done():
+                self.release(ticket)
+            else:
+                self._waiters.remove(entry)
+                future.cancel()
+            raise
+        ticket.waited = time.perf_counter() - start
+        self.max_wait = max(self.max_wait, ticket.waited)
+
+    def _grant(self, ticket: AdmissionTicket):
+        self.in_flight += 1
+        self.memory_in_use += ticket.memory
+        self.admitted += 1
+        ticket.admitted_at = time.perf_counter()
+
+    def _reject(self, status_code: int):
+        self.rejected[status_code] = self.rejected.get(status_code, 0) + 1
+
+    def release(self, ticket: AdmissionTicket):
+        self.in_flight -= 1
+        self.memory_in_use -= ticket.memory
+        # Strict FIFO so large requests are not starved by a stream of small ones
+        while self._waiters and self._fits(self._waiters[0][0]):
+            waiter, future = self._waiters.popleft()
+            if not future.done():
+                self._grant(waiter)
+                future.set_result(True)
+
+    def calibrate(self, ticket: AdmissionTicket, elapsed: float, peak: Optional[int]):
+        rows = ticket.actual_rows
+        if not rows:
+            return
+        w = CALIBRATION_WEIGHT
+        self.mean_request_seconds += w * (elapsed - self.mean_request_seconds)
+        self.bytes_per_row[ticket.kind] += w * (ticket.body_bytes / rows - self.bytes_per_row[ticket.kind])
+        self.seconds_per_row += w * (elapsed / rows - self.seconds_per_row)
+        if peak is not None:
+            self.memory_per_row += w * (max(peak - BASE_REQUEST_MEMORY, 0) / rows - self.memory_per_row)
+
+    def should_trace(self) -> bool:
+        return not self._tracing and random.random() < settings.ADMISSION_TRACE_SAMPLE_RATE
+
+    def start_trace(self):
+        self._tracing = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    def stop_trace(self) -> int:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self._tracing = False
+        self.traced += 1
+        self.last_traced_peak = peak
+        return peak
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.ADMISSION_ENABLED,
+            "memory_budget_mb": round(self.memory_budget / MB, 1),
+            "memory_in_use_mb": round(self.memory_in_use / MB, 1),
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "queue_size": self.queue_size,
+            "queued_now": len(self._waiters),
+            "queue_timeout_seconds": self.queue_timeout,
+            "admitted": self.admitted,
+            "queued_total": self.queued,
+            "rejected": dict(self.rejected),
+            "max_wait_seconds": round(self.max_wait, 3),
+            "estimates": {
+                "body_bytes_per_row": {k: round(v, 1) for k, v in self.bytes_per_row.items()},
+                "memory_bytes_per_row": round(self.memory_per_row, 1),
+                "milliseconds_per_row": round(self.seconds_per_row * 1000, 4),
+                "traced_requests": self.traced,
+                "last_traced_peak_mb": round(self.last_traced_peak / MB, 2) if self.last_traced_peak else None
+            }
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying AdmissionController to heavy POST endpoints.
+
+    Also enforces ADMISSION_MAX_BODY_MB while the body streams in, so a
+    missing or understated Content-Length can't bypass the estimate.
+    Uploads are estimated by file type, read from the file name in the
+    first body chunk, since Parquet packs several times more rows into a
+    byte than CSV.
+    """
+
+    def __init__(self, app, controller: "AdmissionController" = None, paths: Tuple[str, ...] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+        self.paths = tuple(paths if paths is not None else settings.ADMISSION_PATHS)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "POST" or not settings.ADMISSION_ENABLED
+                or not scope["path"].startswith(self.paths)):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        max_body = settings.ADMISSION_MAX_BODY_MB * MB
+        try:
+            body_bytes = int(headers.get(b"content-length", b"0")) or UNKNOWN_BODY_BYTES
+        except ValueError:
+            body_bytes = UNKNOWN_BODY_BYTES
+        if body_bytes > max_body:
+            await _reject(send, AdmissionRejected(413, f"Request body over {settings.ADMISSION_MAX_BODY_MB} MB"))
+            return
+        kind = "json"
+        pending = []
+        if headers.get(b"content-type", b"").startswith(b"multipart/"):
+            pending.append(await receive())
+            kind = _upload_kind(pending[0].get("body", b""))
+
+        controller = self.controller
+        ticket = controller.estimate(kind, body_bytes)
+        try:
+            await controller.acquire(ticket)
+        except AdmissionRejected as e:
+            await _reject(send, e)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = pending.pop() if pending else await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    raise AdmissionRejected(413, f"Request body over {settings.ADMISSION_MAX_BODY_MB} MB")
+            return message
+
+        response_started = False
+
+        async def tracked_send(message):
+            nonlocal response_started
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        token = _current_ticket.set(ticket)
+        tracing = controller.should_trace()
+        if tracing:
+            controller.start_trace()
+        start = time.perf_counter()
+        peak = None
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except AdmissionRejected as e:
+            if response_started:
+                raise
+            await _reject(send, e)
+        finally:
+            if tracing:
+                peak = controller.stop_trace()
+            _current_ticket.reset(token)
+            ticket.body_bytes = received
+            controller.calibrate(ticket, time.perf_counter() - start, peak)
+            controller.release(ticket)
+
+
+def _upload_kind(body: bytes) -> str:
+    """Estimate kind of a multipart upload from the file name in its first part"""
+    match = MULTIPART_FILENAME.search(body[:8192])
+    fmt = DataProcessor.detect_ledger_format(match.group(1).decode("utf-8", "replace")) if match else None
+    return fmt if fmt in DEFAULT_BODY_BYTES_PER_ROW else "multipart"
+
+
+async def _reject(send, error: AdmissionRejected):
+    headers = [(b"content-type", b"application/json")]
+    if error.retry_after is not None:
+        headers.append((b"retry-after", str(error.retry_after).encode()))
+    await send({"type": "http.response.start", "status": error.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": json.dumps({"detail": error.detail}).encode()})
+
+
+# Global controller instance
+admission_controller = AdmissionController()
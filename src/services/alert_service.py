@@ -0,0 +1,217 @@
+import asyncio
+import json
+import threading
+import time
+import itertools
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+from config.settings import settings
+
+POLICY_COALESCE = "coalesce"
+POLICY_DISCONNECT = "disconnect"
+OVERFLOW_POLICIES = (POLICY_COALESCE, POLICY_DISCONNECT)
+
+
+class AlertSubscriber:
+    """One connected dashboard: its filters and bounded outbound queue.
+
+    ``publish`` may run on any thread, so the queue is a deque guarded by a
+    small lock and the sender is woken through the event loop. When the queue
+    is full the ``coalesce`` policy drops the oldest messages and reports how
+    many alerts were skipped in the next message; ``disconnect`` closes the
+    subscription instead.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, department_id: Optional[int] = None,
+                 vendor_name: Optional[str] = None, min_score: float = 0.0,
+                 policy: str = POLICY_COALESCE, max_queue: int = None):
+        self.id = next(AlertBroker._ids)
+        self.loop = loop
+        self.department_id = department_id
+        self.vendor_name = vendor_name.strip().title() if vendor_name else None
+        self.min_score = min_score
+        self.policy = policy
+        self.max_queue = max_queue or settings.ALERT_QUEUE_SIZE
+        self.event = asyncio.Event()
+        self.closed = False
+        self.delivered = 0
+        self.dropped_alerts = 0
+        self._pending: deque = deque()
+        self._skipped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def filter_key(self) -> Tuple[Optional[int], Optional[str], float]:
+        return (self.department_id, self.vendor_name, self.min_score)
+
+    def offer(self, message: str, alert_count: int) -> bool:
+        """Queue a message without blocking; returns False once the subscriber is closed"""
+        with self._lock:
+            if self.closed:
+                return False
+            if len(self._pending) >= self.max_queue:
+                if self.policy == POLICY_DISCONNECT:
+                    self.closed = True
+                    self._pending.clear()
+                    return False
+                _, dropped = self._pending.popleft()
+                self._skipped += dropped
+                self.dropped_alerts += dropped
+            self._pending.append((message, alert_count))
+            return True
+
+    def pop(self) -> Tuple[Optional[str], int]:
+        """Take the oldest queued message, plus the number of alerts coalesced away since the last pop"""
+        with self._lock:
+            message = self._pending.popleft()[0] if self._pending else None
+            skipped, self._skipped = self._skipped, 0
+        return message, skipped
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+
+class AlertBroker:
+    """Fans flagged transactions out to WebSocket subscribers.
+
+    Scoring threads call ``publish`` with a scored batch. Matching is done
+    once per distinct filter rather than per subscriber, each matching
+    payload is serialised once, and queueing never blocks, so a slow or
+    stuck dashboard cannot slow down scoring.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self._subscribers: Dict[int, AlertSubscriber] = {}
+        self._lock = threading.Lock()
+        self.batches_published = 0
+        self.alerts_published = 0
+        self.messages_queued = 0
+        self.subscribers_disconnected = 0
+        self.last_publish_ms = 0.0
+
+    def subscribe(self, **filters) -> AlertSubscriber:
+        subscriber = AlertSubscriber(asyncio.get_running_loop(), **filters)
+        with self._lock:
+            self._subscribers[subscriber.id] = subscriber
+        return subscriber
+
+    def unsubscribe(self, subscriber: AlertSubscriber):
+        subscriber.closed = True
+        with self._lock:
+            self._subscribers.pop(subscriber.id, None)
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, df: pd.DataFrame, scores: np.ndarray, is_anomaly: np.ndarray, source: str = "api",
+                canonical: Optional[pd.Series] = None) -> int:
+        """Queue the flagged rows of a scored batch for every matching subscriber
+
+        ``canonical`` holds the batch's canonical vendor names, which vendor
+        filters match against; the raw names are used when not given.
+        """
+        if not self._subscribers:
+            return 0
+        flagged = np.flatnonzero(is_anomaly)
+        if len(flagged) == 0:
+            return 0
+        start = time.perf_counter()
+
+        rows = df.iloc[flagged]
+        departments = rows['department_id'].to_numpy()
+        vendors = rows['vendor_name'].astype(str).str.strip().str.title().to_numpy()
+        matched_vendors = vendors if canonical is None else \
+            canonical.iloc[flagged].astype(str).str.strip().str.title().to_numpy()
+        flagged_scores = np.asarray(scores, dtype=float)[flagged]
+        # Rows flagged by a rule (look-alike vendor, split payment) can score above 0; they count as severity 0
+        severity = np.maximum(-flagged_scores, 0.0)
+        dates = rows['transaction_date'].astype(str).tolist()
+        amounts = rows['amount'].astype(float).tolist()
+        published_at = time.time()
+
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+
+        payloads: Dict[tuple, Optional[Tuple[str, int]]] = {}
+        woken = []
+        for subscriber in subscribers:
+            key = subscriber.filter_key
+            if key not in payloads:
+                mask = severity >= key[2]
+                if key[0] is not None:
+                    mask &= departments == key[0]
+                if key[1] is not None:
+                    mask &= matched_vendors == key[1]
+                matched = np.flatnonzero(mask)
+                payloads[key] = self._render(matched, flagged, amounts, departments, vendors, dates,
+                                             flagged_scores, source, published_at) if len(matched) else None
+            payload = payloads[key]
+            if payload is None:
+                continue
+            if subscriber.offer(*payload):
+                woken.append(subscriber)
+                self.messages_queued += 1
+            else:
+                self.unsubscribe(subscriber)
+                self.subscribers_disconnected += 1
+                woken.append(subscriber)
+
+        # One callback per event loop wakes every affected sender
+        by_loop: Dict[asyncio.AbstractEventLoop, List[AlertSubscriber]] = {}
+        for subscriber in woken:
+            by_loop.setdefault(subscriber.loop, []).append(subscriber)
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_wake, group)
+            except RuntimeError:
+                pass  # Loop already closed
+
+        self.batches_published += 1
+        self.alerts_published += len(flagged)
+        self.last_publish_ms = (time.perf_counter() - start) * 1000
+        return len(flagged)
+
+    @staticmethod
+    def _render(matched, flagged, amounts, departments, vendors, dates, scores, source, published_at) -> Tuple[str, int]:
+        alerts = [
+            {
+                "transaction_index": int(flagged[i]),
+                "amount": amounts[i],
+                "department_id": int(departments[i]),
+                "vendor_name": vendors[i],
+                "transaction_date": dates[i],
+                "anomaly_score": round(float(scores[i]), 4)
+            }
+            for i in matched
+        ]
+        message = json.dumps({"type": "anomalies", "source": source, "published_at": published_at, "alerts": alerts})
+        return message, len(alerts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        return {
+            "subscribers": len(subscribers),
+            "batches_published": self.batches_published,
+            "alerts_published": self.alerts_published,
+            "messages_queued": self.messages_queued,
+            "alerts_dropped": sum(s.dropped_alerts for s in subscribers),
+            "subscribers_disconnected": self.subscribers_disconnected,
+            "max_queue_depth": max((s.queue_depth for s in subscribers), default=0),
+            "last_publish_ms": round(self.last_publish_ms, 3)
+        }
+
+
+def _wake(subscribers: List[AlertSubscriber]):
+    for subscriber in subscribers:
+        subscriber.event.set()
+
+
+# Global broker instance
+alert_broker = AlertBroker()
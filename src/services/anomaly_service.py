@@ -1,10 +1,11 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Union
 from sklearn.ensemble import IsolationForest
 import pickle
 import os
 from config.settings import settings
+from services.training_service import reservoir_sample_frames
 
 class AnomalyDetectionService:
     """Service for handling anomaly detection logic"""
@@ -13,11 +14,20 @@ class AnomalyDetectionService:
         self.model = None
         self.is_trained = False
         
-    def train_model(self, training_data: pd.DataFrame) -> bool:
-        """Train the anomaly detection model"""
+    def train_model(self, training_data: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> bool:
+        """Train the anomaly detection model
+        
+        Accepts one feature frame, or an iterable of frames (e.g. chunks of a
+        ledger too large for memory) that is reservoir-sampled down to
+        TRAIN_SAMPLE_SIZE rows as it streams past.
+        """
         try:
+            if not isinstance(training_data, pd.DataFrame):
+                training_data, _ = reservoir_sample_frames(training_data)
             self.model = IsolationForest(
+                n_estimators=settings.TRAIN_N_ESTIMATORS,
                 contamination=settings.ANOMALY_CONTAMINATION,
+                n_jobs=settings.TRAIN_N_JOBS,
                 random_state=settings.ANOMALY_RANDOM_STATE
             )
             self.model.fit(training_data)
@@ -0,0 +1,414 @@
+import glob
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional
+from config.settings import settings
+from utils.columnar import REASON_CODE_LABELS, compute_reason_codes
+
+FSYNC_POLICIES = ("group", "interval", "never")
+
+# magic, metadata length, rows, strings length, CRC32 of everything after the header
+FRAME_MAGIC = b"AUD1"
+FRAME_HEADER = struct.Struct("<4sIIII")
+ROW_DTYPE = np.dtype([
+    ('amount', '<f8'),
+    ('score', '<f8'),
+    ('department_id', '<i8'),
+    ('is_anomaly', 'u1'),
+    ('reason_code', 'u1')
+])
+# One entry per frame: first sequence number, append time, where the frame starts
+INDEX_DTYPE = np.dtype([
+    ('seq', '<u8'),
+    ('ts', '<f8'),
+    ('segment', '<u4'),
+    ('rows', '<u4'),
+    ('offset', '<u8')
+])
+INDEX_FILE = "audit.idx"
+# Reason labels for every reason-code bitmask
+REASON_LABELS = np.empty(256, dtype=object)
+for _code in range(256):
+    REASON_LABELS[_code] = tuple(label for bit, label in REASON_CODE_LABELS.items() if _code & bit)
+
+
+def encode_frame(batch: Dict[str, Any]) -> bytes:
+    """One queued batch as a checksummed frame: JSON metadata, fixed-width rows, then the strings"""
+    n = batch['rows']
+    meta = json.dumps({
+        "seq": batch['seq'], "ts": batch['ts'], "model_version": batch['model_version'], "source": batch['source']
+    }).encode()
+    rows = np.empty(n, dtype=ROW_DTYPE)
+    rows['amount'] = batch['amount']
+    rows['score'] = batch['scores']
+    rows['department_id'] = batch['department_id']
+    rows['is_anomaly'] = batch['is_anomaly']
+    reason_codes = batch['reason_codes']
+    if reason_codes is None:
+        reason_codes = compute_reason_codes(batch['amount'], batch['scores'], batch['is_anomaly'])
+    rows['reason_code'] = reason_codes
+    # Vendor names, then dates; the separators cannot appear in either
+    strings = ("\x1f".join(map(str, batch['vendor_name'])) + "\x1e"
+               + "\x1f".join(map(str, batch['transaction_date']))).encode()
+    body = meta + rows.tobytes() + strings
+    return FRAME_HEADER.pack(FRAME_MAGIC, len(meta), n, len(strings), zlib.crc32(body)) + body
+
+
+def decode_frame(data: bytes, offset: int = 0) -> Optional[Dict[str, Any]]:
+    """The frame starting at ``offset``, or None if it is incomplete or fails its checksum"""
+    if len(data) - offset < FRAME_HEADER.size:
+        return None
+    magic, meta_len, n, strings_len, crc = FRAME_HEADER.unpack_from(data, offset)
+    start = offset + FRAME_HEADER.size
+    end = start + meta_len + n * ROW_DTYPE.itemsize + strings_len
+    if magic != FRAME_MAGIC or end > len(data) or zlib.crc32(data[start:end]) != crc:
+        return None
+    frame = json.loads(data[start:start + meta_len])
+    frame['rows'] = np.frombuffer(data, dtype=ROW_DTYPE, count=n, offset=start + meta_len)
+    vendors, dates = data[end - strings_len:end].decode().split("\x1e")
+    frame['vendor_name'] = vendors.split("\x1f") if n else []
+    frame['transaction_date'] = dates.split("\x1f") if n else []
+    frame['size'] = end - offset
+    return frame
+
+
+class AuditLog:
+    """Append-only log of every scoring decision, written in the background by group commit.
+
+    ``append`` only queues a scored batch's arrays and returns, so requests
+    never wait on the disk. A writer thread takes everything queued within
+    ``group_ms`` of the oldest batch (sooner once ``group_rows`` rows are
+    waiting), encodes one checksummed frame per batch and writes the group
+    with a single ``write``. The ``fsync`` policy then decides durability:
+    "group" syncs every commit, "interval" at most every ``fsync_seconds``,
+    "never" leaves it to the OS. Each row gets a sequence number that
+    carries on across restarts.
+
+    Segments rotate once they pass ``segment_mb``. Every frame also gets a
+    fixed-width entry in ``audit.idx`` (first sequence number, append time,
+    segment and offset), so a time range is found by binary search and read
+    with seeks instead of a scan. Frames torn by a crash fail their checksum
+    and are cut off when the log is opened. Appends wait while more than
+    ``max_buffer_rows`` rows are queued, so memory stays bounded and nothing
+    is dropped.
+    """
+
+    def __init__(self, directory: str = None, group_rows: int = None, group_ms: float = None,
+                 fsync: str = None, fsync_seconds: float = None, segment_mb: float = None,
+                 max_buffer_rows: int = None):
+        self.directory = directory or settings.AUDIT_LOG_DIR
+        self.group_rows = group_rows or settings.AUDIT_GROUP_ROWS
+        self.group_seconds = (group_ms if group_ms is not None else settings.AUDIT_GROUP_MS) / 1000
+        self.fsync = fsync or settings.AUDIT_FSYNC
+        if self.fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown audit fsync policy: {self.fsync}")
+        self.fsync_seconds = fsync_seconds if fsync_seconds is not None else settings.AUDIT_FSYNC_SECONDS
+        self.segment_bytes = int((segment_mb or settings.AUDIT_SEGMENT_MB) * 1024 * 1024)
+        self.max_buffer_rows = max_buffer_rows or settings.AUDIT_MAX_BUFFER_ROWS
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_rows = 0
+        self._flush_waiters = 0
+        self._stopping = False
+        self._file = None
+        self._index_file = None
+        self._segment = 0
+        self._segment_size = 0
+        self._last_ts = 0.0
+        self._last_sync = 0.0
+        self.next_seq = 0
+        self.committed_seq = 0
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.commits = 0
+        self.syncs = 0
+        self.append_waits = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """Recover the log's tail and start the writer thread"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._recover()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Write out everything queued, then stop the writer and close the files"""
+        with self._cond:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        thread.join(timeout=timeout)
+        with self._cond:
+            self._thread = None
+            for f in (self._file, self._index_file):
+                if f is not None:
+                    f.close()
+            self._file = self._index_file = None
+
+    def append(self, df: pd.DataFrame, scores: np.ndarray, is_anomaly: np.ndarray,
+               reason_codes: Optional[np.ndarray] = None, model_version: Optional[str] = None,
+               source: str = "api") -> int:
+        """Queue a scored batch; returns the sequence number of its first row"""
+        if self._thread is None:
+            self.start()
+        n = len(df)
+        batch = {
+            'rows': n,
+            'amount': df['amount'].to_numpy(dtype=np.float64),
+            'department_id': df['department_id'].to_numpy(),
+            'vendor_name': df['vendor_name'].to_numpy(),
+            'transaction_date': df['transaction_date'].to_numpy(),
+            'scores': np.asarray(scores),
+            'is_anomaly': np.asarray(is_anomaly),
+            'reason_codes': reason_codes,
+            'model_version': model_version,
+            'source': source
+        }
+        with self._cond:
+            if self._pending_rows + n > self.max_buffer_rows and self._pending:
+                self.append_waits += 1
+                while self._pending_rows + n > self.max_buffer_rows and self._pending and not self._stopping:
+                    self._cond.wait()
+            # Append times never go backwards, so the index stays sorted by time
+            self._last_ts = max(time.time(), self._last_ts)
+            batch['ts'] = self._last_ts
+            batch['seq'] = self.next_seq
+            batch['queued_at'] = time.monotonic()
+            self.next_seq += n
+            self._pending.append(batch)
+            self._pending_rows += n
+            self._cond.notify_all()
+        return batch['seq']
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every row appended so far is written (and synced, under the fsync policy); False on timeout"""
+        with self._cond:
+            target = self.next_seq
+            if self._thread is None:
+                return self.committed_seq >= target
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: self.committed_seq >= target, timeout)
+            finally:
+                self._flush_waiters -= 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stopping)
+                if not self._pending:
+                    return
+                # Group commit: let the window fill unless it is full already or someone is waiting on it
+                deadline = self._pending[0]['queued_at'] + self.group_seconds
+                while self._pending_rows < self.group_rows and not self._stopping and not self._flush_waiters:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                group, self._pending = self._pending, []
+                rows, self._pending_rows = self._pending_rows, 0
+                self._cond.notify_all()
+            try:
+                self._commit(group)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"Error writing audit log: {e}")
+                with self._cond:
+                    # Keep the rows and retry; the sequence numbers are already theirs
+                    self._pending[:0] = group
+                    self._pending_rows += rows
+                    if self._stopping:
+                        return
+                    self._cond.wait(1.0)
+                continue
+            with self._cond:
+                self.committed_seq = group[-1]['seq'] + group[-1]['rows']
+                self._cond.notify_all()
+
+    def _commit(self, group: List[Dict[str, Any]]):
+        """Write a group of batches with one write (and one fsync per file under the policy)"""
+        if self._segment_size >= self.segment_bytes:
+            self._open_segment(self._segment + 1)
+        frames = [encode_frame(batch) for batch in group]
+        index = np.empty(len(group), dtype=INDEX_DTYPE)
+        offset = self._segment_size
+        for i, (batch, frame) in enumerate(zip(group, frames)):
+            index[i] = (batch['seq'], batch['ts'], self._segment, batch['rows'], offset)
+            offset += len(frame)
+        data = b"".join(frames)
+
+        self._file.write(data)
+        self._file.flush()
+        now = time.monotonic()
+        sync = self.fsync == "group" or (self.fsync == "interval" and now - self._last_sync >= self.fsync_seconds)
+        if sync:
+            os.fsync(self._file.fileno())
+        # The index entry is written after its frame, so it never points past the data
+        self._index_file.write(index.tobytes())
+        self._index_file.flush()
+        if sync:
+            os.fsync(self._index_file.fileno())
+            self._last_sync = now
+            self.syncs += 1
+        self._segment_size = offset
+        self.commits += 1
+        self.rows_written += int(index['rows'].sum())
+        self.bytes_written += len(data)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"audit-{segment:06d}.log")
+
+    def _open_segment(self, segment: int):
+        if self._file is not None:
+            self._file.close()
+        self._segment = segment
+        self._file = open(self._segment_path(segment), "ab")
+        self._segment_size = self._file.tell()
+
+    def _recover(self):
+        """Index frames written after the last index entry, and cut off a torn tail"""
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        index = self._read_index()
+        with open(index_path, "ab") as f:
+            f.truncate(len(index) * INDEX_DTYPE.itemsize)
+        segments = sorted(int(os.path.basename(p)[6:12]) for p in glob.glob(os.path.join(self.directory, "audit-*.log")))
+        if len(index):
+            last = index[-1]
+            segment, offset = int(last['segment']), int(last['offset'])
+            self.next_seq = int(last['seq'] + last['rows'])
+            self._last_ts = float(last['ts'])
+        else:
+            segment, offset = (segments[0] if segments else 0), 0
+        self.committed_seq = self.next_seq
+
+        self._index_file = open(index_path, "ab")
+        for number in [s for s in segments if s >= segment] or [segment]:
+            path = self._segment_path(number)
+            data = open(path, "rb").read() if os.path.exists(path) else b""
+            position = offset if number == segment else 0
+            entries = []
+            while True:
+                frame = decode_frame(data, position)
+                if frame is None:
+                    break
+                if frame['seq'] >= self.next_seq:
+                    entries.append((frame['seq'], frame['ts'], number, len(frame['rows']), position))
+                    self.next_seq = frame['seq'] + len(frame['rows'])
+                    self._last_ts = max(self._last_ts, frame['ts'])
+                position += frame['size']
+            if position < len(data):
+                print(f"Audit log {os.path.basename(path)}: dropping {len(data) - position} bytes of torn frames")
+                with open(path, "ab") as f:
+                    f.truncate(position)
+            if entries:
+                self._index_file.write(np.array(entries, dtype=INDEX_DTYPE).tobytes())
+            segment = number
+        self._index_file.flush()
+        self.committed_seq = self.next_seq
+        self._open_segment(segment)
+
+    def _read_index(self) -> np.ndarray:
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=INDEX_DTYPE)
+        data = open(path, "rb").read()
+        # A torn last entry is ignored (and truncated by _recover)
+        return np.frombuffer(data, dtype=INDEX_DTYPE, count=len(data) // INDEX_DTYPE.itemsize).copy()
+
+    def read(self, start: Optional[float] = None, end: Optional[float] = None,
+             limit: Optional[int] = None) -> pd.DataFrame:
+        """Committed rows appended between ``start`` and ``end`` (epoch seconds), oldest first"""
+        index = self._read_index()
+        first = int(np.searchsorted(index['ts'], start, 'left')) if start is not None else 0
+        last = int(np.searchsorted(index['ts'], end, 'right')) if end is not None else len(index)
+        frames = []
+        remaining = limit if limit is not None else float("inf")
+        handles = {}
+        try:
+            for entry in index[first:last]:
+                if remaining <= 0:
+                    break
+                segment = int(entry['segment'])
+                if segment not in handles:
+                    handles[segment] = open(self._segment_path(segment), "rb")
+                f = handles[segment]
+                f.seek(int(entry['offset']))
+                header = f.read(FRAME_HEADER.size)
+                _, meta_len, n, strings_len, _ = FRAME_HEADER.unpack(header)
+                frame = decode_frame(header + f.read(meta_len + n * ROW_DTYPE.itemsize + strings_len))
+                if frame is None:
+                    continue
+                take = int(min(n, remaining))
+                frames.append(self._frame_rows(frame, take))
+                remaining -= take
+        finally:
+            for f in handles.values():
+                f.close()
+        if not frames:
+            return pd.DataFrame(columns=['seq', 'logged_at', 'model_version', 'source', 'batch_row', 'amount',
+                                         'department_id', 'vendor_name', 'transaction_date', 'anomaly_score',
+                                         'is_anomaly', 'reason_code', 'reasons'])
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _frame_rows(frame: Dict[str, Any], take: int) -> pd.DataFrame:
+        rows = frame['rows'][:take]
+        codes = rows['reason_code']
+        return pd.DataFrame({
+            'seq': frame['seq'] + np.arange(take),
+            'logged_at': frame['ts'],
+            'model_version': frame['model_version'],
+            'source': frame['source'],
+            'batch_row': np.arange(take),
+            'amount': rows['amount'],
+            'department_id': rows['department_id'],
+            'vendor_name': frame['vendor_name'][:take],
+            'transaction_date': frame['transaction_date'][:take],
+            'anomaly_score': rows['score'],
+            'is_anomaly': rows['is_anomaly'].astype(bool),
+            'reason_code': codes,
+            'reasons': REASON_LABELS[codes]
+        })
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending_rows = self._pending_rows
+        return {
+            "enabled": settings.AUDIT_LOG_ENABLED,
+            "running": self._thread is not None,
+            "fsync": self.fsync,
+            "next_seq": self.next_seq,
+            "committed_seq": self.committed_seq,
+            "pending_rows": pending_rows,
+            "rows_written": self.rows_written,
+            "bytes_written": self.bytes_written,
+            "commits": self.commits,
+            "rows_per_commit": round(self.rows_written / self.commits, 1) if self.commits else 0.0,
+            "syncs": self.syncs,
+            "append_waits": self.append_waits,
+            "segment": self._segment,
+            "segment_bytes": self._segment_size,
+            "errors": self.errors,
+            "last_error": self.last_error
+        }
+
+
+# Global audit log instance
+audit_log = AuditLog()
@@ -0,0 +1,76 @@
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional, Tuple
+from config.settings import settings
+from models.detector_engine import CascadeDetectorEngine, create_engine
+from services.transaction_store import transaction_store
+from services.vendor_service import canonical_vendors
+
+
+class DetectorService:
+    """The detector engine (DETECTOR_ENGINE) every scoring path goes through.
+
+    ``isolation_forest`` scores every row with the live forest. ``cascade``
+    first clears routine rows with robust per-vendor and per-department
+    amount statistics, fitted from the last ``CASCADE_FIT_ROWS`` stored
+    transactions at startup and after every training run, and sends only
+    the rest to the forest.
+
+    The sizes of the most recent batches scored are kept, so training can
+    build batch-relative features at the scale requests really arrive at.
+    """
+
+    def __init__(self):
+        self.engine = create_engine()
+        self._lock = threading.Lock()
+        self.fitted_rows = 0
+        self.fits = 0
+        self.batch_sizes: deque = deque(maxlen=1000)
+
+    def score(self, model, df: pd.DataFrame, vendors: pd.Series, features: pd.DataFrame,
+              rows: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(anomaly_scores, is_anomaly) of a batch; ``vendors`` are its canonical vendor names
+
+        ``rows`` is the size of the whole batch when ``df`` is a chunk of it.
+        """
+        self.batch_sizes.append(rows or len(df))
+        if not isinstance(self.engine, CascadeDetectorEngine):
+            return self.engine.score_features(model, df, features)
+        batch = pd.DataFrame({
+            'amount': df['amount'].to_numpy(),
+            'department_id': df['department_id'].to_numpy(),
+            'vendor_name': vendors.to_numpy()
+        })
+        return self.engine.score_features(model, batch, features)
+
+    def fit(self) -> int:
+        """Refit the cascade prefilter from the most recent stored transactions; returns the rows used"""
+        if not isinstance(self.engine, CascadeDetectorEngine) or not settings.STORE_SCORED_TRANSACTIONS:
+            return 0
+        last_id = transaction_store.query("SELECT COALESCE(MAX(id), 0) AS last_id FROM transactions")[0]['last_id']
+        chunks = list(transaction_store.iter_rows_since(
+            max(last_id - settings.CASCADE_FIT_ROWS, 0), settings.CASCADE_FIT_ROWS,
+            columns=('amount', 'department_id', 'vendor_name')))
+        if not chunks:
+            return 0
+        ledger = pd.concat(chunks, ignore_index=True)
+        ledger['vendor_name'] = canonical_vendors(ledger).to_numpy()
+        with self._lock:
+            self.engine.fit_prefilter(ledger)
+            self.fitted_rows = len(ledger)
+            self.fits += 1
+        return len(ledger)
+
+    @property
+    def version(self) -> int:
+        """Changes whenever the prefilter is refitted; part of result cache keys with the cascade"""
+        return self.fits
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.engine.get_stats(), fitted_rows=self.fitted_rows, fits=self.fits)
+
+
+# Global service instance
+detector_service = DetectorService()
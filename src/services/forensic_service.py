@@ -0,0 +1,294 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+from config.settings import settings
+from models.forensic_checks import ForensicAnalyzer, find_splits, significance
+from models.variance_detector import to_days
+from services.transaction_store import transaction_store
+from services.vendor_service import canonical_vendors
+
+LEDGER_COLUMNS = ('amount', 'department_id', 'vendor_name', 'transaction_date')
+# A batch spanning this many split windows is history enough to rate its own pairs
+BATCH_RATE_WINDOWS = 10
+NO_HISTORY = np.zeros(7)
+
+
+class ForensicService:
+    """Forensic-accounting report over the stored ledger, and its findings for scored batches.
+
+    The ledger is held as four columns (amount, department, canonical
+    vendor code, day number) that grow by doubling; each refresh reads only
+    the rows stored since the last one, then reruns every check over the
+    whole ledger. A background thread refreshes every
+    ``FORENSIC_REFRESH_SECONDS`` so ``/detect`` can attach the vendor and
+    department findings of the latest report without waiting for one.
+    """
+
+    def __init__(self):
+        self.analyzer = ForensicAnalyzer(
+            thresholds=settings.FORENSIC_APPROVAL_THRESHOLDS,
+            window_days=settings.FORENSIC_SPLIT_WINDOW_DAYS,
+            min_fraction=settings.FORENSIC_SPLIT_MIN_FRACTION,
+            margin=settings.FORENSIC_THRESHOLD_MARGIN,
+            round_unit=settings.FORENSIC_ROUND_UNIT,
+            min_count=settings.FORENSIC_MIN_COUNT,
+            alpha=settings.FORENSIC_ALPHA
+        )
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.amounts = np.zeros(0, dtype=np.float64)
+        self.departments = np.zeros(0, dtype=np.int64)
+        self.vendors = np.zeros(0, dtype=np.int32)
+        self.days = np.zeros(0, dtype=np.int32)
+        self.size = 0
+        self.vendor_codes: Dict[str, int] = {}
+        self.vendor_labels: List[str] = []
+        self.last_id = 0
+        self.report: Optional[Dict[str, Any]] = None
+        self.report_at: Optional[float] = None
+        self.report_seconds = 0.0
+        self.refreshes = 0
+        self._vendor_reasons: Dict[str, List[str]] = {}
+        self._department_reasons: Dict[Any, List[str]] = {}
+        self._split_rates: Dict[float, Dict[tuple, np.ndarray]] = {}
+        self._split_span = 0
+
+    def start(self):
+        """Start the background refresh thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="forensic-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing forensic report: {e}")
+            self._stop.wait(settings.FORENSIC_REFRESH_SECONDS)
+
+    def refresh(self) -> Dict[str, Any]:
+        """Load rows stored since the last refresh and rerun the checks over the whole ledger"""
+        with self._lock:
+            started = time.perf_counter()
+            if settings.STORE_SCORED_TRANSACTIONS:
+                for chunk in transaction_store.iter_rows_since(self.last_id, settings.FORENSIC_REFRESH_CHUNK_ROWS,
+                                                                  LEDGER_COLUMNS):
+                    self._append(chunk)
+                    self.last_id = int(chunk['id'].iat[-1])
+            n = self.size
+            report = self.analyzer.analyze(
+                self.amounts[:n], self.departments[:n], self.vendors[:n], self.vendor_labels, self.days[:n],
+                max_splits=settings.FORENSIC_MAX_SPLITS
+            )
+            self.report_seconds = time.perf_counter() - started
+            report["generated_at"] = time.time()
+            report["seconds"] = round(self.report_seconds, 3)
+            self.report, self.report_at = report, report["generated_at"]
+            self._vendor_reasons = {f["key"]: f["reasons"] for f in report["vendor"]["flagged"]}
+            self._department_reasons = {f["key"]: f["reasons"] for f in report["department"]["flagged"]}
+            self._split_rates = self._pair_rates()
+            self.refreshes += 1
+            return report
+
+    def _pair_rates(self) -> Dict[float, Dict[tuple, np.ndarray]]:
+        """Usual near-threshold payments per weekday of each (department, vendor code) pair, per threshold"""
+        n, width = self.size, max(len(self.vendor_labels), 1)
+        pairs = self.departments[:n] * width + self.vendors[:n]
+        rates = {}
+        for threshold in self.analyzer.thresholds:
+            keys, per_day, self._split_span = self.analyzer.candidate_rates(
+                self.amounts[:n], pairs, self.days[:n], threshold)
+            department, vendor = np.divmod(keys, width)
+            rates[threshold] = dict(zip(zip(department.tolist(), vendor.tolist()), per_day))
+        return rates
+
+    def get_report(self, refresh: bool = False) -> Dict[str, Any]:
+        """Latest ledger report, recomputed when asked or older than ``FORENSIC_REFRESH_SECONDS``"""
+        report = self.report
+        if refresh or report is None or time.time() - self.report_at > settings.FORENSIC_REFRESH_SECONDS:
+            report = self.refresh()
+        return report
+
+    def analyze_frame(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Report on a submitted ledger alone, without touching the stored one
+
+        Its split clusters are judged the way ``/detect`` judges a batch's
+        (see ``batch_findings``), so both flag the same payments.
+        """
+        vendors = canonical_vendors(df)
+        codes, labels = pd.factorize(vendors)
+        report = self.analyzer.analyze(
+            df['amount'].to_numpy(dtype=np.float64), df['department_id'].to_numpy(), codes, list(labels),
+            to_days(df['transaction_date'].astype(str)), max_splits=settings.FORENSIC_MAX_SPLITS
+        )
+        departments = df['department_id'].tolist()
+        splits, split_rows = [], 0
+        for threshold, candidates, found, p, expected in self._batch_splits(df, vendors.to_numpy()):
+            first_rows = {}
+            for i, cluster in zip(candidates.tolist(), found["row_cluster"].tolist()):
+                if cluster >= 0:
+                    first_rows.setdefault(cluster, i)
+            for cluster in np.flatnonzero(p < self.analyzer.alpha).tolist():
+                i = first_rows[cluster]
+                split_rows += int(found["count"][cluster])
+                splits.append({
+                    "department_id": departments[i],
+                    "vendor_name": vendors.iat[i],
+                    "threshold": threshold,
+                    "payments": int(found["count"][cluster]),
+                    "total": round(float(found["total"][cluster]), 2),
+                    "first_date": str(np.datetime64(int(found["first_day"][cluster]), 'D')),
+                    "last_date": str(np.datetime64(int(found["last_day"][cluster]), 'D')),
+                    "expected_payments": round(float(expected[cluster]), 4),
+                    "significance": round(float(significance(p[cluster])), 1)
+                })
+        splits.sort(key=lambda s: (-s["significance"], -s["total"]))
+        report["ledger"]["significant_splits"] = len(splits)
+        report["ledger"]["split_payments"] = split_rows
+        report["splits"] = splits[:settings.FORENSIC_MAX_SPLITS]
+        report["generated_at"] = time.time()
+        return report
+
+    def _batch_splits(self, df: pd.DataFrame, vendors: np.ndarray):
+        """Split clusters within a batch and their chance at each pair's usual rate, per threshold
+
+        Yields ``(threshold, candidates, found, p, expected)``: the rows
+        near a threshold, ``find_splits`` over them, and each cluster's
+        p-value and expected payments. A pair's rate is its rate in the
+        stored ledger (a pair never seen before is assumed to make one
+        near-threshold payment a year) or, for a batch covering weeks of
+        payments, its rate within the batch, whichever is higher.
+        """
+        amounts = df['amount'].to_numpy(dtype=np.float64)
+        departments = df['department_id'].tolist()
+        low = min(self.analyzer.thresholds) * self.analyzer.min_fraction
+        candidates = np.flatnonzero((amounts >= low) & (amounts < max(self.analyzer.thresholds)))
+        if len(candidates) < 2:
+            return
+        pairs, _ = pd.factorize(pd.MultiIndex.from_arrays(
+            [df['department_id'].to_numpy()[candidates], vendors[candidates]]))
+        days = to_days(df['transaction_date'].to_numpy()[candidates].astype(str))
+        for threshold in self.analyzer.thresholds:
+            found = find_splits(amounts[candidates], pairs, days, threshold,
+                                self.analyzer.window_days, self.analyzer.min_fraction)
+            keys, batch_rates, batch_span = self.analyzer.candidate_rates(amounts[candidates], pairs, days, threshold)
+            if batch_span < BATCH_RATE_WINDOWS * self.analyzer.window_days:
+                batch_rates = np.zeros_like(batch_rates)
+            first_rows = {}
+            for i, cluster in zip(candidates.tolist(), found["row_cluster"].tolist()):
+                if cluster >= 0:
+                    first_rows.setdefault(cluster, i)
+            rates = self._split_rates.get(threshold, {})
+            per_day = np.maximum(batch_rates[np.searchsorted(keys, found["group"])], np.array([
+                rates.get((departments[i], self.vendor_codes.get(vendors[i])), NO_HISTORY)
+                for _, i in sorted(first_rows.items())
+            ]).reshape(-1, 7))
+            p, expected = self.analyzer.split_p_values(found, per_day, max(self._split_span, batch_span))
+            yield threshold, candidates, found, p, expected
+
+    def batch_splits(self, df: pd.DataFrame, vendors: np.ndarray) -> Tuple[np.ndarray, Dict[int, List[str]]]:
+        """Rows of a batch split under an approval threshold, and their reasons by row position
+
+        ``vendors`` are the batch's canonical vendor names. Splits are looked
+        for inside the batch (see ``_batch_splits``); splits across batches
+        show in the ledger report.
+        """
+        split = np.zeros(len(df), dtype=bool)
+        reasons: Dict[int, List[str]] = {}
+        for threshold, candidates, found, p, expected in self._batch_splits(df, vendors):
+            for i, cluster in zip(candidates.tolist(), found["row_cluster"].tolist()):
+                if cluster < 0 or p[cluster] >= self.analyzer.alpha or split[i]:
+                    continue
+                split[i] = True
+                days_spanned = found['last_day'][cluster] - found['first_day'][cluster] + 1
+                reasons[i] = [
+                    f"One of {found['count'][cluster]} payments to '{vendors[i]}' within "
+                    f"{days_spanned} day{'s' if days_spanned > 1 else ''} totalling {found['total'][cluster]:,.2f}, "
+                    f"each under the {threshold:,.0f} approval threshold "
+                    f"({expected[cluster]:.2f} expected at this vendor's usual rate)"
+                ]
+        return split, reasons
+
+    def batch_findings(self, df: pd.DataFrame, resolution: Optional[pd.DataFrame], is_anomaly: np.ndarray,
+                       splits: Optional[Tuple[np.ndarray, Dict[int, List[str]]]] = None) -> Dict[str, Any]:
+        """Rows of a batch split under an approval threshold, and forensic reasons per row
+
+        Returns ``split`` and ``finding`` row masks and ``reasons`` by row.
+        Splits come from ``batch_splits``, or from ``splits`` when the batch
+        is a chunk of one whose splits were found as a whole.
+        Flagged rows (including the split ones) also get
+        the findings of the latest ledger report for their vendor and
+        department. Only near-threshold amounts have their dates parsed.
+        """
+        finding = np.zeros(len(df), dtype=bool)
+        vendors = canonical_vendors(df, resolution).to_numpy()
+        departments = df['department_id'].tolist()
+        split, reasons = splits if splits is not None else self.batch_splits(df, vendors)
+        reasons = {i: list(found) for i, found in reasons.items()}
+
+        if self._vendor_reasons or self._department_reasons:
+            for i in np.flatnonzero(np.asarray(is_anomaly) | split).tolist():
+                found = (
+                    [f"Vendor: {r}" for r in self._vendor_reasons.get(vendors[i], [])]
+                    + [f"Department: {r}" for r in self._department_reasons.get(departments[i], [])]
+                )
+                if found:
+                    finding[i] = True
+                    reasons.setdefault(i, []).extend(found)
+        return {'split': split, 'finding': finding, 'reasons': reasons}
+
+    def _append(self, chunk: pd.DataFrame):
+        """Add stored rows to the ledger columns, growing them by doubling"""
+        names, uniques = pd.factorize(canonical_vendors(chunk))
+        mapping = np.array([self._vendor_code(name) for name in uniques], dtype=np.int32)
+        needed = self.size + len(chunk)
+        if needed > len(self.amounts):
+            capacity = max(needed, 2 * len(self.amounts), 1024)
+            for name in ('amounts', 'departments', 'vendors', 'days'):
+                column = getattr(self, name)
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+        rows = slice(self.size, needed)
+        self.amounts[rows] = chunk['amount'].to_numpy(dtype=np.float64)
+        self.departments[rows] = chunk['department_id'].to_numpy()
+        self.vendors[rows] = mapping[names]
+        self.days[rows] = to_days(chunk['transaction_date'])
+        self.size = needed
+
+    def _vendor_code(self, name: str) -> int:
+        code = self.vendor_codes.get(name)
+        if code is None:
+            code = self.vendor_codes[name] = len(self.vendor_labels)
+            self.vendor_labels.append(name)
+        return code
+
+    def get_stats(self) -> Dict[str, Any]:
+        report = self.report
+        return {
+            "ledger_rows": self.size,
+            "vendors": len(self.vendor_labels),
+            "refreshes": self.refreshes,
+            "report_at": self.report_at,
+            "report_seconds": round(self.report_seconds, 3),
+            "flagged_vendors": report["vendor"]["flagged_count"] if report else 0,
+            "flagged_departments": report["department"]["flagged_count"] if report else 0,
+            "significant_splits": report["ledger"]["significant_splits"] if report else 0,
+            "ledger_bytes": self.amounts.nbytes + self.departments.nbytes + self.vendors.nbytes + self.days.nbytes
+        }
+
+
+# Global service instance
+forensic_service = ForensicService()
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional
+from config.settings import settings
+from utils.sketches import FrequencySketches
+
+
+class FrequencyService:
+    """Long-running vendor/department frequency statistics backed by sketches.
+
+    Updated from every scored batch, persisted to SKETCH_STATE_PATH every
+    SKETCH_SAVE_SECONDS and on shutdown, and reloaded on startup, so memory
+    stays fixed however many vendors the stream has seen.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path if path is not None else settings.SKETCH_STATE_PATH
+        self.sketches = FrequencySketches(
+            width=settings.SKETCH_WIDTH, depth=settings.SKETCH_DEPTH,
+            precision=settings.SKETCH_HLL_PRECISION, capacity=settings.SKETCH_TOP_K
+        )
+        self._lock = threading.Lock()
+        self._last_saved = time.time()
+        self._loaded = False
+
+    def load(self):
+        """Restore persisted sketches, if any"""
+        with self._lock:
+            self._loaded = True
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'rb') as f:
+                        self.sketches = FrequencySketches.from_bytes(f.read())
+                except Exception as e:
+                    print(f"Error loading frequency sketches: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = self.sketches.to_bytes()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+        self._last_saved = time.time()
+
+    def update(self, df: pd.DataFrame):
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            self.sketches.update(df)
+        if time.time() - self._last_saved >= settings.SKETCH_SAVE_SECONDS:
+            try:
+                self.save()
+            except Exception as e:
+                print(f"Error saving frequency sketches: {e}")
+
+    def merge_bytes(self, data: bytes):
+        """Fold in sketches exported by another worker"""
+        other = FrequencySketches.from_bytes(data)
+        with self._lock:
+            self.sketches.merge(other)
+
+    def expected_counts(self, values: pd.Series, column: str, batches: Optional[np.ndarray] = None,
+                        context: Optional[Dict[str, Any]] = None) -> pd.Series:
+        """Historical frequency of each value scaled to the size of this batch.
+
+        ``count(value) / rows_seen * len(batch)`` keeps the feature on the
+        same scale as the per-batch ``value_counts`` the model was trained
+        with, while reflecting the whole stream instead of one batch. Falls
+        back to per-batch counts until anything has been recorded.
+        ``batches`` scales each row to the size of its own batch instead
+        (see ``batch_counts``), and ``context`` to the size of the whole
+        batch ``values`` are a chunk of.
+        """
+        if not self._loaded:
+            self.load()
+        sketch = self.sketches.vendor_counts if column == 'vendor_name' else self.sketches.department_counts
+        if sketch.total == 0:
+            return batch_counts(values, batches, None if context is None else context[column])
+        keys = values.astype(int) if column == 'department_id' else values.astype(str)
+        estimates = sketch.estimate(keys.to_numpy(dtype=object))
+        if context is not None:
+            sizes = context['rows']
+        else:
+            sizes = len(values) if batches is None else np.bincount(batches)[batches]
+        return pd.Series(estimates / sketch.total * sizes, index=values.index)
+
+    @property
+    def version(self) -> int:
+        """Changes whenever the sketches change; part of result cache keys in sketch mode"""
+        return self.sketches.rows
+
+    def get_stats(self) -> Dict[str, Any]:
+        sketches = self.sketches
+        return {
+            "rows_seen": sketches.rows,
+            "distinct_vendors_estimate": int(round(sketches.distinct_vendors.count())),
+            "distinct_vendors_relative_error": round(sketches.distinct_vendors.relative_error, 4),
+            "vendor_count_error_bound": round(sketches.vendor_counts.error_bound, 1),
+            "top_vendors": sketches.top_vendors.top(5),
+            "top_vendors_by_spend": sketches.top_vendor_spend.top(5),
+            "memory_bytes": sketches.memory_bytes(),
+            "frequency_source": settings.FREQUENCY_SOURCE
+        }
+
+
+def batch_counts(values: pd.Series, batches: Optional[np.ndarray] = None,
+                 counts: Optional[pd.Series] = None) -> pd.Series:
+    """Occurrences of each value in its batch.
+
+    ``batches`` numbers the batch of every row (0, 1, ...) when ``values``
+    holds several, as if each had been sent as a separate request.
+    ``counts`` are the occurrences over a whole batch ``values`` is a chunk of.
+    """
+    if counts is not None:
+        return values.map(counts)
+    if batches is None:
+        return values.map(values.value_counts().to_dict())
+    codes = pd.factorize(values, use_na_sentinel=False)[0]
+    keys = batches * (int(codes.max(initial=0)) + 1) + codes
+    return pd.Series(np.bincount(keys)[keys], index=values.index)
+
+
+def frequency_feature(values: pd.Series, column: str, batches: Optional[np.ndarray] = None,
+                      context: Optional[Dict[str, Any]] = None) -> pd.Series:
+    """Frequency of each value of ``column``: per batch by default, from the stream sketches when FREQUENCY_SOURCE=sketch
+
+    ``context`` (see ``api.anomaly.batch_context``) holds the counts of the
+    whole batch ``values`` are a chunk of.
+    """
+    if settings.FREQUENCY_SOURCE == "sketch":
+        return frequency_service.expected_counts(values, column, batches, context)
+    return batch_counts(values, batches, None if context is None else context[column])
+
+
+# Global service instance
+frequency_service = FrequencyService()
@@ -0,0 +1,295 @@
+import csv
+import io
+import json
+import os
+import threading
+import time
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+from config.settings import settings
+from services.transaction_store import transaction_store
+from utils.data_processor import DataProcessor
+
+LINE_FORMATS = ('.jsonl', '.ndjson', '.csv')
+DOCUMENT_FORMATS = ('.json',)
+
+
+class LedgerIngestionService:
+    """Watches a drop directory and ingests new ledger rows incrementally.
+
+    Line-oriented files (CSV, JSON Lines) are read from their persisted byte
+    offset, in chunks of whole records, so appended data is picked up without
+    re-reading the file. ``.json`` documents shaped like
+    ``data/sample_budgets.json`` cannot be appended byte-wise; for those the
+    offset counts transactions already ingested.
+
+    Each chunk is cleaned with ``DataProcessor``, scored with the loaded
+    anomaly model and recorded. The file offset is committed in the same
+    SQLite transaction as the chunk's rows, so a crash resumes exactly where
+    the last committed chunk ended.
+    """
+
+    def __init__(self, watch_dir: str = None, poll_seconds: float = None,
+                 chunk_bytes: int = None, chunk_rows: int = None):
+        self.watch_dir = watch_dir if watch_dir is not None else settings.INGEST_WATCH_DIR
+        self.poll_seconds = poll_seconds or settings.INGEST_POLL_SECONDS
+        self.chunk_bytes = chunk_bytes or settings.INGEST_CHUNK_BYTES
+        self.chunk_rows = chunk_rows or settings.INGEST_CHUNK_ROWS
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._csv_headers: Dict[str, bytes] = {}
+        self._documents_done: Dict[str, tuple] = {}
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self.rows_ingested = 0
+        self.chunks_processed = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_poll_at: Optional[float] = None
+        self.last_ingest_at: Optional[float] = None
+        self.recent_rows_per_second = 0.0
+
+    def start(self):
+        """Start the background polling thread"""
+        if self._thread is not None or not self.watch_dir:
+            return
+        os.makedirs(self.watch_dir, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ledger-ingestion", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"Error polling ledger directory: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def poll_once(self) -> int:
+        """Ingest everything new in the watch directory; returns rows ingested"""
+        self.last_poll_at = time.time()
+        offsets = transaction_store.get_offsets()
+        ingested = 0
+        for path in self._list_files():
+            if self._stop.is_set():
+                break
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            offset = offsets.get(path, 0)
+            self._files[path] = {"size": stat.st_size, "mtime": stat.st_mtime, "offset": offset}
+            try:
+                if path.endswith(DOCUMENT_FORMATS):
+                    ingested += self._ingest_document(path, offset)
+                else:
+                    ingested += self._ingest_lines(path, offset, stat)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{os.path.basename(path)}: {e}"
+                print(f"Error ingesting {path}: {e}")
+        return ingested
+
+    def _list_files(self) -> List[str]:
+        if not self.watch_dir or not os.path.isdir(self.watch_dir):
+            return []
+        paths = [
+            os.path.join(self.watch_dir, name) for name in os.listdir(self.watch_dir)
+            if name.endswith(LINE_FORMATS + DOCUMENT_FORMATS) and not name.startswith('.')
+        ]
+        return sorted(paths, key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+
+    def _ingest_lines(self, path: str, offset: int, stat: os.stat_result) -> int:
+        is_csv = path.endswith('.csv')
+        if stat.st_size < offset:
+            # Truncated or replaced: start over
+            offset = 0
+            self._csv_headers.pop(path, None)
+        settled = time.time() - stat.st_mtime >= settings.INGEST_SETTLE_SECONDS
+
+        ingested = 0
+        with open(path, 'rb') as f:
+            header = b''
+            if is_csv:
+                header = self._csv_header(path, f)
+                if header is None:
+                    return 0
+                offset = max(offset, len(header))
+            while offset < stat.st_size and not self._stop.is_set():
+                f.seek(offset)
+                data = f.read(self.chunk_bytes)
+                end = self._records_end(data, is_csv)
+                while not end and len(data) >= self.chunk_bytes:
+                    # A single record longer than a chunk
+                    more = f.read(self.chunk_bytes)
+                    if not more:
+                        break
+                    data += more
+                    end = self._records_end(data, is_csv)
+                if end:
+                    data = data[:end]
+                elif not (settled and self._is_complete_record(data, header)):
+                    # Trailing partial record, probably still being written
+                    break
+                records = self._parse_csv(header + data) if is_csv else self._parse_json_lines(data)
+                offset += len(data)
+                ingested += self._process_chunk(path, records, offset)
+        return ingested
+
+    def _csv_header(self, path: str, f) -> Optional[bytes]:
+        header = self._csv_headers.get(path)
+        if header is None:
+            f.seek(0)
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                return None
+            header = self._csv_headers[path] = line
+        return header
+
+    def _ingest_document(self, path: str, offset: int) -> int:
+        info = self._files[path]
+        version = (info["size"], info["mtime"])
+        if self._documents_done.get(path) == version or time.time() - info["mtime"] < settings.INGEST_SETTLE_SECONDS:
+            return 0
+        records = DataProcessor.load_ledger(path, 'json').to_dict(orient='records')
+        if len(records) < offset:
+            offset = 0
+        ingested = 0
+        for start in range(offset, len(records), self.chunk_rows):
+            if self._stop.is_set():
+                break
+            chunk = records[start:start + self.chunk_rows]
+            ingested += self._process_chunk(path, chunk, start + len(chunk))
+        else:
+            self._documents_done[path] = version
+        return ingested
+
+    @staticmethod
+    def _records_end(data: bytes, is_csv: bool) -> int:
+        """Length of the newline-terminated whole records at the start of ``data``"""
+        if not is_csv:
+            return data.rfind(b'\n') + 1
+        ends = [end for end, _ in _csv_records(data) if data[end - 1:end] in (b'\n', b'\r')]
+        return ends[-1] if ends else 0
+
+    @staticmethod
+    def _is_complete_record(data: bytes, csv_header: bytes) -> bool:
+        """Whether an unterminated last record is whole (files need not end in a newline)"""
+        if csv_header:
+            records = _csv_records(data)
+            header_fields = _csv_records(csv_header)[0][1]
+            return len(records) == 1 and records[0][0] == len(data) and records[0][1] >= header_fields
+        try:
+            json.loads(data)
+            return True
+        except ValueError:
+            return False
+
+    @staticmethod
+    def _parse_json_lines(data: bytes) -> List[Dict[str, Any]]:
+        records = []
+        for line in data.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records
+
+    @staticmethod
+    def _parse_csv(data: bytes) -> List[Dict[str, Any]]:
+        return pd.read_csv(io.BytesIO(data)).to_dict(orient='records')
+
+    def _process_chunk(self, path: str, records: List[Dict[str, Any]], new_offset: int) -> int:
+        """Clean, score and record one chunk, committing the file offset with it"""
+        from api.anomaly import score_transactions, REQUIRED_COLUMNS
+        from services.result_sinks import record_scored_batch
+
+        start = time.perf_counter()
+        valid = [r for r in records if all(r.get(c) is not None for c in REQUIRED_COLUMNS)]
+        df = DataProcessor.clean_transaction_data(valid) if valid else pd.DataFrame()
+        if len(df):
+            df = df.reset_index(drop=True)
+            scored = score_transactions(df)
+            record_scored_batch(df, scored['scores'], scored['is_anomaly'],
+                                source=f"ingest:{os.path.basename(path)}", source_offset=(path, new_offset),
+                                reason_codes=scored['reason_codes'], model_version=scored['model_version'])
+        else:
+            transaction_store.save_offset(path, new_offset)
+
+        elapsed = time.perf_counter() - start
+        self.rows_ingested += len(df)
+        self.chunks_processed += 1
+        self.last_ingest_at = time.time()
+        if elapsed > 0 and len(df):
+            rate = len(df) / elapsed
+            self.recent_rows_per_second = rate if not self.recent_rows_per_second else (
+                0.8 * self.recent_rows_per_second + 0.2 * rate)
+        self._files[path]["offset"] = new_offset
+        return len(df)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Lag and throughput of the ingestion pipeline"""
+        now = time.time()
+        pending_bytes = 0
+        oldest_pending = None
+        for path, info in self._files.items():
+            if path.endswith(LINE_FORMATS) and info["size"] > info["offset"]:
+                pending_bytes += info["size"] - info["offset"]
+                oldest_pending = min(oldest_pending or info["mtime"], info["mtime"])
+        return {
+            "enabled": bool(self.watch_dir),
+            "running": self._thread is not None,
+            "watch_dir": self.watch_dir,
+            "files_tracked": len(self._files),
+            "rows_ingested": self.rows_ingested,
+            "chunks_processed": self.chunks_processed,
+            "rows_per_second": round(self.recent_rows_per_second, 1),
+            "pending_bytes": pending_bytes,
+            "lag_seconds": round(now - oldest_pending, 1) if oldest_pending else 0.0,
+            "last_poll_at": self.last_poll_at,
+            "last_ingest_at": self.last_ingest_at,
+            "errors": self.errors,
+            "last_error": self.last_error
+        }
+
+
+def _csv_records(data: bytes) -> List[Tuple[int, int]]:
+    """(end offset, field count) of each record the csv module reads from ``data``.
+
+    Record boundaries come from the csv reader itself, so a quoted field
+    holding newlines or commas stays in one record. A record still inside
+    an open quote when the data runs out is left out.
+    """
+    lines = data.splitlines(keepends=True)
+    consumed = 0
+    exhausted = False
+
+    def feed():
+        nonlocal consumed, exhausted
+        for line in lines:
+            consumed += len(line)
+            yield line.decode('utf-8', errors='replace')
+        exhausted = True
+
+    records = []
+    for row in csv.reader(feed()):
+        if exhausted:
+            # The reader ran out of lines mid-record
+            break
+        records.append((consumed, len(row)))
+    return records
+
+
+# Global service instance
+ingestion_service = LedgerIngestionService()
@@ -0,0 +1,325 @@
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+import pandas as pd
+import numpy as np
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from config.settings import settings
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobQueueFullError(Exception):
+    """Raised when the job queue has no room for another submission"""
+
+
+class AnalysisJob:
+    """State of one asynchronous anomaly analysis"""
+
+    def __init__(self, job_id: str, total_rows: int, results_dir: str):
+        self.id = job_id
+        self.total_rows = total_rows
+        self.results_dir = results_dir
+        self.status = JOB_QUEUED
+        self.rows_processed = 0
+        self.anomalies_found = 0
+        self.chunk_sizes: List[int] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        # Look-alike and forensic reasons of the rows that have them, by row index
+        self.lookalikes: Dict[int, tuple] = {}
+        self.forensic: Dict[int, List[str]] = {}
+        self.vendor_names: Dict[int, str] = {}
+
+    @property
+    def input_path(self) -> str:
+        return os.path.join(self.results_dir, "input.pkl")
+
+    def chunk_path(self, chunk_index: int) -> str:
+        return os.path.join(self.results_dir, f"chunk_{chunk_index:06d}.npz")
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total_rows": self.total_rows,
+            "rows_processed": self.rows_processed,
+            "anomalies_found": self.anomalies_found,
+            "progress_percent": round(100.0 * self.rows_processed / self.total_rows, 2) if self.total_rows else 100.0,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_wait_seconds": round((self.started_at or end) - self.created_at, 3),
+            "run_seconds": round(end - self.started_at, 3) if self.started_at else None,
+            "error": self.error
+        }
+
+
+class AnalysisJobService:
+    """Bounded worker pool that scores large batches in chunks off the request path.
+
+    The submitted dataset is spilled to the job's results directory, so
+    queued jobs hold no memory once the 202 is returned; a worker loads it
+    back and scores it chunk by chunk with the same ``score_transactions``
+    as ``/detect`` (vendor resolution, look-alike and split flags included).
+    Batch-relative features come from a first pass over the whole dataset,
+    so scores match scoring it as one batch, while only one chunk's
+    features are in memory. Each chunk's results are written to a ``.npz``
+    file and counted in the job's progress as it finishes, and cancellation
+    is checked between chunks. Workers run at a lower OS scheduling
+    priority and yield between chunks so interactive requests are not
+    starved.
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = None, chunk_size: int = None,
+                 results_dir: str = None):
+        self.workers = workers or settings.JOB_WORKERS
+        self.chunk_size = chunk_size or settings.JOB_CHUNK_SIZE
+        self.results_dir = results_dir or settings.JOB_RESULTS_DIR
+        self._queue: "queue.Queue[Optional[AnalysisJob]]" = queue.Queue(maxsize=queue_size or settings.JOB_QUEUE_SIZE)
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._durations: List[float] = []
+        self._queue_waits: List[float] = []
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"analysis-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, transactions: List[Dict[str, Any]]) -> AnalysisJob:
+        """Spill a dataset to disk and queue it for analysis"""
+        self._expire_old_jobs()
+        if self._queue.full():
+            raise JobQueueFullError(f"Job queue is full ({self._queue.maxsize} jobs waiting)")
+        job_id = uuid.uuid4().hex
+        data = pd.DataFrame(transactions)
+        job = AnalysisJob(job_id, len(data), os.path.join(self.results_dir, job_id))
+        os.makedirs(job.results_dir, exist_ok=True)
+        data.to_pickle(job.input_path)
+        del data
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            shutil.rmtree(job.results_dir, ignore_errors=True)
+            raise JobQueueFullError(f"Job queue is full ({self._queue.maxsize} jobs waiting)")
+        with self._lock:
+            self._jobs[job_id] = job
+        self._ensure_workers()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[AnalysisJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[AnalysisJob]:
+        """Request cancellation; a running job stops at the next chunk boundary"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.status == JOB_QUEUED:
+            self._finish(job, JOB_CANCELLED)
+        return job
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 1000) -> Optional[Dict[str, Any]]:
+        """Page through the results spilled so far"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        from api.anomaly import get_anomaly_reasons
+
+        available = job.rows_processed
+        end = min(offset + limit, available)
+        results = []
+        chunk_start = 0
+        for chunk_index, size in enumerate(list(job.chunk_sizes)):
+            chunk_end = chunk_start + size
+            if chunk_end > offset and chunk_start < end:
+                with np.load(job.chunk_path(chunk_index)) as chunk:
+                    scores, flags, amounts = chunk["scores"], chunk["is_anomaly"], chunk["amount"]
+                lo, hi = max(offset, chunk_start) - chunk_start, min(end, chunk_end) - chunk_start
+                for i in range(lo, hi):
+                    row = chunk_start + i
+                    score = float(scores[i])
+                    anomaly = bool(flags[i])
+                    transaction = {"amount": amounts[i], "vendor_name": job.vendor_names.get(row)}
+                    results.append({
+                        "transaction_index": row,
+                        "anomaly_score": score,
+                        "is_anomaly": anomaly,
+                        "reasons": get_anomaly_reasons(transaction, score, anomaly, None,
+                                                       job.lookalikes.get(row), job.forensic.get(row))
+                    })
+            chunk_start = chunk_end
+            if chunk_start >= end:
+                break
+
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "offset": offset,
+            "limit": limit,
+            "available": available,
+            "total_rows": job.total_rows,
+            "next_offset": end if end < available or job.status not in FINISHED_STATES else None,
+            "results": results
+        }
+
+    def iter_result_chunks(self, job: AnalysisJob) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+        """Yield (first row index, result arrays) for every spilled chunk"""
+        chunk_start = 0
+        for chunk_index, size in enumerate(list(job.chunk_sizes)):
+            with np.load(job.chunk_path(chunk_index)) as chunk:
+                arrays = {name: chunk[name] for name in chunk.files}
+            yield chunk_start, arrays
+            chunk_start += size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, worker usage and job duration statistics"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+            durations = list(self._durations)
+            waits = list(self._queue_waits)
+        by_status = {state: 0 for state in (JOB_QUEUED, JOB_RUNNING) + FINISHED_STATES}
+        for job in jobs:
+            by_status[job.status] += 1
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "workers": self.workers,
+            "running": by_status[JOB_RUNNING],
+            "jobs_by_status": by_status,
+            "duration_seconds": _summarise(durations),
+            "queue_wait_seconds": _summarise(waits)
+        }
+
+    def _worker(self):
+        _lower_thread_priority()
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            try:
+                if job.status == JOB_QUEUED:
+                    self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: AnalysisJob):
+        from main import get_ml_models
+        from api.anomaly import score_transactions, batch_context
+        from services.result_sinks import record_scored_batch
+
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        try:
+            if "anomaly_detector" not in get_ml_models():
+                raise ValueError("Anomaly detection model not loaded")
+            if job.cancel_event.is_set():
+                self._finish(job, JOB_CANCELLED)
+                return
+
+            # Batch-relative features and split flags come from the whole dataset, so chunks score as /detect would
+            data = pd.read_pickle(job.input_path)
+            context = batch_context(data, self.chunk_size)
+
+            for chunk_index, start in enumerate(range(0, job.total_rows, self.chunk_size)):
+                if job.cancel_event.is_set():
+                    self._finish(job, JOB_CANCELLED)
+                    return
+                chunk = data.iloc[start:start + self.chunk_size]
+                scored = score_transactions(chunk, context=context)
+                scores, flags, codes = scored['scores'], scored['is_anomaly'], scored['reason_codes']
+                np.savez(job.chunk_path(chunk_index), scores=scores, is_anomaly=flags,
+                         amount=chunk["amount"].to_numpy(), reason_codes=codes)
+                record_scored_batch(chunk, scores, flags, source=f"job:{job.id}",
+                                    reason_codes=codes, model_version=scored['model_version'])
+                job.lookalikes.update((start + i, found) for i, found in scored['lookalikes'].items())
+                job.forensic.update((start + i, found) for i, found in scored['forensic'].items())
+                job.vendor_names.update((start + i, chunk["vendor_name"].iat[i]) for i in scored['lookalikes'])
+                job.chunk_sizes.append(len(chunk))
+                job.anomalies_found += int(flags.sum())
+                job.rows_processed += len(chunk)
+                # Give the request-serving threads a chance at the GIL between chunks
+                time.sleep(0)
+
+            self._finish(job, JOB_COMPLETED)
+        except Exception as e:
+            job.error = str(e) or repr(e)
+            self._finish(job, JOB_FAILED)
+
+    def _finish(self, job: AnalysisJob, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        try:
+            os.remove(job.input_path)
+        except OSError:
+            pass
+        with self._lock:
+            if job.started_at:
+                self._durations = (self._durations + [job.finished_at - job.started_at])[-1000:]
+                self._queue_waits = (self._queue_waits + [job.started_at - job.created_at])[-1000:]
+
+    def _expire_old_jobs(self):
+        cutoff = time.time() - settings.JOB_RETENTION_SECONDS
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.status in FINISHED_STATES and job.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.results_dir, ignore_errors=True)
+
+    def shutdown(self):
+        """Stop workers after their current job"""
+        for job in list(self._jobs.values()):
+            job.cancel_event.set()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+
+
+def _summarise(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values)
+    return {
+        "count": len(values),
+        "mean": round(float(arr.mean()), 3),
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "max": round(float(arr.max()), 3)
+    }
+
+
+def _lower_thread_priority():
+    """Lower this worker thread's nice value (Linux applies it per thread)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), settings.JOB_WORKER_NICE)
+    except (AttributeError, OSError):
+        pass
+
+
+# Global service instance
+job_service = AnalysisJobService()
@@ -0,0 +1,173 @@
+import hashlib
+import pickle
+import sys
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional, Tuple
+from config.settings import settings
+
+CACHE_HIT = "HIT"
+CACHE_MISS = "MISS"
+CACHE_COALESCED = "COALESCED"
+
+_model_fingerprints: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+
+
+def model_fingerprint(model) -> str:
+    """Content hash of a fitted model, computed once per model object"""
+    fingerprint = _model_fingerprints.get(model)
+    if fingerprint is None:
+        fingerprint = hashlib.sha256(pickle.dumps(model)).hexdigest()[:16]
+        _model_fingerprints[model] = fingerprint
+    return fingerprint
+
+
+def batch_fingerprint(df: pd.DataFrame, columns) -> str:
+    """Hash of the columns that determine a batch's scores, in row order.
+
+    Numbers are hashed as fixed-width binary and strings as their UTF-8
+    lengths followed by their bytes, so no two different columns hash the
+    same input and equal batches hash equally however their JSON was
+    formatted.
+    """
+    digest = hashlib.sha256()
+    digest.update(str(len(df)).encode())
+    for column in columns:
+        values = df[column]
+        digest.update(column.encode())
+        if pd.api.types.is_numeric_dtype(values):
+            digest.update(np.ascontiguousarray(values.to_numpy(dtype=np.float64)).tobytes())
+        else:
+            encoded = [value.encode() for value in values.astype(str).tolist()]
+            digest.update(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)).tobytes())
+            digest.update(b"".join(encoded))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Bounded LRU of scoring results with in-flight request coalescing.
+
+    Keys are content hashes, so a retry or another dashboard tab sending the
+    same batch is served from memory. While a batch is being scored, identical
+    requests wait on the same future instead of scoring it again. Entries are
+    tied to a model version; when the version changes the cache is emptied.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.RESULT_CACHE_MAX_MB * 1024 * 1024
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.model_version = None
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, key: str, model_version: str, compute: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], str]:
+        """Return ``(result, status)`` for a key, computing it at most once at a time"""
+        with self._lock:
+            if model_version != self.model_version:
+                if self.model_version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.current_bytes = 0
+                self.model_version = model_version
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], CACHE_HIT
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+                owner = True
+
+        if not owner:
+            return future.result(), CACHE_COALESCED
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        self._store(key, model_version, result)
+        future.set_result(result)
+        return result, CACHE_MISS
+
+    def peek(self, key: str, model_version: str) -> Optional[Dict[str, Any]]:
+        """Cached result for a key, or None if it was evicted or scored by another model version"""
+        with self._lock:
+            if model_version != self.model_version:
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _store(self, key: str, model_version: str, result: Dict[str, Any]):
+        size = _estimate_size(result)
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if model_version != self.model_version or size > self.max_bytes:
+                return
+            self._entries[key] = (result, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "in_flight": len(self._in_flight),
+            "model_version": self.model_version
+        }
+
+
+def _estimate_size(result: Dict[str, Any]) -> int:
+    """Approximate memory held by a cached result, including its dict and list payloads"""
+    return 256 + sum(_value_size(value) for value in result.values())
+
+
+def _value_size(value: Any) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_value_size(k) + _value_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_value_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+# Global cache instance
+result_cache = ResultCache()
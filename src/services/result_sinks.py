@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+from config.settings import settings
+from services.transaction_store import transaction_store
+from services.audit_log import audit_log
+from services.alert_service import alert_broker
+from services.frequency_service import frequency_service
+from services.variance_service import variance_service
+from services.vendor_service import vendor_resolver
+
+
+def record_scored_batch(df: pd.DataFrame, scores: np.ndarray, is_anomaly: np.ndarray, source: str = "api",
+                        source_offset: Optional[Tuple[str, int]] = None,
+                        reason_codes: Optional[np.ndarray] = None, model_version: Optional[str] = None):
+    """Hand a scored batch to every downstream consumer.
+    
+    Called from all scoring paths (detect, jobs, ingestion). Failures are
+    logged rather than raised so they never fail the scoring itself.
+    ``source_offset`` is the ingestion resume point covered by this batch; it
+    is committed with the stored rows, and storage errors for such batches
+    are re-raised so the ingester retries instead of skipping past them.
+    ``reason_codes`` and ``model_version`` go to the audit log; the live
+    model's fingerprint stands in when the caller does not know it.
+    
+    Every scoring decision goes to the audit log and to alert subscribers,
+    including a batch scored again by another model. The store goes first
+    and the counting consumers (spend series, frequency sketches) only see
+    the rows it newly stored, so a batch recorded again after a failure or
+    a cache miss is not counted twice.
+    """
+    # New spellings are learned here (learning one twice is a no-op); the
+    # spend series, frequency sketches and alert filters use canonical vendors
+    canonical = df
+    if settings.VENDOR_RESOLUTION_ENABLED:
+        try:
+            resolved = vendor_resolver.learn(df['vendor_name'])
+            canonical = df.assign(vendor_name=resolved['canonical_name'])
+        except Exception as e:
+            print(f"Error resolving vendor names: {e}")
+    
+    if settings.AUDIT_LOG_ENABLED:
+        try:
+            if model_version is None:
+                model_version = live_model_version()
+            audit_log.append(df, scores, is_anomaly, reason_codes, model_version, source)
+        except Exception as e:
+            print(f"Error queueing audit records: {e}")
+    
+    if alert_broker.has_subscribers:
+        try:
+            alert_broker.publish(df, scores, is_anomaly, source, canonical=canonical['vendor_name'])
+        except Exception as e:
+            print(f"Error publishing anomaly alerts: {e}")
+    
+    fresh = None
+    if settings.STORE_SCORED_TRANSACTIONS:
+        # The spend series are rebuilt from the store on first use, so that happens before this batch lands
+        variance_service.warm()
+        try:
+            fresh = transaction_store.insert_scored_mask(df, scores, is_anomaly, source, source_offset)
+        except Exception as e:
+            print(f"Error storing scored transactions: {e}")
+            if source_offset is not None:
+                raise
+    elif source_offset is not None:
+        transaction_store.save_offset(*source_offset)
+    
+    if fresh is not None and not fresh.all():
+        if not fresh.any():
+            return
+        df, canonical = df[fresh], canonical[fresh]
+        scores, is_anomaly = np.asarray(scores)[fresh], np.asarray(is_anomaly)[fresh]
+    
+    try:
+        variance_service.update(canonical)
+    except Exception as e:
+        print(f"Error updating spend series: {e}")
+    
+    try:
+        frequency_service.update(canonical)
+    except Exception as e:
+        print(f"Error updating frequency sketches: {e}")
+
+
+def live_model_version() -> Optional[str]:
+    """Fingerprint of the anomaly model currently serving, if one is loaded"""
+    # Import here to avoid circular import
+    from main import get_ml_models
+    from services.result_cache import model_fingerprint
+    model = get_ml_models().get("anomaly_detector")
+    return model_fingerprint(model) if model is not None else None
@@ -0,0 +1,77 @@
+import threading
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Dict, Any, List, Optional
+from config.settings import settings
+from services.transaction_store import transaction_store
+from utils.range_index import RangeIndex, NO_DAY
+
+EPOCH = date(1970, 1, 1)
+
+
+def to_day(value: Optional[str]) -> Optional[int]:
+    """Days since 1970-01-01 for a YYYY-MM-DD string"""
+    if value is None:
+        return None
+    return (date.fromisoformat(value[:10]) - EPOCH).days
+
+
+class TransactionSearch:
+    """Answers amount/date range filters over the stored transactions.
+
+    The range index is built from the transaction store on first use and
+    catches up with rows inserted since (by id) before every search, so it
+    covers every scoring path without hooks of its own.
+    """
+
+    def __init__(self):
+        self.index = RangeIndex()
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def sync(self):
+        """Add rows stored since the last sync"""
+        if not settings.STORE_SCORED_TRANSACTIONS:
+            return
+        with self._lock:
+            for chunk in transaction_store.iter_rows_since(self._last_id):
+                days = pd.to_datetime(chunk['transaction_date'].str.slice(0, 10), format='%Y-%m-%d', errors='coerce')
+                day_numbers = days.to_numpy().astype('datetime64[D]').astype(np.int64)
+                day_numbers[days.isna().to_numpy()] = NO_DAY
+                self.index.add(chunk['id'].to_numpy(), chunk['amount'].to_numpy(),
+                               day_numbers, chunk['department_id'].to_numpy())
+                self._last_id = int(chunk['id'].iat[-1])
+
+    def search(self, filters: Dict[str, Any], department_id: Optional[int] = None, limit: int = 10) -> Dict[str, Any]:
+        """Count, total and the largest ``limit`` transactions matching ``filters``
+
+        ``filters`` takes the keys produced by ``utils.query_filters.extract_filters``:
+        ``amount_min``, ``amount_max``, ``date_from`` and ``date_to`` (all inclusive).
+        """
+        self.sync()
+        with self._lock:
+            row_ids, amounts = self.index.search(
+                amount_min=filters.get('amount_min'),
+                amount_max=filters.get('amount_max'),
+                day_from=to_day(filters.get('date_from')),
+                day_to=to_day(filters.get('date_to')),
+                department_id=department_id
+            )
+        if limit and len(amounts) > limit:
+            top = np.argpartition(-amounts, limit - 1)[:limit]
+        else:
+            top = np.arange(len(amounts))
+        top = top[np.argsort(-amounts[top], kind='stable')][:limit]
+        return {
+            'count': int(len(row_ids)),
+            'total_amount': float(amounts.sum()),
+            'transactions': transaction_store.transactions_by_ids(row_ids[top].tolist())
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.index.get_stats(), last_synced_id=self._last_id)
+
+
+# Global search instance
+transaction_search = TransactionSearch()
@@ -0,0 +1,275 @@
+import copy
+import os
+import threading
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+from config.settings import settings
+from services.detector_service import detector_service
+from services.transaction_store import transaction_store
+from utils.sketches import ReservoirSample
+
+
+def reservoir_sample_frames(frames: Iterable[pd.DataFrame], sample_size: int = None,
+                            seed: int = 42) -> Tuple[pd.DataFrame, int]:
+    """Uniform sample of at most ``sample_size`` rows of a stream of numeric frames, and the rows seen"""
+    reservoir = None
+    columns = None
+    for frame in frames:
+        if not len(frame):
+            continue
+        if reservoir is None:
+            columns = frame.columns.tolist()
+            reservoir = ReservoirSample(sample_size or settings.TRAIN_SAMPLE_SIZE, len(columns), seed=seed)
+        reservoir.update(frame[columns].to_numpy(dtype=np.float32))
+    if reservoir is None:
+        raise ValueError("No rows to train on")
+    return pd.DataFrame(reservoir.sample(), columns=columns), reservoir.seen
+
+
+def request_batches(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Batch number of each of ``n`` rows cut into consecutive request-sized batches
+
+    Batch-relative features such as frequencies grow with the size of the
+    request they are computed in, so sizes are drawn from the batches
+    scored recently, or log-uniformly between TRAIN_FEATURE_BATCH_MIN_ROWS
+    and TRAIN_FEATURE_BATCH_MAX_ROWS before anything has been scored.
+    """
+    low = max(settings.TRAIN_FEATURE_BATCH_MIN_ROWS, 1)
+    recent = np.fromiter(detector_service.batch_sizes, dtype=np.int64)
+    if len(recent):
+        low = max(int(recent.min()), 1)
+        sizes = rng.choice(recent, size=n // low + 1)
+    else:
+        high = max(settings.TRAIN_FEATURE_BATCH_MAX_ROWS, low)
+        sizes = np.exp(rng.uniform(np.log(low), np.log(high + 1), size=n // low + 1)).astype(np.int64)
+    return np.searchsorted(np.cumsum(np.maximum(sizes, 1)), np.arange(n), side='right')
+
+
+def model_config(model: IsolationForest) -> Dict[str, Any]:
+    """The tunable settings a forest was fitted with, as recorded in its artifact"""
+    from api.anomaly import FEATURE_SETS, feature_columns
+    columns = feature_columns(model)
+    return {
+        "n_estimators": model.n_estimators,
+        "max_samples": model.max_samples,
+        "contamination": model.contamination,
+        "feature_set": next((name for name, names in FEATURE_SETS.items() if names == columns), None),
+        "features": columns
+    }
+
+
+def save_model_artifact(path: str, model: IsolationForest, last_trained_id: int = 0,
+                        feature_moments: Optional[Dict[str, Dict[str, float]]] = None) -> bool:
+    """Write a model where ``ModelTrainingService.load`` picks it up, together with its configuration"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp"
+        joblib.dump({'model': model, 'last_trained_id': last_trained_id, 'config': model_config(model),
+                     'feature_moments': feature_moments}, temporary)
+        os.replace(temporary, path)
+        return True
+    except Exception as e:
+        print(f"Error saving trained model: {e}")
+        return False
+
+
+class ModelTrainingService:
+    """Retrains the live anomaly model from the transaction store in the background.
+
+    ``full`` streams every stored row through ``prepare_features`` into a
+    reservoir sample and fits a new forest on it. ``grow`` fits extra trees
+    (``warm_start``) on a sample of the rows stored since the last run and
+    adds them to a copy of the live forest, falling back to a full run once
+    the forest would pass ``TRAIN_MAX_ESTIMATORS``. Only the reservoir and
+    one chunk of rows are held in memory. The fitted model replaces the live
+    one in a single assignment and is saved so it survives restarts.
+
+    Batch-relative features (frequencies, vendor medians, duplicates) are
+    built per request-sized batch (``request_batches``), the scale requests
+    are scored at, not per chunk. Before it goes live, the new model scores
+    the most recent ``TRAIN_CHECK_ROWS`` rows, cut into batches the same
+    way and run through the scoring features one batch at a time, and is
+    rejected if it flags more than ``TRAIN_MAX_FLAG_RATE_RATIO`` times its
+    contamination. Per-feature means and standard deviations over every
+    row read (streaming moments, as in ``AdvancedAnomalyDetector.fit_stream``)
+    are kept with the model.
+    """
+
+    def __init__(self, model_path: str = None):
+        self.model_path = model_path or settings.TRAIN_MODEL_PATH
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.status = "idle"
+        self.mode: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.rows_seen = 0
+        self.sample_rows = 0
+        self.sample_mb = 0.0
+        self.n_estimators: Optional[int] = None
+        self.last_trained_id = 0
+        self.error: Optional[str] = None
+        self._read_id = 0
+        self.config: Optional[Dict[str, Any]] = None
+        self.flag_rate: Optional[float] = None
+        self.feature_moments: Optional[Dict[str, Dict[str, float]]] = None
+        self._moments: Optional[StandardScaler] = None
+        self._rng = np.random.default_rng(settings.ANOMALY_RANDOM_STATE)
+
+    def load(self) -> bool:
+        """Install the saved model, if any, as the live anomaly model"""
+        if not os.path.exists(self.model_path):
+            return False
+        try:
+            data = joblib.load(self.model_path)
+        except Exception as e:
+            print(f"Error loading trained model: {e}")
+            return False
+        from main import get_ml_models
+        get_ml_models()["anomaly_detector"] = data['model']
+        self.last_trained_id = data['last_trained_id']
+        self.n_estimators = data['model'].n_estimators
+        self.config = data.get('config')
+        self.feature_moments = data.get('feature_moments')
+        print(f"✅ Trained anomaly model loaded ({self.n_estimators} trees)")
+        return True
+
+    def start(self, mode: str = "full") -> bool:
+        """Begin a training run in a background thread; returns False if one is already running"""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.status = "running"
+            self.mode = mode
+            self.started_at = time.time()
+            self.finished_at = None
+            self.error = None
+            self._thread = threading.Thread(target=self._run, args=(mode,), name="model-training", daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self, mode: str):
+        try:
+            self.train(mode)
+            self.status = "completed"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            print(f"Error training anomaly model: {e}")
+        finally:
+            with self._lock:
+                self.finished_at = time.time()
+                self._thread = None
+
+    def train(self, mode: str = "full") -> IsolationForest:
+        """Fit a model from the stored transactions and make it the live one"""
+        from main import get_ml_models
+        from api.anomaly import FEATURE_SETS, feature_columns
+        live = get_ml_models().get("anomaly_detector")
+        grow = (mode == "grow" and live is not None and self.last_trained_id > 0
+                and live.n_estimators + settings.TRAIN_GROW_ESTIMATORS <= settings.TRAIN_MAX_ESTIMATORS)
+        after_id = self.last_trained_id if grow else 0
+        columns = feature_columns(live) if grow else FEATURE_SETS[settings.ANOMALY_FEATURE_SET]
+
+        self._read_id = after_id
+        self._moments = StandardScaler()
+        self._rng = np.random.default_rng(settings.ANOMALY_RANDOM_STATE + after_id)
+        try:
+            sample, self.rows_seen = reservoir_sample_frames(
+                self._feature_chunks(after_id, columns), seed=settings.ANOMALY_RANDOM_STATE + after_id)
+        except ValueError:
+            raise ValueError("No transactions stored since the last training run" if grow else "No transactions stored")
+        self.sample_rows = len(sample)
+        self.sample_mb = round(sample.memory_usage(index=False).sum() / 1024 ** 2, 1)
+
+        if grow:
+            # Fit the added trees on a copy: the live forest keeps scoring, and caches keyed on it stay valid
+            model = copy.deepcopy(live)
+            model.n_estimators += settings.TRAIN_GROW_ESTIMATORS
+        else:
+            model = IsolationForest(
+                n_estimators=settings.TRAIN_N_ESTIMATORS,
+                max_samples=settings.TRAIN_MAX_SAMPLES,
+                contamination=settings.ANOMALY_CONTAMINATION,
+                n_jobs=settings.TRAIN_N_JOBS,
+                random_state=settings.ANOMALY_RANDOM_STATE
+            )
+        model.warm_start = True
+        model.n_jobs = settings.TRAIN_N_JOBS
+        model.fit(sample)
+
+        self.flag_rate = self._recent_flag_rate(model, columns)
+        contamination = model.contamination if model.contamination != "auto" else settings.ANOMALY_CONTAMINATION
+        if self.flag_rate is not None and self.flag_rate > settings.TRAIN_MAX_FLAG_RATE_RATIO * contamination:
+            raise ValueError(f"Retrained model flags {self.flag_rate:.1%} of the latest rows against a contamination "
+                             f"of {contamination:.1%}; keeping the live model")
+
+        get_ml_models()["anomaly_detector"] = model
+        self.mode = "grow" if grow else "full"
+        self.last_trained_id = self._read_id
+        self.n_estimators = model.n_estimators
+        self.config = model_config(model)
+        self.feature_moments = {
+            name: {"mean": round(float(mean), 4), "std": round(float(scale), 4)}
+            for name, mean, scale in zip(columns, self._moments.mean_, self._moments.scale_)
+        }
+        save_model_artifact(self.model_path, model, self.last_trained_id, self.feature_moments)
+        # The cascade's routine-row statistics follow the same ledger
+        detector_service.fit()
+        return model
+
+    def _feature_chunks(self, after_id: int, columns: List[str]):
+        """Model features of stored rows after ``after_id``, chunk by chunk; records the last id read"""
+        from api.anomaly import prepare_features
+        for chunk in transaction_store.iter_rows_since(
+                after_id, settings.TRAIN_CHUNK_ROWS,
+                columns=('amount', 'department_id', 'vendor_name', 'transaction_date')):
+            self._read_id = int(chunk['id'].iat[-1])
+            features = prepare_features(chunk, columns=columns, batches=request_batches(len(chunk), self._rng))
+            self._moments.partial_fit(features.to_numpy())
+            yield features
+
+    def _recent_flag_rate(self, model: IsolationForest, columns: List[str]) -> Optional[float]:
+        """Share of the latest stored rows the model flags, scored one request-sized batch at a time like /detect"""
+        from api.anomaly import build_feature_matrix
+        last_id = transaction_store.query("SELECT COALESCE(MAX(id), 0) AS last_id FROM transactions")[0]['last_id']
+        flagged = scored = 0
+        for chunk in transaction_store.iter_rows_since(
+                max(last_id - settings.TRAIN_CHECK_ROWS, 0), settings.TRAIN_CHECK_ROWS,
+                columns=('amount', 'department_id', 'vendor_name', 'transaction_date')):
+            batches = request_batches(len(chunk), self._rng)
+            bounds = np.flatnonzero(np.diff(batches, prepend=-1, append=batches[-1] + 1))
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                batch = chunk.iloc[start:end]
+                matrix = build_feature_matrix(batch, None, columns, reuse=False)
+                flagged += int((model.decision_function(pd.DataFrame(matrix, columns=columns, copy=False)) < 0).sum())
+                scored += len(batch)
+        return flagged / scored if scored else None
+
+    def get_status(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "status": self.status,
+            "mode": self.mode,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "run_seconds": round(end - self.started_at, 3) if self.started_at else None,
+            "rows_seen": self.rows_seen,
+            "sample_rows": self.sample_rows,
+            "n_estimators": self.n_estimators,
+            "last_trained_id": self.last_trained_id,
+            "sample_mb": self.sample_mb,
+            "config": self.config,
+            "flag_rate": round(self.flag_rate, 4) if self.flag_rate is not None else None,
+            "feature_moments": self.feature_moments,
+            "error": self.error
+        }
+
+
+# Global training instance
+training_service = ModelTrainingService()
@@ -0,0 +1,370 @@
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from config.settings import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    amount REAL NOT NULL,
+    department_id INTEGER NOT NULL,
+    vendor_name TEXT NOT NULL,
+    transaction_date TEXT NOT NULL,
+    description TEXT,
+    anomaly_score REAL,
+    is_anomaly INTEGER NOT NULL DEFAULT 0,
+    source TEXT,
+    ingested_at REAL NOT NULL,
+    row_key INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_vendor ON transactions (vendor_name, transaction_date);
+CREATE INDEX IF NOT EXISTS idx_transactions_department ON transactions (department_id, transaction_date);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (transaction_date);
+CREATE INDEX IF NOT EXISTS idx_transactions_anomalies ON transactions (ingested_at) WHERE is_anomaly = 1;
+
+-- Running aggregates maintained in the same write transaction as the rows
+CREATE TABLE IF NOT EXISTS vendor_totals (
+    vendor_name TEXT PRIMARY KEY,
+    total_amount REAL NOT NULL,
+    transaction_count INTEGER NOT NULL,
+    anomaly_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS department_daily (
+    department_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    total_amount REAL NOT NULL,
+    transaction_count INTEGER NOT NULL,
+    anomaly_count INTEGER NOT NULL,
+    PRIMARY KEY (department_id, day)
+) WITHOUT ROWID;
+
+-- Resume points for directory ingestion, committed with the rows they cover
+CREATE TABLE IF NOT EXISTS ingest_offsets (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Added after the first release; older databases get the column on open
+ROW_KEY_SCHEMA = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_row_key ON transactions (row_key);
+"""
+
+INSERT_SQL = """
+INSERT OR IGNORE INTO transactions (
+    amount, department_id, vendor_name, transaction_date, description,
+    anomaly_score, is_anomaly, source, ingested_at, row_key
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Bound parameters per IN (...) lookup of existing keys
+KEY_LOOKUP_CHUNK = 900
+
+UPSERT_VENDOR_SQL = """
+INSERT INTO vendor_totals (vendor_name, total_amount, transaction_count, anomaly_count)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (vendor_name) DO UPDATE SET
+    total_amount = total_amount + excluded.total_amount,
+    transaction_count = transaction_count + excluded.transaction_count,
+    anomaly_count = anomaly_count + excluded.anomaly_count
+"""
+
+UPSERT_DEPARTMENT_SQL = """
+INSERT INTO department_daily (department_id, day, total_amount, transaction_count, anomaly_count)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (department_id, day) DO UPDATE SET
+    total_amount = total_amount + excluded.total_amount,
+    transaction_count = transaction_count + excluded.transaction_count,
+    anomaly_count = anomaly_count + excluded.anomaly_count
+"""
+
+UPSERT_OFFSET_SQL = """
+INSERT INTO ingest_offsets (path, offset, updated_at) VALUES (?, ?, ?)
+ON CONFLICT (path) DO UPDATE SET offset = excluded.offset, updated_at = excluded.updated_at
+"""
+
+
+def row_keys(batch: pd.DataFrame) -> np.ndarray:
+    """Signed 64-bit content key per row: amount, department, vendor, date and description, plus the
+    row's occurrence among identical rows of the batch
+
+    Resubmitting a batch reproduces its keys, while repeated rows inside one
+    batch (possible duplicate payments) stay distinct. Identical rows sent
+    in separate batches are taken to be the same transaction.
+    """
+    content = pd.util.hash_pandas_object(
+        batch[['amount', 'department_id', 'vendor_name', 'transaction_date', 'description']], index=False)
+    occurrence = content.groupby(content.to_numpy()).cumcount()
+    keys = pd.util.hash_pandas_object(pd.DataFrame({'content': content.to_numpy(), 'occurrence': occurrence.to_numpy()}),
+                                      index=False)
+    return keys.to_numpy().view(np.int64)
+
+
+class TransactionStore:
+    """Embedded SQLite store for scored transactions.
+
+    Runs in WAL mode so readers never block the ingesting writer. Each
+    thread gets its own connection; writes are serialised in-process and go
+    in as one ``executemany`` per batch inside a single transaction, together
+    with the vendor and department/day aggregates the query layer reads.
+    Every row carries a content key (see ``row_keys``), so a batch that is
+    scored and recorded again, after a cache miss or a retry, is not
+    stored or counted twice.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.TRANSACTION_DB_PATH
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-65536")
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(transactions)")]
+                if 'row_key' not in columns:
+                    conn.execute("ALTER TABLE transactions ADD COLUMN row_key INTEGER")
+                conn.executescript(ROW_KEY_SCHEMA)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def insert_scored(
+        self,
+        df: pd.DataFrame,
+        scores: Optional[np.ndarray] = None,
+        is_anomaly: Optional[np.ndarray] = None,
+        source: str = "api",
+        source_offset: Optional[Tuple[str, int]] = None
+    ) -> int:
+        """Persist a scored batch and update the aggregates in one transaction; returns the rows stored
+        
+        Rows already in the store (same content key) are skipped and left out
+        of the aggregates. ``source_offset`` is an optional ``(path, offset)``
+        resume point that is committed atomically with the rows.
+        """
+        return int(self.insert_scored_mask(df, scores, is_anomaly, source, source_offset).sum())
+
+    def insert_scored_mask(
+        self,
+        df: pd.DataFrame,
+        scores: Optional[np.ndarray] = None,
+        is_anomaly: Optional[np.ndarray] = None,
+        source: str = "api",
+        source_offset: Optional[Tuple[str, int]] = None
+    ) -> np.ndarray:
+        """``insert_scored`` returning which rows of ``df`` were newly stored"""
+        n = len(df)
+        if n == 0:
+            if source_offset is not None:
+                self.save_offset(*source_offset)
+            return np.zeros(0, dtype=bool)
+        now = time.time()
+        # ISO text sorts chronologically, so the date indexes serve range queries
+        dates = pd.to_datetime(df['transaction_date'], errors='coerce').to_numpy().astype('datetime64[s]')
+        date_text = pd.Series(np.char.replace(np.datetime_as_string(dates), 'T', ' '))
+        unparsed = np.isnat(dates)
+        if unparsed.any():
+            date_text[unparsed] = df['transaction_date'].astype(str).to_numpy()[unparsed]
+        days = date_text.str.slice(0, 10)
+        amounts = df['amount'].astype(float)
+        flags = np.zeros(n, dtype=int) if is_anomaly is None else np.asarray(is_anomaly, dtype=int)
+        descriptions = df['description'].astype(object) if 'description' in df.columns else pd.Series([None] * n)
+        descriptions = descriptions.where(descriptions.notna(), None)
+        score_array = None if scores is None else np.asarray(scores, dtype=float)
+        batch = pd.DataFrame({
+            'amount': amounts.to_numpy(),
+            'department_id': df['department_id'].astype(int).to_numpy(),
+            'vendor_name': df['vendor_name'].astype(str).to_numpy(),
+            'transaction_date': date_text.to_numpy(),
+            'description': descriptions.to_numpy(),
+            'day': days.to_numpy(),
+            'is_anomaly': flags
+        })
+        keys = row_keys(batch)
+
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                fresh = ~np.isin(keys, self._existing_keys(conn, keys))
+                if not fresh.all():
+                    batch, keys = batch[fresh], keys[fresh]
+                    score_array = None if score_array is None else score_array[fresh]
+                stored = len(batch)
+                rows = zip(
+                    batch['amount'].tolist(),
+                    batch['department_id'].tolist(),
+                    batch['vendor_name'].tolist(),
+                    batch['transaction_date'].tolist(),
+                    batch['description'].tolist(),
+                    [None] * stored if score_array is None else score_array.tolist(),
+                    batch['is_anomaly'].tolist(),
+                    [source] * stored,
+                    [now] * stored,
+                    keys.tolist()
+                )
+                # Pre-aggregate the batch so the upserts touch one row per key
+                vendors = batch.groupby('vendor_name').agg(
+                    total=('amount', 'sum'), count=('amount', 'size'), anomalies=('is_anomaly', 'sum'))
+                departments = batch.groupby(['department_id', 'day']).agg(
+                    total=('amount', 'sum'), count=('amount', 'size'), anomalies=('is_anomaly', 'sum'))
+                conn.executemany(INSERT_SQL, rows)
+                conn.executemany(UPSERT_VENDOR_SQL, zip(
+                    vendors.index.tolist(), vendors['total'].tolist(),
+                    vendors['count'].tolist(), vendors['anomalies'].tolist()))
+                conn.executemany(UPSERT_DEPARTMENT_SQL, zip(
+                    departments.index.get_level_values(0).tolist(), departments.index.get_level_values(1).tolist(),
+                    departments['total'].tolist(), departments['count'].tolist(), departments['anomalies'].tolist()))
+                if source_offset is not None:
+                    conn.execute(UPSERT_OFFSET_SQL, (source_offset[0], source_offset[1], now))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return fresh
+
+    def _existing_keys(self, conn: sqlite3.Connection, keys: np.ndarray) -> List[int]:
+        """Which of ``keys`` are already stored (one indexed lookup per chunk)"""
+        found = []
+        values = keys.tolist()
+        for start in range(0, len(values), KEY_LOOKUP_CHUNK):
+            chunk = values[start:start + KEY_LOOKUP_CHUNK]
+            found.extend(row[0] for row in conn.execute(
+                f"SELECT row_key FROM transactions WHERE row_key IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+
+    def save_offset(self, path: str, offset: int):
+        """Record an ingestion resume point without any rows"""
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute(UPSERT_OFFSET_SQL, (path, offset, time.time()))
+
+    def get_offsets(self) -> Dict[str, int]:
+        return dict(self._connection().execute("SELECT path, offset FROM ingest_offsets").fetchall())
+
+    def query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """Run a read query and return rows as dicts"""
+        cursor = self._connection().execute(sql, params)
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def count_transactions(self) -> int:
+        return self._connection().execute(
+            "SELECT COALESCE(SUM(transaction_count), 0) FROM vendor_totals").fetchone()[0]
+
+    def count_anomalies(self, since: Optional[float] = None) -> int:
+        if since is None:
+            return self._connection().execute(
+                "SELECT COALESCE(SUM(anomaly_count), 0) FROM vendor_totals").fetchone()[0]
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM transactions WHERE is_anomaly = 1 AND ingested_at >= ?", (since,)).fetchone()[0]
+
+    def department_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Spending per department, optionally limited to a date range (YYYY-MM-DD)"""
+        return self.query(
+            """
+            SELECT department_id, SUM(total_amount) AS total_amount,
+                   SUM(transaction_count) AS transaction_count, SUM(anomaly_count) AS anomaly_count
+            FROM department_daily
+            WHERE day >= COALESCE(?, '') AND day <= COALESCE(?, '9999-12-31')
+            GROUP BY department_id
+            ORDER BY total_amount DESC
+            """,
+            (start_date, end_date)
+        )
+
+    def top_vendors(self, limit: int = 5) -> List[Dict[str, Any]]:
+        return self.query(
+            "SELECT * FROM vendor_totals ORDER BY total_amount DESC LIMIT ?", (limit,))
+
+    def vendor_transactions(self, vendor_name: str, limit: int = 100) -> List[Dict[str, Any]]:
+        return self.query(
+            "SELECT * FROM transactions WHERE vendor_name = ? ORDER BY transaction_date DESC LIMIT ?",
+            (vendor_name, limit))
+
+    def transactions_between(self, start_date: str, end_date: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        return self.query(
+            "SELECT * FROM transactions WHERE transaction_date BETWEEN ? AND ? ORDER BY transaction_date LIMIT ?",
+            (start_date, end_date, limit))
+
+    def iter_daily_spend(self, chunk_rows: int = 100_000):
+        """Spend per (department, vendor, day) over all stored rows, in DataFrame chunks"""
+        cursor = self._connection().execute(
+            """
+            SELECT department_id, vendor_name, substr(transaction_date, 1, 10) AS transaction_date,
+                   SUM(amount) AS amount
+            FROM transactions
+            GROUP BY department_id, vendor_name, substr(transaction_date, 1, 10)
+            """)
+        columns = [c[0] for c in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=columns)
+
+    def iter_rows_since(self, after_id: int = 0, chunk_rows: int = 200_000,
+                        columns: Tuple[str, ...] = ('amount', 'department_id', 'transaction_date')):
+        """``id`` and ``columns`` of rows with id above ``after_id``, in id order, in DataFrame chunks"""
+        cursor = self._connection().execute(
+            f"SELECT id, {', '.join(columns)} FROM transactions WHERE id > ? ORDER BY id",
+            (after_id,))
+        columns = [c[0] for c in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=columns)
+
+    def transactions_by_ids(self, ids: List[int]) -> List[Dict[str, Any]]:
+        """Full rows for the given ids, in the order given"""
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        rows = {row['id']: row for row in self.query(f"SELECT * FROM transactions WHERE id IN ({placeholders})", tuple(ids))}
+        return [rows[i] for i in ids if i in rows]
+
+    def recent_anomalies(self, limit: int = 10) -> List[Dict[str, Any]]:
+        return self.query(
+            "SELECT * FROM transactions WHERE is_anomaly = 1 ORDER BY ingested_at DESC LIMIT ?", (limit,))
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Headline numbers for health and stats endpoints"""
+        conn = self._connection()
+        vendors, transactions, anomalies = conn.execute(
+            """SELECT COUNT(*), COALESCE(SUM(transaction_count), 0), COALESCE(SUM(anomaly_count), 0)
+               FROM vendor_totals""").fetchone()
+        departments, last_day = conn.execute(
+            "SELECT COUNT(DISTINCT department_id), MAX(day) FROM department_daily").fetchone()
+        return {
+            "transactions_stored": transactions,
+            "anomalies_stored": anomalies,
+            "vendors_tracked": vendors,
+            "departments_monitored": departments,
+            "latest_transaction_date": last_day
+        }
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Global store instance
+transaction_store = TransactionStore()
@@ -0,0 +1,83 @@
+import threading
+import pandas as pd
+from typing import Dict, List, Any, Optional
+from config.settings import settings
+from models.variance_detector import SpendVarianceDetector, GRAINS
+from services.transaction_store import transaction_store
+from services.vendor_service import canonical_vendors
+
+
+class VarianceService:
+    """Keeps the spend series current and answers budget-variance questions.
+
+    The series are rebuilt from the transaction store on first use (or at
+    startup), then updated from every scored batch. The rebuild happens
+    before a batch is stored, and only the rows the store newly accepted
+    are added afterwards, so no row is counted twice.
+    Vendor series are keyed by canonical vendor, so spelling variants of one
+    supplier add up to a single series.
+    """
+
+    def __init__(self):
+        self.detector = SpendVarianceDetector(max_vendors=settings.VARIANCE_MAX_VENDORS)
+        self._lock = threading.Lock()
+        self._warmed = False
+
+    def warm(self):
+        """Load historical spend from the transaction store, once"""
+        with self._lock:
+            if self._warmed:
+                return
+            if settings.STORE_SCORED_TRANSACTIONS:
+                try:
+                    for chunk in transaction_store.iter_daily_spend():
+                        # The store keeps the names as submitted
+                        self.detector.update(chunk.assign(vendor_name=canonical_vendors(chunk)))
+                except Exception as e:
+                    print(f"Error loading spend history: {e}")
+            self._warmed = True
+
+    def update(self, df: pd.DataFrame):
+        """Add a batch whose vendor names are already canonical"""
+        self.warm()
+        with self._lock:
+            self.detector.update(df)
+
+    def detect(self, kind: str = "department", grain: str = "monthly", window: Optional[int] = None,
+               threshold: Optional[float] = None, direction: str = "over") -> List[Dict[str, Any]]:
+        self.warm()
+        with self._lock:
+            return self.detector.detect(
+                kind, grain, window,
+                threshold=threshold if threshold is not None else settings.VARIANCE_Z_THRESHOLD,
+                min_amount=settings.VARIANCE_MIN_AMOUNT,
+                direction=direction
+            )
+
+    def get_series(self, kind: str, key: Any, grain: str = "monthly") -> Optional[Dict[str, Any]]:
+        self.warm()
+        with self._lock:
+            return self.detector.get_series(kind, key, grain)
+
+    def department_comparison(self, periods: int = 12) -> List[Dict[str, Any]]:
+        """Department spend over the last ``periods`` months against the ``periods`` before, largest first"""
+        self.warm()
+        with self._lock:
+            labels, current, previous = self.detector.period_totals("department", "monthly", periods)
+        rows = [
+            {
+                "department_id": label,
+                "current": float(cur),
+                "previous": float(prev),
+                "percent_change": round(100 * (cur - prev) / prev, 1) if prev > 0 else None
+            }
+            for label, cur, prev in zip(labels, current, previous)
+        ]
+        return sorted(rows, key=lambda r: -r["current"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.detector.get_stats(), warmed=self._warmed, grains=list(GRAINS))
+
+
+# Global service instance
+variance_service = VarianceService()
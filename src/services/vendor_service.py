@@ -0,0 +1,167 @@
+import io
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional
+from config.settings import settings
+from utils.vendor_index import VendorIndex, normalize_vendor
+
+
+class VendorResolver:
+    """Resolves raw vendor names to canonical vendors and spots look-alikes.
+
+    Every spelling seen is kept in a ``VendorIndex`` and mapped to the
+    canonical vendor it resolved to when first seen. A spelling that only
+    differs in case, punctuation or legal suffix resolves silently; a new
+    spelling within VENDOR_MATCH_THRESHOLD of a known vendor resolves to it
+    but is reported as a look-alike, since near-copies of an existing
+    vendor's name are a common way to route payments to a fake supplier.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path if path is not None else settings.VENDOR_INDEX_PATH
+        self.index = VendorIndex()
+        self.canonical_of: List[int] = []
+        self.display: List[str] = []
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._last_saved = time.time()
+
+    @property
+    def version(self) -> int:
+        """Changes whenever a new spelling is learned; part of result cache keys"""
+        return len(self.display)
+
+    def load(self):
+        """Restore the persisted index, or seed it from the vendors already in the transaction store"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'rb') as f:
+                        self._restore(f.read())
+                    return
+                except Exception as e:
+                    print(f"Error loading vendor index: {e}")
+            if settings.STORE_SCORED_TRANSACTIONS:
+                try:
+                    from services.transaction_store import transaction_store
+                    names = [row['vendor_name'] for row in transaction_store.query(
+                        "SELECT vendor_name FROM vendor_totals ORDER BY transaction_count DESC")]
+                    self._resolve(pd.Series(names, dtype=object), learn=True)
+                except Exception as e:
+                    print(f"Error seeding vendor index: {e}")
+
+    def resolve(self, names: pd.Series) -> pd.DataFrame:
+        """Canonical name, similarity and look-alike target for each name, without learning new spellings"""
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            return self._resolve(names, learn=False)
+
+    def learn(self, names: pd.Series) -> pd.DataFrame:
+        """Resolve and remember any new spellings"""
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            resolved = self._resolve(names, learn=True)
+        if time.time() - self._last_saved >= settings.VENDOR_INDEX_SAVE_SECONDS:
+            try:
+                self.save()
+            except Exception as e:
+                print(f"Error saving vendor index: {e}")
+        return resolved
+
+    def _resolve(self, names: pd.Series, learn: bool) -> pd.DataFrame:
+        codes, uniques = pd.factorize(names.astype(str))
+        uniques = uniques.tolist()
+        normalized = [normalize_vendor(name) for name in uniques]
+        index = self.index
+        canonical = list(uniques)
+        similarity = np.ones(len(uniques))
+        lookalike: List[Optional[str]] = [None] * len(uniques)
+
+        unknown = [i for i, norm in enumerate(normalized) if norm and norm not in index.ids]
+        for i, norm in enumerate(normalized):
+            known = index.ids.get(norm)
+            if known is not None:
+                canonical[i] = self.display[self.canonical_of[known]]
+        if unknown:
+            keys = index.band_keys([normalized[i] for i in unknown])
+            threshold = settings.VENDOR_MATCH_THRESHOLD
+            for i, key in zip(unknown, keys):
+                norm = normalized[i]
+                # An earlier name in this batch may already have taught us this spelling
+                known = index.ids.get(norm)
+                match = (known, 1.0) if known is not None else index.query(norm, key)
+                if match is not None and match[1] >= threshold:
+                    target = self.canonical_of[match[0]]
+                    canonical[i] = self.display[target]
+                    similarity[i] = match[1]
+                    if known is None:
+                        lookalike[i] = self.display[target]
+                else:
+                    target = len(self.display)
+                    similarity[i] = match[1] if match is not None else 0.0
+                if learn and known is None:
+                    index.add([norm], key[None, :])
+                    self.canonical_of.append(target)
+                    self.display.append(uniques[i])
+
+        return pd.DataFrame({
+            'canonical_name': np.asarray(canonical, dtype=object)[codes],
+            'similarity': similarity[codes],
+            'lookalike_of': np.asarray(lookalike, dtype=object)[codes]
+        }, index=names.index)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            buffer = io.BytesIO()
+            np.savez(
+                buffer,
+                index=np.frombuffer(self.index.to_bytes(), dtype=np.uint8),
+                canonical_of=np.asarray(self.canonical_of, dtype=np.int32),
+                display=np.frombuffer(json.dumps(self.display).encode(), dtype=np.uint8)
+            )
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, self.path)
+        self._last_saved = time.time()
+
+    def _restore(self, data: bytes):
+        archive = np.load(io.BytesIO(data), allow_pickle=False)
+        self.index = VendorIndex.from_bytes(archive["index"].tobytes())
+        self.canonical_of = archive["canonical_of"].tolist()
+        self.display = json.loads(archive["display"].tobytes().decode())
+
+    def get_stats(self) -> Dict[str, Any]:
+        canonical = len(set(self.canonical_of))
+        return dict(
+            self.index.get_stats(),
+            spellings=len(self.display),
+            canonical_vendors=canonical,
+            aliases=len(self.display) - canonical,
+            match_threshold=settings.VENDOR_MATCH_THRESHOLD
+        )
+
+
+def canonical_vendors(df: pd.DataFrame, resolution: Optional[pd.DataFrame] = None) -> pd.Series:
+    """Vendor names with spelling variants merged, when vendor resolution is enabled"""
+    if not settings.VENDOR_RESOLUTION_ENABLED:
+        return df['vendor_name']
+    if resolution is None:
+        resolution = vendor_resolver.resolve(df['vendor_name'])
+    return resolution['canonical_name']
+
+
+# Global resolver instance
+vendor_resolver = VendorResolver()
@@ -1,13 +1,54 @@
 import random
-from typing import Dict, List
+import threading
+from typing import Dict, List, Optional
 from config.settings import settings
 from models.nlp_processor import SimpleNLPProcessor
+from models.intent_classifier import load_intent_classifier
+from services.transaction_store import transaction_store
+from services.variance_service import variance_service
+from services.search_service import transaction_search
+from utils.timing import stage
+
+DEPARTMENT_NAMES = {1: "Education", 2: "Healthcare", 3: "Infrastructure", 4: "Administration", 5: "Research"}
+CATEGORY_DEPARTMENTS = {'education': 1, 'healthcare': 2, 'infrastructure': 3}
+
+def format_money(amount: float) -> str:
+    """Compact dollar formatting used in spoken answers ($1.2M, $800K)"""
+    if amount >= 1_000_000:
+        return f"${amount / 1_000_000:.1f}M"
+    if amount >= 1_000:
+        return f"${amount / 1_000:.0f}K"
+    return f"${amount:,.0f}"
+
+def department_name(department_id: int) -> str:
+    return DEPARTMENT_NAMES.get(department_id, f"Department {department_id}")
+
+def describe_filters(filters: Dict) -> str:
+    """Spoken form of an amount/date filter, e.g. "above $50K from 2024-01-01 to 2024-12-31" """
+    parts = []
+    low, high = filters.get('amount_min'), filters.get('amount_max')
+    if low is not None and high is not None:
+        parts.append(f"between {format_money(low)} and {format_money(high)}")
+    elif low is not None:
+        parts.append(f"of {format_money(low)} or more")
+    elif high is not None:
+        parts.append(f"of {format_money(high)} or less")
+    start, end = filters.get('date_from'), filters.get('date_to')
+    if start and end:
+        parts.append(f"on {start}" if start == end else f"from {start} to {end}")
+    elif start:
+        parts.append(f"since {start}")
+    elif end:
+        parts.append(f"up to {end}")
+    return " ".join(parts)
 
 class VoiceProcessingService:
     """Enhanced service for handling voice and natural language processing"""
     
     def __init__(self):
         self.nlp_processor = SimpleNLPProcessor()
+        self._intent_lock = threading.Lock()
+        self._intent_loaded = False
         self.budget_responses = {
             'education': "Education department received $5.2M this year (35% of total budget). Breakdown: Teacher salaries $3.2M, Equipment $1.5M, Facilities $500K.",
             'healthcare': "Healthcare budget is $3.1M (21% of total). Breakdown: Medical staff $2M, Equipment $800K, Medicine supplies $300K.",
@@ -20,75 +61,215 @@ class VoiceProcessingService:
             'default': "I can help you with budget information. Try asking about education spending, healthcare budget, top vendors, unusual transactions, or total budget allocation."
         }
     
+    def load_intent_model(self):
+        """Attach the intent classifier (trained from the labeled samples if not saved yet), once"""
+        with self._intent_lock:
+            if self._intent_loaded:
+                return
+            self._intent_loaded = True
+            if settings.INTENT_CLASSIFIER_ENABLED:
+                self.nlp_processor.intent_classifier = load_intent_classifier(
+                    settings.INTENT_MODEL_PATH, settings.INTENT_SAMPLES_PATH
+                )
+    
     def process_text_query(self, query: str) -> Dict[str, any]:
         """Enhanced processing with NLP analysis"""
+        return self.process_text_queries([query])[0]
+    
+    def process_text_queries(self, queries: List[str]) -> List[Dict[str, any]]:
+        """Answer a batch of queries; intents for the whole batch are classified at once"""
         try:
-            # Use NLP to analyze the query
-            nlp_result = self.nlp_processor.process_query(query)
-            
-            # Smart response selection based on NLP analysis
-            response = self._select_smart_response(nlp_result)
-            
-            return {
-                'query': query,
-                'answer': response,
-                'confidence': nlp_result['confidence'],
-                'keywords_detected': nlp_result['keywords'],
-                'intent': nlp_result['intent'],
-                'numbers_found': nlp_result['numbers'],
-                'processing_time': 0.1,
-                'nlp_template': self.nlp_processor.generate_response_template(nlp_result)
-            }
-            
+            if not self._intent_loaded:
+                self.load_intent_model()
+            # Use NLP to analyze the queries
+            with stage("nlp"):
+                nlp_results = self.nlp_processor.process_queries(queries)
         except Exception as e:
-            return {
-                'query': query,
-                'answer': f"Sorry, I encountered an error processing your query: {str(e)}",
-                'confidence': 0.0,
-                'keywords_detected': [],
-                'intent': 'error',
-                'processing_time': 0.1
-            }
+            return [self._error_response(query, e) for query in queries]
+        
+        results = []
+        for query, nlp_result in zip(queries, nlp_results):
+            try:
+                # Smart response selection based on NLP analysis
+                with stage("answer"):
+                    response = self._select_smart_response(nlp_result)
+                
+                results.append({
+                    'query': query,
+                    'answer': response,
+                    'confidence': nlp_result['confidence'],
+                    'keywords_detected': nlp_result['keywords'],
+                    'intent': nlp_result['intent'],
+                    'numbers_found': nlp_result['numbers'],
+                    'filters': nlp_result['filters'],
+                    'processing_time': 0.1,
+                    'nlp_template': self.nlp_processor.generate_response_template(nlp_result)
+                })
+            except Exception as e:
+                results.append(self._error_response(query, e))
+        return results
+    
+    def _error_response(self, query: str, error: Exception) -> Dict[str, any]:
+        return {
+            'query': query,
+            'answer': f"Sorry, I encountered an error processing your query: {str(error)}",
+            'confidence': 0.0,
+            'keywords_detected': [],
+            'intent': 'error',
+            'processing_time': 0.1
+        }
     
     def _select_smart_response(self, nlp_result: Dict) -> str:
         """Select response based on NLP analysis with priority logic"""
         keywords = nlp_result['keywords']
         intent = nlp_result['intent']
         
+        # Amount/date ranges are answered from the stored transactions
+        if nlp_result.get('filters'):
+            answer = self._filtered_answer(nlp_result['filters'], keywords)
+            if answer:
+                return answer
+        
         # Handle multiple keywords with priority
         if 'education' in keywords:
             if 'vendor' in keywords:
                 return "Education vendors: EduSupply Inc ($700K), Academic Tech ($400K), Learning Resources ($200K). All payments verified and within normal ranges."
-            return self.budget_responses['education']
+            return self._stored_answer('education') or self.budget_responses['education']
             
         elif 'healthcare' in keywords:
             if 'vendor' in keywords:
                 return "Healthcare vendors: Medical Supplies Co ($600K), PharmaCorp ($300K), Equipment Rental ($200K). Recent audit shows all compliant."
-            return self.budget_responses['healthcare']
+            return self._stored_answer('healthcare') or self.budget_responses['healthcare']
             
         elif 'infrastructure' in keywords:
             if 'vendor' in keywords:
                 return "Infrastructure vendors: Construction Plus ($450K), Road Works Inc ($350K), Facility Services ($200K). Two projects completed on time."
-            return self.budget_responses['infrastructure']
+            return self._stored_answer('infrastructure') or self.budget_responses['infrastructure']
             
         elif 'vendor' in keywords and 'spending' in keywords:
-            return self.budget_responses['vendor']
+            return self._stored_answer('vendor') or self.budget_responses['vendor']
             
         elif 'anomaly' in keywords or 'suspicious' in keywords:
-            return self.budget_responses['anomaly']
+            return self._stored_answer('anomaly') or self.budget_responses['anomaly']
             
         elif 'total' in keywords and ('budget' in keywords or 'spending' in keywords):
-            return self.budget_responses['total']
+            return self._stored_answer('total') or self.budget_responses['total']
             
         elif 'department' in keywords:
-            return self.budget_responses['department']
+            return self._stored_answer('department') or self.budget_responses['department']
             
         elif intent == 'comparison' or 'compare' in nlp_result['original_query'].lower():
-            return self.budget_responses['comparison']
+            return self._comparison_answer() or self.budget_responses['comparison']
             
         else:
             return self.budget_responses['default']
     
+    def _stored_answer(self, topic: str) -> Optional[str]:
+        """Answer from real aggregates in the transaction store, or None if it has no data"""
+        try:
+            if transaction_store.count_transactions() == 0:
+                return None
+            
+            if topic == 'vendor':
+                vendors = transaction_store.top_vendors(5)
+                ranked = ", ".join(
+                    f"{i}) {v['vendor_name']} ({format_money(v['total_amount'])})" for i, v in enumerate(vendors, 1)
+                )
+                return f"Top vendors by spending: {ranked}."
+            
+            departments = transaction_store.department_totals()
+            grand_total = sum(d['total_amount'] for d in departments) or 1.0
+            
+            if topic == 'total':
+                allocation = ", ".join(
+                    f"{department_name(d['department_id'])} ({100 * d['total_amount'] / grand_total:.0f}%)"
+                    for d in departments
+                )
+                return f"Total recorded spending is {format_money(grand_total)}. Allocation: {allocation}."
+            
+            if topic in CATEGORY_DEPARTMENTS:
+                department_id = CATEGORY_DEPARTMENTS[topic]
+                match = [d for d in departments if d['department_id'] == department_id]
+                if not match:
+                    return None
+                d = match[0]
+                return (f"{department_name(department_id)} department spent {format_money(d['total_amount'])} "
+                        f"across {d['transaction_count']} transactions "
+                        f"({100 * d['total_amount'] / grand_total:.0f}% of recorded spending).")
+            
+            if topic == 'department':
+                listing = ", ".join(
+                    f"{department_name(d['department_id'])} (ID:{d['department_id']}, {format_money(d['total_amount'])})"
+                    for d in departments
+                )
+                return f"Active departments: {listing}."
+            
+            if topic == 'anomaly':
+                anomalies = transaction_store.recent_anomalies(3)
+                if not anomalies:
+                    return "No unusual transactions have been flagged so far."
+                examples = ", ".join(
+                    f"{format_money(a['amount'])} to {a['vendor_name']} on {a['transaction_date'][:10]}" for a in anomalies
+                )
+                total = transaction_store.count_anomalies()
+                return f"Found {total} flagged transactions. Most recent: {examples}. All flagged for review."
+        except Exception as e:
+            print(f"Error reading transaction store: {e}")
+        return None
+    
+    def _filtered_answer(self, filters: Dict, keywords: List[str]) -> Optional[str]:
+        """Count, total and largest stored transactions inside the query's amount/date range"""
+        try:
+            if transaction_store.count_transactions() == 0:
+                return None
+            department_id = next((CATEGORY_DEPARTMENTS[k] for k in keywords if k in CATEGORY_DEPARTMENTS), None)
+            found = transaction_search.search(filters, department_id=department_id, limit=3)
+        except Exception as e:
+            print(f"Error searching transactions: {e}")
+            return None
+        
+        scope = describe_filters(filters)
+        noun = "transaction" if found['count'] == 1 else "transactions"
+        subject = f"{department_name(department_id)} {noun}" if department_id else noun
+        if found['count'] == 0:
+            return f"No {subject} {scope} were found."
+        answer = f"Found {found['count']:,} {subject} {scope} totalling {format_money(found['total_amount'])}."
+        if found['transactions']:
+            largest = ", ".join(
+                f"{format_money(t['amount'])} to {t['vendor_name']} on {t['transaction_date'][:10]}"
+                for t in found['transactions']
+            )
+            answer += f" Largest: {largest}."
+        return answer
+    
+    def _comparison_answer(self) -> Optional[str]:
+        """Department ranking and year-over-year change from the spend series, plus any flagged overspend"""
+        try:
+            departments = variance_service.department_comparison(12)
+            if not departments:
+                return None
+            ranked = [d for d in departments if d['current'] > 0][:3] or departments[:3]
+            leader = ranked[0]
+            answer = f"{department_name(leader['department_id'])} ({format_money(leader['current'])}) leads spending over the last 12 months"
+            if len(ranked) > 1:
+                others = " and ".join(f"{department_name(d['department_id'])} ({format_money(d['current'])})" for d in ranked[1:])
+                answer += f", followed by {others}"
+            answer += "."
+            if leader['percent_change'] is not None:
+                trend = "increased" if leader['percent_change'] >= 0 else "decreased"
+                answer += f" {department_name(leader['department_id'])} {trend} by {abs(leader['percent_change']):.0f}% from the previous 12 months."
+            
+            flagged = variance_service.detect("department", "monthly")
+            if flagged:
+                worst = flagged[0]
+                answer += (f" {department_name(worst['key'])} is running above its baseline: "
+                           f"{format_money(worst['amount'])} in the month of {worst['bucket_start'][:7]} "
+                           f"against a usual {format_money(worst['baseline'])}.")
+            return answer
+        except Exception as e:
+            print(f"Error reading spend series: {e}")
+        return None
+    
     def simulate_voice_input(self) -> Dict[str, any]:
         """Simulate voice input with enhanced demo queries"""
         demo_queries = [
@@ -147,16 +328,18 @@ class VoiceProcessingService:
     
     def get_query_statistics(self) -> Dict[str, any]:
         """Get statistics about query processing capabilities"""
+        classifier = self.nlp_processor.intent_classifier
         return {
+            "intent_model": classifier.get_stats() if classifier is not None else "rules",
             "supported_categories": list(self.budget_responses.keys()),
             "total_response_templates": len(self.budget_responses),
-            "supported_intents": ["amount", "list", "comparison", "information"],
+            "supported_intents": ["amount", "list", "comparison", "trend", "information"],
             "average_confidence": 0.87,
             "processing_speed": "~100ms",
             "nlp_features": [
                 "Keyword extraction",
-                "Intent detection", 
-                "Confidence scoring",
+                "Intent classification (hashed n-grams, logistic regression)", 
+                "Calibrated confidence scoring",
                 "Multi-category detection",
                 "Number extraction"
             ]
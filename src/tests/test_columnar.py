@@ -0,0 +1,16 @@
+from utils.columnar import negotiate_format
+
+
+def test_output_format_defaults_to_json():
+    assert negotiate_format(None) == "json"
+    assert negotiate_format("text/html, */*") == "json"
+
+
+def test_output_format_honours_q_values():
+    assert negotiate_format("application/json;q=0.5, application/vnd.apache.parquet") == "parquet"
+    assert negotiate_format("application/vnd.apache.parquet;q=0.2, application/vnd.apache.arrow.stream;q=0.9") == "arrow"
+
+
+def test_output_format_never_picks_q_zero():
+    assert negotiate_format("application/vnd.apache.arrow.stream;q=0, application/json;q=0.5") == "json"
+    assert negotiate_format("application/vnd.apache.parquet;q=0") == "json"
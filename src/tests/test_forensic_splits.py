@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from config.settings import settings
+from models.forensic_checks import find_splits
+from services.forensic_service import ForensicService
+
+
+def test_find_splits_clusters_payments_within_the_window():
+    amounts = np.array([6_000, 5_000, 3_000, 6_000, 5_000, 9_000, 200])
+    groups = np.array([0, 0, 0, 1, 1, 2, 0])
+    days = np.array([10, 11, 30, 10, 20, 10, 10])
+    found = find_splits(amounts, groups, days, threshold=10_000, window_days=3, min_fraction=0.25)
+    # Only group 0's first two payments reach the threshold within three days
+    assert found["row_cluster"].tolist() == [0, 0, -1, -1, -1, -1, -1]
+    assert found["count"].tolist() == [2]
+    assert found["total"].tolist() == [11_000]
+    assert (found["first_day"][0], found["last_day"][0]) == (10, 11)
+
+
+def test_find_splits_ignores_unknown_days_and_single_payments():
+    found = find_splits(np.array([6_000, 6_000]), np.array([0, 0]), np.array([5, -1]), 10_000, 3, 0.25)
+    assert (found["row_cluster"] == -1).all()
+    assert len(found["count"]) == 0
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    monkeypatch.setattr(settings, "VENDOR_RESOLUTION_ENABLED", False)
+    split = [(9_500, "2024-03-04"), (9_400, "2024-03-04"), (9_600, "2024-03-05"), (9_550, "2024-03-05")]
+    rows = [{"amount": a, "department_id": 3, "vendor_name": "Acme Co", "transaction_date": d} for a, d in split]
+    rows += [{"amount": 120.0 + i, "department_id": 1, "vendor_name": "Office Depot",
+              "transaction_date": "2024-03-06"} for i in range(20)]
+    return pd.DataFrame(rows)
+
+
+def test_detect_and_submitted_ledger_agree_on_splits(ledger):
+    service = ForensicService()
+    found = service.batch_findings(ledger, None, np.zeros(len(ledger), dtype=bool))
+    assert found["split"].tolist() == [True] * 4 + [False] * 20
+    assert "approval threshold" in found["reasons"][0][0]
+
+    report = service.analyze_frame(ledger)
+    assert report["ledger"]["significant_splits"] == 1
+    assert report["ledger"]["split_payments"] == 4
+    assert report["splits"][0]["vendor_name"] == "Acme Co"
+    assert report["splits"][0]["total"] == 38_050.0
@@ -0,0 +1,27 @@
+from datetime import date
+import pytest
+from utils.query_filters import extract_filters
+
+TODAY = date(2024, 5, 15)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("transactions above $50,000 last year",
+     {"amount_min": 50_000.0, "date_from": "2023-01-01", "date_to": "2023-12-31"}),
+    ("under 2k in March 2024", {"amount_max": 2_000.0, "date_from": "2024-03-01", "date_to": "2024-03-31"}),
+    ("between 1 and 5 million since 2023-06-01",
+     {"amount_min": 1_000_000.0, "amount_max": 5_000_000.0, "date_from": "2023-06-01"}),
+    ("payments over fifty thousand dollars", {"amount_min": 50_000.0}),
+])
+def test_extracts_amount_and_date_ranges(query, expected):
+    assert extract_filters(query, TODAY) == expected
+
+
+def test_bare_numbers_are_not_amounts():
+    filters = extract_filters("top 5 vendors in 2023", TODAY)
+    assert "amount_min" not in filters and "amount_max" not in filters
+    assert filters == {"date_from": "2023-01-01", "date_to": "2023-12-31"}
+
+
+def test_no_filters():
+    assert extract_filters("show me healthcare vendors", TODAY) == {}
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from utils.range_index import RangeIndex, NO_DAY
+
+
+@pytest.fixture
+def ledger():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    days = rng.integers(19_000, 19_400, n).astype(np.int32)
+    days[rng.random(n) < 0.01] = NO_DAY
+    return np.arange(1, n + 1), rng.lognormal(6, 2, n).round(2), days, rng.integers(1, 20, n)
+
+
+def scan(ledger, amount_min=None, amount_max=None, day_from=None, day_to=None, department_id=None):
+    row_ids, amounts, days, departments = ledger
+    keep = np.ones(len(row_ids), dtype=bool)
+    if amount_min is not None:
+        keep &= amounts >= amount_min
+    if amount_max is not None:
+        keep &= amounts <= amount_max
+    if day_from is not None:
+        keep &= (days >= day_from) & (days != NO_DAY)
+    if day_to is not None:
+        keep &= (days <= day_to) & (days != NO_DAY)
+    if department_id is not None:
+        keep &= departments == department_id
+    return set(row_ids[keep].tolist())
+
+
+QUERIES = [
+    {},
+    {"amount_min": 1_000},
+    {"amount_min": 100, "amount_max": 200},
+    {"day_from": 19_100, "day_to": 19_110},
+    {"amount_min": 5_000, "day_from": 19_300},
+    {"amount_max": 50, "day_to": 19_050, "department_id": 3},
+    {"amount_min": 10 ** 9},
+    {"day_from": 10 ** 12}
+]
+
+
+@pytest.mark.parametrize("filters", QUERIES)
+def test_search_matches_scan_with_sorted_rows_and_tail(ledger, filters):
+    index = RangeIndex(min_tail=1_000_000)
+    row_ids, amounts, days, departments = ledger
+    index.add(row_ids[:15_000], amounts[:15_000], days[:15_000], departments[:15_000])
+    index.rebuild()
+    # The rest stays in the unsorted tail
+    index.add(row_ids[15_000:], amounts[15_000:], days[15_000:], departments[15_000:])
+    found, found_amounts = index.search(**filters)
+    assert set(found.tolist()) == scan(ledger, **filters)
+    assert np.array_equal(found_amounts, amounts[found - 1])
+
+
+def test_rebuild_merges_tail_without_changing_results(ledger):
+    index = RangeIndex(min_tail=1_000)
+    row_ids, amounts, days, departments = ledger
+    for start in range(0, len(row_ids), 700):
+        rows = slice(start, start + 700)
+        index.add(row_ids[rows], amounts[rows], days[rows], departments[rows])
+    assert len(index) == len(row_ids)
+    assert np.all(np.diff(index.amounts_sorted) >= 0)
+    found, _ = index.search(amount_min=500, day_to=19_200)
+    assert set(found.tolist()) == scan(ledger, amount_min=500, day_to=19_200)
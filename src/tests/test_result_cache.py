@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from services.result_cache import ResultCache, batch_fingerprint, CACHE_HIT, CACHE_MISS
+
+COLUMNS = ('amount', 'vendor_name')
+
+
+def test_fingerprint_ignores_formatting_but_not_content():
+    a = pd.DataFrame({'amount': [100, 250.5], 'vendor_name': ['Acme', 'Globex']})
+    b = pd.DataFrame({'amount': [100.0, 250.50], 'vendor_name': ['Acme', 'Globex']})
+    assert batch_fingerprint(a, COLUMNS) == batch_fingerprint(b, COLUMNS)
+    assert batch_fingerprint(a, COLUMNS) != batch_fingerprint(a.iloc[::-1], COLUMNS)
+    assert batch_fingerprint(a, COLUMNS) != batch_fingerprint(a.assign(amount=[100, 250.51]), COLUMNS)
+
+
+def test_fingerprint_has_no_separator_collisions():
+    joined = pd.DataFrame({'amount': [1.0, 1.0], 'vendor_name': ['a\x00b', 'c']})
+    split = pd.DataFrame({'amount': [1.0, 1.0], 'vendor_name': ['a', 'b\x00c']})
+    assert batch_fingerprint(joined, COLUMNS) != batch_fingerprint(split, COLUMNS)
+
+
+def test_cache_hits_and_invalidates_on_model_version():
+    cache = ResultCache(max_bytes=1 << 20)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'n': len(calls)}
+
+    assert cache.get_or_compute('k', 'v1', compute) == ({'n': 1}, CACHE_MISS)
+    assert cache.get_or_compute('k', 'v1', compute) == ({'n': 1}, CACHE_HIT)
+    assert cache.get_or_compute('k', 'v2', compute) == ({'n': 2}, CACHE_MISS)
+    assert cache.get_stats()['invalidations'] == 1
+
+
+def test_dict_and_list_payloads_count_towards_the_limit():
+    cache = ResultCache(max_bytes=200_000)
+    explanations = {i: [{'feature': 'amount', 'contribution': 0.5}] for i in range(2_000)}
+    cache.get_or_compute('a', 'v1', lambda: {'scores': np.zeros(10), 'explanations': explanations})
+    stats = cache.get_stats()
+    # Far more than the 200 KB limit once the explanations are measured, so it is not kept
+    assert stats['entries'] == 0 and stats['bytes'] == 0
+
+    small = {i: [{'feature': 'amount', 'contribution': 0.5}] for i in range(10)}
+    cache.get_or_compute('b', 'v1', lambda: {'scores': np.zeros(10), 'explanations': small})
+    assert cache.get_stats()['entries'] == 1
+    assert cache.get_stats()['bytes'] > 256 + np.zeros(10).nbytes
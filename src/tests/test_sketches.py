@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from utils.sketches import CountMinSketch, HyperLogLog, HeavyHitters, FrequencySketches
+
+
+def zipf_keys(n: int, vocabulary: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    ranks = np.minimum(rng.zipf(1.3, n), vocabulary)
+    return np.array([f"vendor-{r}" for r in ranks], dtype=object)
+
+
+def test_count_min_never_undercounts_and_stays_within_bound():
+    keys = zipf_keys(200_000, 50_000)
+    sketch = CountMinSketch(width=1 << 12, depth=4)
+    for block in np.array_split(keys, 7):
+        sketch.update(block)
+    exact = pd.Series(keys).value_counts()
+    estimates = sketch.estimate(exact.index.to_numpy())
+    assert sketch.total == len(keys)
+    assert (estimates >= exact.to_numpy()).all()
+    # The bound holds per key with probability 1 - exp(-depth); allow that share of misses
+    assert np.mean(estimates - exact.to_numpy() > sketch.error_bound) <= np.exp(-4)
+
+
+def test_count_min_merge_equals_one_sketch():
+    keys = zipf_keys(20_000, 1_000)
+    whole, left, right = CountMinSketch(1 << 10), CountMinSketch(1 << 10), CountMinSketch(1 << 10)
+    whole.update(keys)
+    left.update(keys[:5_000])
+    right.update(keys[5_000:])
+    merged = CountMinSketch.from_bytes(left.merge(right).to_bytes())
+    assert np.array_equal(merged.table, whole.table)
+    assert merged.total == whole.total
+
+
+def test_hyperloglog_within_three_standard_errors():
+    for distinct in (100, 10_000, 200_000):
+        sketch = HyperLogLog(precision=14)
+        sketch.update(np.array([f"v{i}" for i in range(distinct)] * 2, dtype=object))
+        assert abs(sketch.count() - distinct) <= 3 * sketch.relative_error * distinct
+
+
+def test_heavy_hitters_bounds_bracket_exact_counts():
+    keys = zipf_keys(100_000, 20_000, seed=1)
+    sketch = HeavyHitters(capacity=100)
+    for block in np.array_split(keys, 10):
+        sketch.update(block)
+    exact = pd.Series(keys).value_counts()
+    assert sketch.error <= len(keys) / 101
+    for entry in sketch.top(20):
+        assert entry["estimate"] <= exact[entry["key"]] <= entry["upper_bound"]
+    # Every key heavier than the error bound is kept
+    heavy = exact[exact > sketch.error].index
+    assert set(heavy) <= set(sketch.counts.index)
+
+
+def test_frequency_sketches_round_trip():
+    df = pd.DataFrame({
+        "vendor_name": zipf_keys(5_000, 300, seed=2),
+        "department_id": np.arange(5_000) % 7,
+        "amount": np.linspace(1, 1_000, 5_000)
+    })
+    sketches = FrequencySketches(width=1 << 10, capacity=50)
+    sketches.update(df)
+    restored = FrequencySketches.from_bytes(sketches.to_bytes())
+    assert restored.rows == 5_000
+    assert restored.distinct_vendors.count() == sketches.distinct_vendors.count()
+    assert restored.top_vendors.top(5) == sketches.top_vendors.top(5)
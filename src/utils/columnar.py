@@ -0,0 +1,189 @@
+import io
+import numpy as np
+from typing import Dict, Iterable, Iterator, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; JSON remains available without it
+    pa = None
+    pq = None
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+MEDIA_TYPES = {
+    "json": JSON_MEDIA_TYPE,
+    "arrow": ARROW_STREAM_MEDIA_TYPE,
+    "parquet": PARQUET_MEDIA_TYPE
+}
+
+# Accept header values mapped to output formats
+_ACCEPT_ALIASES = {
+    JSON_MEDIA_TYPE: "json",
+    ARROW_STREAM_MEDIA_TYPE: "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    PARQUET_MEDIA_TYPE: "parquet",
+    "application/x-parquet": "parquet",
+    "application/parquet": "parquet"
+}
+
+# Reason-code bits; they mirror the rules in api.anomaly.get_anomaly_reasons
+REASON_HIGH_AMOUNT = 1
+REASON_UNUSUAL_PATTERN = 2
+REASON_LOOKALIKE_VENDOR = 4
+REASON_SPLIT_PAYMENT = 8
+REASON_FORENSIC_FINDING = 16
+
+REASON_CODE_LABELS = {
+    REASON_HIGH_AMOUNT: "Unusually high transaction amount",
+    REASON_UNUSUAL_PATTERN: "Highly unusual transaction pattern",
+    REASON_LOOKALIKE_VENDOR: "New vendor name resembles a known vendor",
+    REASON_SPLIT_PAYMENT: "Payment split under an approval threshold",
+    REASON_FORENSIC_FINDING: "Vendor or department fails a forensic-accounting check"
+}
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Pick json/arrow/parquet from an Accept header, honouring q-values
+
+    Entries with ``q=0`` are "not acceptable" and never chosen; JSON is the
+    fallback when nothing else is.
+    """
+    if not accept:
+        return "json"
+    best, best_q = "json", -1.0
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        fmt = _ACCEPT_ALIASES.get(media_type.lower())
+        if fmt is None:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0 and q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
+def compute_reason_codes(amounts: np.ndarray, scores: np.ndarray, is_anomaly: np.ndarray,
+                         lookalike: Optional[np.ndarray] = None, split: Optional[np.ndarray] = None,
+                         forensic: Optional[np.ndarray] = None) -> np.ndarray:
+    """Vectorised reason-code bitmask for a batch of scored transactions"""
+    codes = np.where(np.asarray(amounts) > 10000, REASON_HIGH_AMOUNT, 0)
+    codes |= np.where(np.asarray(scores) < -0.5, REASON_UNUSUAL_PATTERN, 0)
+    if lookalike is not None:
+        codes |= np.where(lookalike, REASON_LOOKALIKE_VENDOR, 0)
+    if split is not None:
+        codes |= np.where(split, REASON_SPLIT_PAYMENT, 0)
+    if forensic is not None:
+        codes |= np.where(forensic, REASON_FORENSIC_FINDING, 0)
+    return (codes * np.asarray(is_anomaly, dtype=bool)).astype(np.uint8)
+
+
+def results_batch(start_index: int, scores: np.ndarray, is_anomaly: np.ndarray,
+                  reason_codes: np.ndarray, indices: Optional[np.ndarray] = None) -> "pa.RecordBatch":
+    """Wrap result arrays in an Arrow record batch without per-row Python objects
+    
+    Rows are numbered from ``start_index`` unless their batch ``indices`` are given.
+    """
+    n = len(scores)
+    if indices is None:
+        indices = np.arange(start_index, start_index + n, dtype=np.int64)
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(np.asarray(indices, dtype=np.int64)),
+            pa.array(np.asarray(scores, dtype=np.float64)),
+            pa.array(np.asarray(is_anomaly, dtype=bool)),
+            pa.array(np.asarray(reason_codes, dtype=np.uint8))
+        ],
+        schema=RESULT_SCHEMA
+    )
+
+
+def _result_schema():
+    if pa is None:
+        return None
+    return pa.schema(
+        [
+            ("transaction_index", pa.int64()),
+            ("anomaly_score", pa.float64()),
+            ("is_anomaly", pa.bool_()),
+            ("reason_code", pa.uint8())
+        ],
+        metadata={
+            "reason_code_bits": ";".join(f"{bit}={label}" for bit, label in REASON_CODE_LABELS.items())
+        }
+    )
+
+
+RESULT_SCHEMA = _result_schema()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only sink whose buffered bytes can be drained between batches"""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_encoded(fmt: str, batches: Iterable["pa.RecordBatch"]) -> Iterator[bytes]:
+    """Encode record batches as an Arrow IPC stream or Parquet file, yielding bytes as they are produced"""
+    sink = _ChunkSink()
+    if fmt == "arrow":
+        writer = pa.ipc.new_stream(sink, RESULT_SCHEMA)
+        write = writer.write_batch
+    elif fmt == "parquet":
+        writer = pq.ParquetWriter(sink, RESULT_SCHEMA)
+        write = lambda batch: writer.write_table(pa.Table.from_batches([batch]))
+    else:
+        raise ValueError(f"Unsupported columnar format: {fmt}")
+
+    for batch in batches:
+        write(batch)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def encode_results(fmt: str, scores: np.ndarray, is_anomaly: np.ndarray, reason_codes: np.ndarray,
+                   indices: Optional[np.ndarray] = None) -> bytes:
+    """Encode a whole result set (or the rows at ``indices``) in one call"""
+    batch = results_batch(0, scores, is_anomaly, reason_codes, indices)
+    return b"".join(iter_encoded(fmt, [batch]))
+
+
+def decode_results(fmt: str, payload: bytes) -> Dict[str, np.ndarray]:
+    """Decode an Arrow/Parquet result payload back into numpy columns"""
+    if fmt == "arrow":
+        table = pa.ipc.open_stream(payload).read_all()
+    elif fmt == "parquet":
+        table = pq.read_table(pa.BufferReader(payload))
+    else:
+        raise ValueError(f"Unsupported columnar format: {fmt}")
+    return {name: table.column(name).to_numpy() for name in table.column_names}
@@ -1,9 +1,12 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
+import io
 import json
 from pathlib import Path
 
+LEDGER_FORMATS = ('json', 'csv', 'parquet')
+
 class DataProcessor:
     """Utility class for data processing and validation"""
     
@@ -56,6 +59,47 @@ class DataProcessor:
             print(f"Error loading sample data: {e}")
             return DataProcessor.get_default_sample_data()
     
+    @staticmethod
+    def detect_ledger_format(filename: str) -> Optional[str]:
+        """Infer the ledger format from a file name"""
+        suffix = Path(filename or '').suffix.lower().lstrip('.')
+        if suffix in ('jsonl', 'ndjson'):
+            return 'json'
+        if suffix in ('pq', 'parq'):
+            return 'parquet'
+        return suffix if suffix in LEDGER_FORMATS else None
+    
+    @staticmethod
+    def load_ledger(source: Union[str, bytes], fmt: Optional[str] = None) -> pd.DataFrame:
+        """Load a ledger extract (JSON, CSV or Parquet) from a path or raw bytes"""
+        if fmt is None:
+            if isinstance(source, bytes):
+                raise ValueError("Format must be given when loading a ledger from bytes")
+            fmt = DataProcessor.detect_ledger_format(source)
+        if fmt not in LEDGER_FORMATS:
+            raise ValueError(f"Unsupported ledger format: {fmt}")
+        
+        handle = io.BytesIO(source) if isinstance(source, bytes) else source
+        if fmt == 'parquet':
+            # Columnar input goes straight to numpy-backed columns
+            return pd.read_parquet(handle)
+        if fmt == 'csv':
+            return pd.read_csv(handle)
+        
+        if isinstance(source, bytes):
+            text = source.decode('utf-8')
+        else:
+            with open(source, 'r') as f:
+                text = f.read()
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            # JSON Lines: one transaction object per line
+            return pd.read_json(io.StringIO(text), lines=True)
+        if isinstance(data, dict):
+            data = data.get('transactions', [])
+        return pd.DataFrame(data)
+    
     @staticmethod
     def get_default_sample_data() -> Dict[str, Any]:
         """Get default sample data if file is not available"""
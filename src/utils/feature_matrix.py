@@ -0,0 +1,59 @@
+import threading
+import numpy as np
+from typing import Dict, Any
+
+
+class FeatureMatrixBuilder:
+    """Per-thread float32 buffers that feature matrices are written into, reused across calls.
+
+    ``allocate(rows, n_columns)`` returns a C-contiguous ``rows x n_columns``
+    float32 view of a buffer owned by the calling thread, grown (never
+    shrunk) when a larger batch arrives, so scoring a stream of batches
+    allocates nothing after warm-up. A view stays valid only until the same
+    thread allocates again. Batches above ``max_rows`` get a matrix of their
+    own instead, so one huge batch does not pin its memory for good.
+    """
+
+    def __init__(self, max_rows: int = 1_000_000):
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self.allocations = 0
+        self.reuses = 0
+
+    def allocate(self, rows: int, n_columns: int, reuse: bool = True) -> np.ndarray:
+        if not reuse or rows > self.max_rows:
+            self.allocations += 1
+            return np.empty((rows, n_columns), dtype=np.float32)
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.shape[1] != n_columns or buffer.shape[0] < rows:
+            capacity = rows if buffer is None or buffer.shape[1] != n_columns else max(rows, buffer.shape[0] * 3 // 2)
+            buffer = self._local.buffer = np.empty((min(capacity, self.max_rows), n_columns), dtype=np.float32)
+            self.allocations += 1
+        else:
+            self.reuses += 1
+        return buffer[:rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"allocations": self.allocations, "reuses": self.reuses, "max_rows": self.max_rows}
+
+
+def standardize_(matrix: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """``(matrix - mean) / scale`` in place, as ``StandardScaler.transform`` computes it"""
+    matrix -= mean.astype(np.float32)
+    matrix *= (1.0 / scale).astype(np.float32)
+    return matrix
+
+
+def percentile_ranks(values: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """``Series.rank(pct=True)`` (ties share their average rank) written into ``out``"""
+    order = np.argsort(values, kind='stable')
+    sorted_values = values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    average = (starts + (counts + 1) / 2) / len(values)
+    out[order] = np.repeat(average.astype(out.dtype), counts)
+    return out
+
+
+# Global builder instance
+feature_builder = FeatureMatrixBuilder()
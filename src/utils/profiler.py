@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, Optional
+
+# Leaf frames of threads that are parked, not doing work
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker")
+}
+
+
+class SamplingProfiler:
+    """Statistical profiler that periodically samples every thread's stack.
+
+    Runs in its own thread only while a session is active, so it costs
+    nothing when off. Stacks are collapsed into ``root;...;leaf count``
+    lines, the input format of flamegraph.pl and speedscope. A session ends
+    after ``max_requests`` requests (counted by the timing middleware) or
+    ``seconds``, whichever comes first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.active = False
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.interval = 0.005
+        self.max_requests: Optional[int] = None
+        self.requests_seen = 0
+        self.deadline: Optional[float] = None
+
+    def start(self, seconds: float, max_requests: Optional[int] = None, interval_ms: float = 5.0) -> bool:
+        """Begin a session; returns False if one is already running"""
+        with self._lock:
+            if self.active:
+                return False
+            self.samples = Counter()
+            self.sample_count = 0
+            self.requests_seen = 0
+            self.max_requests = max_requests
+            self.interval = max(interval_ms, 0.5) / 1000
+            self.started_at = time.time()
+            self.finished_at = None
+            self.deadline = time.monotonic() + seconds
+            self._stop.clear()
+            self.active = True
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def request_finished(self):
+        """Called per request while a session is active"""
+        self.requests_seen += 1
+        if self.max_requests is not None and self.requests_seen >= self.max_requests:
+            self._stop.set()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        try:
+            while not self._stop.is_set() and time.monotonic() < self.deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stack = self._collapse(frame)
+                    if stack:
+                        self.samples[stack] += 1
+                        self.sample_count += 1
+                self._stop.wait(self.interval)
+        finally:
+            with self._lock:
+                self.active = False
+                self.finished_at = time.time()
+                self._thread = None
+
+    @staticmethod
+    def _collapse(frame) -> Optional[str]:
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+            return None
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def collapsed(self) -> str:
+        """Profile in collapsed-stack format, heaviest stacks first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def top_functions(self, limit: int = 20) -> Dict[str, int]:
+        """Self-time sample counts per leaf function"""
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return dict(leaves.most_common(limit))
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "interval_ms": self.interval * 1000,
+            "max_requests": self.max_requests,
+            "requests_profiled": self.requests_seen,
+            "samples": self.sample_count,
+            "distinct_stacks": len(self.samples)
+        }
+
+
+# Global profiler instance
+profiler = SamplingProfiler()
@@ -0,0 +1,256 @@
+import re
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+UNITS = {
+    'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8,
+    'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14, 'fifteen': 15,
+    'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19, 'twenty': 20, 'thirty': 30,
+    'forty': 40, 'fifty': 50, 'sixty': 60, 'seventy': 70, 'eighty': 80, 'ninety': 90
+}
+SCALES = {'hundred': 100, 'thousand': 1_000, 'k': 1_000, 'million': 1_000_000, 'm': 1_000_000,
+          'mm': 1_000_000, 'billion': 1_000_000_000, 'bn': 1_000_000_000, 'b': 1_000_000_000}
+LOWER_BOUND = ('above', 'over', 'more than', 'greater than', 'larger than', 'bigger than', 'higher than',
+               'exceeding', 'in excess of', 'at least', 'minimum of', 'no less than', 'starting at', '>=', '>')
+UPPER_BOUND = ('below', 'under', 'less than', 'smaller than', 'lower than', 'at most', 'up to',
+               'maximum of', 'no more than', 'not exceeding', '<=', '<')
+MONTHS = {name: i for i, name in enumerate(
+    ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august', 'september', 'october',
+     'november', 'december'], 1)}
+MONTHS.update({name[:3]: i for name, i in list(MONTHS.items())})
+MONTHS['sept'] = 9
+
+_TOKEN = re.compile(r"\$?\d[\d,]*(?:\.\d+)?[a-z]*|[a-z]+|[<>]=?|\$")
+_YEAR = re.compile(r"(?:19|20)\d\d")
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_RELATIVE = re.compile(r"\b(last|this|current|previous|past)\s+(year|quarter|month|week)\b")
+_TRAILING = re.compile(r"\b(?:last|past|previous)\s+(\d+|[a-z]+)\s+(days?|weeks?|months?|years?)\b")
+_MONTH_YEAR = re.compile(r"\b(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\b\.?(?:\s+(\d{4}))?")
+_SINCE = ('since', 'after', 'from', 'starting')
+_UNTIL = ('before', 'until', 'till', 'through', 'prior to')
+
+
+def _parse_number(token: str) -> Optional[Tuple[float, bool]]:
+    """``(value, explicit)`` for a digit token like "$50,000", "50k" or "1.5m"; explicit means $ or a scale suffix"""
+    match = re.fullmatch(r"(\$?)(\d[\d,]*(?:\.\d+)?)([a-z]*)", token)
+    if not match:
+        return None
+    dollar, digits, suffix = match.groups()
+    if suffix and suffix not in SCALES:
+        return None
+    value = float(digits.replace(',', '')) * (SCALES[suffix] if suffix else 1)
+    return value, bool(dollar or suffix or ',' in digits)
+
+
+def _read_amount(tokens: List[str], i: int) -> Optional[Tuple[float, int, bool]]:
+    """Amount starting at ``tokens[i]`` as ``(value, tokens used, explicit)``, written in digits or words"""
+    start = i
+    dollar = tokens[i] == '$'
+    if dollar:
+        i += 1
+    if i >= len(tokens):
+        return None
+    parsed = _parse_number(tokens[i])
+    if parsed is not None:
+        value, explicit = parsed
+        i += 1
+        if i < len(tokens) and tokens[i] in SCALES and tokens[i] not in ('m', 'b', 'k'):
+            value *= SCALES[tokens[i]]
+            explicit = True
+            i += 1
+    else:
+        # Number words: "fifty thousand", "two hundred and fifty thousand", "a million"
+        total, current, used = 0.0, 0.0, False
+        while i < len(tokens):
+            word = tokens[i]
+            if word in UNITS:
+                current += UNITS[word]
+            elif word == 'a' and i + 1 < len(tokens) and tokens[i + 1] in SCALES:
+                current += 1
+            elif word == 'hundred':
+                current = max(current, 1) * 100
+            elif word in ('thousand', 'million', 'billion'):
+                total += max(current, 1) * SCALES[word]
+                current = 0.0
+            elif word == 'and' and used and i + 1 < len(tokens) and tokens[i + 1] in UNITS:
+                pass
+            else:
+                break
+            used = True
+            i += 1
+        if not used:
+            return None
+        value = total + current
+        explicit = total > 0 or current >= 100
+    if i < len(tokens) and tokens[i] in ('dollars', 'usd', 'bucks'):
+        explicit = True
+        i += 1
+    return value, i - start, explicit or dollar
+
+
+def _bound_before(text_before: str) -> Optional[str]:
+    tail = text_before[-24:]
+    for phrase in LOWER_BOUND:
+        if re.search(r"(?:^|[\s$])" + re.escape(phrase) + r"\s*$", tail):
+            return 'min'
+    for phrase in UPPER_BOUND:
+        if re.search(r"(?:^|[\s$])" + re.escape(phrase) + r"\s*$", tail):
+            return 'max'
+    return None
+
+
+def extract_amount_filters(text: str) -> Dict[str, float]:
+    """``amount_min``/``amount_max`` from phrases like "above $50,000", "under 2k" or "between 1 and 5 million"
+
+    Bounds are inclusive. Bare numbers without a comparison are left alone,
+    so "top 5 vendors" or a year is never taken as an amount.
+    """
+    lowered = text.lower()
+    tokens, offsets = [], []
+    for match in _TOKEN.finditer(lowered):
+        tokens.append(match.group())
+        offsets.append(match.start())
+    filters: Dict[str, float] = {}
+    i = 0
+    while i < len(tokens):
+        amount = _read_amount(tokens, i)
+        if amount is None:
+            i += 1
+            continue
+        value, used, explicit = amount
+        before = lowered[:offsets[i]]
+        bound = _bound_before(before)
+        if bound is None and re.search(r"\bbetween\s*$", before):
+            # "between X and Y": Y carries the scale when X doesn't ("between 1 and 5 million")
+            j = i + used
+            if j + 1 < len(tokens) and tokens[j] == 'and':
+                upper = _read_amount(tokens, j + 1)
+                if upper is not None:
+                    low = value * _common_scale(value, upper[0])
+                    filters['amount_min'], filters['amount_max'] = min(low, upper[0]), max(low, upper[0])
+                    i = j + 1 + upper[1]
+                    continue
+        if bound is not None and (explicit or not _YEAR.fullmatch(tokens[i])):
+            filters['amount_min' if bound == 'min' else 'amount_max'] = value
+        i += used
+    return filters
+
+
+def _common_scale(low: float, high: float) -> float:
+    """Scale that a bare lower bound borrows from the upper one ("between 1 and 5 million")"""
+    for scale in (1_000_000_000, 1_000_000, 1_000):
+        if high >= scale and low < 1_000 and high % scale == 0 and low * scale <= high:
+            return scale
+    return 1
+
+
+def _month_range(year: int, month: int) -> Tuple[date, date]:
+    first = date(year, month, 1)
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return first, following - timedelta(days=1)
+
+
+def _quarter_range(year: int, quarter: int) -> Tuple[date, date]:
+    first, _ = _month_range(year, 3 * quarter - 2)
+    _, last = _month_range(year, 3 * quarter)
+    return first, last
+
+
+def _word_count(word: str) -> Optional[int]:
+    if word.isdigit():
+        return int(word)
+    return UNITS.get(word) or (1 if word in ('a', 'an') else None)
+
+
+def extract_date_filters(text: str, today: Optional[date] = None) -> Dict[str, str]:
+    """``date_from``/``date_to`` (YYYY-MM-DD, inclusive) from phrases like "last year", "in March 2024" or "since 2023-06-01" """
+    today = today or date.today()
+    lowered = text.lower()
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+    def preceded_by(position: int, words) -> bool:
+        return any(re.search(r"\b" + re.escape(w) + r"\s*$", lowered[:position]) for w in words)
+
+    def apply(first: date, last: date, position: int):
+        nonlocal start, end
+        if preceded_by(position, _SINCE):
+            start = first
+        elif preceded_by(position, _UNTIL):
+            end = first - timedelta(days=1) if preceded_by(position, ('before', 'prior to')) else last
+        else:
+            start, end = first, last
+
+    if re.search(r"\btoday\b", lowered):
+        start = end = today
+    elif re.search(r"\byesterday\b", lowered):
+        start = end = today - timedelta(days=1)
+    elif re.search(r"\b(?:year to date|ytd)\b", lowered):
+        start, end = date(today.year, 1, 1), today
+
+    for match in _RELATIVE.finditer(lowered):
+        which, unit = match.groups()
+        back = which in ('last', 'previous', 'past')
+        if unit == 'year':
+            year = today.year - back
+            first, last = date(year, 1, 1), date(year, 12, 31)
+        elif unit == 'quarter':
+            quarter = (today.month - 1) // 3 + 1 - back
+            year = today.year - (quarter == 0)
+            first, last = _quarter_range(year, quarter or 4)
+        elif unit == 'month':
+            month = today.month - back
+            year = today.year - (month == 0)
+            first, last = _month_range(year, month or 12)
+        else:
+            monday = today - timedelta(days=today.weekday()) - timedelta(weeks=back)
+            first, last = monday, monday + timedelta(days=6)
+        if not back:
+            last = min(last, today)
+        apply(first, last, match.start())
+
+    for match in _TRAILING.finditer(lowered):
+        count = _word_count(match.group(1))
+        if count is None:
+            continue
+        unit = match.group(2).rstrip('s')
+        days = {'day': 1, 'week': 7, 'month': 30, 'year': 365}[unit] * count
+        start, end = today - timedelta(days=days), today
+
+    for match in _ISO_DATE.finditer(lowered):
+        try:
+            day = date(*map(int, match.groups()))
+        except ValueError:
+            continue
+        apply(day, day, match.start())
+
+    for match in _MONTH_YEAR.finditer(lowered):
+        name, year_text = match.groups()
+        # "may" and "mar" are also ordinary words; only count them next to a date preposition or a year
+        if name in ('may', 'mar', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec', 'jan', 'feb', 'apr') \
+                and not year_text and not preceded_by(match.start(), ('in', 'during', 'of') + _SINCE + _UNTIL):
+            continue
+        month = MONTHS[name]
+        year = int(year_text) if year_text else today.year - (month > today.month)
+        first, last = _month_range(year, month)
+        apply(first, last, match.start())
+
+    if start is None and end is None:
+        for match in re.finditer(r"(?<![\d$,.])((?:19|20)\d\d)(?![\d,.]|\s*(?:k|m|thousand|million|dollars))",
+                                 lowered):
+            if _MONTH_YEAR.search(lowered[max(0, match.start() - 12):match.start()]):
+                continue
+            year = int(match.group(1))
+            apply(date(year, 1, 1), date(year, 12, 31), match.start())
+
+    filters = {}
+    if start is not None:
+        filters['date_from'] = start.isoformat()
+    if end is not None:
+        filters['date_to'] = end.isoformat()
+    return filters
+
+
+def extract_filters(text: str, today: Optional[date] = None) -> Dict[str, Any]:
+    """Structured amount and date range filters found in a natural-language query"""
+    return dict(extract_amount_filters(text), **extract_date_filters(text, today))
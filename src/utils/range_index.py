@@ -0,0 +1,156 @@
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+# Day number used for rows whose date could not be parsed; below every real date
+NO_DAY = np.iinfo(np.int32).min
+
+
+class RangeIndex:
+    """Amount and day range index over transactions, held as numpy arrays.
+
+    Each attribute is kept sorted together with the permutation back to row
+    positions and its inverse (each row's rank). A range is two binary
+    searches giving a slice of the sorted order; with two ranges the smaller
+    slice is taken and its rows are kept when their rank in the other
+    attribute falls inside that attribute's slice. A query costs
+    O(log n + k) for k rows in the smaller range, instead of a scan.
+
+    Rows added since the last merge sit in a small unsorted tail that is
+    scanned directly; it is merged into the sorted arrays once it outgrows
+    1/32 of the index (or ``min_tail`` rows), so a merge's linear cost is
+    spread over many additions.
+    """
+
+    def __init__(self, min_tail: int = 65_536):
+        self.min_tail = min_tail
+        self.row_ids = np.zeros(0, dtype=np.int64)
+        self.departments = np.zeros(0, dtype=np.int32)
+        self.amounts_sorted = np.zeros(0, dtype=np.float64)
+        self.amount_order = np.zeros(0, dtype=np.int32)
+        self.amount_rank = np.zeros(0, dtype=np.int32)
+        self.days_sorted = np.zeros(0, dtype=np.int32)
+        self.day_order = np.zeros(0, dtype=np.int32)
+        self.day_rank = np.zeros(0, dtype=np.int32)
+        self._tail_ids = []
+        self._tail_amounts = []
+        self._tail_days = []
+        self._tail_departments = []
+        self._tail_size = 0
+
+    def __len__(self) -> int:
+        return len(self.row_ids) + self._tail_size
+
+    def add(self, row_ids: np.ndarray, amounts: np.ndarray, days: np.ndarray, departments: np.ndarray):
+        """Append rows; ``days`` are days since 1970-01-01 (NO_DAY when unknown)"""
+        if not len(row_ids):
+            return
+        self._tail_ids.append(np.asarray(row_ids, dtype=np.int64))
+        self._tail_amounts.append(np.asarray(amounts, dtype=np.float64))
+        self._tail_days.append(np.asarray(days, dtype=np.int32))
+        self._tail_departments.append(np.asarray(departments, dtype=np.int32))
+        self._tail_size += len(row_ids)
+        if self._tail_size >= max(self.min_tail, len(self.row_ids) // 32):
+            self.rebuild()
+
+    def _tail(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        if len(self._tail_ids) > 1:
+            self._tail_ids = [np.concatenate(self._tail_ids)]
+            self._tail_amounts = [np.concatenate(self._tail_amounts)]
+            self._tail_days = [np.concatenate(self._tail_days)]
+            self._tail_departments = [np.concatenate(self._tail_departments)]
+        if not self._tail_ids:
+            empty = np.zeros(0)
+            return empty.astype(np.int64), empty, empty.astype(np.int32), empty.astype(np.int32)
+        return self._tail_ids[0], self._tail_amounts[0], self._tail_days[0], self._tail_departments[0]
+
+    def rebuild(self):
+        """Merge the tail into the sorted arrays: a sort of the tail plus linear inserts, no full re-sort"""
+        tail_ids, tail_amounts, tail_days, tail_departments = self._tail()
+        if not len(tail_ids):
+            return
+        offset = len(self.row_ids)
+        self.amounts_sorted, self.amount_order, self.amount_rank = _merge_sorted(
+            self.amounts_sorted, self.amount_order, tail_amounts, offset)
+        self.days_sorted, self.day_order, self.day_rank = _merge_sorted(
+            self.days_sorted, self.day_order, tail_days, offset)
+        self.row_ids = np.concatenate([self.row_ids, tail_ids])
+        self.departments = np.concatenate([self.departments, tail_departments])
+        self._tail_ids, self._tail_amounts, self._tail_days, self._tail_departments = [], [], [], []
+        self._tail_size = 0
+
+    def search(self, amount_min: Optional[float] = None, amount_max: Optional[float] = None,
+               day_from: Optional[int] = None, day_to: Optional[int] = None,
+               department_id: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Row ids and amounts of the rows inside every given (inclusive) bound, in no particular order"""
+        amount_lo = 0 if amount_min is None else np.searchsorted(self.amounts_sorted, amount_min, side='left')
+        amount_hi = len(self.amounts_sorted) if amount_max is None else \
+            np.searchsorted(self.amounts_sorted, amount_max, side='right')
+        # Rows without a date only match when no date bound is given
+        dated = day_from is not None or day_to is not None
+        # Keys are cast to int32: a Python int would make searchsorted copy the whole int32 array to int64
+        day_lo = np.searchsorted(self.days_sorted, _day_key(NO_DAY + 1 if day_from is None else day_from),
+                                 side='left') if dated else 0
+        day_hi = len(self.days_sorted) if day_to is None else \
+            np.searchsorted(self.days_sorted, _day_key(day_to), side='right')
+
+        if amount_hi - amount_lo <= day_hi - day_lo or not dated:
+            positions = self.amount_order[amount_lo:amount_hi]
+            if dated:
+                rank = self.day_rank[positions]
+                positions = positions[(rank >= day_lo) & (rank < day_hi)]
+        else:
+            positions = self.day_order[day_lo:day_hi]
+            rank = self.amount_rank[positions]
+            positions = positions[(rank >= amount_lo) & (rank < amount_hi)]
+        if department_id is not None:
+            positions = positions[self.departments[positions] == department_id]
+        amounts = self.amounts_sorted[self.amount_rank[positions]]
+        row_ids = self.row_ids[positions]
+
+        tail_ids, tail_amounts, tail_days, tail_departments = self._tail()
+        if len(tail_ids):
+            keep = np.ones(len(tail_ids), dtype=bool)
+            if amount_min is not None:
+                keep &= tail_amounts >= amount_min
+            if amount_max is not None:
+                keep &= tail_amounts <= amount_max
+            if day_from is not None:
+                keep &= tail_days >= day_from
+            if day_to is not None:
+                keep &= (tail_days <= day_to) & (tail_days != NO_DAY)
+            if department_id is not None:
+                keep &= tail_departments == department_id
+            row_ids = np.concatenate([row_ids, tail_ids[keep]])
+            amounts = np.concatenate([amounts, tail_amounts[keep]])
+        return row_ids, amounts
+
+    def memory_bytes(self) -> int:
+        arrays = (self.row_ids, self.departments, self.amounts_sorted, self.amount_order, self.amount_rank,
+                  self.days_sorted, self.day_order, self.day_rank)
+        return sum(a.nbytes for a in arrays) + self._tail_size * 20
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rows_indexed": len(self),
+            "unsorted_tail": self._tail_size,
+            "memory_mb": round(self.memory_bytes() / 1024 ** 2, 1)
+        }
+
+
+def _day_key(day: int) -> np.int32:
+    """Day bound clipped into int32 range, so bounds far outside it still compare correctly"""
+    info = np.iinfo(np.int32)
+    return np.int32(min(max(day, info.min), info.max))
+
+
+def _merge_sorted(values_sorted: np.ndarray, order: np.ndarray, new_values: np.ndarray, offset: int
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Insert new rows (positions ``offset`` onwards) into a sorted attribute; returns sorted values, order and ranks"""
+    new_order = np.argsort(new_values, kind='stable')
+    new_sorted = new_values[new_order]
+    at = np.searchsorted(values_sorted, new_sorted, side='right')
+    merged = np.insert(values_sorted, at, new_sorted)
+    merged_order = np.insert(order, at, (new_order + offset).astype(np.int32))
+    rank = np.empty_like(merged_order)
+    rank[merged_order] = np.arange(len(merged_order), dtype=np.int32)
+    return merged, merged_order, rank
@@ -0,0 +1,47 @@
+import base64
+import json
+import numpy as np
+from typing import Dict, Any
+
+RESPONSE_MODES = ("all", "anomalies", "top_k")
+
+
+def select_rows(scores: np.ndarray, is_anomaly: np.ndarray, mode: str = "all", k: int = 100) -> np.ndarray:
+    """Row indices a response mode returns, in the order they are returned
+
+    ``anomalies`` keeps the flagged rows in batch order. ``top_k`` picks the
+    ``k`` lowest scores with a partial selection (``np.partition``, linear
+    in the batch) and sorts only those, most anomalous first, ties in batch
+    order. The selection depends on nothing but the arrays, so every page
+    of a result set sees the same one.
+    """
+    if mode == "anomalies":
+        return np.flatnonzero(is_anomaly)
+    if mode == "top_k":
+        if k < len(scores):
+            # Rows tied with the k-th score are taken in batch order, not wherever the partition left them
+            kth = np.partition(scores, k - 1)[k - 1]
+            below = np.flatnonzero(scores < kth)
+            candidates = np.concatenate([below, np.flatnonzero(scores == kth)[:k - len(below)]])
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.lexsort((candidates, scores[candidates]))]
+    return np.arange(len(scores))
+
+
+def encode_cursor(key: str, mode: str, k: int, offset: int) -> str:
+    """Opaque cursor for the page of a cached result set starting at ``offset``"""
+    state = json.dumps({"key": key, "mode": mode, "k": k, "offset": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(state.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Inverse of ``encode_cursor``; raises ValueError for anything it did not produce"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        state = {"key": str(state["key"]), "mode": state["mode"], "k": int(state["k"]), "offset": int(state["offset"])}
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if state["mode"] not in RESPONSE_MODES or state["k"] < 1 or state["offset"] < 0:
+        raise ValueError("Invalid cursor")
+    return state
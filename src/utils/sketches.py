@@ -0,0 +1,307 @@
+import io
+import json
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional, Sequence, List
+
+_HASH_KEYS = ("bnb-sketch-key-0", "bnb-sketch-key-1")
+
+
+def hash_keys(keys, seed: int = 0) -> np.ndarray:
+    """Vectorised 64-bit hashes of arbitrary keys (strings or numbers, compared by their text)"""
+    values = np.asarray(keys, dtype=object).astype(str).astype(object)
+    return pd.util.hash_array(values, hash_key=_HASH_KEYS[seed % 2], categorize=True)
+
+
+def _save(arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> bytes:
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, __meta__=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **arrays)
+    return buffer.getvalue()
+
+
+def _load(data: bytes):
+    archive = np.load(io.BytesIO(data), allow_pickle=False)
+    meta = json.loads(archive["__meta__"].tobytes().decode())
+    return meta, archive
+
+
+class CountMinSketch:
+    """Count-Min Sketch over a ``depth x width`` table of int64 counters.
+
+    Estimates never undercount; with probability ``1 - exp(-depth)`` they
+    overcount by at most ``e / width`` of the total added. Updates are one
+    ``bincount`` per row, and two hashes per key give all ``depth`` indexes
+    (Kirsch-Mitzenmacher double hashing). Sketches of the same shape merge by
+    adding their tables.
+    """
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4):
+        if width & (width - 1):
+            raise ValueError("width must be a power of two")
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    def _indexes(self, keys) -> np.ndarray:
+        h1 = hash_keys(keys, 0)
+        h2 = hash_keys(keys, 1) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) & np.uint64(self.width - 1)).astype(np.intp)
+
+    def update(self, keys, counts: Optional[Sequence[int]] = None):
+        if len(keys) == 0:
+            return
+        indexes = self._indexes(keys)
+        weights = None if counts is None else np.asarray(counts, dtype=np.float64)
+        for row in range(self.depth):
+            self.table[row] += np.bincount(indexes[row], weights=weights, minlength=self.width).astype(np.int64)
+        self.total += len(keys) if counts is None else int(weights.sum())
+
+    def estimate(self, keys) -> np.ndarray:
+        if len(keys) == 0:
+            return np.zeros(0, dtype=np.int64)
+        indexes = self._indexes(keys)
+        return self.table[np.arange(self.depth)[:, None], indexes].min(axis=0)
+
+    @property
+    def error_bound(self) -> float:
+        """Additive overcount bound (holds with probability 1 - exp(-depth))"""
+        return math.e / self.width * self.total
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Count-Min sketches must have the same width and depth to merge")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    def memory_bytes(self) -> int:
+        return self.table.nbytes
+
+    def to_bytes(self) -> bytes:
+        return _save({"table": self.table}, {"width": self.width, "depth": self.depth, "total": self.total})
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CountMinSketch":
+        meta, archive = _load(data)
+        sketch = cls(meta["width"], meta["depth"])
+        sketch.table = archive["table"].astype(np.int64)
+        sketch.total = meta["total"]
+        return sketch
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with ``2**precision`` one-byte registers.
+
+    Standard error is about ``1.04 / sqrt(2**precision)`` (0.8% at the
+    default precision of 14, in 16 KB). Merging takes the register-wise max.
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, keys):
+        if len(keys) == 0:
+            return
+        hashes = hash_keys(keys, 0)
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # Position of the leftmost 1-bit in the remaining 64 - p bits; frexp is exact below 2**53
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, 64 - p + 1, (64 - p) - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return float(estimate)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if self.precision != other.precision:
+            raise ValueError("HyperLogLog sketches must have the same precision to merge")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def memory_bytes(self) -> int:
+        return self.registers.nbytes
+
+    def to_bytes(self) -> bytes:
+        return _save({"registers": self.registers}, {"precision": self.precision})
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        meta, archive = _load(data)
+        sketch = cls(meta["precision"])
+        sketch.registers = archive["registers"].astype(np.uint8)
+        return sketch
+
+
+class HeavyHitters:
+    """Mergeable Misra-Gries summary of the heaviest keys (by count or any positive weight).
+
+    Keeps at most ``capacity`` counters. A batch is aggregated exactly and
+    merged in; whenever more than ``capacity`` keys remain, the
+    ``capacity + 1``-th largest counter is subtracted from all of them and
+    non-positive ones are dropped. Reported weights undercount by at most
+    ``error`` (itself at most ``total / (capacity + 1)``), and every key
+    heavier than that bound is guaranteed to be kept.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.float64)
+        self.total = 0.0
+        self.error = 0.0
+
+    def update(self, keys, weights: Optional[Sequence[float]] = None):
+        if len(keys) == 0:
+            return
+        values = np.ones(len(keys)) if weights is None else np.asarray(weights, dtype=np.float64)
+        batch = pd.Series(values).groupby(np.asarray(keys, dtype=object).astype(str)).sum()
+        self._absorb(batch, float(values.sum()), 0.0)
+
+    def _absorb(self, counts: pd.Series, total: float, error: float):
+        combined = self.counts.add(counts, fill_value=0.0)
+        if len(combined) > self.capacity:
+            kth = np.partition(combined.to_numpy(), -(self.capacity + 1))[-(self.capacity + 1)]
+            combined = combined - kth
+            combined = combined[combined > 0]
+            error += kth
+        self.counts = combined
+        self.total += total
+        self.error += error
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Heaviest keys with their guaranteed lower and upper bounds"""
+        top = self.counts.nlargest(n)
+        return [
+            {"key": key, "estimate": float(value), "upper_bound": float(value + self.error)}
+            for key, value in top.items()
+        ]
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        self._absorb(other.counts, other.total, other.error)
+        return self
+
+    def memory_bytes(self) -> int:
+        return int(self.counts.memory_usage(index=True, deep=True))
+
+    def to_bytes(self) -> bytes:
+        return _save(
+            {"keys": self.counts.index.to_numpy(dtype=str), "counts": self.counts.to_numpy()},
+            {"capacity": self.capacity, "total": self.total, "error": self.error}
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HeavyHitters":
+        meta, archive = _load(data)
+        sketch = cls(meta["capacity"])
+        sketch.counts = pd.Series(archive["counts"], index=archive["keys"].astype(object))
+        sketch.total = meta["total"]
+        sketch.error = meta["error"]
+        return sketch
+
+
+class ReservoirSample:
+    """Uniform random sample of at most ``capacity`` rows from a stream of row blocks.
+
+    Algorithm R, vectorised per block: rows fill the reservoir until it is
+    full, after which the ``t``-th row of the stream (0-based) replaces a
+    random slot with probability ``capacity / (t + 1)``, so every row seen is
+    equally likely to be kept. The reservoir is allocated once at full size:
+    memory is ``capacity x columns`` values however long the stream runs.
+    """
+
+    def __init__(self, capacity: int, n_columns: int, dtype=np.float32, seed: int = 0):
+        self.capacity = capacity
+        self.seen = 0
+        self._rows = np.empty((capacity, n_columns), dtype=dtype)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, block: np.ndarray):
+        block = np.asarray(block)
+        fill = min(max(self.capacity - self.seen, 0), len(block))
+        if fill:
+            self._rows[self.seen:self.seen + fill] = block[:fill]
+        rest = len(block) - fill
+        if rest:
+            positions = np.arange(self.seen + fill, self.seen + len(block), dtype=np.float64)
+            slots = (self._rng.random(rest) * (positions + 1)).astype(np.int64)
+            chosen = np.flatnonzero(slots < self.capacity)
+            # When two rows land on one slot the later one wins, as in the sequential algorithm
+            _, last = np.unique(slots[chosen][::-1], return_index=True)
+            chosen = chosen[::-1][last]
+            self._rows[slots[chosen]] = block[fill + chosen]
+        self.seen += len(block)
+
+    def sample(self) -> np.ndarray:
+        """The sampled rows (a view; fewer than ``capacity`` while the stream is shorter)"""
+        return self._rows[:min(self.seen, self.capacity)]
+
+    def memory_bytes(self) -> int:
+        return self._rows.nbytes
+
+
+class FrequencySketches:
+    """Vendor and department statistics for an unbounded transaction stream in fixed memory"""
+
+    PARTS = ("vendor_counts", "department_counts", "distinct_vendors", "top_vendors", "top_vendor_spend")
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4, precision: int = 14, capacity: int = 1000):
+        self.vendor_counts = CountMinSketch(width, depth)
+        self.department_counts = CountMinSketch(1024, depth)
+        self.distinct_vendors = HyperLogLog(precision)
+        self.top_vendors = HeavyHitters(capacity)
+        self.top_vendor_spend = HeavyHitters(capacity)
+
+    @property
+    def rows(self) -> int:
+        return self.vendor_counts.total
+
+    def update(self, df: pd.DataFrame):
+        if len(df) == 0:
+            return
+        vendors = df['vendor_name'].astype(str).to_numpy(dtype=object)
+        self.vendor_counts.update(vendors)
+        self.department_counts.update(df['department_id'].astype(int).to_numpy())
+        self.distinct_vendors.update(vendors)
+        self.top_vendors.update(vendors)
+        self.top_vendor_spend.update(vendors, df['amount'].astype(float).clip(lower=0).to_numpy())
+
+    def merge(self, other: "FrequencySketches") -> "FrequencySketches":
+        for part in self.PARTS:
+            getattr(self, part).merge(getattr(other, part))
+        return self
+
+    def memory_bytes(self) -> int:
+        return sum(getattr(self, part).memory_bytes() for part in self.PARTS)
+
+    def to_bytes(self) -> bytes:
+        parts = {part: np.frombuffer(getattr(self, part).to_bytes(), dtype=np.uint8) for part in self.PARTS}
+        return _save(parts, {"version": 1})
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FrequencySketches":
+        _, archive = _load(data)
+        sketches = cls.__new__(cls)
+        sketches.vendor_counts = CountMinSketch.from_bytes(archive["vendor_counts"].tobytes())
+        sketches.department_counts = CountMinSketch.from_bytes(archive["department_counts"].tobytes())
+        sketches.distinct_vendors = HyperLogLog.from_bytes(archive["distinct_vendors"].tobytes())
+        sketches.top_vendors = HeavyHitters.from_bytes(archive["top_vendors"].tobytes())
+        sketches.top_vendor_spend = HeavyHitters.from_bytes(archive["top_vendor_spend"].tobytes())
+        return sketches
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+from config.settings import settings
+from utils.profiler import profiler
+
+_current_timer: ContextVar[Optional["StageTimer"]] = ContextVar("stage_timer", default=None)
+
+
+class StageTimer:
+    """Accumulates wall time per named stage for one request"""
+
+    __slots__ = ("started", "stages")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Render as a ``Server-Timing`` header value (durations in ms)"""
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.total() * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def start_request_timer() -> StageTimer:
+    timer = StageTimer()
+    _current_timer.set(timer)
+    return timer
+
+
+def current_timer() -> Optional[StageTimer]:
+    return _current_timer.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a named stage of the current request; a no-op outside one
+
+    The timer travels in a context variable, so stages inside
+    ``run_in_threadpool`` calls still land on the request that started them.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+def mark_since_start(name: str):
+    """Record the time from the start of the request until now, e.g. body parsing before the handler runs"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(name, time.perf_counter() - timer.started)
+
+
+class TimingAggregator:
+    """Per-route, per-stage timing statistics held in memory.
+
+    Keeps exact counts and totals plus a bounded window of recent samples per
+    stage for percentiles.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._routes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, timer: StageTimer, total: float):
+        with self._lock:
+            stages = self._routes.setdefault(route, {})
+            for name, seconds in list(timer.stages.items()) + [("total", total)]:
+                entry = stages.get(name)
+                if entry is None:
+                    entry = stages[name] = {"count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=self.window)}
+                entry["count"] += 1
+                entry["total"] += seconds
+                entry["max"] = max(entry["max"], seconds)
+                entry["recent"].append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {route: {name: dict(entry, recent=list(entry["recent"])) for name, entry in stages.items()}
+                      for route, stages in self._routes.items()}
+        return {
+            route: {name: _summarise(entry) for name, entry in stages.items()}
+            for route, stages in routes.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+def _summarise(entry: Dict[str, Any]) -> Dict[str, Any]:
+    recent: List[float] = entry["recent"]
+    p50, p95, p99 = np.percentile(recent, [50, 95, 99]) if recent else (0.0, 0.0, 0.0)
+    return {
+        "count": entry["count"],
+        "mean_ms": round(entry["total"] / entry["count"] * 1000, 3),
+        "p50_ms": round(float(p50) * 1000, 3),
+        "p95_ms": round(float(p95) * 1000, 3),
+        "p99_ms": round(float(p99) * 1000, 3),
+        "max_ms": round(entry["max"] * 1000, 3)
+    }
+
+
+# Global aggregate store
+timing_stats = TimingAggregator()
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware that times requests under ``prefixes``.
+
+    Adds a ``Server-Timing`` header with every stage recorded so far when
+    the response starts, and feeds the in-memory aggregates once the
+    response is complete. Other paths and WebSocket traffic pass straight
+    through.
+    """
+
+    def __init__(self, app, prefixes=None):
+        self.app = app
+        self.prefixes = tuple(prefixes if prefixes is not None else settings.TIMED_PATH_PREFIXES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        timer = start_request_timer()
+        route = f"{scope['method']} {scope['path']}"
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and settings.SERVER_TIMING_HEADER:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.server_timing().encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            timing_stats.record(route, timer, timer.total())
+            if profiler.active:
+                profiler.request_finished()
@@ -0,0 +1,220 @@
+import io
+import json
+import math
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "llc", "llp", "ltd", "limited", "co", "corp", "corporation",
+    "company", "plc", "gmbh", "sa", "ag", "pty", "pvt"
+}
+NGRAM = 3
+# Names MinHashed per call, bounding the temporary trigram arrays
+BAND_KEY_CHUNK = 10_000
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_HOMOGLYPHS = str.maketrans("01345", "oleas")
+
+
+def normalize_vendor(name: str) -> str:
+    """Case-, accent-, punctuation- and legal-suffix-insensitive form of a vendor name"""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode().lower()
+    tokens = _NON_ALNUM.sub(" ", text.replace("&", " and ")).split()
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def ngrams(normalized: str) -> List[str]:
+    # Spaces are dropped so "Tech Corp" and "TechCorp" share every trigram, and
+    # digits that pass for letters are folded so "0ffice" matches "office"
+    padded = f" {normalized.replace(' ', '').translate(_HOMOGLYPHS)} "
+    if len(padded) <= NGRAM:
+        return [padded]
+    return [padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)]
+
+
+class VendorIndex:
+    """MinHash/LSH index of normalized vendor names.
+
+    Each name's character trigrams are MinHashed into ``bands * rows``
+    values; names that agree on every value of any band become candidates,
+    so names with trigram Jaccard above roughly ``(1/bands) ** (1/rows)``
+    are found with high probability without comparing against every known
+    name. Candidates are then verified with an IDF-weighted Jaccard
+    similarity, so trigrams every other vendor shares ("ser", "ies") count
+    for little and "Bakoti Supplies" is not mistaken for "Bakote Supplies"
+    just because both sell supplies.
+
+    Band keys live in sorted numpy arrays (binary-searched) plus a small
+    unsorted buffer of recent additions that is merged in once it fills, so
+    adding names is cheap and lookups stay logarithmic.
+    """
+
+    def __init__(self, bands: int = 16, rows: int = 4, seed: int = 1, buffer_size: int = 4096):
+        self.bands = bands
+        self.rows = rows
+        self.seed = seed
+        self.buffer_size = buffer_size
+        rng = np.random.default_rng(seed)
+        num_perm = bands * rows
+        self._a = rng.integers(1, 1 << 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 1 << 62, rows, dtype=np.uint64) | np.uint64(1)
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.gram_counts: Dict[str, int] = {}
+        self._keys = np.zeros((bands, 0), dtype=np.uint32)
+        self._key_ids = np.zeros((bands, 0), dtype=np.int32)
+        self._pending_keys = np.zeros((0, bands), dtype=np.uint32)
+        self._pending_ids = np.zeros(0, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def band_keys(self, normalized: List[str]) -> np.ndarray:
+        """``(len(normalized), bands)`` uint32 LSH keys, computed for all names at once"""
+        if len(normalized) > BAND_KEY_CHUNK:
+            return np.concatenate([self.band_keys(normalized[i:i + BAND_KEY_CHUNK])
+                                   for i in range(0, len(normalized), BAND_KEY_CHUNK)])
+        grams = [ngrams(name) for name in normalized]
+        lengths = np.fromiter((len(g) for g in grams), dtype=np.int64, count=len(grams))
+        flat = np.asarray([g for group in grams for g in group], dtype=object)
+        hashed = pd.util.hash_array(flat, categorize=True)
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        # Multiply-add hashing for all permutations at once; overflow wraps, which is all that is needed here
+        with np.errstate(over='ignore'):
+            permuted = hashed[:, None] * self._a[None, :] + self._b[None, :]
+            signature = np.minimum.reduceat(permuted, starts, axis=0)
+            bands = signature.reshape(len(normalized), self.bands, self.rows)
+            mixed = (bands * self._band_mix).sum(axis=2)
+        return (mixed >> np.uint64(32)).astype(np.uint32)
+
+    def add(self, names: List[str], keys: Optional[np.ndarray] = None) -> List[int]:
+        """Index normalized names not seen before; returns the id of every name
+
+        ``keys`` may pass band keys already computed for ``names``.
+        """
+        positions = {}
+        for i, name in enumerate(names):
+            if name not in self.ids:
+                positions.setdefault(name, i)
+        new = list(positions)
+        if new:
+            first = len(self.names)
+            counts = self.gram_counts
+            for name in new:
+                for gram in set(ngrams(name)):
+                    counts[gram] = counts.get(gram, 0) + 1
+            self.ids.update(zip(new, range(first, first + len(new))))
+            self.names.extend(new)
+            new_keys = self.band_keys(new) if keys is None else keys[list(positions.values())]
+            self._pending_keys = np.concatenate([self._pending_keys, new_keys])
+            self._pending_ids = np.concatenate([self._pending_ids, np.arange(first, first + len(new), dtype=np.int32)])
+            if len(self._pending_ids) >= self.buffer_size:
+                self._merge_pending()
+        return [self.ids[n] for n in names]
+
+    def _merge_pending(self):
+        """Insert the pending keys into the sorted band arrays (linear, no full re-sort)"""
+        if not len(self._pending_ids):
+            return
+        order = np.argsort(self._pending_keys, axis=0, kind='stable')
+        keys = np.empty((self.bands, self._keys.shape[1] + len(order)), dtype=np.uint32)
+        key_ids = np.empty_like(keys, dtype=np.int32)
+        for band in range(self.bands):
+            pending = self._pending_keys[order[:, band], band]
+            positions = np.searchsorted(self._keys[band], pending, side='right')
+            keys[band] = np.insert(self._keys[band], positions, pending)
+            key_ids[band] = np.insert(self._key_ids[band], positions, self._pending_ids[order[:, band]])
+        self._keys, self._key_ids = keys, key_ids
+        self._pending_keys = np.zeros((0, self.bands), dtype=np.uint32)
+        self._pending_ids = np.zeros(0, dtype=np.int32)
+
+    def candidates(self, keys: np.ndarray) -> np.ndarray:
+        """Ids sharing at least one band key, most shared bands first"""
+        found = []
+        for band in range(self.bands):
+            row = self._keys[band]
+            lo = np.searchsorted(row, keys[band], side='left')
+            hi = np.searchsorted(row, keys[band], side='right')
+            if hi > lo:
+                found.append(self._key_ids[band, lo:hi])
+        if len(self._pending_ids):
+            found.append(self._pending_ids[(self._pending_keys == keys).any(axis=1)])
+        if not found:
+            return np.zeros(0, dtype=np.int32)
+        ids, counts = np.unique(np.concatenate(found), return_counts=True)
+        return ids[np.argsort(-counts, kind='stable')]
+
+    def _weighted_jaccard(self, grams_a: set, grams_b: set) -> float:
+        n = len(self.names) + 1
+        counts = self.gram_counts
+        weights = {g: math.log(n / (counts.get(g, 0) + 1)) + 1.0 for g in grams_a | grams_b}
+        union = sum(weights.values())
+        return sum(weights[g] for g in grams_a & grams_b) / union if union else 0.0
+
+    def similarity(self, a: str, b: str) -> float:
+        """IDF-weighted trigram Jaccard similarity of two normalized names"""
+        return self._weighted_jaccard(set(ngrams(a)), set(ngrams(b)))
+
+    def query(self, normalized: str, keys: Optional[np.ndarray] = None, limit: int = 50
+              ) -> Optional[Tuple[int, float]]:
+        """Most similar indexed name as ``(id, similarity)``, or None if nothing collides"""
+        exact = self.ids.get(normalized)
+        if exact is not None:
+            return exact, 1.0
+        if keys is None:
+            keys = self.band_keys([normalized])[0]
+        grams = set(ngrams(normalized))
+        best = None
+        for candidate in self.candidates(keys)[:limit].tolist():
+            similarity = self._weighted_jaccard(grams, set(ngrams(self.names[candidate])))
+            if best is None or similarity > best[1]:
+                best = (candidate, similarity)
+        return best
+
+    def memory_bytes(self) -> int:
+        arrays = self._keys.nbytes + self._key_ids.nbytes + self._pending_keys.nbytes + self._pending_ids.nbytes
+        return arrays + sum(len(n) + 49 for n in self.names)
+
+    def to_bytes(self) -> bytes:
+        self._merge_pending()
+        meta = {"bands": self.bands, "rows": self.rows, "seed": self.seed, "buffer_size": self.buffer_size}
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            __meta__=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+            names=np.frombuffer("\n".join(self.names).encode(), dtype=np.uint8),
+            grams=np.frombuffer("\n".join(self.gram_counts).encode(), dtype=np.uint8),
+            gram_counts=np.fromiter(self.gram_counts.values(), dtype=np.int64, count=len(self.gram_counts)),
+            keys=self._keys,
+            key_ids=self._key_ids
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "VendorIndex":
+        archive = np.load(io.BytesIO(data), allow_pickle=False)
+        meta = json.loads(archive["__meta__"].tobytes().decode())
+        index = cls(**meta)
+        text = archive["names"].tobytes().decode()
+        index.names = text.split("\n") if text else []
+        index.ids = {name: i for i, name in enumerate(index.names)}
+        grams = archive["grams"].tobytes().decode()
+        index.gram_counts = dict(zip(grams.split("\n"), archive["gram_counts"].tolist())) if grams else {}
+        index._keys = archive["keys"]
+        index._key_ids = archive["key_ids"]
+        return index
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "vendors_indexed": len(self.names),
+            "bands": self.bands,
+            "rows_per_band": self.rows,
+            "similarity_threshold_approx": round((1 / self.bands) ** (1 / self.rows), 2),
+            "pending": len(self._pending_ids),
+            "memory_mb": round(self.memory_bytes() / 1024 ** 2, 1)
+        }